@@ -5,11 +5,11 @@ Handles authentication, rate limiting, retries, caching
 
 import time
 import functools
-import hashlib
 import json
+import threading
 from typing import Dict, Any, Optional, Callable
 from collections import defaultdict
-from datetime import datetime, timedelta
+from datetime import datetime
 import os
 
 # ============================================================================
@@ -17,7 +17,12 @@ import os
 # ============================================================================
 
 class RateLimiter:
-    """Token bucket rate limiter"""
+    """
+    Token bucket rate limiter (thread-safe).
+    
+    Gemini calls made by the autonomous engine are paced separately by the
+    adaptive, quota-aware limiter in autonomous_engine/rate_limiter.py.
+    """
     
     def __init__(self):
         self.buckets = defaultdict(lambda: {"tokens": 100, "last_refill": time.time()})
@@ -28,25 +33,30 @@ class RateLimiter:
             "storage": {"rate": 1000, "per": 60},
             "default": {"rate": 100, "per": 60}
         }
+        self._lock = threading.Lock()
     
-    def acquire(self, api_name: str = "default") -> bool:
-        """Acquire a token for API call"""
+    def _refill(self, api_name: str):
         limit = self.limits.get(api_name, self.limits["default"])
         bucket = self.buckets[api_name]
         
-        # Refill tokens
         now = time.time()
         time_passed = now - bucket["last_refill"]
         refill_amount = (time_passed / limit["per"]) * limit["rate"]
         
         bucket["tokens"] = min(limit["rate"], bucket["tokens"] + refill_amount)
         bucket["last_refill"] = now
-        
-        # Check if we have tokens
-        if bucket["tokens"] >= 1:
-            bucket["tokens"] -= 1
-            return True
-        return False
+        return bucket, limit
+    
+    def acquire(self, api_name: str = "default") -> bool:
+        """Acquire a token for API call"""
+        with self._lock:
+            bucket, _ = self._refill(api_name)
+            
+            # Check if we have tokens
+            if bucket["tokens"] >= 1:
+                bucket["tokens"] -= 1
+                return True
+            return False
     
     def wait_if_needed(self, api_name: str = "default", max_wait: float = 5.0):
         """Wait until a token is available"""
@@ -54,7 +64,11 @@ class RateLimiter:
         while not self.acquire(api_name):
             if time.time() - start > max_wait:
                 raise Exception(f"Rate limit exceeded for {api_name}, waited {max_wait}s")
-            time.sleep(0.1)
+            # Sleep until the next token is due rather than polling
+            with self._lock:
+                bucket, limit = self._refill(api_name)
+                wait = (1 - bucket["tokens"]) * limit["per"] / limit["rate"]
+            time.sleep(min(max(wait, 0.01), max_wait))
 
 # Global rate limiter instance
 rate_limiter = RateLimiter()
@@ -96,59 +110,20 @@ def retry_with_backoff(
 # CACHING
 # ============================================================================
 
-class SimpleCache:
-    """Simple in-memory cache with TTL"""
-    
-    def __init__(self, default_ttl: int = 300):
-        self.cache = {}
-        self.default_ttl = default_ttl
-    
-    def get(self, key: str) -> Optional[Any]:
-        """Get cached value"""
-        if key in self.cache:
-            value, expiry = self.cache[key]
-            if datetime.now() < expiry:
-                return value
-            else:
-                del self.cache[key]
-        return None
-    
-    def set(self, key: str, value: Any, ttl: Optional[int] = None):
-        """Set cached value"""
-        expiry = datetime.now() + timedelta(seconds=ttl or self.default_ttl)
-        self.cache[key] = (value, expiry)
-    
-    def clear(self):
-        """Clear all cache"""
-        self.cache.clear()
+# Bounded LRU/TinyLFU cache with TTL sweeping, single-flight misses, stable
+# argument keys, per-namespace stats and an optional disk tier (caching.py)
+try:
+    from .caching import Cache, cached, stable_key, tool_cache
+except ImportError:
+    from caching import Cache, cached, stable_key, tool_cache
 
-# Global cache instance
-cache = SimpleCache()
+# Backwards-compatible names
+SimpleCache = Cache
+cache = tool_cache
 
-def cache_result(ttl: int = 300, key_func: Optional[Callable] = None):
-    """Decorator for caching function results"""
-    def decorator(func: Callable) -> Callable:
-        @functools.wraps(func)
-        def wrapper(*args, **kwargs):
-            # Generate cache key
-            if key_func:
-                cache_key = key_func(*args, **kwargs)
-            else:
-                key_data = f"{func.__name__}:{str(args)}:{str(kwargs)}"
-                cache_key = hashlib.md5(key_data.encode()).hexdigest()
-            
-            # Check cache
-            cached = cache.get(cache_key)
-            if cached is not None:
-                print(f"📦 Cache hit for {func.__name__}")
-                return cached
-            
-            # Execute and cache
-            result = func(*args, **kwargs)
-            cache.set(cache_key, result, ttl)
-            return result
-        return wrapper
-    return decorator
+def cache_result(ttl: int = 300, key_func: Optional[Callable] = None, namespace: Optional[str] = None):
+    """Decorator for caching function results (sync or async functions)"""
+    return cached(ttl=ttl, key_func=key_func, namespace=namespace, cache=cache)
 
 # ============================================================================
 # AUTHENTICATION & CREDENTIALS
@@ -211,15 +186,11 @@ def api_call(
         # Apply decorators in order
         wrapped = func
         
-        # 1. Caching (innermost)
-        if cache_ttl is not None:
-            wrapped = cache_result(ttl=cache_ttl)(wrapped)
-        
-        # 2. Retry logic
+        # 1. Retry logic (innermost)
         if retry:
             wrapped = retry_with_backoff()(wrapped)
         
-        # 3. Rate limiting (outermost)
+        # 2. Rate limiting
         @functools.wraps(wrapped)
         def wrapper(*args, **kwargs):
             if rate_limit:
@@ -239,6 +210,10 @@ def api_call(
                 print(f"❌ API Error: {json.dumps(error_info, indent=2)}")
                 raise
         
+        # 3. Caching (outermost, so hits skip rate limiting and retries)
+        if cache_ttl is not None:
+            # Default namespace is module.qualname, so same-named functions never share keys
+            return cache_result(ttl=cache_ttl)(wrapper)
         return wrapper
     return decorator
 
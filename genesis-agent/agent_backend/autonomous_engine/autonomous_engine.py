@@ -8,15 +8,23 @@ Phase 2: LLM-Powered Autonomous Execution
 - Continuous execution loop
 - Task execution with EnvironmentTools
 - Error analysis and self-correction
+
+Phase 3: Parallel DAG execution
+- Independent tasks (e.g. style.css, script.js, index.html) run concurrently,
+  up to max_concurrency at a time (AUTONOMOUS_MAX_CONCURRENCY, default 4)
+- Every transition is journaled (execution_journal.jsonl in the workspace);
+  resume() picks a crashed or preempted run up where it stopped
 """
 
 import asyncio
 import json
+import os
 from typing import Dict, Any, List, Optional
 from pathlib import Path
 import uuid
 
 from .task_manager import Task, TaskManager
+from .task_journal import TaskJournal, content_hash
 from environment_tools import EnvironmentTools
 try:
     from resilient_llm import ResilientLLM
@@ -35,12 +43,13 @@ class AutonomousEngine:
     Workflow:
     1. Take a high-level goal from user
     2. Decompose into subtasks (using LLM - will integrate later)
-    3. Execute tasks one by one using EnvironmentTools
+    3. Execute ready tasks concurrently using EnvironmentTools (dependency order)
     4. Observe results and self-correct if errors occur
     5. Continue until goal is achieved
     """
     
-    def __init__(self, workspace_dir: str, verbose: bool = True, use_llm: bool = True):
+    def __init__(self, workspace_dir: str, verbose: bool = True, use_llm: bool = True,
+                 max_concurrency: int = None):
         """
         Initialize the autonomous engine.
         
@@ -48,13 +57,18 @@ class AutonomousEngine:
             workspace_dir: Directory where agent can work
             verbose: Whether to print detailed progress
             use_llm: Whether to use LLM for intelligent execution (Phase 2)
+            max_concurrency: Maximum tasks executing at once (Phase 3)
         """
         self.workspace_dir = Path(workspace_dir)
         self.verbose = verbose
         self.use_llm = use_llm
+        if max_concurrency is None:
+            max_concurrency = int(os.getenv('AUTONOMOUS_MAX_CONCURRENCY', '4'))
+        self.max_concurrency = max(1, max_concurrency)
         self.task_manager: Optional[TaskManager] = None
         self.environment: Optional[EnvironmentTools] = None
         self.llm: Optional[LLMIntegration] = None
+        self.journal: Optional[TaskJournal] = None
         
         # Initialize LLM integration (Phase 2 with Resilience)
         if self.use_llm:
@@ -111,24 +125,25 @@ class AutonomousEngine:
         if "react component" in goal.lower():
             component_name = self._extract_component_name(goal)
             
-            tasks = [
-                Task(
-                    id=str(uuid.uuid4()),
-                    description=f"Create component file: {component_name}.tsx"
-                ),
-                Task(
-                    id=str(uuid.uuid4()),
-                    description=f"Write React component code for {component_name}"
-                ),
-                Task(
-                    id=str(uuid.uuid4()),
-                    description=f"Create test file: {component_name}.test.tsx"
-                ),
-                Task(
-                    id=str(uuid.uuid4()),
-                    description=f"Write tests for {component_name}"
-                ),
-            ]
+            create_component = Task(
+                id=str(uuid.uuid4()),
+                description=f"Create component file: {component_name}.tsx"
+            )
+            write_component = Task(
+                id=str(uuid.uuid4()),
+                description=f"Write React component code for {component_name}",
+                dependencies=[create_component.id]
+            )
+            create_test = Task(
+                id=str(uuid.uuid4()),
+                description=f"Create test file: {component_name}.test.tsx"
+            )
+            write_test = Task(
+                id=str(uuid.uuid4()),
+                description=f"Write tests for {component_name}",
+                dependencies=[write_component.id, create_test.id]
+            )
+            tasks = [create_component, write_component, create_test, write_test]
             
         # Example: "Create a file called hello.txt with content 'Hello World'"
         elif "create a file" in goal.lower() or "create file" in goal.lower():
@@ -203,8 +218,8 @@ class AutonomousEngine:
         description = task.description.lower()
         
         # Get task type and details (set by LLM decomposition)
-        task_type = getattr(task, 'task_type', None)
-        details = getattr(task, 'details', {})
+        task_type = task.task_type
+        details = task.details
         
         # Phase 2: Use LLM for code generation
         if self.use_llm and self.llm and task_type == 'write_code':
@@ -213,16 +228,23 @@ class AutonomousEngine:
                 language = details.get('language', 'text')
                 framework = details.get('framework')
                 
-                print(f"💻 Generating {language} code for {filename}...")
-                code = await self.llm.generate_code(
-                    task_description=task.description,
-                    filename=filename,
-                    language=language,
-                    framework=framework
-                )
+                # Reuse a journaled generation if this task was interrupted after the LLM call
+                code = self.journal.llm_output(task.id) if self.journal else None
+                if code is not None:
+                    print(f"♻️  Reusing journaled {language} code for {filename}")
+                else:
+                    print(f"💻 Generating {language} code for {filename}...")
+                    code = await self.llm.generate_code(
+                        task_description=task.description,
+                        filename=filename,
+                        language=language,
+                        framework=framework
+                    )
+                    if self.journal:
+                        self.journal.record_llm_output(task.id, code)
                 
                 # Save generated code
-                result = self.environment.create_file(filename, code)
+                result = self._write_file(task, filename, code)
                 return result
                 
             except Exception as e:
@@ -249,7 +271,7 @@ class AutonomousEngine:
             else:
                 content += "File created by Autonomous Engine\n"
                 
-            result = self.environment.create_file(filename, content)
+            result = self._write_file(task, filename, content)
             return result
             
         # Pattern: "Write React component code for X"
@@ -282,6 +304,47 @@ class AutonomousEngine:
                 'message': f'Task executed: {task.description}'
             }
             
+    def _write_file(self, task: Task, filename: str, content: str) -> Dict[str, Any]:
+        """Write a workspace file and journal it so resume() can restore it."""
+        result = self.environment.create_file(filename, content)
+        if result.get('success') and self.journal:
+            self.journal.record_file_write(task.id, filename, content)
+        return result
+        
+    async def _run_task(self, task: Task) -> None:
+        """Execute one task and record the outcome (runs concurrently with other ready tasks)."""
+        try:
+            result = await self.execute_task(task)
+            
+            if result.get('success'):
+                # Task succeeded
+                self.task_manager.mark_completed(task, result)
+                self.task_manager.update_state({'last_success': result})
+            else:
+                # Task failed
+                error = result.get('error', 'Unknown error')
+                self.task_manager.mark_failed(task, error)
+                
+                # Phase 2: Try to self-correct errors
+                if self.use_llm and self.llm:
+                    print(f"🔍 Analyzing error with LLM...")
+                    try:
+                        analysis = await self.llm.analyze_error(
+                            error_message=error,
+                            task_description=task.description
+                        )
+                        print(f"📋 Diagnosis: {analysis.get('diagnosis', 'No diagnosis')}")
+                        print(f"🔧 Fix strategy: {analysis.get('fix_strategy', 'No strategy')}")
+                        
+                        # If there's a fix, we could retry (future enhancement)
+                        
+                    except Exception as llm_error:
+                        print(f"⚠️ Error analysis failed: {llm_error}")
+                
+        except Exception as e:
+            # Unexpected error
+            self.task_manager.mark_failed(task, str(e))
+            
     async def run(self, goal: str) -> Dict[str, Any]:
         """
         Main execution loop - runs autonomously until goal is achieved.
@@ -297,62 +360,104 @@ class AutonomousEngine:
         print(f"{'='*60}")
         print(f"Goal: {goal}\n")
         
-        # Initialize components
-        self.task_manager = TaskManager(goal=goal)
+        # Initialize components (fresh write-ahead journal for this run)
+        self.journal = TaskJournal(self.workspace_dir / "execution_journal.jsonl")
+        self.journal.start(goal)
+        self.task_manager = TaskManager(goal=goal, journal=self.journal)
         self.environment = EnvironmentTools(workspace_dir=str(self.workspace_dir))
         
         # Step 1: Decompose goal into tasks
         tasks = await self.decompose_goal(goal)
         self.task_manager.add_tasks(tasks)
         
-        # Step 2: Execute tasks continuously
+        return await self._execute()
+        
+    async def resume(self, state_file: str) -> Dict[str, Any]:
+        """
+        Resume a run from its journal after a crash or preemption.
+        
+        Completed tasks are not re-executed and the LLM is not asked to
+        decompose the goal again; files written by completed tasks are
+        restored from the journal if they are missing or were changed, and
+        interrupted write_code tasks reuse any generation already journaled.
+        
+        Args:
+            state_file: The run's execution_journal.jsonl, or the
+                execution_state.json that points to it
+                
+        Returns:
+            Final execution summary (same shape as run())
+        """
+        path = Path(state_file)
+        if path.suffix == '.json':
+            with open(path) as f:
+                path = Path(json.load(f).get('journal') or '')
+            if not path.name:
+                raise ValueError(f"{state_file} does not reference a journal")
+        
+        self.journal = TaskJournal(path)
+        self.task_manager = TaskManager.from_journal(self.journal)
+        self.environment = EnvironmentTools(workspace_dir=str(self.workspace_dir))
+        
+        print(f"\n{'='*60}")
+        print(f"🔁 AUTONOMOUS EXECUTION RESUMED")
+        print(f"{'='*60}")
+        print(f"Goal: {self.task_manager.goal}\n")
+        
+        self._restore_files()
+        
+        # Crashed before decomposition was journaled: that step is all that's lost
+        if not self.task_manager.tasks:
+            tasks = await self.decompose_goal(self.task_manager.goal)
+            self.task_manager.add_tasks(tasks)
+        
+        return await self._execute()
+        
+    def _restore_files(self) -> None:
+        """Rewrite files of completed tasks that are missing or differ from what was journaled."""
+        for task in self.task_manager.completed_tasks:
+            for filename, digest in self.journal.file_writes.get(task.id, {}).items():
+                full_path = self.environment.workspace_dir / filename
+                try:
+                    current = content_hash(full_path.read_text(encoding='utf-8'))
+                except (OSError, UnicodeDecodeError):
+                    current = None
+                if current == digest:
+                    continue
+                content = self.journal.load_blob(digest)
+                if content is None:
+                    print(f"⚠️ Cannot restore {filename}: journaled content missing")
+                    continue
+                self.environment.create_file(filename, content)
+                print(f"♻️  Restored {filename} from journal")
+                
+    async def _execute(self) -> Dict[str, Any]:
+        """Run the task DAG to completion and write the final state file."""
+        goal = self.task_manager.goal
+        
+        # Step 2: Execute ready tasks concurrently, in dependency order
         iteration = 0
         max_iterations = 50  # Safety limit to prevent infinite loops
+        running: Dict[asyncio.Task, Task] = {}
         
-        while self.task_manager.has_pending_tasks() and iteration < max_iterations:
-            iteration += 1
-            
-            # Get next task
-            task = self.task_manager.get_next_task()
-            
-            if task is None:
-                break
+        while True:
+            # Fill free slots from the ready queue
+            while len(running) < self.max_concurrency and iteration < max_iterations:
+                task = self.task_manager.get_next_task()
+                if task is None:
+                    break
+                iteration += 1
+                running[asyncio.create_task(self._run_task(task))] = task
                 
-            # Execute task
-            try:
-                result = await self.execute_task(task)
-                
-                if result.get('success'):
-                    # Task succeeded
-                    self.task_manager.mark_completed(task, result)
-                    self.task_manager.update_state({'last_success': result})
-                else:
-                    # Task failed
-                    error = result.get('error', 'Unknown error')
-                    self.task_manager.mark_failed(task, error)
-                    
-                    # Phase 2: Try to self-correct errors
-                    if self.use_llm and self.llm:
-                        print(f"🔍 Analyzing error with LLM...")
-                        try:
-                            analysis = await self.llm.analyze_error(
-                                error_message=error,
-                                task_description=task.description
-                            )
-                            print(f"📋 Diagnosis: {analysis.get('diagnosis', 'No diagnosis')}")
-                            print(f"🔧 Fix strategy: {analysis.get('fix_strategy', 'No strategy')}")
-                            
-                            # If there's a fix, we could retry (future enhancement)
-                            
-                        except Exception as llm_error:
-                            print(f"⚠️ Error analysis failed: {llm_error}")
-                    
-            except Exception as e:
-                # Unexpected error
-                self.task_manager.mark_failed(task, str(e))
+            if not running:
+                if self.task_manager.has_pending_tasks() and iteration < max_iterations:
+                    # Nothing running and nothing ready: a dependency can never be met
+                    self.task_manager.fail_blocked_tasks()
+                break
                 
-            # Small delay to prevent overwhelming output
-            await asyncio.sleep(0.1)
+            done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for finished in done:
+                running.pop(finished)
             
         # Step 3: Generate summary
         summary = self.task_manager.get_progress_summary()
@@ -370,17 +475,19 @@ class AutonomousEngine:
         # Save state for debugging
         state_file = self.workspace_dir / "execution_state.json"
         self.task_manager.save_state(str(state_file))
+        self.journal.close()
         
         return {
             'goal': goal,
             'success': summary['failed'] == 0,
             'summary': summary,
             'iterations': iteration,
-            'state_file': str(state_file)
+            'state_file': str(state_file),
+            'journal': str(self.journal.path)
         }
 
 
-# Convenience function for testing
+# Convenience functions for testing
 async def run_autonomous_task(goal: str, workspace_dir: str = None) -> Dict[str, Any]:
     """
     Run an autonomous task (convenience function for testing).
@@ -400,6 +507,22 @@ async def run_autonomous_task(goal: str, workspace_dir: str = None) -> Dict[str,
     return result
 
 
+async def resume_autonomous_task(workspace_dir: str) -> Dict[str, Any]:
+    """
+    Resume an interrupted autonomous task from its workspace journal.
+    
+    Args:
+        workspace_dir: Workspace of the interrupted run
+        
+    Returns:
+        Execution summary
+    """
+    engine = AutonomousEngine(workspace_dir=workspace_dir)
+    journal = Path(workspace_dir) / "execution_journal.jsonl"
+    result = await engine.resume(str(journal))
+    return result
+
+
 if __name__ == "__main__":
     # Simple test
     async def test():
@@ -409,4 +532,3 @@ if __name__ == "__main__":
         print(f"\n🎯 Final result: {result}")
         
     asyncio.run(test())
-
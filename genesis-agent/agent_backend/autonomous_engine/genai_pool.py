@@ -0,0 +1,159 @@
+"""
+Shared Gemini Client Pool
+One genai.Client per auth mode for the whole process, native async calls
+
+Every LLM-using component (ResilientLLM, LLMIntegration, WebLearner,
+ResearchAgent, SmartLLMRouter) gets its client from here instead of
+constructing its own, so auth and the HTTP connection pool are set up once
+and reused. Calls go through client.aio (no asyncio.to_thread hop) and
+are bounded by one concurrency limiter per model, sized by model family:
+
+    *pro*              GENAI_MAX_CONCURRENCY_PRO    (default 4)
+    *flash*            GENAI_MAX_CONCURRENCY_FLASH  (default 16)
+    anything else      GENAI_MAX_CONCURRENCY        (default 8)
+
+and paced per model by the shared adaptive rate limiter (rate_limiter.py),
+which also owns quota retries, so callers don't need their own 429 handling.
+"""
+
+import os
+import asyncio
+import weakref
+import threading
+from typing import Any, Dict, Optional
+
+from google import genai
+
+from .rate_limiter import rate_limiter, estimate_tokens, is_quota_error, retry_after
+
+
+VERTEX_PROJECT = os.getenv('GOOGLE_CLOUD_PROJECT', 'studio-2416451423-f2d96')
+VERTEX_LOCATION = os.getenv('GOOGLE_CLOUD_LOCATION', 'us-central1')
+
+_BUCKET_LIMITS = {
+    'pro': int(os.getenv('GENAI_MAX_CONCURRENCY_PRO', '4')),
+    'flash': int(os.getenv('GENAI_MAX_CONCURRENCY_FLASH', '16')),
+    'default': int(os.getenv('GENAI_MAX_CONCURRENCY', '8')),
+}
+
+GENAI_MAX_RETRIES = int(os.getenv('GENAI_MAX_RETRIES', '3'))
+
+_clients: Dict[str, Any] = {}
+_clients_lock = threading.Lock()
+
+# asyncio primitives belong to one event loop, so limiters are per loop and model
+_limiters: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Semaphore]]" = weakref.WeakKeyDictionary()
+_limiters_lock = threading.Lock()
+
+
+def get_client(vertexai: bool = True) -> Optional[Any]:
+    """
+    Process-wide genai.Client.
+
+    vertexai=True uses Vertex AI (project credentials); False uses
+    GEMINI_API_KEY and returns None when the key isn't set.
+    """
+    kind = 'vertex' if vertexai else 'api_key'
+    client = _clients.get(kind)
+    if client is not None:
+        return client
+
+    with _clients_lock:
+        client = _clients.get(kind)
+        if client is None:
+            if vertexai:
+                client = genai.Client(vertexai=True, project=VERTEX_PROJECT, location=VERTEX_LOCATION)
+            else:
+                api_key = os.getenv('GEMINI_API_KEY')
+                if not api_key:
+                    return None
+                client = genai.Client(api_key=api_key)
+            _clients[kind] = client
+    return client
+
+
+def quota_bucket(model: str) -> str:
+    """Model family ('pro', 'flash' or 'default') that sets a model's default limits"""
+    model = model.lower()
+    if 'flash' in model:
+        return 'flash'
+    if 'pro' in model:
+        return 'pro'
+    return 'default'
+
+
+def model_limiter(model: str) -> asyncio.Semaphore:
+    """Concurrency limiter shared by every caller of this model (current loop)."""
+    loop = asyncio.get_running_loop()
+    with _limiters_lock:
+        models = _limiters.setdefault(loop, {})
+        limiter = models.get(model)
+        if limiter is None:
+            limiter = models[model] = asyncio.Semaphore(_BUCKET_LIMITS[quota_bucket(model)])
+    return limiter
+
+
+def _client_kind(client: Any) -> str:
+    for kind, pooled in _clients.items():
+        if pooled is client:
+            return kind
+    return 'external'
+
+
+async def generate_content(
+    model: str,
+    contents: Any,
+    config: Any = None,
+    client: Any = None,
+    max_retries: int = GENAI_MAX_RETRIES
+):
+    """
+    Async generate_content through the shared pool.
+
+    Requests are paced by the shared adaptive rate limiter; quota errors
+    (429 / RESOURCE_EXHAUSTED) are retried with jittered backoff, honoring
+    Retry-After, while the global retry budget allows it, then re-raised.
+
+    Args:
+        model: Model name (each model has its own concurrency limit and quota state)
+        contents: As for client.models.generate_content
+        config: Optional GenerateContentConfig
+        client: A specific pooled client (default: the Vertex AI client)
+        max_retries: Quota retries for this call (0 = fail fast)
+    """
+    client = client or get_client()
+    bucket = quota_bucket(model)
+    key = f"{_client_kind(client)}:{model}"
+    tokens = estimate_tokens(contents)
+    rate_limiter.retry_budget.record_request()
+
+    attempt = 0
+    while True:
+        await rate_limiter.acquire(key, bucket, tokens)
+        try:
+            async with model_limiter(model):
+                response = await client.aio.models.generate_content(
+                    model=model, contents=contents, config=config
+                )
+        except Exception as e:
+            if not is_quota_error(e):
+                raise
+            delay_hint = retry_after(e)
+            rate_limiter.on_throttle(key, bucket, delay_hint)
+            if attempt >= max_retries or not rate_limiter.retry_budget.try_spend():
+                raise
+            wait = rate_limiter.backoff(attempt, delay_hint)
+            print(f"⚠️ Quota exhausted on {model}, retrying in {wait:.1f}s (attempt {attempt + 1}/{max_retries})")
+            await asyncio.sleep(wait)
+            attempt += 1
+            continue
+        rate_limiter.on_success(key, bucket)
+        return response
+
+
+def pool_stats() -> Dict[str, Any]:
+    return {
+        'clients': sorted(_clients),
+        'bucket_limits': dict(_BUCKET_LIMITS),
+        'rate_limits': rate_limiter.stats(),
+    }
@@ -1,13 +1,84 @@
 """
 Continuous Learning Knowledge Base
 Stores and retrieves knowledge learned from web research and experience.
+
+Storage is SQLite (WAL) with an FTS5 index over topic entries, so adding
+knowledge is a small insert instead of rewriting the whole file, and
+search_knowledge is an index lookup instead of a scan over every entry.
+An existing knowledge_base.json is migrated into the database on first
+open and left in place as a backup.
 """
 
 import json
+import sqlite3
+import threading
+from contextlib import contextmanager
 from pathlib import Path
 from typing import Dict, List, Optional
 from datetime import datetime
 
+try:
+    from .knowledge_retrieval import KnowledgeRetriever
+except ImportError:
+    from knowledge_retrieval import KnowledgeRetriever
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS topics (
+    name TEXT PRIMARY KEY,
+    created TEXT,
+    updated TEXT,
+    update_count INTEGER DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS topic_entries (
+    id INTEGER PRIMARY KEY,
+    topic TEXT NOT NULL,
+    knowledge TEXT NOT NULL,
+    source TEXT,
+    timestamp TEXT
+);
+CREATE INDEX IF NOT EXISTS topic_entries_topic ON topic_entries(topic);
+CREATE VIRTUAL TABLE IF NOT EXISTS topic_entries_fts USING fts5(
+    topic, knowledge, content='topic_entries', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS topic_entries_ai AFTER INSERT ON topic_entries BEGIN
+    INSERT INTO topic_entries_fts(rowid, topic, knowledge) VALUES (new.id, new.topic, new.knowledge);
+END;
+CREATE TABLE IF NOT EXISTS patterns (
+    name TEXT PRIMARY KEY,
+    description TEXT,
+    solution TEXT,
+    timestamp TEXT,
+    use_count INTEGER DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS best_practices (
+    id INTEGER PRIMARY KEY,
+    technology TEXT NOT NULL,
+    practice TEXT,
+    rationale TEXT,
+    timestamp TEXT
+);
+CREATE INDEX IF NOT EXISTS best_practices_technology ON best_practices(technology);
+CREATE TABLE IF NOT EXISTS tools (
+    name TEXT PRIMARY KEY,
+    usage TEXT,
+    tips TEXT,
+    timestamp TEXT
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def _fts_query(query: str) -> Optional[str]:
+    """All query words as prefix terms (any order), quoted so FTS5 syntax can't leak in"""
+    words = [w for w in ''.join(c if c.isalnum() else ' ' for c in query.lower()).split() if w]
+    if not words:
+        return None
+    return ' '.join(f'"{w}"*' for w in words)
+
 
 class KnowledgeBase:
     """
@@ -18,51 +89,143 @@ class KnowledgeBase:
     """
     
     def __init__(self, storage_path: str = None):
-        """Initialize knowledge base with persistent storage."""
+        """
+        Initialize knowledge base with persistent storage.
+        
+        Args:
+            storage_path: SQLite database path. A legacy *.json path is accepted:
+                          the database lives next to it (same name, .sqlite3) and
+                          the JSON contents are migrated on first open.
+        """
         if storage_path is None:
             storage_path = Path(__file__).parent / "knowledge_base.json"
         
-        self.storage_path = Path(storage_path)
-        self.knowledge = self._load()
-    
-    def _load(self) -> Dict:
-        """Load knowledge from persistent storage."""
-        if self.storage_path.exists():
-            try:
-                with open(self.storage_path, 'r') as f:
-                    return json.load(f)
-            except Exception as e:
-                print(f"⚠️ Could not load knowledge base: {e}")
-                return self._init_knowledge()
-        return self._init_knowledge()
+        storage_path = Path(storage_path)
+        if storage_path.suffix == '.json':
+            self.json_path = storage_path
+            self.storage_path = storage_path.with_suffix('.sqlite3')
+        else:
+            self.json_path = None
+            self.storage_path = storage_path
+        
+        self._lock = threading.RLock()
+        self._batch_depth = 0
+        self._retriever: Optional[KnowledgeRetriever] = None
+        self._db = self._connect()
+        self._migrate_json()
     
-    def _init_knowledge(self) -> Dict:
-        """Initialize empty knowledge structure."""
-        return {
-            "topics": {},  # Topic-based knowledge
-            "patterns": {},  # Error patterns and solutions
-            "best_practices": {},  # Coding best practices
-            "tools": {},  # Tool-specific knowledge
-            "statistics": {
-                "total_topics": 0,
-                "total_updates": 0,
-                "last_updated": None
-            }
-        }
+    def _connect(self) -> sqlite3.Connection:
+        self.storage_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.storage_path), check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA)
+        conn.commit()
+        return conn
     
-    def _save(self):
-        """Persist knowledge to disk."""
+    def _migrate_json(self):
+        """One-time import of a legacy knowledge_base.json."""
+        if not self.json_path or not self.json_path.exists():
+            return
+        if self._get_meta("migrated_from"):
+            return
+        
         try:
-            self.storage_path.parent.mkdir(parents=True, exist_ok=True)
-            with open(self.storage_path, 'w') as f:
-                json.dump(self.knowledge, f, indent=2)
+            with open(self.json_path, 'r') as f:
+                legacy = json.load(f)
         except Exception as e:
+            print(f"⚠️ Could not load knowledge base: {e}")
+            return
+        
+        with self.batch():
+            db = self._db
+            # Take the write lock first so two processes opening at once can't both import
+            db.execute("BEGIN IMMEDIATE")
+            if self._get_meta("migrated_from"):
+                return
+            for topic, data in legacy.get("topics", {}).items():
+                db.execute(
+                    "INSERT OR IGNORE INTO topics (name, created, updated, update_count) VALUES (?, ?, ?, ?)",
+                    (topic, data.get("created"), data.get("updated"), data.get("update_count", 0))
+                )
+                db.executemany(
+                    "INSERT INTO topic_entries (topic, knowledge, source, timestamp) VALUES (?, ?, ?, ?)",
+                    [(topic, e.get("knowledge", ""), e.get("source"), e.get("timestamp"))
+                     for e in data.get("entries", [])]
+                )
+            for name, p in legacy.get("patterns", {}).items():
+                db.execute(
+                    "INSERT OR REPLACE INTO patterns (name, description, solution, timestamp, use_count) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (name, p.get("description"), p.get("solution"), p.get("timestamp"), p.get("use_count", 0))
+                )
+            for tech, practices in legacy.get("best_practices", {}).items():
+                db.executemany(
+                    "INSERT INTO best_practices (technology, practice, rationale, timestamp) VALUES (?, ?, ?, ?)",
+                    [(tech, p.get("practice"), p.get("rationale"), p.get("timestamp")) for p in practices]
+                )
+            for name, t in legacy.get("tools", {}).items():
+                db.execute(
+                    "INSERT OR REPLACE INTO tools (name, usage, tips, timestamp) VALUES (?, ?, ?, ?)",
+                    (name, t.get("usage"), json.dumps(t.get("tips", [])), t.get("timestamp"))
+                )
+            stats = legacy.get("statistics", {})
+            self._set_meta("total_updates", stats.get("total_updates", 0))
+            self._set_meta("last_updated", stats.get("last_updated"))
+            self._set_meta("migrated_from", str(self.json_path))
+        
+        print(f"📚 Migrated knowledge base {self.json_path.name} → {self.storage_path.name} "
+              f"({len(legacy.get('topics', {}))} topics)")
+    
+    @contextmanager
+    def batch(self):
+        """
+        Group many writes into one transaction.
+        
+        Inside `with kb.batch():` add_* calls are committed together when the
+        outermost batch exits (or rolled back if it raises).
+        """
+        with self._lock:
+            self._batch_depth += 1
+            try:
+                yield self
+            except BaseException:
+                self._batch_depth -= 1
+                if self._batch_depth == 0:
+                    self._db.rollback()
+                raise
+            self._batch_depth -= 1
+            if self._batch_depth == 0:
+                self._commit()
+    
+    def _commit(self):
+        """Commit now unless a batch is open (then the batch commits)."""
+        if self._batch_depth:
+            return
+        try:
+            self._db.commit()
+        except sqlite3.Error as e:
             print(f"⚠️ Could not save knowledge base: {e}")
     
+    def _set_meta(self, key: str, value):
+        self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, json.dumps(value)))
+    
+    def _get_meta(self, key: str, default=None):
+        row = self._db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return json.loads(row["value"]) if row else default
+    
+    def _touch_statistics(self, now: str):
+        self._db.execute(
+            "INSERT INTO meta (key, value) VALUES ('total_updates', '1') "
+            "ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1"
+        )
+        self._set_meta("last_updated", now)
+    
     def add_topic_knowledge(
-        self, 
-        topic: str, 
-        knowledge: str, 
+        self,
+        topic: str,
+        knowledge: str,
         source: str = "research"
     ):
         """
@@ -73,147 +236,241 @@ class KnowledgeBase:
             knowledge: What was learned
             source: Where it came from (research, experience, error)
         """
-        if topic not in self.knowledge["topics"]:
-            self.knowledge["topics"][topic] = {
-                "entries": [],
-                "created": datetime.now().isoformat(),
-                "updated": datetime.now().isoformat(),
-                "update_count": 0
-            }
-        
-        # Add new entry
-        self.knowledge["topics"][topic]["entries"].append({
-            "knowledge": knowledge,
-            "source": source,
-            "timestamp": datetime.now().isoformat()
-        })
-        
-        # Update metadata
-        self.knowledge["topics"][topic]["updated"] = datetime.now().isoformat()
-        self.knowledge["topics"][topic]["update_count"] += 1
-        self.knowledge["statistics"]["total_updates"] += 1
-        self.knowledge["statistics"]["last_updated"] = datetime.now().isoformat()
-        
-        if len(self.knowledge["topics"][topic]["entries"]) == 1:
-            self.knowledge["statistics"]["total_topics"] += 1
-        
-        self._save()
+        now = datetime.now().isoformat()
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO topics (name, created, updated, update_count) VALUES (?, ?, ?, 1) "
+                "ON CONFLICT(name) DO UPDATE SET updated = excluded.updated, update_count = update_count + 1",
+                (topic, now, now)
+            )
+            self._db.execute(
+                "INSERT INTO topic_entries (topic, knowledge, source, timestamp) VALUES (?, ?, ?, ?)",
+                (topic, knowledge, source, now)
+            )
+            self._touch_statistics(now)
+            self._commit()
         print(f"📚 LEARNED: Added knowledge about '{topic}' (source: {source})")
     
+    def _entries(self, topic: str) -> List[Dict]:
+        rows = self._db.execute(
+            "SELECT knowledge, source, timestamp FROM topic_entries WHERE topic = ? ORDER BY id",
+            (topic,)
+        ).fetchall()
+        return [dict(row) for row in rows]
+    
     def get_topic_knowledge(self, topic: str) -> Optional[List[Dict]]:
         """Retrieve all knowledge about a topic."""
-        if topic in self.knowledge["topics"]:
-            return self.knowledge["topics"][topic]["entries"]
-        return None
+        with self._lock:
+            entries = self._entries(topic)
+        return entries or None
     
     def search_knowledge(self, query: str) -> List[Dict]:
         """
         Search knowledge base for relevant information.
         
+        Topics whose name contains the query come first (with all their
+        entries), then individual entries matching every query word, best
+        FTS5 (bm25) match first.
+        
         Returns list of matching entries with topic and content.
         """
         results = []
-        query_lower = query.lower()
+        query_lower = query.lower().strip()
+        if not query_lower:
+            return results
         
-        for topic, data in self.knowledge["topics"].items():
-            # Check if query matches topic
-            if query_lower in topic.lower():
+        with self._lock:
+            topic_matches = [
+                row["name"] for row in self._db.execute(
+                    "SELECT name FROM topics WHERE instr(lower(name), ?) > 0 ORDER BY rowid",
+                    (query_lower,)
+                )
+            ]
+            for topic in topic_matches:
                 results.append({
                     "topic": topic,
                     "relevance": "topic_match",
-                    "entries": data["entries"]
+                    "entries": self._entries(topic)
                 })
-            else:
-                # Check if query matches any knowledge entry
-                for entry in data["entries"]:
-                    if query_lower in entry["knowledge"].lower():
-                        results.append({
-                            "topic": topic,
-                            "relevance": "content_match",
-                            "entry": entry
-                        })
+            
+            fts = _fts_query(query_lower)
+            if fts is None:
+                return results
+            try:
+                rows = self._db.execute(
+                    "SELECT e.topic, e.knowledge, e.source, e.timestamp FROM topic_entries_fts "
+                    "JOIN topic_entries e ON e.id = topic_entries_fts.rowid "
+                    "WHERE topic_entries_fts MATCH ? ORDER BY bm25(topic_entries_fts)",
+                    (f"knowledge : ({fts})",)
+                ).fetchall()
+            except sqlite3.Error as e:
+                print(f"⚠️ Knowledge search error: {e}")
+                rows = []
+        
+        matched_topics = set(topic_matches)
+        for row in rows:
+            if row["topic"] in matched_topics:
+                continue
+            results.append({
+                "topic": row["topic"],
+                "relevance": "content_match",
+                "entry": {
+                    "knowledge": row["knowledge"],
+                    "source": row["source"],
+                    "timestamp": row["timestamp"]
+                }
+            })
         
         return results
     
+    def version(self) -> tuple:
+        """Changes whenever entries, patterns or best practices change (retrieval index key)."""
+        with self._lock:
+            return tuple(self._db.execute(
+                "SELECT (SELECT MAX(id) FROM topic_entries), "
+                "(SELECT COUNT(*) FROM patterns), (SELECT MAX(rowid) FROM patterns), "
+                "(SELECT MAX(id) FROM best_practices)"
+            ).fetchone())
+    
+    def iter_documents(self) -> List[Dict]:
+        """Every retrievable document: topic entries, patterns and best practices."""
+        with self._lock:
+            entries = self._db.execute(
+                "SELECT id, topic, knowledge, source FROM topic_entries ORDER BY id"
+            ).fetchall()
+            patterns = self._db.execute(
+                "SELECT name, description, solution FROM patterns ORDER BY rowid"
+            ).fetchall()
+            practices = self._db.execute(
+                "SELECT technology, practice, rationale FROM best_practices ORDER BY id"
+            ).fetchall()
+        docs = [
+            {"kind": "topic", "topic": row["topic"], "text": row["knowledge"], "source": row["source"]}
+            for row in entries
+        ]
+        docs += [
+            {"kind": "pattern", "topic": row["name"], "source": "pattern",
+             "text": f"{row['description'] or ''}\nSolution: {row['solution'] or ''}"}
+            for row in patterns
+        ]
+        docs += [
+            {"kind": "best_practice", "topic": row["technology"], "source": "best_practice",
+             "text": f"{row['practice'] or ''} ({row['rationale'] or ''})"}
+            for row in practices
+        ]
+        return docs
+    
+    def retrieve(self, query: str, top_k: int = 8, token_budget: int = 1500,
+                 kinds: Optional[List[str]] = None) -> List[Dict]:
+        """
+        Hybrid (BM25 + embedding) retrieval of ranked, deduplicated snippets
+        that fit in token_budget. See knowledge_retrieval.py.
+        
+        Args:
+            query: Free text, e.g. a full error message
+            top_k: Maximum number of snippets
+            token_budget: Approximate token cap for all snippets together
+            kinds: Restrict to 'topic', 'pattern' and/or 'best_practice'
+        """
+        if self._retriever is None:
+            self._retriever = KnowledgeRetriever(self)
+        return self._retriever.retrieve(query, top_k=top_k, token_budget=token_budget, kinds=kinds)
+    
     def add_pattern(
-        self, 
-        pattern_name: str, 
-        description: str, 
+        self,
+        pattern_name: str,
+        description: str,
         solution: str
     ):
         """
         Store a reusable pattern (error pattern, design pattern, etc.).
         """
-        self.knowledge["patterns"][pattern_name] = {
-            "description": description,
-            "solution": solution,
-            "timestamp": datetime.now().isoformat(),
-            "use_count": 0
-        }
-        self._save()
+        now = datetime.now().isoformat()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO patterns (name, description, solution, timestamp, use_count) "
+                "VALUES (?, ?, ?, ?, 0)",
+                (pattern_name, description, solution, now)
+            )
+            self._commit()
         print(f"📚 LEARNED: Stored pattern '{pattern_name}'")
     
     def get_pattern(self, pattern_name: str) -> Optional[Dict]:
         """Retrieve a stored pattern."""
-        pattern = self.knowledge["patterns"].get(pattern_name)
-        if pattern:
-            pattern["use_count"] += 1
-            self._save()
-        return pattern
+        with self._lock:
+            self._db.execute("UPDATE patterns SET use_count = use_count + 1 WHERE name = ?", (pattern_name,))
+            self._commit()
+            row = self._db.execute(
+                "SELECT description, solution, timestamp, use_count FROM patterns WHERE name = ?",
+                (pattern_name,)
+            ).fetchone()
+        return dict(row) if row else None
     
     def add_best_practice(
-        self, 
-        technology: str, 
-        practice: str, 
+        self,
+        technology: str,
+        practice: str,
         rationale: str
     ):
         """Store best practices for technologies."""
-        if technology not in self.knowledge["best_practices"]:
-            self.knowledge["best_practices"][technology] = []
-        
-        self.knowledge["best_practices"][technology].append({
-            "practice": practice,
-            "rationale": rationale,
-            "timestamp": datetime.now().isoformat()
-        })
-        self._save()
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO best_practices (technology, practice, rationale, timestamp) VALUES (?, ?, ?, ?)",
+                (technology, practice, rationale, datetime.now().isoformat())
+            )
+            self._commit()
         print(f"📚 LEARNED: Best practice for {technology}")
     
     def get_best_practices(self, technology: str) -> List[Dict]:
         """Get all best practices for a technology."""
-        return self.knowledge["best_practices"].get(technology, [])
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT practice, rationale, timestamp FROM best_practices WHERE technology = ? ORDER BY id",
+                (technology,)
+            ).fetchall()
+        return [dict(row) for row in rows]
     
     def add_tool_knowledge(
-        self, 
-        tool_name: str, 
-        usage: str, 
+        self,
+        tool_name: str,
+        usage: str,
         tips: List[str]
     ):
         """Store knowledge about how to use a tool."""
-        self.knowledge["tools"][tool_name] = {
-            "usage": usage,
-            "tips": tips,
-            "timestamp": datetime.now().isoformat()
-        }
-        self._save()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO tools (name, usage, tips, timestamp) VALUES (?, ?, ?, ?)",
+                (tool_name, usage, json.dumps(tips), datetime.now().isoformat())
+            )
+            self._commit()
         print(f"📚 LEARNED: How to use {tool_name}")
     
     def get_tool_knowledge(self, tool_name: str) -> Optional[Dict]:
         """Get knowledge about a tool."""
-        return self.knowledge["tools"].get(tool_name)
+        with self._lock:
+            row = self._db.execute(
+                "SELECT usage, tips, timestamp FROM tools WHERE name = ?", (tool_name,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {"usage": row["usage"], "tips": json.loads(row["tips"]), "timestamp": row["timestamp"]}
     
     def get_summary(self) -> Dict:
         """Get a summary of what's stored in the knowledge base."""
-        return {
-            "total_topics": len(self.knowledge["topics"]),
-            "total_patterns": len(self.knowledge["patterns"]),
-            "total_best_practices": sum(
-                len(practices) 
-                for practices in self.knowledge["best_practices"].values()
-            ),
-            "total_tools": len(self.knowledge["tools"]),
-            "statistics": self.knowledge["statistics"]
-        }
+        with self._lock:
+            count = lambda table: self._db.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            total_topics = count("topics")
+            return {
+                "total_topics": total_topics,
+                "total_patterns": count("patterns"),
+                "total_best_practices": count("best_practices"),
+                "total_tools": count("tools"),
+                "statistics": {
+                    "total_topics": total_topics,
+                    "total_updates": int(self._get_meta("total_updates", 0)),
+                    "last_updated": self._get_meta("last_updated")
+                }
+            }
     
     def print_summary(self):
         """Print a human-readable summary."""
@@ -228,36 +485,39 @@ class KnowledgeBase:
         print(f"Total updates: {summary['statistics']['total_updates']}")
         print(f"Last updated: {summary['statistics']['last_updated']}")
         print("="*60 + "\n")
+    
+    def close(self):
+        with self._lock:
+            self._db.close()
 
 
 # Example usage
 if __name__ == "__main__":
     kb = KnowledgeBase()
-    
+
     # Add some example knowledge
     kb.add_topic_knowledge(
         topic="Flask routing",
         knowledge="Flask uses @app.route() decorator. The route must have a return value.",
         source="research"
     )
-    
+
     kb.add_topic_knowledge(
         topic="Playwright selectors",
         knowledge="Playwright uses CSS selectors by default. Use #id for IDs, .class for classes.",
         source="web_search"
     )
-    
+
     kb.add_pattern(
         pattern_name="missing_ui_elements",
         description="When Playwright can't find UI elements in HTML",
         solution="Ensure HTML has the exact selector IDs. Use proven template if necessary."
     )
-    
+
     kb.print_summary()
-    
+
     # Search knowledge
     results = kb.search_knowledge("selector")
     print(f"\nSearch results for 'selector': {len(results)} matches")
     for result in results:
         print(f"  - {result['topic']}")
-
@@ -0,0 +1,338 @@
+"""
+Hybrid Knowledge Retrieval
+Ranked, deduplicated knowledge snippets for prompts, within a token budget
+
+Used by KnowledgeBase.retrieve (and through it ResearchAgent and
+MetaAppBuilderV3's knowledge-guided fixes). Every topic entry, error
+pattern and best practice is split into paragraph-sized snippets and
+indexed twice:
+
+- lexically with BM25, so exact identifiers from an error message
+  (TypeError, jsonify, querySelector...) score highly
+- semantically with text-embedding-004 (VertexEmbedder, through
+  jai_cortex's EmbeddingClient, so snippet vectors are cached on disk by
+  content hash and a rebuild only embeds new snippets), so paraphrases
+  with no words in common still match
+
+The semantic embedder needs the Vertex AI SDK and credentials. Without
+them (KNOWLEDGE_EMBEDDER=auto, the default) the retriever falls back to
+HashingEmbedder: hashed word + character n-gram vectors, no API calls.
+That is a second lexical signal rather than a semantic one ("selector"
+still finds "querySelectorAll", but paraphrases only match through shared
+word pieces). KNOWLEDGE_EMBEDDER=hashing forces it; =vertex disables the
+fallback.
+
+The two rankings are fused with Reciprocal Rank Fusion, near-duplicate
+snippets are dropped, and snippets are taken best-first until the token
+budget is spent. The index is rebuilt in memory whenever the knowledge
+base changes. Any embedder with embed_many(texts) -> vectors can be
+injected instead.
+"""
+
+import os
+import re
+import math
+import zlib
+import functools
+import threading
+import importlib.util
+from pathlib import Path
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+_WORD_RE = re.compile(r"[A-Za-z_][A-Za-z0-9_]*|\d+")
+_CAMEL_RE = re.compile(r"[A-Z]?[a-z]+|[A-Z]+(?![a-z])|\d+")
+
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the this to "
+    "was were will with you your not no can do does how what when which".split()
+)
+
+SNIPPET_CHARS = 600
+RRF_K = 60
+
+# 'auto' (text-embedding-004, hashing fallback), 'vertex' or 'hashing'
+KNOWLEDGE_EMBEDDER = os.environ.get('KNOWLEDGE_EMBEDDER', 'auto').lower()
+KNOWLEDGE_EMBEDDING_MODEL = os.environ.get('KNOWLEDGE_EMBEDDING_MODEL', 'text-embedding-004')
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens; identifiers also yield their camelCase/snake_case parts."""
+    tokens = []
+    for word in _WORD_RE.findall(text):
+        lower = word.lower()
+        if lower not in _STOPWORDS and len(lower) > 1:
+            tokens.append(lower)
+        parts = [p.lower() for chunk in word.split('_') for p in _CAMEL_RE.findall(chunk)]
+        if len(parts) > 1:
+            tokens.extend(p for p in parts if len(p) > 1 and p not in _STOPWORDS)
+    return tokens
+
+
+def _unit_rows(vectors: Any) -> np.ndarray:
+    matrix = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def split_snippets(text: str, max_chars: int = SNIPPET_CHARS) -> List[str]:
+    """Paragraph-sized snippets: merge short paragraphs, hard-wrap long ones."""
+    snippets, current = [], ""
+    for para in re.split(r"\n\s*\n", text.strip()):
+        para = para.strip()
+        if not para:
+            continue
+        while len(para) > max_chars:
+            cut = para.rfind(' ', 0, max_chars)
+            cut = cut if cut > max_chars // 2 else max_chars
+            if current:
+                snippets.append(current)
+                current = ""
+            snippets.append(para[:cut].strip())
+            para = para[cut:].strip()
+        if current and len(current) + len(para) + 2 > max_chars:
+            snippets.append(current)
+            current = para
+        else:
+            current = f"{current}\n\n{para}" if current else para
+    if current:
+        snippets.append(current)
+    return snippets
+
+
+class HashingEmbedder:
+    """
+    Local embedding: signed feature hashing of word unigrams, word bigrams
+    and character 4-grams, sublinear term frequency, L2 normalized.
+    """
+
+    def __init__(self, dim: int = 1024):
+        self.dim = dim
+
+    def _features(self, text: str) -> Counter:
+        words = tokenize(text)
+        features = Counter(words)
+        features.update(f"{a} {b}" for a, b in zip(words, words[1:]))
+        for word in set(words):
+            padded = f"#{word}#"
+            features.update(f"~{padded[i:i + 4]}" for i in range(max(1, len(padded) - 3)))
+        return features
+
+    def embed_many(self, texts: List[str]) -> np.ndarray:
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature, count in self._features(text).items():
+                h = zlib.crc32(feature.encode('utf-8'))
+                sign = 1.0 if h & 0x80000000 else -1.0
+                matrix[row, h % self.dim] += sign * (1.0 + math.log(count))
+        return _unit_rows(matrix)
+
+
+@functools.lru_cache(maxsize=None)
+def _embedding_client_class():
+    """
+    jai_cortex's EmbeddingClient, loaded by file path: importing the
+    jai_cortex package would pull in the whole ADK agent.
+    """
+    path = Path(__file__).resolve().parent.parent / 'jai_cortex' / 'embedding_client.py'
+    spec = importlib.util.spec_from_file_location('jai_cortex_embedding_client', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.EmbeddingClient
+
+
+class VertexEmbedder:
+    """Semantic embedding with Vertex AI text-embedding-004 (cached, batched)"""
+
+    def __init__(self, model_name: str = KNOWLEDGE_EMBEDDING_MODEL, client: Optional[Any] = None):
+        self.client = client or _embedding_client_class()(model_name)
+
+    def embed_many(self, texts: List[str]) -> np.ndarray:
+        return _unit_rows(self.client.embed_many(texts))
+
+
+def default_embedder(kind: str = KNOWLEDGE_EMBEDDER) -> Any:
+    """VertexEmbedder when the Vertex AI SDK is importable (or kind='vertex'), else HashingEmbedder"""
+    if kind == 'hashing':
+        return HashingEmbedder()
+    try:
+        import vertexai  # noqa: F401
+        return VertexEmbedder()
+    except Exception as e:
+        if kind == 'vertex':
+            raise
+        print(f"⚠️  Semantic knowledge embeddings unavailable ({e}), using hashed n-grams")
+        return HashingEmbedder()
+
+
+class BM25Index:
+    """Okapi BM25 over a fixed list of documents"""
+
+    def __init__(self, documents: List[str], k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        lengths = []
+        for doc_id, text in enumerate(documents):
+            counts = Counter(tokenize(text))
+            lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                self.postings[term].append((doc_id, tf))
+        self.lengths = np.asarray(lengths, dtype=np.float32)
+        self.avg_length = float(self.lengths.mean()) if len(lengths) else 0.0
+        self.n = len(documents)
+
+    def scores(self, query: str) -> np.ndarray:
+        scores = np.zeros(self.n, dtype=np.float32)
+        if not self.n:
+            return scores
+        norm = self.k1 * (1 - self.b + self.b * self.lengths / max(self.avg_length, 1e-9))
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (self.n - len(postings) + 0.5) / (len(postings) + 0.5))
+            ids = np.fromiter((d for d, _ in postings), dtype=np.int64, count=len(postings))
+            tfs = np.fromiter((tf for _, tf in postings), dtype=np.float32, count=len(postings))
+            scores[ids] += idf * tfs * (self.k1 + 1) / (tfs + norm[ids])
+        return scores
+
+
+class KnowledgeRetriever:
+    """Hybrid BM25 + embedding retrieval over a KnowledgeBase"""
+
+    def __init__(self, kb, embedder: Optional[Any] = None, dedup_threshold: float = 0.92):
+        self.kb = kb
+        self.embedder = embedder or default_embedder()
+        # Only a default (auto) embedder falls back; an injected one fails loudly
+        self._can_fall_back = embedder is None and KNOWLEDGE_EMBEDDER == 'auto'
+        self.dedup_threshold = dedup_threshold
+        self._lock = threading.Lock()
+        self._version = None
+        self._snippets: List[Dict[str, Any]] = []
+        self._bm25: Optional[BM25Index] = None
+        self._vectors: Optional[np.ndarray] = None
+
+    def _ensure_index(self) -> None:
+        version = self.kb.version()
+        if version == self._version:
+            return
+        snippets = []
+        for doc in self.kb.iter_documents():
+            for text in split_snippets(doc['text']):
+                snippets.append({**doc, 'text': text})
+        texts = [f"{s['topic']}\n{s['text']}" for s in snippets]
+        self._bm25 = BM25Index(texts)
+        self._vectors = self._embed(texts) if texts else None
+        self._snippets = snippets
+        self._version = version
+
+    def _embed(self, texts: List[str]) -> np.ndarray:
+        """Unit rows for texts; a failing semantic embedder is swapped for hashing once"""
+        try:
+            return _unit_rows(self.embedder.embed_many(texts))
+        except Exception as e:
+            if not self._can_fall_back or isinstance(self.embedder, HashingEmbedder):
+                raise
+            print(f"⚠️  Knowledge embedding failed ({e}), falling back to hashed n-grams")
+            self.embedder = HashingEmbedder()
+            self._version = None  # stored vectors came from the other embedder
+            return _unit_rows(self.embedder.embed_many(texts))
+
+    def _index_and_query(self, query: str):
+        """(snippets, bm25, vectors, query vector), all from the same embedder"""
+        with self._lock:
+            self._ensure_index()
+            embedder = self.embedder
+            query_vec = self._embed([query])[0]
+            if self.embedder is not embedder:
+                self._ensure_index()  # fell back while embedding the query
+            return self._snippets, self._bm25, self._vectors, query_vec
+
+    def retrieve(self, query: str, top_k: int = 8, token_budget: int = 1500,
+                 kinds: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Best snippets for the query.
+
+        Returns up to top_k dicts {topic, kind, snippet, score, source,
+        lexical_rank, semantic_rank}, best first, whose snippets fit in
+        token_budget (estimated at ~4 chars per token).
+        """
+        if not query or not query.strip():
+            return []
+
+        snippets, bm25, vectors, query_vec = self._index_and_query(query)
+        if not snippets:
+            return []
+
+        lexical = bm25.scores(query)
+        semantic = vectors @ query_vec
+
+        allowed = np.ones(len(snippets), dtype=bool)
+        if kinds:
+            allowed = np.fromiter((s['kind'] in kinds for s in snippets), dtype=bool, count=len(snippets))
+
+        # Reciprocal Rank Fusion over the candidates each ranking actually found
+        depth = max(top_k * 10, 50)
+        fused: Dict[int, float] = defaultdict(float)
+        lexical_rank: Dict[int, int] = {}
+        semantic_rank: Dict[int, int] = {}
+        for scores, ranks, floor in ((lexical, lexical_rank, 0.0), (semantic, semantic_rank, 0.05)):
+            order = np.argsort(-scores)[:depth]
+            rank = 0
+            for idx in order:
+                if scores[idx] <= floor or not allowed[idx]:
+                    continue
+                rank += 1
+                ranks[int(idx)] = rank
+                fused[int(idx)] += 1.0 / (RRF_K + rank)
+
+        results, chosen, seen_text, spent = [], [], set(), 0
+        for idx, score in sorted(fused.items(), key=lambda item: -item[1]):
+            snippet = snippets[idx]
+            key = ' '.join(snippet['text'].lower().split())
+            if key in seen_text:
+                continue
+            if chosen and float(np.max(vectors[chosen] @ vectors[idx])) >= self.dedup_threshold:
+                continue
+            text = snippet['text']
+            cost = estimate_tokens(text)
+            if spent + cost > token_budget:
+                if results:
+                    continue
+                text = text[:token_budget * 4].rstrip() + "..."
+                cost = token_budget
+            seen_text.add(key)
+            chosen.append(idx)
+            spent += cost
+            results.append({
+                'topic': snippet['topic'],
+                'kind': snippet['kind'],
+                'snippet': text,
+                'score': round(score, 5),
+                'source': snippet.get('source'),
+                'lexical_rank': lexical_rank.get(idx),
+                'semantic_rank': semantic_rank.get(idx)
+            })
+            if len(results) >= top_k or spent >= token_budget:
+                break
+        return results
+
+
+def format_snippets(results: List[Dict[str, Any]], header: str = "RELEVANT KNOWLEDGE") -> str:
+    """Render retrieve() results as a prompt section ('' when empty)."""
+    if not results:
+        return ""
+    lines = [f"\n**{header}:**"]
+    for result in results:
+        label = {'pattern': 'Known pattern', 'best_practice': 'Best practice'}.get(result['kind'], 'Topic')
+        lines.append(f"\n{label}: {result['topic']}\n{result['snippet']}")
+    return "\n".join(lines) + "\n"
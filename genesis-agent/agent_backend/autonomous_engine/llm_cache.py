@@ -0,0 +1,234 @@
+"""
+LLM Response Cache
+Content-addressed cache for Gemini generations used by the autonomous engine
+
+Keyed on (model, sha256 of the prompt, sha256 of the generation config), so
+the same prompt under the same settings is only ever paid for once per TTL:
+retry loops, repeated MetaAppBuilder strategy iterations and re-runs of the
+same goal or template hit the cache instead of the API.
+
+Entries live in SQLite (~/.jai_cortex/llm_cache.sqlite3 by default) and
+survive restarts. Sampled generations (temperature > 0) are cached too
+unless the caller asks for a bypass, or LLM_CACHE_SKIP_SAMPLED=true.
+Only successful responses are stored (and, for JSON-mode configs, only
+responses that parse). Callers remember() the artifact they derived from a
+response (e.g. cleaned-up code) and reject() it when it fails verification,
+so the retry asks the model again instead of replaying the bad answer.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+
+LLM_CACHE_PATH = os.getenv(
+    'LLM_CACHE_PATH',
+    os.path.join(os.path.expanduser('~'), '.jai_cortex', 'llm_cache.sqlite3')
+)
+LLM_CACHE_TTL = float(os.getenv('LLM_CACHE_TTL_HOURS', '168')) * 3600
+LLM_CACHE_ENABLED = os.getenv('LLM_CACHE_ENABLED', 'true').lower() == 'true'
+LLM_CACHE_SKIP_SAMPLED = os.getenv('LLM_CACHE_SKIP_SAMPLED', 'false').lower() == 'true'
+MAX_TRACKED_ARTIFACTS = 256
+
+
+def _config_dict(config: Any) -> Dict[str, Any]:
+    """Generation settings as a plain dict (GenerateContentConfig, dict or None)"""
+    if config is None:
+        return {}
+    if isinstance(config, dict):
+        return config
+    if hasattr(config, 'model_dump'):
+        return config.model_dump(mode='json', exclude_none=True)
+    return {'repr': repr(config)}
+
+
+def _sha256(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class LLMResponseCache:
+    """SQLite-backed (model, prompt, config) -> response text cache"""
+
+    def __init__(
+        self,
+        path: Optional[str] = LLM_CACHE_PATH,
+        ttl: float = LLM_CACHE_TTL,
+        enabled: bool = LLM_CACHE_ENABLED,
+        skip_sampled: bool = LLM_CACHE_SKIP_SAMPLED
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.enabled = enabled and path is not None
+        self.skip_sampled = skip_sampled
+        self._db: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        # artifact text -> cache key of the response it came from (this process only)
+        self._origins: "OrderedDict[str, str]" = OrderedDict()
+
+        self.stats_counters = {
+            'hits': 0,
+            'misses': 0,
+            'expired': 0,
+            'bypassed': 0,
+            'stores': 0,
+            'rejected': 0
+        }
+
+    def _get_db(self) -> sqlite3.Connection:
+        if self._db is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, model TEXT, prompt_hash TEXT, config_hash TEXT, "
+                "response TEXT, created_at REAL, expires_at REAL, hits INTEGER DEFAULT 0)"
+            )
+            # Drop whatever expired since the last process
+            conn.execute("DELETE FROM responses WHERE expires_at < ?", (time.time(),))
+            conn.commit()
+            self._db = conn
+        return self._db
+
+    @staticmethod
+    def key(model: str, prompt: str, config: Any = None) -> str:
+        config_hash = _sha256(json.dumps(_config_dict(config), sort_keys=True, default=str))
+        return _sha256(f"{model}\x00{_sha256(prompt)}\x00{config_hash}")
+
+    def _should_bypass(self, config: Any, bypass_sampled: Optional[bool]) -> bool:
+        if not self.enabled:
+            return True
+        skip = self.skip_sampled if bypass_sampled is None else bypass_sampled
+        if not skip:
+            return False
+        temperature = _config_dict(config).get('temperature')
+        return temperature is None or temperature > 0
+
+    def get(
+        self,
+        model: str,
+        prompt: str,
+        config: Any = None,
+        bypass_sampled: Optional[bool] = None
+    ) -> Optional[str]:
+        """
+        Cached response, or None.
+
+        bypass_sampled=True skips the cache for non-zero temperature (a fresh
+        sample is wanted); None uses the LLM_CACHE_SKIP_SAMPLED default.
+        """
+        if self._should_bypass(config, bypass_sampled):
+            self.stats_counters['bypassed'] += 1
+            return None
+
+        key = self.key(model, prompt, config)
+        try:
+            with self._lock:
+                db = self._get_db()
+                row = db.execute("SELECT response, expires_at FROM responses WHERE key = ?", (key,)).fetchone()
+                if row is not None and row[1] < time.time():
+                    db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    db.commit()
+                    self.stats_counters['expired'] += 1
+                    row = None
+                elif row is not None:
+                    db.execute("UPDATE responses SET hits = hits + 1 WHERE key = ?", (key,))
+                    db.commit()
+        except sqlite3.Error as e:
+            print(f"⚠️ LLM cache read error: {e}")
+            row = None
+
+        if row is None:
+            self.stats_counters['misses'] += 1
+            return None
+        self.stats_counters['hits'] += 1
+        print(f"💾 LLM cache hit ({model})")
+        return row[0]
+
+    def put(
+        self,
+        model: str,
+        prompt: str,
+        config: Any,
+        response: str,
+        bypass_sampled: Optional[bool] = None
+    ) -> None:
+        if not response or self._should_bypass(config, bypass_sampled):
+            return
+        if _config_dict(config).get('response_mime_type') == 'application/json':
+            # Never pin a malformed structured response for the whole TTL
+            try:
+                json.loads(response)
+            except ValueError:
+                return
+        now = time.time()
+        config_hash = _sha256(json.dumps(_config_dict(config), sort_keys=True, default=str))
+        try:
+            with self._lock:
+                db = self._get_db()
+                db.execute(
+                    "INSERT OR REPLACE INTO responses "
+                    "(key, model, prompt_hash, config_hash, response, created_at, expires_at, hits) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, 0)",
+                    (self.key(model, prompt, config), model, _sha256(prompt), config_hash,
+                     response, now, now + self.ttl)
+                )
+                db.commit()
+            self.stats_counters['stores'] += 1
+        except sqlite3.Error as e:
+            print(f"⚠️ LLM cache write error: {e}")
+
+    def invalidate(self, model: str, prompt: str, config: Any = None) -> None:
+        """Forget one response (e.g. a generated fix that failed verification)"""
+        self._delete(self.key(model, prompt, config))
+
+    def _delete(self, key: str) -> None:
+        if not self.enabled:
+            return
+        try:
+            with self._lock:
+                db = self._get_db()
+                db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                db.commit()
+        except sqlite3.Error as e:
+            print(f"⚠️ LLM cache write error: {e}")
+
+    def remember(self, artifact: str, model: str, prompt: str, config: Any = None) -> None:
+        """Record which (model, prompt, config) produced artifact, for reject()"""
+        if not artifact:
+            return
+        with self._lock:
+            self._origins[artifact] = self.key(model, prompt, config)
+            self._origins.move_to_end(artifact)
+            while len(self._origins) > MAX_TRACKED_ARTIFACTS:
+                self._origins.popitem(last=False)
+
+    def reject(self, artifact: str) -> bool:
+        """Invalidate the response an artifact was generated from; False if it isn't known"""
+        with self._lock:
+            key = self._origins.pop(artifact, None)
+        if key is None:
+            return False
+        self._delete(key)
+        self.stats_counters['rejected'] += 1
+        print("🗑️  Rejected generation dropped from LLM cache")
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.stats_counters['hits'] + self.stats_counters['misses']
+        return {
+            **self.stats_counters,
+            'hit_rate': round(self.stats_counters['hits'] / lookups, 3) if lookups else 0.0,
+            'enabled': self.enabled
+        }
+
+
+# Shared by ResilientLLM, LLMIntegration and SmartLLMRouter
+llm_cache = LLMResponseCache()
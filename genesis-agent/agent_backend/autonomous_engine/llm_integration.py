@@ -3,12 +3,12 @@ LLM Integration for Autonomous Engine
 Phase 2: Adds Gemini 2.5 Pro intelligence to the autonomous execution loop
 """
 
-import os
 import json
 from typing import List, Dict, Any
-from google import genai
 from google.genai import types as genai_types
-from .task_manager import Task
+from .task_manager import Task, tasks_from_plan
+from .llm_cache import llm_cache
+from . import genai_pool
 import uuid
 
 
@@ -29,21 +29,16 @@ class LLMIntegration:
         Args:
             use_vertex_ai: Whether to use Vertex AI (True) or direct API key (False)
         """
-        # Initialize Gemini client
+        # Gemini client (shared process-wide through genai_pool)
         if use_vertex_ai:
             # Use Vertex AI (same as JAi Cortex)
-            self.client = genai.Client(
-                vertexai=True,
-                project='studio-2416451423-f2d96',
-                location='us-central1'
-            )
+            self.client = genai_pool.get_client(vertexai=True)
             print("🧠 LLM Integration initialized (Gemini 2.5 Pro via Vertex AI)")
         else:
             # Use direct API key
-            api_key = os.getenv('GEMINI_API_KEY')
-            if not api_key:
+            self.client = genai_pool.get_client(vertexai=False)
+            if self.client is None:
                 raise ValueError("GEMINI_API_KEY environment variable not set")
-            self.client = genai.Client(api_key=api_key)
             print("🧠 LLM Integration initialized (Gemini 2.5 Pro via API Key)")
         
         # Model configuration for autonomous execution
@@ -53,6 +48,31 @@ class LLMIntegration:
             response_mime_type="application/json"  # Structured output
         )
         
+    async def _generate(self, prompt: str, config: genai_types.GenerateContentConfig,
+                        model: str = 'gemini-2.5-pro') -> str:
+        """One Gemini call, answered from the shared LLM response cache when possible."""
+        cached = llm_cache.get(model, prompt, config)
+        if cached is not None:
+            return cached
+        
+        response = await genai_pool.generate_content(
+            model=model,
+            contents=[
+                genai_types.Content(
+                    role='user',
+                    parts=[genai_types.Part.from_text(text=prompt)]
+                )
+            ],
+            config=config,
+            client=self.client
+        )
+        llm_cache.put(model, prompt, config, response.text)
+        return response.text
+    
+    def reject(self, output: str) -> bool:
+        """Drop generated code that failed verification from the LLM response cache."""
+        return llm_cache.reject(output)
+        
     async def decompose_goal(self, goal: str) -> List[Task]:
         """
         Use Gemini to intelligently break down a high-level goal into tasks.
@@ -72,7 +92,7 @@ Your role: Break down high-level goals into specific, executable tasks.
 Requirements for each task:
 1. SPECIFIC - Clear, actionable description
 2. EXECUTABLE - Can be accomplished by file operations or code generation
-3. ORDERED - Logical dependency order
+3. ORDERED - Logical dependency order, with dependencies declared explicitly
 4. COMPLETE - All necessary steps included
 
 Task Types Available:
@@ -86,11 +106,15 @@ Guidelines:
 - Include tests if code is being written
 - Add verification steps for critical tasks
 - Keep tasks atomic (one clear purpose each)
-- Think about dependencies (what needs to happen first)
+- Think about dependencies (what needs to happen first): list in "depends_on"
+  only the tasks that truly must finish first. Tasks that don't depend on each
+  other (e.g. separate files) run in parallel, so don't chain them needlessly.
 
 Output Format:
 Return a JSON array of tasks, each with:
 {
+  "id": "short unique id, e.g. t1",
+  "depends_on": ["ids of earlier tasks that must complete first"],
   "description": "Clear description of what to do",
   "type": "create_file | write_code | run_command | verify_result",
   "details": {
@@ -106,21 +130,29 @@ Goal: "Create a React button component with tests"
 Output:
 [
   {
+    "id": "t1",
+    "depends_on": [],
     "description": "Create Button component file",
     "type": "create_file",
     "details": {"filename": "Button.tsx", "language": "typescript"}
   },
   {
+    "id": "t2",
+    "depends_on": ["t1"],
     "description": "Write React Button component with props and styling",
     "type": "write_code",
     "details": {"filename": "Button.tsx", "language": "typescript", "framework": "react"}
   },
   {
+    "id": "t3",
+    "depends_on": [],
     "description": "Create test file for Button component",
     "type": "create_file", 
     "details": {"filename": "Button.test.tsx", "language": "typescript"}
   },
   {
+    "id": "t4",
+    "depends_on": ["t2", "t3"],
     "description": "Write comprehensive tests for Button component",
     "type": "write_code",
     "details": {"filename": "Button.test.tsx", "language": "typescript", "framework": "react-testing-library"}
@@ -134,37 +166,17 @@ Be thorough but efficient. Quality over quantity."""
 Break this down into specific, executable tasks following the guidelines above."""
 
         try:
-            # Call Gemini (wrapped in to_thread because it's a blocking call)
-            import asyncio
-            
-            def call_gemini():
-                return self.client.models.generate_content(
-                    model='gemini-2.5-pro',
-                    contents=[
-                        genai_types.Content(
-                            role='user',
-                            parts=[genai_types.Part.from_text(text=system_prompt + "\n\n" + user_prompt)]
-                        )
-                    ],
-                    config=self.model_config
-                )
-            
-            response = await asyncio.to_thread(call_gemini)
+            # Call Gemini (cached, native async)
+            response_text = await self._generate(
+                system_prompt + "\n\n" + user_prompt,
+                self.model_config
+            )
             
             # Parse response
-            tasks_data = json.loads(response.text)
+            tasks_data = json.loads(response_text)
             
-            # Convert to Task objects
-            tasks = []
-            for task_data in tasks_data:
-                task = Task(
-                    id=str(uuid.uuid4()),
-                    description=task_data['description']
-                )
-                # Store task type and details for execution
-                task.task_type = task_data.get('type', 'generic')
-                task.details = task_data.get('details', {})
-                tasks.append(task)
+            # Convert to Task objects (dependency DAG)
+            tasks = tasks_from_plan(tasks_data)
             
             print(f"🎯 Gemini decomposed goal into {len(tasks)} tasks")
             return tasks
@@ -246,28 +258,17 @@ Filename: {filename}
 
 Remember: Return ONLY the code, nothing else."""
 
+        prompt = system_prompt + "\n\n" + user_prompt
+        config = genai_types.GenerateContentConfig(
+            temperature=0.2,  # Very low for consistent code
+            max_output_tokens=8192,
+        )
+        
         try:
-            # Call Gemini for code generation (wrapped in to_thread because it's blocking)
-            import asyncio
-            
-            def call_gemini():
-                return self.client.models.generate_content(
-                    model='gemini-2.5-pro',
-                    contents=[
-                        genai_types.Content(
-                            role='user',
-                            parts=[genai_types.Part.from_text(text=system_prompt + "\n\n" + user_prompt)]
-                        )
-                    ],
-                    config=genai_types.GenerateContentConfig(
-                        temperature=0.2,  # Very low for consistent code
-                        max_output_tokens=8192,
-                    )
-                )
-            
-            response = await asyncio.to_thread(call_gemini)
+            # Call Gemini for code generation (cached, native async)
+            response_text = await self._generate(prompt, config)
             
-            code = response.text.strip()
+            code = response_text.strip()
             
             # Clean up any markdown that might have slipped through
             if code.startswith('```'):
@@ -279,6 +280,8 @@ Remember: Return ONLY the code, nothing else."""
                     lines = lines[:-1]
                 code = '\n'.join(lines)
             
+            # So callers can reject() it if it fails verification
+            llm_cache.remember(code, 'gemini-2.5-pro', prompt, config)
             print(f"💻 Generated {len(code)} chars of {language} code")
             return code
             
@@ -327,28 +330,17 @@ Error message:
 Analyze this error and provide a fix."""
 
         try:
-            # Call Gemini for error analysis (wrapped in to_thread because it's blocking)
-            import asyncio
-            
-            def call_gemini():
-                return self.client.models.generate_content(
-                    model='gemini-2.5-pro',
-                    contents=[
-                        genai_types.Content(
-                            role='user',
-                            parts=[genai_types.Part.from_text(text=system_prompt + "\n\n" + user_prompt)]
-                        )
-                    ],
-                    config=genai_types.GenerateContentConfig(
-                        temperature=0.3,
-                        max_output_tokens=4096,
-                        response_mime_type="application/json"
-                    )
+            # Call Gemini for error analysis (cached, native async)
+            response_text = await self._generate(
+                system_prompt + "\n\n" + user_prompt,
+                genai_types.GenerateContentConfig(
+                    temperature=0.3,
+                    max_output_tokens=4096,
+                    response_mime_type="application/json"
                 )
+            )
             
-            response = await asyncio.to_thread(call_gemini)
-            
-            analysis = json.loads(response.text)
+            analysis = json.loads(response_text)
             print(f"🔍 Error analyzed: {analysis.get('root_cause', 'Unknown')}")
             return analysis
             
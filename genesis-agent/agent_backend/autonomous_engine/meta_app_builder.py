@@ -149,6 +149,8 @@ class MetaAppBuilder:
             return False
             
         current_code = app_file.read_text()
+        # It failed verification: don't let the response cache hand it back on regeneration
+        self.llm.reject(current_code)
         
         # Use LLM to diagnose and fix
         fix_prompt = f"""You are an expert Flask developer. The application has this error:
@@ -110,7 +110,8 @@ class MetaAppBuilder:
             # Apply the saved solution
             saved_solution = solution_data['solution']
             
-            if 'fixed_content' in saved_solution:
+            # Fuzzy matches may come from another file or project: only replay exact ones
+            if 'fixed_content' in saved_solution and solution_data.get('match') == 'exact':
                 # We have the exact fix
                 file_path = self.workspace / saved_solution['file']
                 file_path.write_text(saved_solution['fixed_content'])
@@ -163,6 +164,8 @@ class MetaAppBuilder:
             return False
             
         current_code = file_path.read_text()
+        # It failed verification: don't let the response cache hand it back on regeneration
+        self.llm.reject(current_code)
         print(f"📖 Current {file_to_fix}: {len(current_code)} characters\n")
         
         # Step 3: Build file-specific fix prompt
@@ -294,6 +297,7 @@ Return ONLY the fixed Python code."""
             # Store the fix temporarily so we can save it AFTER verification
             self.pending_solution = {
                 "error_signature": self.meta_learner.create_signature_from_error(error_message),
+                "error_message": error_message,
                 "solution": {
                     "file": file_to_fix,
                     "fixed_content": fixed_code,
@@ -348,7 +352,8 @@ Return ONLY the fixed Python code."""
                     
                     self.meta_learner.save_successful_solution(
                         self.pending_solution['error_signature'],
-                        self.pending_solution['solution']
+                        self.pending_solution['solution'],
+                        error_message=self.pending_solution.get('error_message')
                     )
                     self.pending_solution = None  # Clear it
                 
@@ -20,10 +20,12 @@ from autonomous_engine import AutonomousEngine
 from .resilient_llm import ResilientLLM
 from verification_system import VerificationSystem
 from meta_learner import MetaLearner
-from web_learner import WebLearner
+from .web_learner import WebLearner
 from cognitive_supervisor import CognitiveSupervisor
-from research_agent import ResearchAgent
+from .research_agent import ResearchAgent
 from .knowledge_base import KnowledgeBase
+from .knowledge_retrieval import format_snippets
+from .workspace_state import WorkspaceState, diff_stats
 
 
 class MetaAppBuilderV3:
@@ -37,9 +39,12 @@ class MetaAppBuilderV3:
         self.port = 5001
         self.engine = AutonomousEngine(workspace_dir=str(self.workspace), use_llm=True)
         self.llm = ResilientLLM()
+        # 📂 Tracks file hashes so attempts only re-read what changed
+        self.workspace_state = WorkspaceState(self.workspace)
         self.verification_system = VerificationSystem(
             workspace_dir=str(self.workspace),
-            port=self.port  # Pass port during initialization
+            port=self.port,  # Pass port during initialization
+            workspace_state=self.workspace_state
         )
         self.meta_learner = MetaLearner()  # 🧠 Memory from experience
         self.web_learner = WebLearner()     # 🌐 Reactive web search
@@ -48,6 +53,9 @@ class MetaAppBuilderV3:
         self.server_process = None
         self.pending_solution = None
         self.last_errors = []  # Store errors from last verification
+        self.baseline_snapshot = None  # Workspace right after the initial build
+        self.fix_snapshot = None  # Workspace before the last applied fix (for rollback)
+        self.errors_before_fix = []
         self.required_files = [
             "app.py",
             "templates/index.html",
@@ -94,6 +102,7 @@ class MetaAppBuilderV3:
             if not success:
                 return False, "Initial build failed"
             self._built = True
+            self.baseline_snapshot = self.workspace_state.snapshot("initial_build")
         
         # Run verification
         success, errors = await self.verification_system.run_all_verifications(
@@ -108,17 +117,37 @@ class MetaAppBuilderV3:
                 solution_data = {
                     'fixed_code': self.pending_solution['fixed_code'],
                     'file_path': self.pending_solution['file_path'],
+                    'source_hash': self.pending_solution.get('source_hash'),
+                    'workspace': str(self.workspace),
                     'strategy': strategy
                 }
-                self.meta_learner.save_successful_solution(error_sig, solution_data)
+                self.meta_learner.save_successful_solution(
+                    error_sig, solution_data,
+                    error_message=self.pending_solution.get('error_message')
+                )
                 print(f"🧠 LEARNED: Saved working solution to memory")
                 self.pending_solution = None
+            self._release_fix_snapshot()
             return True, None
         
+        # Roll back the last fix if it made things worse
+        if self.fix_snapshot and len(errors) > len(self.errors_before_fix):
+            restored = self.workspace_state.restore(self.fix_snapshot)
+            print(f"↩️ Last fix made things worse ({len(self.errors_before_fix)} → {len(errors)} issues), "
+                  f"rolled back: {', '.join(restored) or 'nothing to restore'}")
+            errors = self.errors_before_fix
+            self.pending_solution = None
+            self.deploy()
+        self._release_fix_snapshot()
+        
         # Failed verification - store errors
         self.last_errors = errors
         error_message = "\n".join(self.last_errors)
         
+        # Snapshot is copy-on-write (hashes only), so taking one per fix is cheap
+        self.fix_snapshot = self.workspace_state.snapshot(strategy)
+        self.errors_before_fix = list(errors)
+        
         # Apply the requested strategy
         if strategy == "direct_file_fix":
             success = await self._strategy_direct_file_fix()
@@ -133,13 +162,34 @@ class MetaAppBuilderV3:
             success = False
         
         if not success:
+            # Undo any partial writes from the failed strategy
+            self.workspace_state.restore(self.fix_snapshot)
+            self._release_fix_snapshot()
             return False, error_message
         
+        for file_path, diff in self.workspace_state.diff(self.fix_snapshot).items():
+            added, removed = diff_stats(diff)
+            print(f"📝 {file_path}: +{added} -{removed} lines")
+        
         # Redeploy after fix
         self.deploy()
         
         return False, error_message  # Return False to continue testing
     
+    def close(self):
+        """Stop the app server and release the workspace tracker's inotify fd."""
+        if self.server_process:
+            self.server_process.terminate()
+            self.server_process = None
+        self.verification_system.close()
+        self.workspace_state.close()
+    
+    def _release_fix_snapshot(self):
+        """Drop the pre-fix snapshot once its fix is settled (frees unshared blobs)."""
+        if self.fix_snapshot:
+            self.workspace_state.release(self.fix_snapshot)
+            self.fix_snapshot = None
+    
     async def _initial_build(self) -> bool:
         """
         Build and deploy the app for the first time.
@@ -223,23 +273,34 @@ class MetaAppBuilderV3:
             self._get_files_state()
         )
         
+        past_fix = None
         if has_solution and not solution_data.get('trigger_self_improvement'):
-            print(f"🧠 MEMORY: Found known solution!")
-            fixed_code = solution_data['solution']['fixed_code']
-            file_path = solution_data['solution']['file_path']
-            target_file = self.workspace / file_path
-            target_file.write_text(fixed_code)
-            print(f"✅ Applied known solution to {file_path}")
-            return True
+            known = solution_data['solution']
+            file_path = known['file_path']
+            # Whole-file fixes are only safe to replay on the same error in this
+            # workspace, or on the exact file content the fix was generated from;
+            # anything else may come from another project, so it only guides the LLM
+            current = self.workspace_state.get(file_path)
+            same_source = bool(known.get('source_hash')) and current is not None \
+                and current.hash == known['source_hash']
+            same_error = solution_data.get('match') == 'exact' \
+                and known.get('workspace') == str(self.workspace)
+            if same_error or same_source:
+                print(f"🧠 MEMORY: Found known solution!")
+                self.workspace_state.write_text(file_path, known['fixed_code'])
+                print(f"✅ Applied known solution to {file_path}")
+                return True
+            print(f"🧠 MEMORY: Similar past fix ({solution_data.get('match')} match), using it as a reference")
+            past_fix = known
         
         # Step 2: Check knowledge base for relevant information
         print(f"📚 KNOWLEDGE BASE: Searching for relevant knowledge...")
-        knowledge_results = self.knowledge_base.search_knowledge(error_message)
+        knowledge_results = self.knowledge_base.retrieve(error_message, top_k=6, token_budget=1500)
         
         if knowledge_results:
-            print(f"📚 Found {len(knowledge_results)} relevant knowledge entries:")
-            for result in knowledge_results[:3]:  # Show top 3
-                print(f"   • {result['topic']}")
+            print(f"📚 Found {len(knowledge_results)} relevant knowledge snippets:")
+            for result in knowledge_results:
+                print(f"   • [{result['kind']}] {result['topic']}")
         
         # Step 3: Determine which file needs fixing
         file_path, file_content = self._detect_problem_file(error_message)
@@ -253,15 +314,16 @@ class MetaAppBuilderV3:
             file_path, 
             file_content, 
             error_message,
-            knowledge_results
+            knowledge_results,
+            past_fix=past_fix
         )
         
         if not fixed_code:
             return False
         
         # Step 5: Apply fix
-        target_file = self.workspace / file_path
-        target_file.write_text(fixed_code)
+        source_hash = self.workspace_state.get(file_path).hash
+        self.workspace_state.write_text(file_path, fixed_code)
         print(f"✅ Applied fix to {file_path}")
         
         # Store as pending (will be saved only if verification succeeds)
@@ -269,7 +331,9 @@ class MetaAppBuilderV3:
         self.pending_solution = {
             'error_signature': error_signature,
             'fixed_code': fixed_code,
-            'file_path': file_path
+            'file_path': file_path,
+            'source_hash': source_hash,
+            'error_message': error_message
         }
         
         return True
@@ -289,8 +353,15 @@ class MetaAppBuilderV3:
         
         # Get related files for context
         context_files = self._get_related_files(file_path)
-        context_str = "\n".join([f"File: {f}\n{(self.workspace / f).read_text()}\n" 
-                                 for f in context_files if (self.workspace / f).exists()])
+        context_str = "\n".join([f"File: {f}\n{self.workspace_state.read_text(f)}\n" 
+                                 for f in context_files if self.workspace_state.exists(f)])
+        
+        # Show what earlier fixes already changed, so they are not repeated blindly
+        previous_changes = ""
+        if self.baseline_snapshot:
+            diff = self.workspace_state.diff(self.baseline_snapshot, [file_path]).get(file_path)
+            if diff:
+                previous_changes = f"\nCHANGES ALREADY MADE TO {file_path} SINCE THE INITIAL BUILD:\n{diff}\n"
         
         # Enhanced prompt with context
         prompt = f"""Fix the following error with full project context:
@@ -303,6 +374,7 @@ MAIN FILE TO FIX ({file_path}):
 
 RELATED FILES FOR CONTEXT:
 {context_str}
+{previous_changes}
 
 Generate the COMPLETE, CORRECTED version of {file_path}:"""
         
@@ -311,8 +383,7 @@ Generate the COMPLETE, CORRECTED version of {file_path}:"""
         if not fixed_code:
             return False
         
-        target_file = self.workspace / file_path
-        target_file.write_text(fixed_code)
+        self.workspace_state.write_text(file_path, fixed_code)
         print(f"✅ Applied contextual fix to {file_path}")
         
         return True
@@ -336,16 +407,13 @@ Generate the COMPLETE, CORRECTED version of {file_path}:"""
             print("🎯 Detected frontend error - applying COMPLETE proven template set")
             
             # Apply proven HTML
-            html_path = self.workspace / "templates" / "index.html"
-            html_path.parent.mkdir(exist_ok=True, parents=True)
-            html_path.write_text(self.html_template)
+            self.workspace_state.write_text("templates/index.html", self.html_template)
             print(f"✅ Applied proven HTML: templates/index.html")
             
             # Also ensure we have basic CSS
-            css_path = self.workspace / "static" / "style.css"
-            css_path.parent.mkdir(exist_ok=True, parents=True)
-            if not css_path.exists() or len(css_path.read_text()) < 100:
-                css_path.write_text("""
+            css = self.workspace_state.read_text("static/style.css")
+            if css is None or len(css) < 100:
+                self.workspace_state.write_text("static/style.css", """
 body {
     font-family: Arial, sans-serif;
     margin: 0;
@@ -393,9 +461,9 @@ button:hover {
                 print(f"✅ Applied proven CSS: static/style.css")
             
             # Also ensure we have basic JS
-            js_path = self.workspace / "static" / "script.js"
-            if not js_path.exists() or len(js_path.read_text()) < 100:
-                js_path.write_text("""
+            js = self.workspace_state.read_text("static/script.js")
+            if js is None or len(js) < 100:
+                self.workspace_state.write_text("static/script.js", """
 document.addEventListener('DOMContentLoaded', function() {
     const form = document.getElementById('message-form');
     const input = document.getElementById('message-input');
@@ -461,8 +529,7 @@ document.addEventListener('DOMContentLoaded', function() {
         print(f"🌐 Solution found from: {solution['source_url']}")
         
         # Apply the web-learned solution
-        target_file = self.workspace / file_path
-        target_file.write_text(solution['fixed_code'])
+        self.workspace_state.write_text(file_path, solution['fixed_code'])
         print(f"✅ Applied web-learned solution to {file_path}")
         
         return True
@@ -487,12 +554,12 @@ document.addEventListener('DOMContentLoaded', function() {
         else:
             file_path = "app.py"
         
-        target_file = self.workspace / file_path
-        if not target_file.exists():
+        file_content = self.workspace_state.read_text(file_path)
+        if file_content is None:
             return None, None
         
         print(f"🎯 Detected problem in: {file_path}")
-        return file_path, target_file.read_text()
+        return file_path, file_content
     
     def _get_related_files(self, file_path: str) -> List[str]:
         """Get files related to the target file for context."""
@@ -505,16 +572,8 @@ document.addEventListener('DOMContentLoaded', function() {
         return []
     
     def _get_files_state(self) -> Dict:
-        """Get current state of all files (for meta-learner)."""
-        files = {}
-        for file_path in ["app.py", "templates/index.html", "static/style.css", "static/script.js", "requirements.txt"]:
-            full_path = self.workspace / file_path
-            if full_path.exists():
-                files[file_path] = {
-                    'size': len(full_path.read_text()),
-                    'exists': True
-                }
-        return files
+        """Get current state of all files (for meta-learner) from tracked stats, without reading them."""
+        return self.workspace_state.files_state(self.required_files)
     
     async def _generate_fix(self, file_path: str, file_content: str, error_message: str) -> Optional[str]:
         """Generate a fix using LLM (without knowledge context)."""
@@ -535,21 +594,20 @@ Generate the COMPLETE, CORRECTED version of {file_path}:"""
         file_path: str, 
         file_content: str, 
         error_message: str,
-        knowledge_results: List[Dict]
+        knowledge_results: List[Dict],
+        past_fix: Optional[Dict] = None
     ) -> Optional[str]:
-        """Generate a fix using LLM WITH knowledge base context."""
+        """Generate a fix using LLM WITH knowledge base context (and a similar past fix, if any)."""
         
-        # Build knowledge context
-        knowledge_context = ""
-        if knowledge_results:
-            knowledge_context = "\n**RELEVANT KNOWLEDGE FROM RESEARCH:**\n"
-            for result in knowledge_results[:3]:  # Top 3 results
-                knowledge_context += f"\nTopic: {result['topic']}\n"
-                if 'entries' in result:
-                    for entry in result['entries'][-2:]:  # Last 2 entries
-                        knowledge_context += f"- {entry['knowledge']}\n"
-                elif 'entry' in result:
-                    knowledge_context += f"- {result['entry']['knowledge']}\n"
+        # Build knowledge context (already ranked and trimmed to the token budget)
+        knowledge_context = format_snippets(knowledge_results, header="RELEVANT KNOWLEDGE FROM RESEARCH")
+        if past_fix:
+            knowledge_context += f"""
+
+A SIMILAR ERROR WAS FIXED BEFORE (in {past_fix['file_path']}, possibly another project).
+Use it as a reference only, adapt it to the current code:
+{past_fix['fixed_code']}
+"""
         
         prompt = f"""Fix the following error in {file_path}:
 
@@ -607,30 +665,31 @@ async def main():
     # Create the cognitive supervisor
     supervisor = CognitiveSupervisor(executor=builder)
     
-    # Run the autonomous flow
-    success = await supervisor.run_autonomous_flow()
-    
-    if success:
-        print("\n" + "="*70)
-        print("🎉 APPLICATION IS FULLY OPERATIONAL!")
-        print("="*70)
-        print(f"\n🌐 Access your app at: http://localhost:{builder.port}")
-        print("\nThe app will continue running. Press Ctrl+C to stop.")
-        
-        # Keep the app running
-        try:
-            while True:
-                await asyncio.sleep(1)
-        except KeyboardInterrupt:
-            print("\n\n👋 Shutting down...")
-            if builder.server_process:
-                builder.server_process.terminate()
-    else:
-        print("\n" + "="*70)
-        print("❌ COULD NOT ACHIEVE FULL FUNCTIONALITY")
-        print("="*70)
-        print("\nThe system tried all available strategies.")
-        print("Manual intervention may be required.")
+    try:
+        # Run the autonomous flow
+        success = await supervisor.run_autonomous_flow()
+        
+        if success:
+            print("\n" + "="*70)
+            print("🎉 APPLICATION IS FULLY OPERATIONAL!")
+            print("="*70)
+            print(f"\n🌐 Access your app at: http://localhost:{builder.port}")
+            print("\nThe app will continue running. Press Ctrl+C to stop.")
+            
+            # Keep the app running
+            try:
+                while True:
+                    await asyncio.sleep(1)
+            except KeyboardInterrupt:
+                print("\n\n👋 Shutting down...")
+        else:
+            print("\n" + "="*70)
+            print("❌ COULD NOT ACHIEVE FULL FUNCTIONALITY")
+            print("="*70)
+            print("\nThe system tried all available strategies.")
+            print("Manual intervention may be required.")
+    finally:
+        builder.close()
 
 
 if __name__ == "__main__":
@@ -3,6 +3,7 @@ Meta-Learner System - Phase 2.8
 Detects patterns, applies known solutions, and learns from failures
 """
 
+import hashlib
 from typing import Dict, List, Optional, Tuple
 from .meta_memory import MetaMemory
 
@@ -52,10 +53,9 @@ class MetaLearner:
             
             print(f"🔍 Error signature: {signature}")
             
-            # Check memory
-            if self.memory.has_seen_error(signature):
-                solution = self.memory.get_solution(signature)
-                
+            # Check memory (exact signature, then fingerprint / near-duplicate of the raw error)
+            solution = self.memory.get_solution(signature, error_message=error)
+            if solution is not None:
                 print(f"💡 KNOWN ERROR! I've seen this before.")
                 print(f"📊 This solution has been reused {solution['reuse_count']} times")
                 print(f"✅ Applying saved solution...")
@@ -72,7 +72,8 @@ class MetaLearner:
     def save_successful_solution(
         self, 
         error_signature: str, 
-        solution_data: Dict
+        solution_data: Dict,
+        error_message: Optional[str] = None
     ):
         """
         Save a solution that worked
@@ -80,12 +81,13 @@ class MetaLearner:
         Args:
             error_signature: The error pattern
             solution_data: What fixed it (file content, approach, etc.)
+            error_message: The raw error, indexed so similar errors find this solution
         """
         print(f"\n{'='*70}")
         print(f"💾 META-LEARNER: Saving Successful Solution")
         print(f"{'='*70}\n")
         
-        self.memory.save_solution(error_signature, solution_data)
+        self.memory.save_solution(error_signature, solution_data, error_message=error_message)
         
         # Clear error history for this run (we fixed it!)
         self.current_run_errors = []
@@ -143,8 +145,10 @@ class MetaLearner:
                 return "broken_html_template:multiple_missing_elements"
             return "js_error:console"
         
-        # Generic fallback
-        return f"generic_error:{error[:50]}"
+        # Generic fallback: hash of the raw error (paths and lines included), so
+        # an exact hit is the very same error; MetaMemory's fingerprint and
+        # near-duplicate lookups catch the same error from another path or run
+        return f"generic_error:{hashlib.sha1(error.encode('utf-8')).hexdigest()[:16]}"
     
     def is_stuck_in_loop(self) -> bool:
         """
@@ -1,13 +1,140 @@
 """
 Meta-Memory System - Phase 2.8
 The system's knowledge base of errors and solutions
+
+Storage is an append-only JSONL log (meta_memory.jsonl): saving a solution
+appends one record, and reuse statistics are buffered in memory and
+appended in batches, so reading a solution never rewrites the file. The
+log is compacted into one record per solution when it grows past
+COMPACT_RATIO x the live records. A legacy meta_memory.json is imported
+on first load.
+
+Lookups go exact signature → normalized error fingerprint (paths, line
+numbers, hex ids, timestamps stripped) → MinHash near-duplicate (estimated
+Jaccard >= 0.85 over words and word bigrams), so the
+same error from a different file, line or run still finds its past fix.
+Only exact-signature hits are safe to apply as-is: fuzzy matches may come
+from another project's file, so get_solution() tags each result with how
+it matched and callers treat fuzzy ones as advisory.
 """
 
+import os
+import re
 import json
+import atexit
+import hashlib
+import threading
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime
 
+import numpy as np
+
+
+FLUSH_EVERY = 20       # buffered reuse updates before they are appended
+COMPACT_RATIO = 4      # compact when log records > ratio x live solutions
+MINHASH_PERMUTATIONS = 128
+MINHASH_BANDS = 16     # 16 bands x 8 rows: pairs above ~0.7 Jaccard become candidates
+NEAR_DUPLICATE_JACCARD = 0.85
+MAX_ERROR_CHARS = 4000
+
+_MERSENNE = np.uint64((1 << 61) - 1)
+_rng = np.random.default_rng(20251003)
+_PERM_A = _rng.integers(1, 1 << 32, MINHASH_PERMUTATIONS, dtype=np.uint64)
+_PERM_B = _rng.integers(0, 1 << 32, MINHASH_PERMUTATIONS, dtype=np.uint64)
+
+_NORMALIZERS = [
+    # Timestamps and dates
+    (re.compile(r"\b\d{4}-\d{2}-\d{2}[t ]\d{2}:\d{2}:\d{2}(?:\.\d+)?(?:z|[+-]\d{2}:?\d{2})?"), "<ts>"),
+    (re.compile(r"\b\d{4}-\d{2}-\d{2}\b"), "<date>"),
+    (re.compile(r"\b\d{1,2}:\d{2}:\d{2}(?:\.\d+)?\b"), "<time>"),
+    # UUIDs, hex addresses and long hex ids
+    (re.compile(r"\b[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\b"), "<id>"),
+    (re.compile(r"\b0x[0-9a-f]+\b"), "<addr>"),
+    (re.compile(r"\b(?=[0-9a-f]*\d)(?=[0-9a-f]*[a-f])[0-9a-f]{8,}\b"), "<id>"),
+    # Directories (keep the file name); URLs lose their host first
+    (re.compile(r"\bhttps?://[^/\s]+"), ""),
+    (re.compile(r"(?:[a-z]:)?[\w.\-~]*(?:[\\/][\w.\-~]+)+"), lambda m: re.split(r"[\\/]", m.group(0))[-1]),
+    # Line / column numbers
+    (re.compile(r"\bline \d+(?:, column \d+)?"), "line <n>"),
+    (re.compile(r"(\.\w+):\d+(?::\d+)?"), r"\1:<n>"),
+    # Long numbers (pids, durations, ports); short ones like HTTP codes stay
+    (re.compile(r"\b\d{5,}\b"), "<n>"),
+]
+
+
+def normalize_error(error: str) -> str:
+    """Error text with run-specific details removed (lowercased, whitespace collapsed)."""
+    text = error.lower()
+    for pattern, replacement in _NORMALIZERS:
+        text = pattern.sub(replacement, text)
+    return " ".join(text.split())
+
+
+def error_fingerprint(error: str) -> str:
+    """Short stable hash of the normalized error"""
+    return hashlib.sha1(normalize_error(error).encode("utf-8")).hexdigest()[:16]
+
+
+def error_features(error: str) -> set:
+    """Words and word bigrams of the normalized error"""
+    words = re.findall(r"[a-z_<>][\w<>]*", normalize_error(error))
+    return set(words) | {f"{a} {b}" for a, b in zip(words, words[1:])}
+
+
+def minhash(error: str) -> Optional[np.ndarray]:
+    """MinHash signature of error_features (None if the error is too short to compare)."""
+    features = error_features(error)
+    if len(features) < 5:
+        return None
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(f.encode("utf-8"), digest_size=4).digest(), "big") for f in features),
+        dtype=np.uint64, count=len(features)
+    )
+    # (a*h + b) mod p with 32-bit a, b, h never overflows 64 bits
+    permuted = (np.outer(_PERM_A, hashes) + _PERM_B[:, None]) % _MERSENNE
+    return permuted.min(axis=1)
+
+
+class MinHashIndex:
+    """MinHash LSH: near-duplicate lookup without comparing against every stored error"""
+
+    def __init__(self, bands: int = MINHASH_BANDS):
+        self.bands = bands
+        self.rows = MINHASH_PERMUTATIONS // bands
+        self.tables: List[Dict[bytes, set]] = [{} for _ in range(bands)]
+        self.signatures: Dict[str, np.ndarray] = {}
+
+    def _band_keys(self, signature: np.ndarray):
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows].tobytes()
+
+    def add(self, key: str, signature: np.ndarray) -> None:
+        self.remove(key)
+        self.signatures[key] = signature
+        for band, band_key in self._band_keys(signature):
+            self.tables[band].setdefault(band_key, set()).add(key)
+
+    def remove(self, key: str) -> None:
+        signature = self.signatures.pop(key, None)
+        if signature is None:
+            return
+        for band, band_key in self._band_keys(signature):
+            self.tables[band].get(band_key, set()).discard(key)
+
+    def nearest(self, signature: np.ndarray,
+                threshold: float = NEAR_DUPLICATE_JACCARD) -> Optional[Tuple[str, float]]:
+        """Most similar key with estimated Jaccard >= threshold, as (key, similarity)"""
+        candidates = set()
+        for band, band_key in self._band_keys(signature):
+            candidates |= self.tables[band].get(band_key, set())
+        best = None
+        for key in candidates:
+            similarity = float(np.mean(self.signatures[key] == signature))
+            if similarity >= threshold and (best is None or similarity > best[1]):
+                best = (key, similarity)
+        return best
+
 
 class MetaMemory:
     """
@@ -15,20 +142,59 @@ class MetaMemory:
     The system's long-term memory of what works
     """
     
-    def __init__(self, memory_file: str = "meta_memory.json"):
-        self.memory_file = Path(__file__).parent / memory_file
-        self.memory = self.load_memory()
+    def __init__(self, memory_file: str = "meta_memory.json", flush_every: int = FLUSH_EVERY):
+        legacy = Path(memory_file)
+        if not legacy.is_absolute():
+            legacy = Path(__file__).parent / memory_file
+        self.legacy_file = legacy
+        self.memory_file = legacy.with_suffix(".jsonl")
+        self.flush_every = flush_every
+        
+        self._lock = threading.RLock()
+        self._pending_reuses: Dict[str, Dict] = {}
+        self._log_records = 0
+        self._by_fingerprint: Dict[str, str] = {}
+        self._near = MinHashIndex()
         
+        self.memory = self.load_memory()
+        atexit.register(self.flush)
+    
     def load_memory(self) -> Dict:
-        """Load existing memory or create new"""
+        """Load existing memory (replaying the log) or create new"""
+        memory = self.create_new_memory()
         if self.memory_file.exists():
+            with open(self.memory_file, "r", encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # torn final write
+                    self._apply(memory, record)
+                    self._log_records += 1
+        elif self.legacy_file.exists():
             try:
-                with open(self.memory_file, 'r') as f:
-                    return json.load(f)
-            except:
-                return self.create_new_memory()
-        else:
-            return self.create_new_memory()
+                with open(self.legacy_file, "r") as f:
+                    legacy = json.load(f)
+                memory["solutions"] = legacy.get("solutions", {})
+                memory["patterns"] = legacy.get("patterns", {})
+                memory["statistics"].update(legacy.get("statistics", {}))
+                for entry in memory["solutions"].values():
+                    error = (entry.get("solution") or {}).get("error")
+                    if error and "fingerprint" not in entry:
+                        entry["fingerprint"] = error_fingerprint(error)
+                        entry["normalized_error"] = normalize_error(error)[:MAX_ERROR_CHARS]
+                self.memory = memory
+                self._compact()
+                print(f"🧠 Migrated {self.legacy_file.name} → {self.memory_file.name}")
+            except Exception as e:
+                print(f"⚠️ Could not load legacy memory: {e}")
+        
+        for signature, entry in memory["solutions"].items():
+            self._index(signature, entry)
+        return memory
     
     def create_new_memory(self) -> Dict:
         """Create new memory structure"""
@@ -42,10 +208,82 @@ class MetaMemory:
             }
         }
     
+    # ------------------------------------------------------------------
+    # Log plumbing
+    # ------------------------------------------------------------------
+    
+    @staticmethod
+    def _apply(memory: Dict, record: Dict) -> None:
+        op = record.get("op")
+        stats = memory["statistics"]
+        if op == "save":
+            memory["solutions"][record["signature"]] = record["entry"]
+            if not record.get("snapshot"):
+                stats["total_errors_seen"] += 1
+                stats["total_solutions_saved"] += 1
+        elif op == "reuse":
+            entry = memory["solutions"].get(record["signature"])
+            if entry is not None:
+                entry["reuse_count"] = entry.get("reuse_count", 0) + record["count"]
+                entry["last_reused"] = record["last_reused"]
+            stats["total_reuses"] += record["count"]
+        elif op == "stats":
+            stats.update(record["statistics"])
+    
+    def _append(self, records: List[Dict]) -> None:
+        with open(self.memory_file, "a", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record, default=str) + "\n")
+            f.flush()
+        self._log_records += len(records)
+    
+    def _compact(self) -> None:
+        """Rewrite the log as one record per solution (atomic replace)."""
+        records = [{"op": "stats", "statistics": self.memory["statistics"]}]
+        records += [
+            {"op": "save", "signature": signature, "entry": entry, "snapshot": True}
+            for signature, entry in self.memory["solutions"].items()
+        ]
+        tmp = self.memory_file.with_suffix(".jsonl.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record, default=str) + "\n")
+        os.replace(tmp, self.memory_file)
+        self._log_records = len(records)
+    
+    def _index(self, signature: str, entry: Dict) -> None:
+        if entry.get("fingerprint"):
+            self._by_fingerprint[entry["fingerprint"]] = signature
+        if entry.get("normalized_error"):
+            # Signatures are cheap to rebuild, so only the normalized text is stored
+            value = minhash(entry["normalized_error"])
+            if value is not None:
+                self._near.add(signature, value)
+    
+    def flush(self):
+        """Append buffered reuse statistics (and compact if the log has grown)."""
+        with self._lock:
+            if self._pending_reuses:
+                records = [{"op": "reuse", "signature": sig, **update}
+                           for sig, update in self._pending_reuses.items()]
+                self._pending_reuses = {}
+                try:
+                    self._append(records)
+                except OSError as e:
+                    print(f"⚠️ Could not persist memory stats: {e}")
+                    return
+            if self._log_records > COMPACT_RATIO * max(len(self.memory["solutions"]), 8):
+                self._compact()
+    
     def save_memory(self):
-        """Persist memory to disk"""
-        with open(self.memory_file, 'w') as f:
-            json.dump(self.memory, f, indent=2)
+        """Persist memory to disk (flush buffered stats and compact the log)"""
+        with self._lock:
+            self.flush()
+            self._compact()
+    
+    # ------------------------------------------------------------------
+    # Lookups
+    # ------------------------------------------------------------------
     
     def has_seen_error(self, error_signature: str) -> bool:
         """
@@ -53,52 +291,101 @@ class MetaMemory:
         
         Args:
             error_signature: Unique identifier for the error
-            
+        
         Returns:
             True if we have a solution for this error
         """
         return error_signature in self.memory["solutions"]
     
-    def get_solution(self, error_signature: str) -> Optional[Dict]:
+    def find_match(self, error_signature: str,
+                   error_message: Optional[str] = None) -> Optional[Tuple[str, str]]:
+        """
+        Stored signature for this error and how it matched, as (signature, kind)
+        with kind "exact", "fingerprint" (normalized error) or "near" (MinHash).
+        """
+        if error_signature in self.memory["solutions"]:
+            return error_signature, "exact"
+        if not error_message:
+            return None
+        signature = self._by_fingerprint.get(error_fingerprint(error_message))
+        if signature:
+            print(f"🧬 Fingerprint match: {signature}")
+            return signature, "fingerprint"
+        value = minhash(error_message)
+        if value is not None:
+            nearest = self._near.nearest(value)
+            if nearest:
+                print(f"🧬 Near-duplicate match: {nearest[0]} (similarity {nearest[1]:.2f})")
+                return nearest[0], "near"
+        return None
+    
+    def match_signature(self, error_signature: str, error_message: Optional[str] = None) -> Optional[str]:
+        """
+        Stored signature for this error: exact signature, then the normalized
+        fingerprint of error_message, then the nearest MinHash neighbour.
+        """
+        match = self.find_match(error_signature, error_message)
+        return match[0] if match else None
+    
+    def get_solution(self, error_signature: str, error_message: Optional[str] = None) -> Optional[Dict]:
         """
         Retrieve a known solution for this error
         
         Args:
             error_signature: The error we're trying to fix
-            
+            error_message: Raw error text, enables fingerprint / near-duplicate matching
+        
         Returns:
-            Solution dict or None if not found
+            Solution dict or None if not found. Its "match" key says how it
+            was found; anything but "exact" must not be applied blindly.
         """
-        if self.has_seen_error(error_signature):
-            solution = self.memory["solutions"][error_signature]
+        with self._lock:
+            match = self.find_match(error_signature, error_message)
+            if match is None:
+                return None
+            signature, kind = match
+            solution = self.memory["solutions"][signature]
             
-            # Track reuse
+            # Track reuse (buffered; appended to the log in batches)
+            now = datetime.now().isoformat()
             solution["reuse_count"] = solution.get("reuse_count", 0) + 1
-            solution["last_reused"] = datetime.now().isoformat()
+            solution["last_reused"] = now
             self.memory["statistics"]["total_reuses"] += 1
-            self.save_memory()
+            update = self._pending_reuses.setdefault(signature, {"count": 0})
+            update["count"] += 1
+            update["last_reused"] = now
+            if sum(u["count"] for u in self._pending_reuses.values()) >= self.flush_every:
+                self.flush()
             
-            return solution
-        return None
+            return {**solution, "match": kind}
     
-    def save_solution(self, error_signature: str, solution: Dict):
+    def save_solution(self, error_signature: str, solution: Dict, error_message: Optional[str] = None):
         """
         Save a solution that worked
         
         Args:
             error_signature: The error pattern
             solution: The fix that worked
+            error_message: Raw error text (indexed for fuzzy matching)
         """
-        self.memory["solutions"][error_signature] = {
+        error_message = error_message or solution.get("error")
+        entry = {
             "solution": solution,
             "first_seen": datetime.now().isoformat(),
             "reuse_count": 0,
             "success_rate": 1.0
         }
+        if error_message:
+            entry["fingerprint"] = error_fingerprint(error_message)
+            entry["normalized_error"] = normalize_error(error_message)[:MAX_ERROR_CHARS]
         
-        self.memory["statistics"]["total_errors_seen"] += 1
-        self.memory["statistics"]["total_solutions_saved"] += 1
-        self.save_memory()
+        with self._lock:
+            self.memory["solutions"][error_signature] = entry
+            self.memory["statistics"]["total_errors_seen"] += 1
+            self.memory["statistics"]["total_solutions_saved"] += 1
+            self._near.remove(error_signature)
+            self._index(error_signature, entry)
+            self._append([{"op": "save", "signature": error_signature, "entry": entry}])
         
         print(f"💾 Solution saved to memory: {error_signature}")
     
@@ -111,7 +398,7 @@ class MetaMemory:
             error_type: Type of error (e.g., "missing_file", "empty_file")
             file_path: The file with the error
             error_message: The error message
-            
+        
         Returns:
             Unique signature string
         """
@@ -139,7 +426,10 @@ class MetaMemory:
     
     def clear_memory(self):
         """Clear all memory (use with caution!)"""
-        self.memory = self.create_new_memory()
-        self.save_memory()
+        with self._lock:
+            self.memory = self.create_new_memory()
+            self._pending_reuses = {}
+            self._by_fingerprint = {}
+            self._near = MinHashIndex()
+            self._compact()
         print("🧹 Memory cleared")
-
@@ -0,0 +1,265 @@
+"""
+Adaptive Rate Limiter - Quota-aware pacing for Gemini calls
+Shared by every genai_pool caller so concurrent research and build loops
+coordinate instead of stampeding the quota.
+
+Per quota key (auth mode + model name; ceilings come from the model's
+family, pro / flash / default) it keeps:
+- a request bucket and an input-token bucket, paced by reservation
+  (callers are handed a wait time, nobody polls)
+- an AIMD rate: halved on a 429 (at most once per cooldown, so a burst of
+  429s from concurrent callers counts as one congestion signal), raised
+  additively on every success up to the configured ceiling
+- a shared "blocked until" deadline set from Retry-After / RetryInfo, so
+  every caller of the bucket waits it out together
+
+Retries are drawn from a process-wide RetryBudget: at most
+GENAI_RETRY_RATIO retries per recent request (plus a small floor), so a
+quota outage degrades to fallbacks instead of multiplying traffic.
+
+State is guarded by a threading.Lock; acquire() is async, acquire_sync()
+blocks the calling thread, and both share the same buckets.
+"""
+
+import os
+import re
+import time
+import random
+import asyncio
+import threading
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Optional
+
+
+# Requests / input tokens per minute per model, by family (ceilings for the AIMD rate)
+_RPM = {
+    'pro': float(os.getenv('GENAI_RPM_PRO', '60')),
+    'flash': float(os.getenv('GENAI_RPM_FLASH', '300')),
+    'default': float(os.getenv('GENAI_RPM', '120')),
+}
+_TPM = {
+    'pro': float(os.getenv('GENAI_TPM_PRO', '1000000')),
+    'flash': float(os.getenv('GENAI_TPM_FLASH', '4000000')),
+    'default': float(os.getenv('GENAI_TPM', '1000000')),
+}
+
+RETRY_RATIO = float(os.getenv('GENAI_RETRY_RATIO', '0.2'))
+MIN_RETRIES_PER_MINUTE = float(os.getenv('GENAI_MIN_RETRIES_PER_MINUTE', '6'))
+BACKOFF_BASE = float(os.getenv('GENAI_BACKOFF_BASE', '2'))
+BACKOFF_CAP = float(os.getenv('GENAI_BACKOFF_CAP', '60'))
+
+_RETRY_DELAY_RE = re.compile(r"retryDelay['\"]?\s*[:=]\s*['\"]?(\d+(?:\.\d+)?)s")
+
+
+def estimate_tokens(contents: Any) -> int:
+    """Rough input token count (~4 chars per token) used for TPM pacing"""
+    return max(1, len(str(contents)) // 4)
+
+
+def is_quota_error(error: Exception) -> bool:
+    code = getattr(error, 'code', None) or getattr(error, 'status_code', None)
+    if code == 429:
+        return True
+    text = str(error)
+    return '429' in text or 'RESOURCE_EXHAUSTED' in text
+
+
+def retry_after(error: Exception) -> Optional[float]:
+    """
+    Server-requested delay in seconds, if the error carries one
+    (Retry-After header, or a RetryInfo retryDelay in the error details).
+    """
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None)
+    value = None
+    if hasattr(headers, 'get'):
+        value = headers.get('retry-after') or headers.get('Retry-After')
+    if value:
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            try:
+                return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+            except (TypeError, ValueError):
+                pass
+
+    match = _RETRY_DELAY_RE.search(str(getattr(error, 'details', None) or error))
+    if match:
+        return float(match.group(1))
+    return None
+
+
+class _Bucket:
+    """Reservation-based token bucket whose refill rate can be changed"""
+
+    def __init__(self, per_minute: float):
+        self.ceiling = per_minute / 60.0
+        self.rate = self.ceiling
+        self.capacity = max(1.0, per_minute / 60.0 * 5)  # up to ~5s of burst
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def reserve(self, cost: float, now: float) -> float:
+        """Take cost tokens (possibly going negative); returns seconds to wait."""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        cost = min(cost, self.capacity)
+        self.tokens -= cost
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+
+class _QuotaState:
+    def __init__(self, bucket: str):
+        self.requests = _Bucket(_RPM[bucket])
+        self.tokens = _Bucket(_TPM[bucket])
+        self.blocked_until = 0.0
+        self.last_decrease = 0.0
+        self.throttled = 0
+        self.successes = 0
+
+
+class RetryBudget:
+    """
+    Process-wide cap on retries: within the sliding window, allow
+    max(min_retries, ratio * requests) retries.
+    """
+
+    def __init__(self, ratio: float = RETRY_RATIO,
+                 min_per_minute: float = MIN_RETRIES_PER_MINUTE, window: float = 60.0):
+        self.ratio = ratio
+        self.min_retries = min_per_minute * window / 60.0
+        self.window = window
+        self._requests: deque = deque()
+        self._retries: deque = deque()
+        self._lock = threading.Lock()
+        self.denied = 0
+
+    def _trim(self, now: float) -> None:
+        for q in (self._requests, self._retries):
+            while q and q[0] < now - self.window:
+                q.popleft()
+
+    def record_request(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            self._trim(now)
+            self._requests.append(now)
+
+    def try_spend(self) -> bool:
+        """Withdraw one retry; False when the budget is exhausted."""
+        with self._lock:
+            now = time.monotonic()
+            self._trim(now)
+            allowed = max(self.min_retries, self.ratio * len(self._requests))
+            if len(self._retries) >= allowed:
+                self.denied += 1
+                return False
+            self._retries.append(now)
+            return True
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._trim(time.monotonic())
+            return {
+                'requests_in_window': len(self._requests),
+                'retries_in_window': len(self._retries),
+                'denied': self.denied
+            }
+
+
+class AdaptiveRateLimiter:
+    """Per-bucket request/token pacing with AIMD and Retry-After support"""
+
+    def __init__(self, decrease_factor: float = 0.5, increase_fraction: float = 0.05,
+                 min_fraction: float = 0.05, cooldown: float = 2.0):
+        self.decrease_factor = decrease_factor
+        self.increase_fraction = increase_fraction  # of the ceiling, per success
+        self.min_fraction = min_fraction  # rate never drops below this share of the ceiling
+        self.cooldown = cooldown
+        self._states: Dict[str, _QuotaState] = {}
+        self._lock = threading.Lock()
+        self.retry_budget = RetryBudget()
+
+    def _state(self, key: str, bucket: str) -> _QuotaState:
+        state = self._states.get(key)
+        if state is None:
+            state = self._states[key] = _QuotaState(bucket)
+        return state
+
+    def _reserve(self, key: str, bucket: str, tokens: int) -> float:
+        with self._lock:
+            state = self._state(key, bucket)
+            now = time.monotonic()
+            wait = max(
+                state.requests.reserve(1, now),
+                state.tokens.reserve(tokens, now),
+                state.blocked_until - now
+            )
+        return wait
+
+    async def acquire(self, key: str, bucket: str = 'default', tokens: int = 1) -> float:
+        """Wait for this bucket's pacing; returns the seconds waited."""
+        wait = self._reserve(key, bucket, tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    def acquire_sync(self, key: str, bucket: str = 'default', tokens: int = 1) -> float:
+        wait = self._reserve(key, bucket, tokens)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def on_success(self, key: str, bucket: str = 'default') -> None:
+        """Additive increase back towards the configured ceiling"""
+        with self._lock:
+            state = self._state(key, bucket)
+            state.successes += 1
+            for b in (state.requests, state.tokens):
+                b.rate = min(b.ceiling, b.rate + b.ceiling * self.increase_fraction)
+
+    def on_throttle(self, key: str, bucket: str = 'default',
+                    retry_after_s: Optional[float] = None) -> None:
+        """Multiplicative decrease (once per cooldown) and shared Retry-After block"""
+        with self._lock:
+            state = self._state(key, bucket)
+            now = time.monotonic()
+            state.throttled += 1
+            if retry_after_s:
+                state.blocked_until = max(state.blocked_until, now + retry_after_s)
+            if now - state.last_decrease >= self.cooldown:
+                state.last_decrease = now
+                for b in (state.requests, state.tokens):
+                    b.rate = max(b.ceiling * self.min_fraction, b.rate * self.decrease_factor)
+                print(f"🐢 Quota pressure on {key}: pacing at {state.requests.rate * 60:.0f} req/min")
+
+    @staticmethod
+    def backoff(attempt: int, retry_after_s: Optional[float] = None,
+                base: float = BACKOFF_BASE, cap: float = BACKOFF_CAP) -> float:
+        """Full-jitter exponential backoff, never shorter than the server's Retry-After"""
+        delay = random.uniform(0, min(cap, base * (2 ** attempt)))
+        if retry_after_s is not None:
+            # Spread callers released by the same Retry-After
+            delay = retry_after_s + random.uniform(0, max(0.5, 0.2 * retry_after_s))
+        return delay
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            now = time.monotonic()
+            buckets = {
+                key: {
+                    'rpm': round(state.requests.rate * 60, 1),
+                    'rpm_ceiling': round(state.requests.ceiling * 60, 1),
+                    'tpm': round(state.tokens.rate * 60),
+                    'blocked_for': round(max(0.0, state.blocked_until - now), 2),
+                    'throttled': state.throttled,
+                    'successes': state.successes
+                }
+                for key, state in self._states.items()
+            }
+        return {'buckets': buckets, 'retry_budget': self.retry_budget.stats()}
+
+
+# Shared by genai_pool (and through it every Gemini caller in the engine)
+rate_limiter = AdaptiveRateLimiter()
@@ -3,11 +3,12 @@ Proactive Research Agent
 Researches topics BEFORE execution to build knowledge.
 """
 
+import os
 import asyncio
-from typing import List, Dict
-from google import genai
+from typing import List, Dict, Optional
 from google.genai import types as genai_types
 from .knowledge_base import KnowledgeBase
+from . import genai_pool
 
 
 class ResearchAgent:
@@ -19,17 +20,22 @@ class ResearchAgent:
     - Proactive: Research → Build Knowledge → Execute with Intelligence
     """
     
-    def __init__(self):
-        """Initialize research agent with Gemini Flash (10x cheaper!) and knowledge base."""
+    def __init__(self, concurrent: Optional[bool] = None):
+        """
+        Initialize research agent with Gemini Flash (10x cheaper!) and knowledge base.
+        
+        Args:
+            concurrent: Research topics in parallel (default: RESEARCH_CONCURRENT env, true).
+                        Pacing comes from the shared rate limiter in genai_pool either way.
+        """
         self.kb = KnowledgeBase()
         self.model_name = "gemini-2.5-flash"  # Use Flash for research - way cheaper!
+        if concurrent is None:
+            concurrent = os.getenv('RESEARCH_CONCURRENT', 'true').lower() == 'true'
+        self.concurrent = concurrent
         
         try:
-            self.client = genai.Client(
-                vertexai=True,
-                project="studio-2416451423-f2d96",
-                location="us-central1"
-            )
+            self.client = genai_pool.get_client(vertexai=True)
             print("✅ Research Agent initialized (using Gemini 2.5 Flash for 10x cost savings)")
         except Exception as e:
             print(f"⚠️ Research Agent init error: {e}")
@@ -64,46 +70,56 @@ class ResearchAgent:
             print(f"   • {topic}")
         print()
         
-        # Step 2: Research each topic
-        findings = {}
-        for i, topic in enumerate(topics, 1):
-            print(f"🔍 Researching ({i}/{len(topics)}): {topic}...")
-            try:
-                knowledge = await self._research_topic(topic)
-                if knowledge:
-                    findings[topic] = knowledge
-                    # Store in knowledge base
-                    self.kb.add_topic_knowledge(
-                        topic=topic,
-                        knowledge=knowledge,
-                        source="proactive_research"
-                    )
-                    print(f"   ✅ Success")
-                await asyncio.sleep(3)  # Increased delay to avoid rate limits
-            except Exception as e:
-                print(f"   ⚠️ Skipped due to rate limit: {str(e)[:50]}...")
-                await asyncio.sleep(5)  # Longer delay after error
+        if self.concurrent:
+            # Steps 2-4 only depend on the topic list, so fan them all out;
+            # genai_pool's rate limiter paces the calls instead of fixed sleeps
+            print(f"🔍 Researching {len(topics)} topics, best practices and pitfalls in parallel...")
+            topic_results, best_practices, pitfalls = await asyncio.gather(
+                asyncio.gather(*(self._research_one(topic, i, len(topics))
+                                 for i, topic in enumerate(topics, 1))),
+                self._identify_best_practices(goal, topics),
+                self._identify_pitfalls(goal, topics)
+            )
+        else:
+            # Step 2: Research each topic
+            topic_results = [
+                await self._research_one(topic, i, len(topics))
+                for i, topic in enumerate(topics, 1)
+            ]
+            # Step 3: Identify best practices
+            print(f"\n📚 Identifying best practices...")
+            best_practices = await self._identify_best_practices(goal, topics)
+            # Step 4: Identify common pitfalls
+            print(f"\n⚠️ Identifying common pitfalls...")
+            pitfalls = await self._identify_pitfalls(goal, topics)
         
-        # Step 3: Identify best practices
-        print(f"\n📚 Identifying best practices...")
-        best_practices = await self._identify_best_practices(goal, topics)
-        for tech, practices in best_practices.items():
-            for practice in practices:
-                self.kb.add_best_practice(
-                    technology=tech,
-                    practice=practice["practice"],
-                    rationale=practice["rationale"]
-                )
+        findings = {
+            topic: knowledge
+            for topic, knowledge in zip(topics, topic_results)
+            if knowledge
+        }
         
-        # Step 4: Identify common pitfalls
-        print(f"\n⚠️ Identifying common pitfalls...")
-        pitfalls = await self._identify_pitfalls(goal, topics)
-        for pitfall in pitfalls:
-            self.kb.add_pattern(
-                pattern_name=pitfall["name"],
-                description=pitfall["description"],
-                solution=pitfall["solution"]
-            )
+        # Store everything in the knowledge base with a single save
+        with self.kb.batch():
+            for topic, knowledge in findings.items():
+                self.kb.add_topic_knowledge(
+                    topic=topic,
+                    knowledge=knowledge,
+                    source="proactive_research"
+                )
+            for tech, practices in best_practices.items():
+                for practice in practices:
+                    self.kb.add_best_practice(
+                        technology=tech,
+                        practice=practice["practice"],
+                        rationale=practice["rationale"]
+                    )
+            for pitfall in pitfalls:
+                self.kb.add_pattern(
+                    pattern_name=pitfall["name"],
+                    description=pitfall.get("description", ""),
+                    solution=pitfall.get("solution", "")
+                )
         
         print("\n" + "="*70)
         print("✅ RESEARCH COMPLETE")
@@ -116,6 +132,18 @@ class ResearchAgent:
             "pitfalls": pitfalls
         }
     
+    async def _research_one(self, topic: str, index: int, total: int) -> str:
+        """Research one topic; failures are logged and yield an empty result."""
+        print(f"🔍 Researching ({index}/{total}): {topic}...")
+        try:
+            knowledge = await self._research_topic(topic)
+        except Exception as e:
+            print(f"   ⚠️ Skipped {topic}: {str(e)[:50]}...")
+            return ""
+        if knowledge:
+            print(f"   ✅ {topic}")
+        return knowledge
+    
     async def _identify_topics(self, goal: str) -> List[str]:
         """Identify what topics need to be researched for this goal."""
         if not self.client:
@@ -136,8 +164,7 @@ Examples of good topics:
 Return ONLY a numbered list of topics, one per line."""
 
         try:
-            response = await asyncio.to_thread(
-                self.client.models.generate_content,
+            response = await genai_pool.generate_content(
                 model=self.model_name,
                 contents=genai_types.Part.from_text(text=prompt)
             )
@@ -165,8 +192,7 @@ Return ONLY a numbered list of topics, one per line."""
         
         try:
             # Use Gemini with Google Search grounding
-            response = await asyncio.to_thread(
-                self.client.models.generate_content,
+            response = await genai_pool.generate_content(
                 model=self.model_name,
                 contents=genai_types.Part.from_text(
                     text=f"""Research and summarize: {topic}
@@ -213,9 +239,7 @@ Be concise and practical."""
             if "css" in topic_lower:
                 techs.add("CSS")
         
-        best_practices = {}
-        
-        for tech in techs:
+        async def practices_for(tech: str) -> List[Dict]:
             try:
                 prompt = f"""What are 3 critical best practices for {tech} that prevent common errors?
 
@@ -224,8 +248,7 @@ Return as a simple list:
 2. Practice: [what to do] | Rationale: [why it matters]
 3. Practice: [what to do] | Rationale: [why it matters]"""
 
-                response = await asyncio.to_thread(
-                    self.client.models.generate_content,
+                response = await genai_pool.generate_content(
                     model=self.model_name,
                     contents=genai_types.Part.from_text(text=prompt)
                 )
@@ -241,12 +264,15 @@ Return as a simple list:
                             "practice": practice_part,
                             "rationale": rationale_part
                         })
-                
-                if practices:
-                    best_practices[tech] = practices
+                return practices
                 
             except Exception as e:
                 print(f"⚠️ Error getting best practices for {tech}: {e}")
+                return []
+        
+        techs = sorted(techs)
+        results = await asyncio.gather(*(practices_for(tech) for tech in techs))
+        best_practices = {tech: practices for tech, practices in zip(techs, results) if practices}
         
         return best_practices
     
@@ -272,8 +298,7 @@ Format:
    Description: [what goes wrong]
    Solution: [how to prevent]"""
 
-            response = await asyncio.to_thread(
-                self.client.models.generate_content,
+            response = await genai_pool.generate_content(
                 model=self.model_name,
                 contents=genai_types.Part.from_text(text=prompt),
                 config=genai_types.GenerateContentConfig(
@@ -305,12 +330,16 @@ Format:
             print(f"⚠️ Error identifying pitfalls: {e}")
             return []
     
-    def get_knowledge_for_execution(self, query: str) -> List[Dict]:
+    def get_knowledge_for_execution(self, query: str, top_k: int = 8,
+                                    token_budget: int = 1500) -> List[Dict]:
         """
         Get relevant knowledge from the knowledge base for current execution.
         Called during execution to reference learned knowledge.
+        
+        Returns ranked, deduplicated snippets (hybrid BM25 + embedding
+        retrieval) that together fit in token_budget.
         """
-        return self.kb.search_knowledge(query)
+        return self.kb.retrieve(query, top_k=top_k, token_budget=token_budget)
 
 
 # Example usage
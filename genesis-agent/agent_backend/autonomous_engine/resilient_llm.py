@@ -3,12 +3,11 @@ Resilient LLM Integration with Fallbacks
 Handles quota limits, retries, and multiple API fallbacks
 """
 
-import asyncio
-import time
 from typing import List, Dict, Any
-from google import genai
 from google.genai import types as genai_types
-from .task_manager import Task
+from .task_manager import Task, tasks_from_plan
+from .llm_cache import llm_cache
+from . import genai_pool
 import uuid
 
 
@@ -29,87 +28,91 @@ class ResilientLLM:
         self.model_name = model_name
         self.vertex_client = None
         self.direct_client = None
-        self.max_retries = 3
-        self.base_delay = 2  # seconds
+        self.max_retries = 3  # attempts per strategy; backoff/jitter live in rate_limiter
         
-        # Initialize Vertex AI client
+        # Vertex AI client (shared process-wide through genai_pool)
         try:
-            self.vertex_client = genai.Client(
-                vertexai=True,
-                project='studio-2416451423-f2d96',
-                location='us-central1'
-            )
+            self.vertex_client = genai_pool.get_client(vertexai=True)
             print("✅ Vertex AI client initialized")
         except Exception as e:
             print(f"⚠️ Vertex AI init failed: {e}")
         
-        # Initialize direct API client as fallback
-        import os
-        api_key = os.getenv('GEMINI_API_KEY')
-        if api_key:
-            try:
-                self.direct_client = genai.Client(api_key=api_key)
+        # Direct API client as fallback (only when GEMINI_API_KEY is set)
+        try:
+            self.direct_client = genai_pool.get_client(vertexai=False)
+            if self.direct_client:
                 print("✅ Direct Gemini API client initialized")
-            except Exception as e:
-                print(f"⚠️ Direct API init failed: {e}")
+        except Exception as e:
+            print(f"⚠️ Direct API init failed: {e}")
     
-    async def call_with_fallback(self, prompt: str, config: genai_types.GenerateContentConfig):
+    async def call_with_fallback(self, prompt: str, config: genai_types.GenerateContentConfig,
+                                 system_instruction: str = None, use_cache: bool = True,
+                                 bypass_sampled: bool = None):
         """
         Try to call LLM with automatic fallback and retry logic
+        
+        Identical (model, prompt, config) requests are answered from the
+        shared LLM response cache; use_cache=False forces a fresh call and
+        bypass_sampled=True does so only for non-zero temperature configs.
         """
-        # Strategy 1: Try Vertex AI with retries
+        if system_instruction:
+            prompt = system_instruction + "\n\n" + prompt
+        
+        if use_cache:
+            cached = llm_cache.get(self.model_name, prompt, config, bypass_sampled=bypass_sampled)
+            if cached is not None:
+                return cached
+        
+        response_text = await self._call_uncached(prompt, config)
+        if use_cache:
+            llm_cache.put(self.model_name, prompt, config, response_text, bypass_sampled=bypass_sampled)
+        return response_text
+    
+    def reject(self, output: str) -> bool:
+        """Drop generated code that failed verification from the LLM response cache"""
+        return llm_cache.reject(output)
+    
+    async def _call_uncached(self, prompt: str, config: genai_types.GenerateContentConfig) -> str:
+        """Vertex AI with retries, then the direct API; raises if both fail"""
+        # Strategy 1: Try Vertex AI (quota pacing and 429 retries happen in genai_pool)
         if self.vertex_client:
-            for attempt in range(self.max_retries):
-                try:
-                    print(f"🔄 Attempt {attempt + 1}: Calling Vertex AI...")
-                    
-                    def call_vertex():
-                        return self.vertex_client.models.generate_content(
-                            model=self.model_name,
-                            contents=[
-                                genai_types.Content(
-                                    role='user',
-                                    parts=[genai_types.Part.from_text(text=prompt)]
-                                )
-                            ],
-                            config=config
+            try:
+                print(f"🔄 Calling Vertex AI...")
+                
+                response = await genai_pool.generate_content(
+                    model=self.model_name,
+                    contents=[
+                        genai_types.Content(
+                            role='user',
+                            parts=[genai_types.Part.from_text(text=prompt)]
                         )
-                    
-                    response = await asyncio.to_thread(call_vertex)
-                    print(f"✅ Vertex AI call succeeded")
-                    return response.text
-                    
-                except Exception as e:
-                    error_str = str(e)
-                    
-                    # Check if quota exhausted
-                    if '429' in error_str or 'RESOURCE_EXHAUSTED' in error_str:
-                        wait_time = self.base_delay * (2 ** attempt)
-                        print(f"⚠️ Quota exhausted, waiting {wait_time}s before retry...")
-                        await asyncio.sleep(wait_time)
-                        continue
-                    else:
-                        print(f"⚠️ Vertex AI error: {e}")
-                        break
+                    ],
+                    config=config,
+                    client=self.vertex_client,
+                    max_retries=self.max_retries - 1
+                )
+                print(f"✅ Vertex AI call succeeded")
+                return response.text
+                
+            except Exception as e:
+                print(f"⚠️ Vertex AI error: {e}")
         
         # Strategy 2: Try direct Gemini API
         if self.direct_client:
             try:
                 print(f"🔄 Falling back to direct Gemini API...")
                 
-                def call_direct():
-                    return self.direct_client.models.generate_content(
-                        model='gemini-2.5-pro',
-                        contents=[
-                            genai_types.Content(
-                                role='user',
-                                parts=[genai_types.Part.from_text(text=prompt)]
-                            )
-                        ],
-                        config=config
-                    )
-                
-                response = await asyncio.to_thread(call_direct)
+                response = await genai_pool.generate_content(
+                    model='gemini-2.5-pro',
+                    contents=[
+                        genai_types.Content(
+                            role='user',
+                            parts=[genai_types.Part.from_text(text=prompt)]
+                        )
+                    ],
+                    config=config,
+                    client=self.direct_client
+                )
                 print(f"✅ Direct API call succeeded")
                 return response.text
                 
@@ -128,6 +131,8 @@ class ResilientLLM:
 Return a JSON array of tasks:
 [
   {
+    "id": "t1",
+    "depends_on": ["ids of earlier tasks that must complete first"],
     "description": "Clear task description",
     "type": "create_file | write_code | run_command",
     "details": {
@@ -138,6 +143,9 @@ Return a JSON array of tasks:
   }
 ]
 
+Only list real dependencies in depends_on: tasks that don't depend on each
+other (e.g. separate files) run in parallel.
+
 Be specific and actionable."""
 
         user_prompt = f"Goal: {goal}\n\nBreak this down into tasks."
@@ -157,17 +165,7 @@ Be specific and actionable."""
             import json
             tasks_data = json.loads(response_text)
             
-            tasks = []
-            for task_data in tasks_data:
-                task = Task(
-                    id=str(uuid.uuid4()),
-                    description=task_data['description']
-                )
-                task.task_type = task_data.get('type', 'generic')
-                task.details = task_data.get('details', {})
-                tasks.append(task)
-            
-            return tasks
+            return tasks_from_plan(tasks_data)
             
         except Exception as e:
             print(f"❌ Goal decomposition failed: {e}")
@@ -177,8 +175,22 @@ Be specific and actionable."""
                 description=f"Execute goal: {goal}"
             )]
     
+    async def generate(self, prompt: str, temperature: float = 0.2,
+                       max_output_tokens: int = 8192) -> str:
+        """General-purpose text generation (cached like every call_with_fallback request)"""
+        config = genai_types.GenerateContentConfig(
+            temperature=temperature,
+            max_output_tokens=max_output_tokens,
+        )
+        return await self.call_with_fallback(prompt, config)
+    
     async def generate_fix(self, prompt: str) -> str:
-        """Simple method for generating fixes - just takes a prompt"""
+        """
+        Simple method for generating fixes - just takes a prompt.
+        
+        Never cached: a fix that fails verification (or gets rolled back)
+        would otherwise come back unchanged for the identical retry prompt.
+        """
         config = genai_types.GenerateContentConfig(
             temperature=0.2,
             top_p=0.95,
@@ -188,7 +200,8 @@ Be specific and actionable."""
         return await self.call_with_fallback(
             prompt=prompt,
             config=config,
-            system_instruction="You are an expert developer. Fix bugs and generate clean, working code. Return ONLY code, no explanations."
+            system_instruction="You are an expert developer. Fix bugs and generate clean, working code. Return ONLY code, no explanations.",
+            use_cache=False
         )
     
     async def generate_code(self, task_description: str, filename: str,
@@ -214,16 +227,14 @@ Filename: {filename}
 
 Return ONLY the code."""
 
+        prompt = system_prompt + "\n\n" + user_prompt
         config = genai_types.GenerateContentConfig(
             temperature=0.2,
             max_output_tokens=8192
         )
         
         try:
-            code = await self.call_with_fallback(
-                system_prompt + "\n\n" + user_prompt,
-                config
-            )
+            code = await self.call_with_fallback(prompt, config)
             
             # Clean up markdown if present
             code = code.strip()
@@ -235,6 +246,8 @@ Return ONLY the code."""
                     lines = lines[:-1]
                 code = '\n'.join(lines)
             
+            # So callers can reject() it if it fails verification
+            llm_cache.remember(code, self.model_name, prompt, config)
             return code
             
         except Exception as e:
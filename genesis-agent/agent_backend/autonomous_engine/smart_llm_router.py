@@ -2,10 +2,14 @@
 Smart LLM Router - Cost Optimizer
 Routes requests to Flash (cheap) or Pro (expensive) based on task complexity
 Saves 70-80% on API costs without hurting quality
+
+Both models go through ResilientLLM, so repeated prompts are answered from
+the shared LLM response cache (see llm_cache.py) at no cost.
 """
 
 from typing import Optional, Dict
 from .resilient_llm import ResilientLLM
+from .llm_cache import llm_cache
 
 
 class SmartLLMRouter:
@@ -87,12 +91,12 @@ class SmartLLMRouter:
         if use_pro:
             print(f"💎 Using Gemini 2.5 Pro (high quality)")
             self.stats["pro_calls"] += 1
-            result = await self.pro.generate_code(prompt)
+            result = await self.pro.generate(prompt)
         else:
             print(f"⚡ Using Gemini 2.5 Flash (fast & cheap)")
             self.stats["flash_calls"] += 1
             self.stats["estimated_savings"] += 0.05  # ~$0.05 saved per call
-            result = await self.flash.generate_code(prompt)
+            result = await self.flash.generate(prompt)
         
         return result
     
@@ -110,12 +114,12 @@ class SmartLLMRouter:
         if use_pro:
             print(f"💎 Using Gemini 2.5 Pro (complex reasoning)")
             self.stats["pro_calls"] += 1
-            result = await self.pro.generate_code(prompt)  # Using generate_code as general method
+            result = await self.pro.generate(prompt)
         else:
             print(f"⚡ Using Gemini 2.5 Flash (simple analysis)")
             self.stats["flash_calls"] += 1
             self.stats["estimated_savings"] += 0.05
-            result = await self.flash.generate_code(prompt)
+            result = await self.flash.generate(prompt)
         
         return result
     
@@ -129,7 +133,7 @@ class SmartLLMRouter:
         self.stats["estimated_savings"] += 0.05
         
         # Flash is perfect for research queries
-        result = await self.flash.generate_code(query)
+        result = await self.flash.generate(query)
         return result
     
     def get_cost_report(self) -> Dict:
@@ -138,6 +142,7 @@ class SmartLLMRouter:
         """
         total_calls = self.stats["flash_calls"] + self.stats["pro_calls"]
         flash_percentage = (self.stats["flash_calls"] / total_calls * 100) if total_calls > 0 else 0
+        cache_stats = llm_cache.stats()
         
         return {
             "total_calls": total_calls,
@@ -145,6 +150,8 @@ class SmartLLMRouter:
             "pro_calls": self.stats["pro_calls"],
             "flash_percentage": round(flash_percentage, 1),
             "estimated_savings": round(self.stats["estimated_savings"], 2),
+            "cache_hits": cache_stats["hits"],
+            "cache_hit_rate": cache_stats["hit_rate"],
             "message": f"Saved ~${self.stats['estimated_savings']:.2f} by using Flash for {self.stats['flash_calls']} calls"
         }
     
@@ -158,6 +165,7 @@ class SmartLLMRouter:
         print(f"  ⚡ Flash calls: {report['flash_calls']} ({report['flash_percentage']}%)")
         print(f"  💎 Pro calls: {report['pro_calls']} ({100 - report['flash_percentage']:.1f}%)")
         print(f"💵 Estimated savings: ${report['estimated_savings']}")
+        print(f"💾 Cache hits: {report['cache_hits']} (hit rate {report['cache_hit_rate']:.0%})")
         print(f"{'='*60}\n")
 
 
@@ -0,0 +1,173 @@
+"""
+Task Journal - Write-ahead log for autonomous execution
+Makes AutonomousEngine runs durable and resumable.
+
+Every transition is appended to a JSONL file and fsynced before execution
+moves on, so a preempted worker loses at most the task it was running:
+
+    {"event": "goal", "goal": ...}
+    {"event": "task_added", "task": {...Task.to_dict()}}
+    {"event": "task_started", "task_id": ...}
+    {"event": "llm_output", "task_id": ..., "sha256": ..., "chars": ...}
+    {"event": "file_write", "task_id": ..., "path": ..., "sha256": ...}
+    {"event": "task_completed", "task_id": ..., "result": {...}}
+    {"event": "task_failed", "task_id": ..., "error": ..., "retry_count": ..., "permanent": bool}
+
+LLM outputs and written file contents are stored content-addressed next to
+the journal (<journal>.blobs/<sha256>), so a resumed run can restore
+generated files and reuse generations for interrupted tasks without calling
+the LLM again.
+"""
+
+import os
+import json
+import hashlib
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, Optional, Iterator
+
+
+def content_hash(content: str) -> str:
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+class TaskJournal:
+    """Append-only JSONL journal plus content-addressed LLM output store."""
+
+    def __init__(self, path: str, fsync: bool = True):
+        self.path = Path(path)
+        self.blob_dir = Path(str(self.path) + '.blobs')
+        self.fsync = fsync
+        self._lock = threading.Lock()
+        self._file = None
+        self._llm_outputs: Dict[str, str] = {}  # task_id -> latest output hash
+        self.file_writes: Dict[str, Dict[str, str]] = {}  # task_id -> {path: hash}, after replay
+
+    def _open(self):
+        if self._file is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(self.path, 'a', encoding='utf-8')
+        return self._file
+
+    def start(self, goal: str) -> None:
+        """Begin a fresh journal for a new run (previous journal is discarded)."""
+        self._llm_outputs = {}
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(self.path, 'w', encoding='utf-8')
+        self.record('goal', goal=goal)
+
+    def record(self, event: str, **fields: Any) -> None:
+        """Append one event; durable once this returns."""
+        entry = {'event': event, 'ts': datetime.now().isoformat(), **fields}
+        line = json.dumps(entry, default=str)
+        with self._lock:
+            f = self._open()
+            f.write(line + '\n')
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+
+    def _store_blob(self, content: str) -> str:
+        digest = content_hash(content)
+        self.blob_dir.mkdir(parents=True, exist_ok=True)
+        blob = self.blob_dir / digest
+        if not blob.exists():
+            tmp = blob.with_suffix('.tmp')
+            tmp.write_text(content, encoding='utf-8')
+            os.replace(tmp, blob)
+        return digest
+
+    def record_llm_output(self, task_id: str, output: str) -> str:
+        """Store an LLM generation for a task; returns its hash."""
+        digest = self._store_blob(output)
+        self.record('llm_output', task_id=task_id, sha256=digest, chars=len(output))
+        self._llm_outputs[task_id] = digest
+        return digest
+
+    def record_file_write(self, task_id: str, path: str, content: str) -> None:
+        """Record a workspace file written by a task (content kept for restore)."""
+        digest = self._store_blob(content)
+        self.record('file_write', task_id=task_id, path=path, sha256=digest)
+
+    def load_blob(self, digest: str) -> Optional[str]:
+        blob = self.blob_dir / digest
+        try:
+            return blob.read_text(encoding='utf-8')
+        except OSError:
+            return None
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    # ------------------------------------------------------------------
+    # Replay
+    # ------------------------------------------------------------------
+
+    def entries(self) -> Iterator[Dict[str, Any]]:
+        """Journal entries in order; a torn final line (crash mid-write) is ignored."""
+        if not self.path.exists():
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    print(f"⚠️ Skipping corrupt journal line in {self.path}")
+
+    def replay(self) -> Dict[str, Any]:
+        """
+        Fold the journal into the state needed to resume:
+        goal, tasks (dicts with their last known status), the latest LLM output
+        hash per task and the files each task wrote.
+        """
+        state = {
+            'goal': None,
+            'tasks': {},
+            'order': [],
+            'llm_outputs': {},
+            'file_writes': {}
+        }
+        for entry in self.entries():
+            event = entry.get('event')
+            task_id = entry.get('task_id')
+            if event == 'goal':
+                state['goal'] = entry['goal']
+            elif event == 'task_added':
+                task = entry['task']
+                state['tasks'][task['id']] = task
+                state['order'].append(task['id'])
+            elif event == 'task_started' and task_id in state['tasks']:
+                state['tasks'][task_id]['status'] = 'in_progress'
+            elif event == 'task_completed' and task_id in state['tasks']:
+                task = state['tasks'][task_id]
+                task['status'] = 'completed'
+                task['result'] = entry.get('result')
+                task['completed_at'] = entry['ts']
+            elif event == 'task_failed' and task_id in state['tasks']:
+                task = state['tasks'][task_id]
+                task['status'] = 'failed' if entry.get('permanent') else 'pending'
+                task['error'] = entry.get('error')
+                task['retry_count'] = entry.get('retry_count', task.get('retry_count', 0))
+            elif event == 'llm_output':
+                state['llm_outputs'][task_id] = entry['sha256']
+            elif event == 'file_write':
+                state['file_writes'].setdefault(task_id, {})[entry['path']] = entry['sha256']
+        self._llm_outputs = dict(state['llm_outputs'])
+        self.file_writes = state['file_writes']
+        return state
+
+    def llm_output(self, task_id: str) -> Optional[str]:
+        """Most recent journaled LLM output for a task (after replay), if its blob survives."""
+        digest = self._llm_outputs.get(task_id)
+        return self.load_blob(digest) if digest else None
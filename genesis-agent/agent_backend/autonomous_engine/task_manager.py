@@ -6,12 +6,26 @@ Phase 1: Simple Implementation
 - Task queue (FIFO)
 - Completion tracking
 - Basic state management
+
+Phase 3: Dependency-aware scheduling
+- Tasks declare the ids they depend on; the queue is a DAG
+- Tasks whose dependencies are done sit in a heap-backed ready queue
+  (priority, then insertion order), so independent tasks can run together
+- A permanently failed task fails everything downstream of it
+
+Durability
+- With a TaskJournal attached every transition is written ahead to disk;
+  TaskManager.from_journal rebuilds the manager after a crash
 """
 
 from dataclasses import dataclass, field
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Set
 from datetime import datetime
+import heapq
 import json
+import uuid
+
+from .task_journal import TaskJournal
 
 
 @dataclass
@@ -26,6 +40,10 @@ class Task:
     error: Optional[str] = None
     retry_count: int = 0
     max_retries: int = 3
+    dependencies: List[str] = field(default_factory=list)  # ids of tasks that must complete first
+    priority: int = 0  # lower runs first among ready tasks
+    task_type: Optional[str] = None  # set by LLM decomposition
+    details: Dict[str, Any] = field(default_factory=dict)
     
     def to_dict(self) -> dict:
         """Convert task to dictionary for serialization."""
@@ -38,8 +56,131 @@ class Task:
             'result': self.result,
             'error': self.error,
             'retry_count': self.retry_count,
-            'max_retries': self.max_retries
+            'max_retries': self.max_retries,
+            'dependencies': self.dependencies,
+            'priority': self.priority,
+            'task_type': self.task_type,
+            'details': self.details
         }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Task':
+        """Inverse of to_dict (used when resuming from a journal)."""
+        def parse(value):
+            return datetime.fromisoformat(value) if value else None
+        
+        return cls(
+            id=data['id'],
+            description=data['description'],
+            status=data.get('status', 'pending'),
+            created_at=parse(data.get('created_at')) or datetime.now(),
+            completed_at=parse(data.get('completed_at')),
+            result=data.get('result'),
+            error=data.get('error'),
+            retry_count=data.get('retry_count', 0),
+            max_retries=data.get('max_retries', 3),
+            dependencies=list(data.get('dependencies') or []),
+            priority=data.get('priority', 0),
+            task_type=data.get('task_type'),
+            details=data.get('details') or {}
+        )
+
+
+def tasks_from_plan(tasks_data: List[Dict[str, Any]]) -> List[Task]:
+    """
+    Build Tasks from an LLM plan.
+    
+    Each entry may carry an "id" and a "depends_on" list naming earlier
+    entries by id or by 1-based position. Plans without any depends_on get
+    conservative inferred dependencies (see infer_dependencies). Ready-queue
+    priority favours the longest remaining chain, so the critical path starts
+    first.
+    """
+    tasks = []
+    plan_ids: Dict[str, str] = {}
+    for position, task_data in enumerate(tasks_data, 1):
+        task = Task(
+            id=str(uuid.uuid4()),
+            description=task_data['description'],
+            task_type=task_data.get('type', 'generic'),
+            details=task_data.get('details') or {}
+        )
+        plan_ids[str(position)] = task.id
+        if task_data.get('id') is not None:
+            plan_ids[str(task_data['id'])] = task.id
+        tasks.append(task)
+    
+    explicit = any('depends_on' in task_data for task_data in tasks_data)
+    if explicit:
+        for task, task_data in zip(tasks, tasks_data):
+            deps = []
+            for ref in task_data.get('depends_on') or []:
+                dep_id = plan_ids.get(str(ref))
+                # Ignore unknown and self references rather than deadlocking
+                if dep_id and dep_id != task.id and dep_id not in deps:
+                    deps.append(dep_id)
+            task.dependencies = deps
+    else:
+        infer_dependencies(tasks)
+    
+    assign_critical_path_priority(tasks)
+    return tasks
+
+
+def infer_dependencies(tasks: List[Task]) -> None:
+    """
+    Dependencies for a plan that didn't state any, in plan order:
+    - tasks on the same file run in sequence (create, then write, ...)
+    - run_command / verify_result tasks wait for everything before them
+    - tasks after a command wait for that command
+    Independent files are left free to run concurrently.
+    """
+    last_for_file: Dict[str, str] = {}
+    barrier: Optional[str] = None
+    seen: List[str] = []
+    for task in tasks:
+        deps = []
+        if task.task_type in ('run_command', 'verify_result'):
+            deps = list(seen)
+        else:
+            if barrier:
+                deps.append(barrier)
+            filename = task.details.get('filename')
+            if filename and filename in last_for_file and last_for_file[filename] not in deps:
+                deps.append(last_for_file[filename])
+        task.dependencies = deps
+        
+        if task.task_type in ('run_command', 'verify_result'):
+            barrier = task.id
+        filename = task.details.get('filename')
+        if filename:
+            last_for_file[filename] = task.id
+        seen.append(task.id)
+
+
+def assign_critical_path_priority(tasks: List[Task]) -> None:
+    """priority = -(longest chain of tasks waiting on this one)"""
+    dependents: Dict[str, List[str]] = {task.id: [] for task in tasks}
+    for task in tasks:
+        for dep in task.dependencies:
+            if dep in dependents:
+                dependents[dep].append(task.id)
+    
+    heights: Dict[str, int] = {}
+    
+    def height(task_id: str, visiting: Set[str]) -> int:
+        if task_id in heights:
+            return heights[task_id]
+        if task_id in visiting:  # cycle: scheduler reports it as blocked
+            return 0
+        visiting.add(task_id)
+        value = 1 + max((height(d, visiting) for d in dependents[task_id]), default=0)
+        visiting.discard(task_id)
+        heights[task_id] = value
+        return value
+    
+    for task in tasks:
+        task.priority = -height(task.id, set())
 
 
 class TaskManager:
@@ -47,17 +188,19 @@ class TaskManager:
     Manages the task queue and execution state for autonomous operation.
     
     Key Responsibilities:
-    - Maintain task queue (what needs to be done)
+    - Maintain task DAG (what needs to be done, and in which order)
     - Track completed tasks (what's been done)
     - Store working state (files created, commands run, etc.)
-    - Provide task to execute next
+    - Provide the next ready task(s) to execute
     """
     
-    def __init__(self, goal: str):
+    def __init__(self, goal: str, journal: Optional[TaskJournal] = None):
         self.goal = goal
-        self.task_queue: List[Task] = []
+        self.journal = journal
+        self.tasks: Dict[str, Task] = {}
         self.completed_tasks: List[Task] = []
         self.failed_tasks: List[Task] = []
+        self.in_progress: Dict[str, Task] = {}
         self.working_state: Dict[str, Any] = {
             'files_created': [],
             'files_modified': [],
@@ -67,9 +210,78 @@ class TaskManager:
         }
         self.current_task: Optional[Task] = None
         
+        self._ready: List[tuple] = []  # heap of (priority, seq, task_id)
+        self._waiting: Dict[str, Set[str]] = {}  # task_id -> unmet dependency ids
+        self._dependents: Dict[str, List[str]] = {}
+        self._seq: Dict[str, int] = {}
+        
+    @classmethod
+    def from_journal(cls, journal: TaskJournal) -> 'TaskManager':
+        """
+        Rebuild a manager from a journal after a crash or preemption.
+        
+        Completed and permanently failed tasks are restored as such (never
+        re-executed); tasks that were pending or mid-flight go back into the
+        queue with their retry counts. Further transitions append to the
+        same journal.
+        """
+        state = journal.replay()
+        if state['goal'] is None:
+            raise ValueError(f"No goal recorded in journal {journal.path}")
+        
+        manager = cls(goal=state['goal'])
+        tasks = [Task.from_dict(state['tasks'][task_id]) for task_id in state['order']]
+        for task in tasks:
+            manager.tasks[task.id] = task
+            manager._seq[task.id] = len(manager._seq)
+            if task.status == 'completed':
+                manager.completed_tasks.append(task)
+            elif task.status == 'failed':
+                manager.failed_tasks.append(task)
+        for task in tasks:
+            if task.status not in ('completed', 'failed'):
+                task.status = 'pending'
+                manager.add_task(task)
+        
+        manager.journal = journal
+        print(f"♻️  Resumed '{manager.goal}': {len(manager.completed_tasks)} completed, "
+              f"{len(manager.failed_tasks)} failed, {len(tasks) - len(manager.completed_tasks) - len(manager.failed_tasks)} to run")
+        return manager
+        
+    def _record(self, event: str, **fields: Any) -> None:
+        if self.journal is not None:
+            self.journal.record(event, **fields)
+        
+    @property
+    def task_queue(self) -> List[Task]:
+        """Pending tasks (ready or waiting on dependencies), in insertion order."""
+        pending = [self.tasks[task_id] for _, _, task_id in self._ready]
+        pending += [self.tasks[task_id] for task_id in self._waiting]
+        return sorted(pending, key=lambda task: self._seq[task.id])
+        
+    def _push_ready(self, task: Task) -> None:
+        heapq.heappush(self._ready, (task.priority, self._seq[task.id], task.id))
+        
     def add_task(self, task: Task) -> None:
-        """Add a new task to the queue."""
-        self.task_queue.append(task)
+        """Add a new task; it becomes ready once its dependencies complete."""
+        self.tasks[task.id] = task
+        self._seq.setdefault(task.id, len(self._seq))
+        self._record('task_added', task=task.to_dict())
+        
+        completed = {t.id for t in self.completed_tasks}
+        failed = {t.id for t in self.failed_tasks}
+        for dep in task.dependencies:
+            self._dependents.setdefault(dep, []).append(task.id)
+        
+        if any(dep in failed for dep in task.dependencies):
+            self._fail_permanently(task, "Dependency failed")
+            return
+        
+        unmet = {dep for dep in task.dependencies if dep not in completed}
+        if unmet:
+            self._waiting[task.id] = unmet
+        else:
+            self._push_ready(task)
         print(f"📝 Task added: {task.description}")
         
     def add_tasks(self, tasks: List[Task]) -> None:
@@ -78,38 +290,79 @@ class TaskManager:
             self.add_task(task)
             
     def get_next_task(self) -> Optional[Task]:
-        """Get the next task from the queue."""
-        if not self.task_queue:
+        """Get the highest-priority task whose dependencies are all done."""
+        if not self._ready:
             return None
             
-        self.current_task = self.task_queue.pop(0)
+        _, _, task_id = heapq.heappop(self._ready)
+        self.current_task = self.tasks[task_id]
         self.current_task.status = "in_progress"
+        self.in_progress[task_id] = self.current_task
+        self._record('task_started', task_id=task_id)
         print(f"▶️  Starting task: {self.current_task.description}")
         return self.current_task
         
     def mark_completed(self, task: Task, result: Dict[str, Any]) -> None:
-        """Mark a task as completed."""
+        """Mark a task as completed and release the tasks waiting on it."""
         task.status = "completed"
         task.completed_at = datetime.now()
         task.result = result
+        self.in_progress.pop(task.id, None)
         self.completed_tasks.append(task)
+        self._record('task_completed', task_id=task.id, result=result)
         print(f"✅ Task completed: {task.description}")
         
+        for dependent_id in self._dependents.get(task.id, []):
+            unmet = self._waiting.get(dependent_id)
+            if unmet is None:
+                continue
+            unmet.discard(task.id)
+            if not unmet:
+                del self._waiting[dependent_id]
+                self._push_ready(self.tasks[dependent_id])
+        
     def mark_failed(self, task: Task, error: str) -> None:
         """Mark a task as failed."""
         task.error = error
         task.retry_count += 1
+        self.in_progress.pop(task.id, None)
         
         if task.retry_count < task.max_retries:
-            # Retry: Put back in queue at front
+            # Retry: back into the ready queue at its original position
             task.status = "pending"
-            self.task_queue.insert(0, task)
+            self._record('task_failed', task_id=task.id, error=error, retry_count=task.retry_count, permanent=False)
+            self._push_ready(task)
             print(f"🔄 Task failed, retrying ({task.retry_count}/{task.max_retries}): {task.description}")
         else:
             # Max retries exceeded
-            task.status = "failed"
-            self.failed_tasks.append(task)
             print(f"❌ Task failed permanently: {task.description} - {error}")
+            self._fail_permanently(task, error)
+            
+    def _fail_permanently(self, task: Task, error: str) -> None:
+        """Fail a task and, transitively, everything that depends on it."""
+        task.status = "failed"
+        task.error = error
+        self._waiting.pop(task.id, None)
+        self.failed_tasks.append(task)
+        self._record('task_failed', task_id=task.id, error=error, retry_count=task.retry_count, permanent=True)
+        
+        for dependent_id in self._dependents.get(task.id, []):
+            dependent = self.tasks.get(dependent_id)
+            if dependent is not None and dependent_id in self._waiting:
+                print(f"⏭️  Skipping task (dependency failed): {dependent.description}")
+                self._fail_permanently(dependent, f"Dependency failed: {task.description}")
+                
+    def fail_blocked_tasks(self) -> List[Task]:
+        """
+        Fail tasks that can never become ready (unknown dependency or a
+        cycle). Only meaningful when nothing is ready or in progress.
+        """
+        blocked = [self.tasks[task_id] for task_id in list(self._waiting)]
+        for task in blocked:
+            if task.id in self._waiting:
+                print(f"⛔ Task blocked on unresolvable dependencies: {task.description}")
+                self._fail_permanently(task, "Unresolvable dependencies")
+        return blocked
             
     def update_state(self, updates: Dict[str, Any]) -> None:
         """Update the working state with new information."""
@@ -121,23 +374,28 @@ class TaskManager:
                 
     def get_progress_summary(self) -> Dict[str, Any]:
         """Get a summary of current progress."""
-        total_tasks = len(self.completed_tasks) + len(self.failed_tasks) + len(self.task_queue)
-        if self.current_task:
-            total_tasks += 1
+        pending = len(self._ready) + len(self._waiting)
+        total_tasks = len(self.completed_tasks) + len(self.failed_tasks) + pending + len(self.in_progress)
             
         return {
             'goal': self.goal,
             'total_tasks': total_tasks,
             'completed': len(self.completed_tasks),
             'failed': len(self.failed_tasks),
-            'pending': len(self.task_queue),
+            'pending': pending,
+            'ready': len(self._ready),
+            'in_progress': len(self.in_progress),
             'current_task': self.current_task.description if self.current_task else None,
             'progress_percentage': (len(self.completed_tasks) / total_tasks * 100) if total_tasks > 0 else 0
         }
         
     def has_pending_tasks(self) -> bool:
-        """Check if there are any pending tasks."""
-        return len(self.task_queue) > 0
+        """Check if there are any pending tasks (ready or waiting on dependencies)."""
+        return bool(self._ready or self._waiting)
+        
+    def has_ready_tasks(self) -> bool:
+        """Check if a task can be started right now."""
+        return bool(self._ready)
         
     def save_state(self, filepath: str) -> None:
         """Save the current state to a file."""
@@ -147,6 +405,7 @@ class TaskManager:
             'completed_tasks': [task.to_dict() for task in self.completed_tasks],
             'failed_tasks': [task.to_dict() for task in self.failed_tasks],
             'working_state': self.working_state,
+            'journal': str(self.journal.path) if self.journal else None,
             'timestamp': datetime.now().isoformat()
         }
         
@@ -0,0 +1,232 @@
+"""
+Test script for MetaMemory
+Checks error normalization, fingerprint and MinHash matching, buffered
+reuse stats, log compaction and the legacy JSON import
+
+Run from agent_backend/: python -m autonomous_engine.test_meta_memory
+"""
+
+import json
+import tempfile
+from pathlib import Path
+
+from .meta_memory import (
+    COMPACT_RATIO, MetaMemory, MinHashIndex, error_fingerprint, minhash, normalize_error
+)
+
+
+TRACEBACK = """Traceback (most recent call last):
+  File "/home/{user}/projects/{project}/app.py", line {line}, in chat
+    reply = generate_reply(request.json["message"], history=session_history)
+  File "/home/{user}/projects/{project}/services/llm.py", line 88, in generate_reply
+    response = client.models.generate_content(model=model_name, contents=prompt_parts)
+  File "/usr/lib/python3.11/site-packages/google/genai/models.py", line 4512, in generate_content
+    return self._generate_content(model=model, contents=contents, config=config)
+KeyError: 'message' while handling POST /chat at {ts} from worker {pid} object at {addr}
+The request body did not contain the expected field and the handler raised before
+returning a response to the browser, so the frontend showed a network error banner"""
+
+
+def traceback(user="alice", project="chat", line=42, ts="2025-10-03 14:22:01",
+              pid="123456", addr="0x7f3a2c1d9e80", word="message"):
+    return TRACEBACK.format(user=user, project=project, line=line, ts=ts, pid=pid,
+                            addr=addr).replace("'message'", f"'{word}'")
+
+
+def new_memory(tmp, **kwargs) -> MetaMemory:
+    return MetaMemory(str(Path(tmp) / "meta_memory.json"), **kwargs)
+
+
+def log_lines(memory: MetaMemory):
+    return [json.loads(line) for line in memory.memory_file.read_text().splitlines() if line.strip()]
+
+
+def test_normalization():
+    """Paths, line numbers, timestamps, pids and addresses don't change the fingerprint"""
+    print("\n" + "="*60)
+    print("TESTING: error normalization")
+    print("="*60 + "\n")
+
+    text = normalize_error('File "/srv/app/main.py", line 12 at 2025-01-02T03:04:05Z id 0xdeadbeef pid 987654')
+    assert "/srv" not in text and "main.py" in text, text
+    assert "line <n>" in text and "<ts>" in text and "<addr>" in text and "<n>" in text, text
+    assert normalize_error("Error in app.js:120:7") == "error in app.js:<n>"
+    assert normalize_error("HTTP 404") == "http 404", "Short numbers such as status codes are kept"
+
+    first = traceback()
+    moved = traceback(user="bob", project="other", line=97, ts="2026-01-01 00:00:00",
+                      pid="999999", addr="0x55aa55aa55aa")
+    assert first != moved and error_fingerprint(first) == error_fingerprint(moved)
+    assert error_fingerprint(first) != error_fingerprint(traceback(word="messages"))
+
+    print("✅ Normalization test passed!\n")
+
+
+def test_minhash():
+    """Signatures estimate Jaccard similarity; LSH finds near-duplicates only"""
+    a = minhash(traceback())
+    b = minhash(traceback(word="msg"))
+    unrelated = minhash("ModuleNotFoundError: No module named 'flask_cors' when importing the app factory")
+    assert a is not None and b is not None and unrelated is not None
+    assert minhash("too short") is None, "Errors with under 5 features are not compared"
+
+    index = MinHashIndex()
+    index.add("keyerror", a)
+    index.add("import", unrelated)
+    match = index.nearest(b)
+    assert match is not None and match[0] == "keyerror" and match[1] >= 0.85, f"Got {match}"
+    assert index.nearest(minhash("TypeError: unsupported operand type(s) for +: 'int' and 'str' in totals")) is None
+
+    index.remove("keyerror")
+    assert index.nearest(b) is None
+    index.add("import", a)  # re-adding a key replaces its old signature
+    assert index.nearest(unrelated) is None and index.nearest(b)[0] == "import"
+
+    print("✅ MinHash test passed!\n")
+
+
+def test_matching():
+    """Exact signature, then fingerprint, then near-duplicate; fuzzy hits are tagged"""
+    print("\n" + "="*60)
+    print("TESTING: solution matching")
+    print("="*60 + "\n")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        memory = new_memory(tmp)
+        memory.save_solution("backend:app.py", {"file": "app.py", "fixed_content": "fixed"},
+                             error_message=traceback())
+
+        assert memory.find_match("backend:app.py") == ("backend:app.py", "exact")
+        assert memory.find_match("backend:server.py") is None, "No error text, no fuzzy match"
+        assert memory.find_match("backend:server.py", traceback(user="bob", line=7)) == \
+            ("backend:app.py", "fingerprint")
+        assert memory.find_match("backend:server.py", traceback(word="msg")) == ("backend:app.py", "near")
+        assert memory.find_match("backend:server.py", "SyntaxError: invalid syntax in routes.py near the "
+                                 "decorator for the index view") is None
+
+        solution = memory.get_solution("backend:server.py", traceback(line=1))
+        assert solution["match"] == "fingerprint" and solution["solution"]["fixed_content"] == "fixed"
+        assert memory.get_solution("backend:app.py")["match"] == "exact"
+        assert memory.get_solution("nothing", "nothing like it at all here") is None
+        assert memory.match_signature("x", traceback(word="msg")) == "backend:app.py"
+        memory.flush()
+
+        # The fuzzy indexes survive a reload
+        reloaded = new_memory(tmp)
+        assert reloaded.find_match("other", traceback(word="msg")) == ("backend:app.py", "near")
+
+    print("✅ Matching test passed!\n")
+
+
+def test_buffered_reuse_and_reload():
+    """Reuse stats are appended in batches and replayed on load; torn lines are skipped"""
+    with tempfile.TemporaryDirectory() as tmp:
+        memory = new_memory(tmp, flush_every=3)
+        memory.save_solution("sig", {"fix": 1}, error_message=traceback())
+        assert [r["op"] for r in log_lines(memory)] == ["save"]
+
+        memory.get_solution("sig")
+        memory.get_solution("sig")
+        assert len(log_lines(memory)) == 1, "Reads don't write until the buffer fills"
+        memory.get_solution("sig")
+        records = log_lines(memory)
+        assert records[-1] == {"op": "reuse", "signature": "sig", "count": 3,
+                               "last_reused": records[-1]["last_reused"]}
+
+        memory.get_solution("sig")
+        memory.flush()
+        with open(memory.memory_file, "a", encoding="utf-8") as f:
+            f.write('{"op": "reuse", "signature": "sig", "cou')
+
+        reloaded = new_memory(tmp)
+        assert reloaded.memory["solutions"]["sig"]["reuse_count"] == 4
+        stats = reloaded.get_statistics()
+        assert stats["total_reuses"] == 4 and stats["total_solutions_saved"] == 1
+        assert stats["known_solutions"] == 1
+
+    print("✅ Buffered reuse test passed!\n")
+
+
+def test_compaction():
+    """A log that outgrows COMPACT_RATIO x solutions is rewritten as one record per solution"""
+    print("\n" + "="*60)
+    print("TESTING: log compaction")
+    print("="*60 + "\n")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        memory = new_memory(tmp, flush_every=1)
+        memory.save_solution("a", {"fix": "a"}, error_message=traceback())
+        memory.save_solution("b", {"fix": "b"}, error_message="ImportError: cannot import name 'jsonify' from flask")
+        memory.save_solution("a", {"fix": "a2"}, error_message=traceback())  # overwrite
+
+        limit = COMPACT_RATIO * 8
+        lengths = []
+        for _ in range(limit + 5):
+            memory.get_solution("b")
+            lengths.append(len(log_lines(memory)))
+        assert max(lengths) <= limit + 1, f"Log grew to {max(lengths)} records"
+        assert any(after < before for before, after in zip(lengths, lengths[1:])), "Log never compacted"
+        assert not memory.memory_file.with_suffix(".jsonl.tmp").exists()
+
+        memory.save_memory()
+        records = log_lines(memory)
+        assert [r["op"] for r in records] == ["stats", "save", "save"]
+        assert all(r["snapshot"] for r in records[1:])
+
+        reloaded = new_memory(tmp)
+        assert reloaded.memory == memory.memory, "Compaction must not change the replayed state"
+        stats = reloaded.get_statistics()
+        assert stats["total_solutions_saved"] == 3 and stats["total_reuses"] == limit + 5
+        assert reloaded.memory["solutions"]["a"]["solution"] == {"fix": "a2"}
+        assert reloaded.find_match("z", traceback(user="carol")) == ("a", "fingerprint")
+
+        reloaded.clear_memory()
+        assert new_memory(tmp).get_statistics()["known_solutions"] == 0
+
+    print("✅ Compaction test passed!\n")
+
+
+def test_legacy_import():
+    """meta_memory.json is migrated to the log once, with fingerprints added"""
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy = {
+            "solutions": {"old": {"solution": {"error": traceback(), "fix": "legacy"}, "reuse_count": 2}},
+            "patterns": {},
+            "statistics": {"total_errors_seen": 5, "total_solutions_saved": 1, "total_reuses": 2}
+        }
+        (Path(tmp) / "meta_memory.json").write_text(json.dumps(legacy))
+
+        memory = new_memory(tmp)
+        assert memory.memory_file.exists()
+        assert memory.get_statistics()["total_errors_seen"] == 5
+        assert memory.find_match("new", traceback(line=3)) == ("old", "fingerprint")
+
+        (Path(tmp) / "meta_memory.json").write_text(json.dumps({"solutions": {}}))
+        assert new_memory(tmp).get_statistics()["known_solutions"] == 1, "The log wins once it exists"
+
+    print("✅ Legacy import test passed!\n")
+
+
+def main():
+    """Run all meta-memory tests."""
+    print("\n🧪 META-MEMORY TESTS\n")
+
+    try:
+        test_normalization()
+        test_minhash()
+        test_matching()
+        test_buffered_reuse_and_reload()
+        test_compaction()
+        test_legacy_import()
+
+        print("\n" + "="*60)
+        print("🎉 ALL META-MEMORY TESTS PASSED!")
+        print("="*60 + "\n")
+
+    except AssertionError as e:
+        print(f"\n❌ TEST FAILED: {e}\n")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""
+Test script for the adaptive Gemini rate limiter
+Checks bucket pacing, AIMD rate changes, Retry-After parsing and blocking,
+backoff bounds and the retry budget
+
+Run from agent_backend/: python -m autonomous_engine.test_rate_limiter
+"""
+
+import time
+import asyncio
+from email.utils import formatdate
+
+from .rate_limiter import (
+    AdaptiveRateLimiter, RetryBudget, is_quota_error, retry_after
+)
+
+
+class FakeResponse:
+    def __init__(self, headers):
+        self.headers = headers
+
+
+class FakeAPIError(Exception):
+    def __init__(self, message="", code=None, headers=None, details=None):
+        super().__init__(message)
+        self.code = code
+        self.response = FakeResponse(headers) if headers is not None else None
+        self.details = details
+
+
+def rpm(limiter, key):
+    return limiter.stats()["buckets"][key]["rpm"]
+
+
+def test_quota_errors_and_retry_after():
+    """429s are recognized; Retry-After comes from headers or RetryInfo details"""
+    print("\n" + "="*60)
+    print("TESTING: Retry-After parsing")
+    print("="*60 + "\n")
+
+    assert is_quota_error(FakeAPIError(code=429))
+    assert is_quota_error(Exception("429 RESOURCE_EXHAUSTED: quota exceeded"))
+    assert not is_quota_error(FakeAPIError("bad request", code=400))
+
+    assert retry_after(FakeAPIError(headers={"retry-after": "7"})) == 7.0
+    assert retry_after(FakeAPIError(headers={"Retry-After": "1.5"})) == 1.5
+    http_date = retry_after(FakeAPIError(headers={"retry-after": formatdate(time.time() + 30, usegmt=True)}))
+    assert 25 <= http_date <= 31, f"HTTP-date Retry-After parsed as {http_date}"
+    assert retry_after(FakeAPIError(headers={"retry-after": formatdate(time.time() - 30, usegmt=True)})) == 0.0
+
+    details = {"error": {"details": [{"@type": "type.googleapis.com/google.rpc.RetryInfo", "retryDelay": "12s"}]}}
+    assert retry_after(FakeAPIError("429", details=details)) == 12.0
+    assert retry_after(Exception("429 ... 'retryDelay': '3.5s' ...")) == 3.5
+    assert retry_after(FakeAPIError("429", headers={"retry-after": "soon"})) is None
+    assert retry_after(Exception("429")) is None
+
+    print("✅ Retry-After parsing test passed!\n")
+
+
+def test_bucket_pacing():
+    """A burst of ~5s worth of requests goes through, then callers are paced"""
+    limiter = AdaptiveRateLimiter()
+    waits = [limiter._reserve("gemini-2.5-pro", "pro", tokens=10) for _ in range(5)]
+    assert waits == [0.0] * 5, f"Burst capacity should admit 5 pro requests, got {waits}"
+
+    wait = limiter._reserve("gemini-2.5-pro", "pro", tokens=10)
+    assert 0.9 <= wait <= 1.1, f"60 rpm means the next slot is ~1s away, got {wait:.2f}"
+    wait = limiter._reserve("gemini-2.5-pro", "pro", tokens=10)
+    assert 1.9 <= wait <= 2.1, "Reservations queue behind each other"
+
+    assert limiter._reserve("gemini-2.5-flash", "flash", tokens=1) == 0.0, "Buckets are independent per key"
+
+    # Token pacing: one oversized request can't wait longer than a full bucket refill
+    limiter = AdaptiveRateLimiter()
+    assert limiter._reserve("k", "default", tokens=10 ** 9) == 0.0
+    assert 0 < limiter._reserve("k", "default", tokens=10 ** 9) <= 5.1
+
+    print("✅ Bucket pacing test passed!\n")
+
+
+def test_aimd():
+    """Throttles halve the rate (once per cooldown, down to a floor); successes add back"""
+    print("\n" + "="*60)
+    print("TESTING: AIMD")
+    print("="*60 + "\n")
+
+    limiter = AdaptiveRateLimiter(cooldown=60)
+    limiter.on_success("m", "pro")
+    assert rpm(limiter, "m") == 60.0, "Rate never exceeds the ceiling"
+
+    limiter.on_throttle("m", "pro")
+    assert rpm(limiter, "m") == 30.0
+    limiter.on_throttle("m", "pro")
+    limiter.on_throttle("m", "pro")
+    assert rpm(limiter, "m") == 30.0, "A burst of 429s within the cooldown is one congestion signal"
+    assert limiter.stats()["buckets"]["m"]["throttled"] == 3
+
+    for _ in range(4):
+        limiter.on_success("m", "pro")
+    assert rpm(limiter, "m") == 42.0, "Each success adds 5% of the ceiling"
+    for _ in range(100):
+        limiter.on_success("m", "pro")
+    assert rpm(limiter, "m") == 60.0
+
+    limiter = AdaptiveRateLimiter(cooldown=0)
+    for _ in range(10):
+        limiter.on_throttle("m", "pro")
+    assert rpm(limiter, "m") == 3.0, "Rate is floored at min_fraction of the ceiling"
+    assert limiter._reserve("m", "pro", tokens=1) == 0.0
+    assert limiter.stats()["buckets"]["m"]["tpm"] == 50000, "Token rate follows the request rate"
+
+    print("✅ AIMD test passed!\n")
+
+
+def test_retry_after_blocks_bucket():
+    """A Retry-After blocks every caller of that bucket, and only that bucket"""
+    limiter = AdaptiveRateLimiter()
+    limiter.on_throttle("m", "pro", retry_after_s=0.3)
+    assert 0.25 <= limiter._reserve("m", "pro", tokens=1) <= 0.3
+    assert limiter._reserve("other", "pro", tokens=1) == 0.0
+    assert limiter.stats()["buckets"]["m"]["blocked_for"] > 0
+
+    async def waiters():
+        start = time.monotonic()
+        waited = await asyncio.gather(*(limiter.acquire("m", "pro") for _ in range(3)))
+        return waited, time.monotonic() - start
+
+    waited, elapsed = asyncio.run(waiters())
+    assert all(w > 0 for w in waited), "All concurrent callers waited out the block together"
+    assert elapsed < 1.0, f"Waits overlap instead of stacking, took {elapsed:.2f}s"
+
+    # A shorter Retry-After never shortens an existing block
+    limiter.on_throttle("m", "pro", retry_after_s=5)
+    limiter.on_throttle("m", "pro", retry_after_s=0.1)
+    assert limiter._reserve("m", "pro", tokens=1) > 4
+
+    print("✅ Retry-After block test passed!\n")
+
+
+def test_backoff():
+    """Full-jitter exponential backoff, capped, never shorter than Retry-After"""
+    for attempt in range(8):
+        for _ in range(50):
+            delay = AdaptiveRateLimiter.backoff(attempt, base=1, cap=10)
+            assert 0 <= delay <= min(10, 2 ** attempt)
+
+    for _ in range(50):
+        delay = AdaptiveRateLimiter.backoff(0, retry_after_s=10)
+        assert 10 <= delay <= 12
+        delay = AdaptiveRateLimiter.backoff(5, retry_after_s=0)
+        assert 0 <= delay <= 0.5
+
+    print("✅ Backoff test passed!\n")
+
+
+def test_retry_budget():
+    """Retries are capped at max(floor, ratio * recent requests) within the window"""
+    print("\n" + "="*60)
+    print("TESTING: retry budget")
+    print("="*60 + "\n")
+
+    budget = RetryBudget(ratio=0.2, min_per_minute=6, window=60)
+    assert [budget.try_spend() for _ in range(7)] == [True] * 6 + [False], "Floor of 6 without traffic"
+    assert budget.denied == 1
+
+    for _ in range(100):
+        budget.record_request()
+    spent = sum(budget.try_spend() for _ in range(30))
+    assert spent == 14, f"20% of 100 requests = 20 retries in total, 6 already used; got {spent}"
+    assert budget.stats() == {"requests_in_window": 100, "retries_in_window": 20, "denied": 17}
+
+    budget = RetryBudget(ratio=0.2, min_per_minute=60, window=0.1)  # floor of 0.1 retries per window
+    budget.record_request()
+    assert budget.try_spend() and not budget.try_spend()
+    time.sleep(0.15)
+    assert budget.try_spend(), "Budget refills once old retries leave the window"
+    assert budget.stats()["requests_in_window"] == 0
+
+    print("✅ Retry budget test passed!\n")
+
+
+def main():
+    """Run all rate limiter tests."""
+    print("\n🧪 RATE LIMITER TESTS\n")
+
+    try:
+        test_quota_errors_and_retry_after()
+        test_bucket_pacing()
+        test_aimd()
+        test_retry_after_blocks_bucket()
+        test_backoff()
+        test_retry_budget()
+
+        print("\n" + "="*60)
+        print("🎉 ALL RATE LIMITER TESTS PASSED!")
+        print("="*60 + "\n")
+
+    except AssertionError as e:
+        print(f"\n❌ TEST FAILED: {e}\n")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
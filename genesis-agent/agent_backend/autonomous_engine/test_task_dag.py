@@ -0,0 +1,222 @@
+"""
+Test script for the TaskManager dependency DAG
+Checks ready ordering, critical-path priority, failure cascades and cycles
+
+Run from agent_backend/: python -m autonomous_engine.test_task_dag
+"""
+
+from .task_manager import Task, TaskManager, tasks_from_plan
+
+
+def make_task(task_id: str, *dependencies: str, max_retries: int = 3) -> Task:
+    return Task(id=task_id, description=f"Task {task_id}", dependencies=list(dependencies),
+                max_retries=max_retries)
+
+
+def drain_ready(tm: TaskManager) -> list:
+    """Start every task that is ready right now, in scheduling order"""
+    started = []
+    while tm.has_ready_tasks():
+        started.append(tm.get_next_task())
+    return started
+
+
+def test_dependency_order():
+    """Diamond a -> (b, c) -> d: d only starts once both b and c are done"""
+    print("\n" + "="*60)
+    print("TESTING: dependency ordering")
+    print("="*60 + "\n")
+
+    tm = TaskManager(goal="diamond")
+    tm.add_tasks([make_task("d", "b", "c"), make_task("b", "a"), make_task("c", "a"), make_task("a")])
+
+    wave = drain_ready(tm)
+    assert [t.id for t in wave] == ["a"], f"Only 'a' should be ready, got {[t.id for t in wave]}"
+    assert tm.has_pending_tasks()
+    tm.mark_completed(wave[0], {"ok": True})
+
+    wave = drain_ready(tm)
+    assert sorted(t.id for t in wave) == ["b", "c"], f"'b' and 'c' should run together, got {[t.id for t in wave]}"
+
+    tm.mark_completed(wave[0], {"ok": True})
+    assert not tm.has_ready_tasks(), "'d' must wait for both of its dependencies"
+    tm.mark_completed(wave[1], {"ok": True})
+
+    wave = drain_ready(tm)
+    assert [t.id for t in wave] == ["d"]
+    tm.mark_completed(wave[0], {"ok": True})
+    assert not tm.has_pending_tasks()
+    assert [t.id for t in tm.completed_tasks][-1] == "d"
+
+    print("\n✅ Dependency ordering test passed!\n")
+
+
+def test_completed_dependency_is_ready():
+    """A task added after its dependency finished is ready immediately"""
+    tm = TaskManager(goal="late add")
+    tm.add_task(make_task("a"))
+    tm.mark_completed(tm.get_next_task(), {"ok": True})
+
+    tm.add_task(make_task("b", "a"))
+    assert tm.has_ready_tasks(), "Dependency already completed, 'b' should be ready"
+    assert tm.get_next_task().id == "b"
+
+    print("✅ Late-added dependent test passed!\n")
+
+
+def test_critical_path_priority():
+    """tasks_from_plan starts the longest chain first, then plan order"""
+    print("\n" + "="*60)
+    print("TESTING: critical-path priority")
+    print("="*60 + "\n")
+
+    plan = [
+        {"id": "readme", "description": "Write README"},
+        {"id": "model", "description": "Write model"},
+        {"id": "api", "description": "Write API", "depends_on": ["model"]},
+        {"id": "tests", "description": "Run tests", "depends_on": ["api", 2]},
+    ]
+    tasks = tasks_from_plan(plan)
+    by_name = {task.description: task for task in tasks}
+
+    assert by_name["Write API"].dependencies == [by_name["Write model"].id]
+    assert by_name["Run tests"].dependencies == [by_name["Write API"].id, by_name["Write model"].id], \
+        "Dependencies by id and by 1-based position should both resolve, without duplicates"
+
+    tm = TaskManager(goal="plan")
+    tm.add_tasks(tasks)
+    wave = drain_ready(tm)
+    assert [t.description for t in wave] == ["Write model", "Write README"], \
+        f"The head of the longest chain should start first, got {[t.description for t in wave]}"
+
+    print("\n✅ Critical-path priority test passed!\n")
+
+
+def test_plan_ignores_bad_references():
+    """Self and unknown references in a plan are dropped instead of deadlocking"""
+    plan = [
+        {"id": "a", "description": "A", "depends_on": ["a", "missing"]},
+        {"id": "b", "description": "B", "depends_on": ["a", "a"]},
+    ]
+    a, b = tasks_from_plan(plan)
+    assert a.dependencies == [], f"Self/unknown references should be ignored, got {a.dependencies}"
+    assert b.dependencies == [a.id]
+
+    print("✅ Plan reference cleanup test passed!\n")
+
+
+def test_inferred_dependencies():
+    """Plans without depends_on: same-file tasks serialize, commands are barriers"""
+    plan = [
+        {"description": "Create app.py", "type": "create_file", "details": {"filename": "app.py"}},
+        {"description": "Create util.py", "type": "create_file", "details": {"filename": "util.py"}},
+        {"description": "Edit app.py", "type": "write_code", "details": {"filename": "app.py"}},
+        {"description": "Run app", "type": "run_command"},
+        {"description": "Create notes.md", "type": "create_file", "details": {"filename": "notes.md"}},
+    ]
+    create_app, create_util, edit_app, run_app, notes = tasks_from_plan(plan)
+    assert create_util.dependencies == [], "Independent files should run concurrently"
+    assert edit_app.dependencies == [create_app.id]
+    assert run_app.dependencies == [create_app.id, create_util.id, edit_app.id]
+    assert notes.dependencies == [run_app.id]
+
+    print("✅ Inferred dependency test passed!\n")
+
+
+def test_failure_cascade():
+    """A permanently failed task fails everything downstream, not its siblings"""
+    print("\n" + "="*60)
+    print("TESTING: failure cascade")
+    print("="*60 + "\n")
+
+    tm = TaskManager(goal="cascade")
+    tm.add_tasks([make_task("a", max_retries=2), make_task("b", "a"), make_task("c", "b"), make_task("x")])
+
+    wave = drain_ready(tm)
+    a = next(t for t in wave if t.id == "a")
+    tm.mark_failed(a, "boom")
+    assert a.status == "pending" and tm.has_ready_tasks(), "First failure should be retried"
+
+    assert tm.get_next_task().id == "a"
+    tm.mark_failed(a, "boom again")
+    failed = {t.id: t for t in tm.failed_tasks}
+    assert set(failed) == {"a", "b", "c"}, f"Dependents should fail with 'a', got {sorted(failed)}"
+    assert failed["c"].error.startswith("Dependency failed")
+    assert tm.tasks["x"].status == "in_progress", "Unrelated task must not be touched"
+
+    tm.add_task(make_task("late", "a"))
+    assert tm.tasks["late"].status == "failed", "Adding a task on a failed dependency fails it at once"
+    assert not tm.has_pending_tasks() and list(tm.in_progress) == ["x"]
+
+    print("\n✅ Failure cascade test passed!\n")
+
+
+def test_cycle_rejection():
+    """Cycles never become ready and are failed by fail_blocked_tasks"""
+    print("\n" + "="*60)
+    print("TESTING: cycle rejection")
+    print("="*60 + "\n")
+
+    tm = TaskManager(goal="cycle")
+    tm.add_tasks([make_task("x", "y"), make_task("y", "x"), make_task("z", "x"), make_task("free")])
+
+    wave = drain_ready(tm)
+    assert [t.id for t in wave] == ["free"], f"Only the acyclic task should be ready, got {[t.id for t in wave]}"
+    tm.mark_completed(wave[0], {"ok": True})
+
+    assert tm.has_pending_tasks() and not tm.has_ready_tasks(), "Cycle should leave tasks stuck waiting"
+    blocked = tm.fail_blocked_tasks()
+    assert {t.id for t in blocked} == {"x", "y", "z"}
+    assert all(tm.tasks[task_id].status == "failed" for task_id in ("x", "y", "z"))
+    assert len(tm.failed_tasks) == 3, "Each blocked task should be failed exactly once"
+    assert not tm.has_pending_tasks()
+
+    # Unknown dependencies are blocked the same way
+    tm.add_task(make_task("orphan", "does-not-exist"))
+    assert [t.id for t in tm.fail_blocked_tasks()] == ["orphan"]
+
+    print("\n✅ Cycle rejection test passed!\n")
+
+
+def test_cycle_in_plan_priority():
+    """assign_critical_path_priority terminates on cyclic plans"""
+    plan = [
+        {"id": 1, "description": "One", "depends_on": [2]},
+        {"id": 2, "description": "Two", "depends_on": [1]},
+    ]
+    one, two = tasks_from_plan(plan)
+    assert one.dependencies == [two.id] and two.dependencies == [one.id]
+
+    tm = TaskManager(goal="cyclic plan")
+    tm.add_tasks([one, two])
+    assert not tm.has_ready_tasks()
+    assert len(tm.fail_blocked_tasks()) == 2
+
+    print("✅ Cyclic plan test passed!\n")
+
+
+def main():
+    """Run all DAG tests."""
+    print("\n🧪 TASK DAG TESTS\n")
+
+    try:
+        test_dependency_order()
+        test_completed_dependency_is_ready()
+        test_critical_path_priority()
+        test_plan_ignores_bad_references()
+        test_inferred_dependencies()
+        test_failure_cascade()
+        test_cycle_rejection()
+        test_cycle_in_plan_priority()
+
+        print("\n" + "="*60)
+        print("🎉 ALL TASK DAG TESTS PASSED!")
+        print("="*60 + "\n")
+
+    except AssertionError as e:
+        print(f"\n❌ TEST FAILED: {e}\n")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
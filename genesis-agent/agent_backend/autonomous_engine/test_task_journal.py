@@ -0,0 +1,169 @@
+"""
+Test script for the TaskJournal write-ahead log
+Checks replay folding, torn lines, blob reuse and TaskManager.from_journal
+
+Run from agent_backend/: python -m autonomous_engine.test_task_journal
+"""
+
+import json
+import tempfile
+from pathlib import Path
+
+from .task_journal import TaskJournal, content_hash
+from .task_manager import Task, TaskManager
+
+
+def make_task(task_id: str, *dependencies: str, max_retries: int = 3) -> Task:
+    return Task(id=task_id, description=f"Task {task_id}", dependencies=list(dependencies),
+                max_retries=max_retries)
+
+
+def journaled_run(path: Path) -> TaskJournal:
+    """
+    A run interrupted mid-flight:
+    a completed (with generated code), b failed once, c in progress, d waiting on c,
+    f failed permanently and g failed with it
+    """
+    journal = TaskJournal(str(path), fsync=False)
+    journal.start("build the app")
+    tm = TaskManager(goal="build the app", journal=journal)
+    tm.add_tasks([make_task("a"), make_task("b"), make_task("c"), make_task("d", "c"),
+                  make_task("f", max_retries=1), make_task("g", "f")])
+
+    started = {}
+    while tm.has_ready_tasks():
+        task = tm.get_next_task()
+        started[task.id] = task
+    journal.record_llm_output("a", "print('hello')")
+    journal.record_file_write("a", "app.py", "print('hello')")
+    tm.mark_completed(started["a"], {"success": True})
+    tm.mark_failed(started["b"], "timeout")
+    tm.mark_failed(started["f"], "boom")
+    journal.close()
+    return journal
+
+
+def test_replay_state():
+    """replay() folds events into each task's last status, outputs and file writes"""
+    print("\n" + "="*60)
+    print("TESTING: journal replay")
+    print("="*60 + "\n")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        journal = journaled_run(Path(tmp) / "run.jsonl")
+        state = TaskJournal(str(journal.path)).replay()
+
+        assert state["goal"] == "build the app"
+        assert state["order"] == ["a", "b", "c", "d", "f", "g"], "Tasks replay in insertion order"
+        status = {task_id: task["status"] for task_id, task in state["tasks"].items()}
+        assert status == {"a": "completed", "b": "pending", "c": "in_progress", "d": "pending",
+                          "f": "failed", "g": "failed"}, f"Unexpected statuses: {status}"
+        assert state["tasks"]["a"]["result"] == {"success": True}
+        assert state["tasks"]["b"]["retry_count"] == 1 and state["tasks"]["b"]["error"] == "timeout"
+        assert state["tasks"]["g"]["error"].startswith("Dependency failed")
+        assert state["tasks"]["d"]["dependencies"] == ["c"]
+
+        digest = content_hash("print('hello')")
+        assert state["llm_outputs"] == {"a": digest}
+        assert state["file_writes"] == {"a": {"app.py": digest}}
+        assert (Path(tmp) / "run.jsonl.blobs" / digest).read_text() == "print('hello')"
+
+    print("✅ Replay test passed!\n")
+
+
+def test_torn_and_unknown_lines():
+    """A crash mid-write leaves a torn last line; it and events for unknown tasks are skipped"""
+    with tempfile.TemporaryDirectory() as tmp:
+        journal = journaled_run(Path(tmp) / "run.jsonl")
+        with open(journal.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"event": "task_completed", "task_id": "ghost", "ts": "x"}) + "\n")
+            f.write('{"event": "task_completed", "task_id": "c", "res')
+
+        state = TaskJournal(str(journal.path)).replay()
+        assert "ghost" not in state["tasks"]
+        assert state["tasks"]["c"]["status"] == "in_progress", "Torn completion must not count"
+
+        assert TaskJournal(str(Path(tmp) / "missing.jsonl")).replay()["goal"] is None
+
+    print("✅ Torn line test passed!\n")
+
+
+def test_start_truncates():
+    """start() begins a fresh journal; blobs of the old run may stay but aren't referenced"""
+    with tempfile.TemporaryDirectory() as tmp:
+        journal = journaled_run(Path(tmp) / "run.jsonl")
+        journal.start("second goal")
+        journal.close()
+        state = TaskJournal(str(journal.path)).replay()
+        assert state["goal"] == "second goal" and state["tasks"] == {} and state["llm_outputs"] == {}
+
+    print("✅ Truncate test passed!\n")
+
+
+def test_from_journal():
+    """A resumed manager skips finished work and re-queues what was pending or mid-flight"""
+    print("\n" + "="*60)
+    print("TESTING: resume from journal")
+    print("="*60 + "\n")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "run.jsonl"
+        journaled_run(path)
+
+        journal = TaskJournal(str(path), fsync=False)
+        tm = TaskManager.from_journal(journal)
+        assert tm.goal == "build the app" and tm.journal is journal
+        assert [t.id for t in tm.completed_tasks] == ["a"]
+        assert sorted(t.id for t in tm.failed_tasks) == ["f", "g"]
+        assert journal.llm_output("a") == "print('hello')", "Generation reusable without an LLM call"
+        assert journal.llm_output("b") is None
+        assert journal.file_writes == {"a": {"app.py": content_hash("print('hello')")}}
+
+        ready = []
+        while tm.has_ready_tasks():
+            ready.append(tm.get_next_task())
+        assert sorted(t.id for t in ready) == ["b", "c"], f"Got {[t.id for t in ready]}"
+        assert tm.tasks["b"].retry_count == 1, "Retry budget carries over"
+        assert tm.tasks["d"].status == "pending"
+
+        # The resumed run keeps appending to the same journal
+        tm.mark_completed(tm.tasks["c"], {"success": True})
+        journal.close()
+        assert TaskJournal(str(path)).replay()["tasks"]["c"]["status"] == "completed"
+
+        # A lost blob just means regenerating
+        (Path(tmp) / "run.jsonl.blobs" / content_hash("print('hello')")).unlink()
+        assert journal.llm_output("a") is None
+
+        empty = Path(tmp) / "empty.jsonl"
+        empty.write_text("")
+        try:
+            TaskManager.from_journal(TaskJournal(str(empty)))
+            assert False, "A journal without a goal can't be resumed"
+        except ValueError:
+            pass
+
+    print("✅ Resume test passed!\n")
+
+
+def main():
+    """Run all journal tests."""
+    print("\n🧪 TASK JOURNAL TESTS\n")
+
+    try:
+        test_replay_state()
+        test_torn_and_unknown_lines()
+        test_start_truncates()
+        test_from_journal()
+
+        print("\n" + "="*60)
+        print("🎉 ALL TASK JOURNAL TESTS PASSED!")
+        print("="*60 + "\n")
+
+    except AssertionError as e:
+        print(f"\n❌ TEST FAILED: {e}\n")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
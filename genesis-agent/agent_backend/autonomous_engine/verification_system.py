@@ -6,7 +6,12 @@ Tests build integrity, backend functionality, AND frontend in a real browser
 import asyncio
 import requests
 from pathlib import Path
-from typing import Tuple, List
+from typing import Tuple, List, Optional
+
+try:
+    from .workspace_state import WorkspaceState
+except ImportError:
+    from workspace_state import WorkspaceState
 
 
 class VerificationSystem:
@@ -17,10 +22,19 @@ class VerificationSystem:
     3. Frontend Functionality - UI works in real browser
     """
     
-    def __init__(self, workspace_dir: str, port: int = 5001):
+    def __init__(self, workspace_dir: str, port: int = 5001,
+                 workspace_state: Optional[WorkspaceState] = None):
         self.workspace = Path(workspace_dir)
         self.port = port
         self.url = f"http://localhost:{port}"
+        # Shared with the builder so unchanged files are never re-read
+        self._owns_state = workspace_state is None
+        self.workspace_state = workspace_state or WorkspaceState(self.workspace)
+    
+    def close(self):
+        """Release the file tracker (only if we created it; a shared one belongs to its owner)"""
+        if self._owns_state:
+            self.workspace_state.close()
         
     def verify_build_integrity(self, required_files: List[str]) -> Tuple[bool, List[str]]:
         """
@@ -31,12 +45,11 @@ class VerificationSystem:
         print(f"{'='*70}\n")
         
         errors = []
+        self.workspace_state.refresh()
         
         for file_path in required_files:
-            full_path = self.workspace / file_path
-            
             # Check file exists
-            if not full_path.exists():
+            if not self.workspace_state.exists(file_path):
                 error = f"❌ Missing file: {file_path}"
                 print(error)
                 errors.append(error)
@@ -44,7 +57,7 @@ class VerificationSystem:
             
             # Check file has content (with file-specific thresholds)
             try:
-                content = full_path.read_text()
+                content = self.workspace_state.read_text(file_path)
                 
                 # File-specific minimum sizes
                 min_size = 50  # Default
@@ -6,9 +6,10 @@ This module implements the ability to search for solutions when stuck.
 import re
 import asyncio
 from typing import Dict, Optional, List, Tuple
-from google import genai
 from google.genai import types as genai_types
 
+from . import genai_pool
+
 
 class WebLearner:
     """
@@ -19,12 +20,8 @@ class WebLearner:
     def __init__(self):
         """Initialize the web learner with Gemini integration."""
         try:
-            # Use Vertex AI authentication
-            self.client = genai.Client(
-                vertexai=True,
-                project="studio-2416451423-f2d96",
-                location="us-central1"
-            )
+            # Use Vertex AI authentication (client shared through genai_pool)
+            self.client = genai_pool.get_client(vertexai=True)
             print("✅ WebLearner initialized with Vertex AI")
         except Exception as e:
             print(f"⚠️ WebLearner init error: {e}")
@@ -110,8 +107,7 @@ class WebLearner:
 
         try:
             # Use Gemini with Google Search grounding for REAL results
-            response = await asyncio.to_thread(
-                self.client.models.generate_content,
+            response = await genai_pool.generate_content(
                 model="gemini-2.0-flash-exp",
                 contents=genai_types.Part.from_text(
                     text=f"Search the web for: {query}\n\nProvide 3-5 relevant URLs with titles and brief descriptions of each result."
@@ -213,9 +209,8 @@ File: {current_file_path}
 Generate the corrected code now:"""
 
         try:
-            # Call Gemini in a separate thread to avoid blocking
-            response = await asyncio.to_thread(
-                self.client.models.generate_content,
+            # Native async call through the shared client pool
+            response = await genai_pool.generate_content(
                 model="gemini-2.0-flash-exp",
                 contents=genai_types.Part.from_text(text=prompt),
             )
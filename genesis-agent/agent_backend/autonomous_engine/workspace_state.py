@@ -0,0 +1,466 @@
+"""
+Workspace State Tracker
+Incremental file tracking, exact diffs and cheap snapshots for the builders
+
+MetaAppBuilderV3 and VerificationSystem used to re-read every workspace
+file on each attempt just to get its size or paste it into a prompt.
+WorkspaceState keeps (mtime, size, content hash) per file and only
+re-reads a file when its stat changes. On Linux it listens to inotify, so
+a refresh only looks at paths that had events; elsewhere (or when
+WORKSPACE_INOTIFY=false) it falls back to a stat sweep.
+
+File contents live in a content-addressed blob store, so a snapshot is
+just a {path: hash} map: taking one copies nothing, and unchanged files
+share blobs across snapshots (copy-on-write). restore() rewrites only the
+files that differ from the snapshot, and diff() returns unified diffs of
+exactly what changed since it was taken.
+"""
+
+import os
+import sys
+import stat
+import time
+import struct
+import difflib
+import hashlib
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+
+IGNORED_DIRS = frozenset({'.git', '__pycache__', 'node_modules', 'venv', '.venv', '.pytest_cache'})
+MAX_FILE_BYTES = 2 * 1024 * 1024   # larger files are not tracked
+MAX_SNAPSHOTS = 20
+
+# inotify(7) event bits
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+_EVENT_HEADER = struct.Struct('iIII')
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+@dataclass(frozen=True)
+class FileState:
+    """Stat signature and content hash of one workspace file"""
+    mtime_ns: int
+    size: int
+    hash: str
+
+
+@dataclass
+class Snapshot:
+    """Point-in-time view of the workspace: relative path -> content hash"""
+    label: str
+    files: Dict[str, str]
+    created: float = field(default_factory=time.time)
+
+
+class _Inotify:
+    """Minimal non-blocking inotify watcher over ctypes (Linux only)"""
+
+    MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO
+            | IN_CREATE | IN_DELETE | IN_DELETE_SELF)
+
+    def __init__(self):
+        import ctypes
+        import ctypes.util
+
+        self._ctypes = ctypes
+        self._libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        self.dirs: Dict[int, Path] = {}
+
+    def watch(self, directory: Path) -> None:
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(str(directory)), self.MASK)
+        if wd < 0:
+            raise OSError(self._ctypes.get_errno(), f'inotify_add_watch failed for {directory}')
+        self.dirs[wd] = directory
+
+    def read_events(self) -> Tuple[List[Tuple[Path, int]], bool]:
+        """Drain pending events: ([(path, mask)], overflowed)"""
+        events, overflow = [], False
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            if not data:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+                name = data[offset + _EVENT_HEADER.size:offset + _EVENT_HEADER.size + length].rstrip(b'\0')
+                offset += _EVENT_HEADER.size + length
+                if mask & IN_Q_OVERFLOW:
+                    overflow = True
+                    continue
+                if mask & IN_IGNORED:
+                    self.dirs.pop(wd, None)
+                    continue
+                directory = self.dirs.get(wd)
+                if directory is not None:
+                    events.append((directory / os.fsdecode(name) if name else directory, mask))
+        return events, overflow
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+class WorkspaceState:
+    """
+    Tracks the files of a workspace directory.
+
+    Args:
+        root: Workspace directory (it may not exist yet)
+        files: Only track these relative paths (default: every file under
+               root outside IGNORED_DIRS)
+        use_inotify: Use inotify when available (default: WORKSPACE_INOTIFY env, true)
+    """
+
+    def __init__(self, root, files: Optional[Iterable[str]] = None,
+                 use_inotify: Optional[bool] = None):
+        self.root = Path(root)
+        self.pinned = sorted({self._rel(f) for f in files}) if files is not None else None
+        self._states: Dict[str, FileState] = {}
+        self._blobs: Dict[str, bytes] = {}
+        self._snapshots: List[Snapshot] = []
+        self._lock = threading.RLock()
+        self._inotify: Optional[_Inotify] = None
+        self._watched: Set[Path] = set()
+        self._needs_scan = True
+        self.stats = {'refreshes': 0, 'files_read': 0, 'bytes_read': 0}
+
+        if use_inotify is None:
+            use_inotify = os.getenv('WORKSPACE_INOTIFY', 'true').lower() == 'true'
+        if use_inotify and sys.platform.startswith('linux'):
+            try:
+                self._inotify = _Inotify()
+            except (OSError, AttributeError) as e:
+                print(f"⚠️ inotify unavailable, falling back to stat polling: {e}")
+
+        self.refresh()
+
+    @staticmethod
+    def _rel(path) -> str:
+        return Path(path).as_posix()
+
+    # ---------------------------------------------------------------- tracking
+
+    def _watch(self, directory: Path) -> None:
+        if self._inotify is None or directory in self._watched:
+            return
+        try:
+            self._inotify.watch(directory)
+            self._watched.add(directory)
+        except OSError:
+            pass
+
+    def _walk(self, directory: Path) -> Iterable[str]:
+        """Relative paths of regular files under directory, watching each subdirectory"""
+        self._watch(directory)
+        try:
+            entries = list(os.scandir(directory))
+        except OSError:
+            return
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                if entry.name not in IGNORED_DIRS:
+                    yield from self._walk(Path(entry.path))
+            elif entry.is_file(follow_symlinks=False):
+                yield Path(entry.path).relative_to(self.root).as_posix()
+
+    def _update(self, rel: str) -> Optional[str]:
+        """Bring one path up to date; returns 'added', 'modified', 'deleted' or None."""
+        path = self.root / rel
+        old = self._states.get(rel)
+        try:
+            st = path.stat()
+        except OSError:
+            st = None
+        if st is None or not stat.S_ISREG(st.st_mode) or st.st_size > MAX_FILE_BYTES:
+            if old is not None:
+                del self._states[rel]
+                self._drop_if_unreferenced(old.hash)
+                return 'deleted'
+            return None
+        if old is not None and old.mtime_ns == st.st_mtime_ns and old.size == st.st_size:
+            return None
+
+        try:
+            with open(path, 'rb') as f:
+                st = os.fstat(f.fileno())
+                data = f.read()
+        except OSError:
+            return None
+        self.stats['files_read'] += 1
+        self.stats['bytes_read'] += len(data)
+        digest = content_hash(data)
+        self._blobs.setdefault(digest, data)
+        self._states[rel] = FileState(st.st_mtime_ns, len(data), digest)
+        if old is None:
+            return 'added'
+        if old.hash == digest:
+            return None
+        self._drop_if_unreferenced(old.hash)
+        return 'modified'
+
+    def _reload(self, rel: str) -> None:
+        """Re-read a path we just wrote, even if its mtime/size look unchanged"""
+        old = self._states.pop(rel, None)
+        self._update(rel)
+        if old is not None:
+            self._drop_if_unreferenced(old.hash)
+
+    def _drop_if_unreferenced(self, digest: str) -> None:
+        if any(s.hash == digest for s in self._states.values()):
+            return
+        if any(digest in snap.files.values() for snap in self._snapshots):
+            return
+        self._blobs.pop(digest, None)
+
+    def _full_scan(self) -> Dict[str, str]:
+        if self.pinned is not None:
+            if self.root.is_dir():
+                self._watch(self.root)
+            for rel in self.pinned:
+                parent = (self.root / rel).parent
+                if parent.is_dir():
+                    self._watch(parent)
+            candidates = set(self.pinned)
+        else:
+            candidates = set(self._walk(self.root)) if self.root.is_dir() else set()
+        candidates |= set(self._states)
+        self._needs_scan = self._inotify is None or self.root not in self._watched
+        return self._update_all(candidates)
+
+    def _update_all(self, paths: Iterable[str]) -> Dict[str, str]:
+        changes = {}
+        for rel in sorted(paths):
+            kind = self._update(rel)
+            if kind:
+                changes[rel] = kind
+        return changes
+
+    def _dirty_from_events(self) -> Optional[Set[str]]:
+        """Paths touched since the last drain, or None if a full scan is needed"""
+        events, overflow = self._inotify.read_events()
+        if overflow:
+            return None
+        dirty: Set[str] = set()
+        for path, mask in events:
+            try:
+                rel = path.relative_to(self.root).as_posix()
+            except ValueError:
+                continue
+            if mask & IN_ISDIR or mask & IN_DELETE_SELF:
+                if mask & (IN_DELETE_SELF | IN_MOVED_FROM | IN_DELETE):
+                    self._watched.discard(path)
+                    if path == self.root:
+                        self._needs_scan = True
+                    prefix = '' if rel == '.' else rel + '/'
+                    dirty.update(p for p in self._states if p.startswith(prefix))
+                elif mask & (IN_CREATE | IN_MOVED_TO) and self.pinned is None:
+                    # Files can land in a new directory before it is watched
+                    dirty.update(self._walk(path))
+                continue
+            if self.pinned is None or rel in self.pinned:
+                dirty.add(rel)
+        if self.pinned is not None:
+            # A pinned file's directory may have appeared since the last scan
+            for rel in self.pinned:
+                parent = (self.root / rel).parent
+                if parent not in self._watched and parent.is_dir():
+                    self._watch(parent)
+                    dirty.add(rel)
+        return dirty
+
+    def refresh(self, paths: Optional[Iterable[str]] = None) -> Dict[str, str]:
+        """
+        Bring tracked state up to date without re-reading unchanged files.
+
+        With inotify only the paths that had events are checked; without it
+        every tracked path (or just `paths`, when given) is stat-ed.
+        Returns {relative_path: 'added' | 'modified' | 'deleted'}.
+        """
+        with self._lock:
+            self.stats['refreshes'] += 1
+            if self._needs_scan:
+                if paths is not None and self._inotify is None:
+                    return self._update_all(self._rel(p) for p in paths)
+                return self._full_scan()
+            dirty = self._dirty_from_events()
+            if dirty is None:
+                return self._full_scan()
+            return self._update_all(dirty)
+
+    # ------------------------------------------------------------------ access
+
+    def get(self, path: str) -> Optional[FileState]:
+        rel = self._rel(path)
+        self.refresh([rel])
+        return self._states.get(rel)
+
+    def exists(self, path: str) -> bool:
+        return self.get(path) is not None
+
+    def read_bytes(self, path: str) -> Optional[bytes]:
+        state = self.get(path)
+        return self._blobs.get(state.hash) if state else None
+
+    def read_text(self, path: str) -> Optional[str]:
+        """Current contents (served from the blob store unless the file changed)"""
+        data = self.read_bytes(path)
+        return data.decode('utf-8', errors='replace') if data is not None else None
+
+    def write_text(self, path: str, text: str) -> str:
+        """Write a file through the tracker; returns the unified diff of the change."""
+        rel = self._rel(path)
+        with self._lock:
+            before = self.read_text(rel) or ''
+            target = self.root / rel
+            target.parent.mkdir(parents=True, exist_ok=True)
+            target.write_text(text)
+            if self._inotify is not None and target.parent not in self._watched:
+                self._watch(target.parent)
+            self._reload(rel)
+        return unified_diff(rel, before, text)
+
+    def files_state(self, paths: Optional[Iterable[str]] = None) -> Dict[str, Dict]:
+        """{path: {'size', 'exists', 'hash'}} for existing files, without reading them"""
+        with self._lock:
+            if paths is None:
+                self.refresh()
+                rels = sorted(self._states)
+            else:
+                rels = [self._rel(p) for p in paths]
+                self.refresh(rels)
+            return {
+                rel: {'size': self._states[rel].size, 'exists': True, 'hash': self._states[rel].hash}
+                for rel in rels if rel in self._states
+            }
+
+    # --------------------------------------------------------------- snapshots
+
+    def snapshot(self, label: str = "") -> Snapshot:
+        """Record the current workspace; no file contents are copied."""
+        with self._lock:
+            self.refresh()
+            snap = Snapshot(label=label, files={rel: s.hash for rel, s in self._states.items()})
+            self._snapshots.append(snap)
+            if len(self._snapshots) > MAX_SNAPSHOTS:
+                self._snapshots.pop(0)
+                self._prune()
+            return snap
+
+    def release(self, snapshot: Snapshot) -> None:
+        """Forget a snapshot so blobs only it referenced can be freed"""
+        with self._lock:
+            if snapshot in self._snapshots:
+                self._snapshots.remove(snapshot)
+            self._prune()
+
+    def _prune(self) -> None:
+        live = {s.hash for s in self._states.values()}
+        for snap in self._snapshots:
+            live.update(snap.files.values())
+        for digest in [d for d in self._blobs if d not in live]:
+            del self._blobs[digest]
+
+    def changed_since(self, snapshot: Snapshot) -> Dict[str, str]:
+        """{relative_path: 'added' | 'modified' | 'deleted'} relative to the snapshot"""
+        with self._lock:
+            self.refresh()
+            changes = {}
+            for rel, digest in snapshot.files.items():
+                state = self._states.get(rel)
+                if state is None:
+                    changes[rel] = 'deleted'
+                elif state.hash != digest:
+                    changes[rel] = 'modified'
+            for rel in self._states:
+                if rel not in snapshot.files:
+                    changes[rel] = 'added'
+            return dict(sorted(changes.items()))
+
+    def diff(self, snapshot: Snapshot, paths: Optional[Iterable[str]] = None) -> Dict[str, str]:
+        """Unified diffs of the files that changed since the snapshot"""
+        wanted = {self._rel(p) for p in paths} if paths is not None else None
+        diffs = {}
+        with self._lock:
+            for rel in self.changed_since(snapshot):
+                if wanted is not None and rel not in wanted:
+                    continue
+                old = self._blobs.get(snapshot.files.get(rel), b'')
+                new_state = self._states.get(rel)
+                new = self._blobs.get(new_state.hash, b'') if new_state else b''
+                diffs[rel] = unified_diff(rel, old.decode('utf-8', errors='replace'),
+                                          new.decode('utf-8', errors='replace'))
+        return diffs
+
+    def restore(self, snapshot: Snapshot, remove_added: bool = False) -> List[str]:
+        """
+        Roll the workspace back to a snapshot, rewriting only files that
+        differ. Files created since the snapshot are kept unless
+        remove_added (the running app may have created them).
+        Returns the relative paths that were restored or removed.
+        """
+        restored = []
+        with self._lock:
+            for rel, kind in self.changed_since(snapshot).items():
+                target = self.root / rel
+                if kind == 'added':
+                    if not remove_added:
+                        continue
+                    target.unlink(missing_ok=True)
+                else:
+                    data = self._blobs.get(snapshot.files[rel])
+                    if data is None:
+                        continue
+                    target.parent.mkdir(parents=True, exist_ok=True)
+                    target.write_bytes(data)
+                self._reload(rel)
+                restored.append(rel)
+        return restored
+
+    def close(self) -> None:
+        """Release the inotify fd (the tracker keeps working by rescanning)"""
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+            self._needs_scan = True
+
+    def __del__(self):
+        # Safety net for trackers nobody closed
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+def unified_diff(path: str, before: str, after: str, context: int = 3) -> str:
+    return "".join(difflib.unified_diff(
+        before.splitlines(keepends=True), after.splitlines(keepends=True),
+        fromfile=f"a/{path}", tofile=f"b/{path}", n=context
+    ))
+
+
+def diff_stats(diff: str) -> Tuple[int, int]:
+    """(lines added, lines removed) in a unified diff"""
+    added = sum(1 for line in diff.splitlines() if line.startswith('+') and not line.startswith('+++'))
+    removed = sum(1 for line in diff.splitlines() if line.startswith('-') and not line.startswith('---'))
+    return added, removed
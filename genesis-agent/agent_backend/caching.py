@@ -0,0 +1,451 @@
+"""
+Caching for JAi Cortex tools
+Bounded, thread-safe, async-aware result cache behind api_utils.cache_result
+
+- Size-bounded LRU with TinyLFU admission: a count-min sketch tracks how
+  often keys are requested, and a new entry only displaces the LRU victim
+  if it is requested at least as often, so one-off lookups can't flush
+  hot entries
+- TTLs are enforced on read and by a background sweeper thread, so
+  expired entries don't pile up between reads
+- Single-flight: concurrent misses on the same key (threads or
+  coroutines) wait for one computation instead of each calling the API
+- Stable argument hashing: canonical JSON of args/kwargs (sorted dict
+  keys, sets sorted), not md5(str(args)), so equal arguments always share
+  a key
+- Per-namespace stats (hits, misses, coalesced waits, evictions...)
+- Optional on-disk tier (SQLite, CACHE_DISK_PATH) shared by every process
+  on the host; values must be JSON-serializable to be written there
+"""
+
+import os
+import json
+import time
+import sqlite3
+import asyncio
+import hashlib
+import inspect
+import functools
+import threading
+from collections import OrderedDict, defaultdict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Optional, Tuple
+
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "2048"))
+CACHE_DEFAULT_TTL = float(os.getenv("CACHE_DEFAULT_TTL", "300"))
+CACHE_SWEEP_INTERVAL = float(os.getenv("CACHE_SWEEP_INTERVAL", "30"))
+CACHE_DISK_PATH = os.getenv("CACHE_DISK_PATH") or None
+
+_MISSING = object()
+
+def _cancelling(task: Optional[asyncio.Task]) -> bool:
+    """Whether cancellation was requested for task (Task.cancelling() on 3.11+)"""
+    if task is None:
+        return False
+    cancelling = getattr(task, "cancelling", None)
+    return bool(cancelling()) if cancelling else False
+
+# ============================================================================
+# KEYS
+# ============================================================================
+
+def _canonical(value: Any) -> Any:
+    """JSON-friendly canonical form: equal values always encode the same way"""
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if isinstance(value, dict):
+        return {str(k): _canonical(v) for k, v in sorted(value.items(), key=lambda item: str(item[0]))}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(v) for v in value]
+    if isinstance(value, (set, frozenset)):
+        return sorted((_canonical(v) for v in value), key=lambda v: json.dumps(v, sort_keys=True))
+    if isinstance(value, bytes):
+        return {"__bytes__": hashlib.sha256(value).hexdigest()}
+    if hasattr(value, "model_dump"):
+        return _canonical(value.model_dump())
+    if hasattr(value, "to_dict"):
+        return _canonical(value.to_dict())
+    return {"__repr__": repr(value)}
+
+def stable_key(namespace: str, args: tuple = (), kwargs: Optional[Dict[str, Any]] = None) -> str:
+    """namespace:sha256(canonical args) - stable across processes and restarts"""
+    payload = json.dumps([_canonical(list(args)), _canonical(kwargs or {})], sort_keys=True, separators=(",", ":"))
+    return f"{namespace}:{hashlib.sha256(payload.encode('utf-8')).hexdigest()[:32]}"
+
+# ============================================================================
+# ADMISSION (TinyLFU)
+# ============================================================================
+
+class FrequencySketch:
+    """Count-min sketch of request frequencies, halved periodically so old popularity fades"""
+
+    def __init__(self, width: int = 4096, depth: int = 4, sample_size: int = 40960):
+        self.width = width
+        self.depth = depth
+        self.sample_size = sample_size
+        self.rows = [[0] * width for _ in range(depth)]
+        self.additions = 0
+
+    def _indexes(self, key: str):
+        return [hash((seed, key)) % self.width for seed in range(self.depth)]
+
+    def increment(self, key: str) -> None:
+        for row, index in zip(self.rows, self._indexes(key)):
+            if row[index] < 15:
+                row[index] += 1
+        self.additions += 1
+        if self.additions >= self.sample_size:
+            self.rows = [[count >> 1 for count in row] for row in self.rows]
+            self.additions //= 2
+
+    def estimate(self, key: str) -> int:
+        return min(row[index] for row, index in zip(self.rows, self._indexes(key)))
+
+# ============================================================================
+# DISK TIER
+# ============================================================================
+
+class DiskTier:
+    """JSON values in a WAL SQLite file, shared by every process on the host"""
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "key TEXT PRIMARY KEY, namespace TEXT NOT NULL, value TEXT NOT NULL, expires REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS cache_expires ON cache(expires)")
+        self._db.commit()
+
+    def get(self, key: str) -> Tuple[Any, float]:
+        """(value, expires) or (_MISSING, 0)"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT value, expires FROM cache WHERE key = ? AND expires > ?", (key, time.time())
+            ).fetchone()
+        if row is None:
+            return _MISSING, 0.0
+        return json.loads(row[0]), row[1]
+
+    def set(self, key: str, namespace: str, value: Any, expires: float) -> bool:
+        try:
+            data = json.dumps(value)
+        except (TypeError, ValueError):
+            return False  # not JSON-serializable: memory tier only
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO cache (key, namespace, value, expires) VALUES (?, ?, ?, ?)",
+                (key, namespace, data, expires)
+            )
+        return True
+
+    def delete(self, key: str) -> None:
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def clear(self, namespace: Optional[str] = None) -> None:
+        with self._lock, self._db:
+            if namespace is None:
+                self._db.execute("DELETE FROM cache")
+            else:
+                self._db.execute("DELETE FROM cache WHERE namespace = ?", (namespace,))
+
+    def sweep(self) -> int:
+        with self._lock, self._db:
+            return self._db.execute("DELETE FROM cache WHERE expires <= ?", (time.time(),)).rowcount
+
+# ============================================================================
+# CACHE
+# ============================================================================
+
+class Cache:
+    """
+    Thread-safe TTL cache with LRU eviction, TinyLFU admission, single-flight
+    misses and an optional disk tier. get()/set()/clear() keep the old
+    SimpleCache interface.
+    """
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES, default_ttl: float = CACHE_DEFAULT_TTL,
+                 disk_path: Optional[str] = CACHE_DISK_PATH, sweep_interval: float = CACHE_SWEEP_INTERVAL):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.sweep_interval = sweep_interval
+        self._entries: "OrderedDict[str, Tuple[Any, float, str]]" = OrderedDict()  # key -> (value, expires, namespace)
+        self._sketch = FrequencySketch(sample_size=max(1000, 10 * max_entries))
+        self._lock = threading.RLock()
+        self._inflight: Dict[str, Future] = {}
+        self._inflight_async: Dict[str, Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = {}
+        self._stats: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self._sweeper: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.disk: Optional[DiskTier] = None
+        if disk_path:
+            try:
+                self.disk = DiskTier(disk_path)
+            except (OSError, sqlite3.Error) as e:
+                print(f"⚠️  Cache disk tier unavailable ({e}), using memory only")
+
+    # ------------------------------------------------------------------ basic
+
+    def _lookup(self, key: str, namespace: str) -> Any:
+        """Memory, then disk; returns _MISSING on a miss (and records stats)"""
+        now = time.time()
+        stats = self._stats[namespace]
+        with self._lock:
+            self._sketch.increment(key)
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[1] > now:
+                    self._entries.move_to_end(key)
+                    stats["hits"] += 1
+                    return entry[0]
+                del self._entries[key]
+                stats["expired"] += 1
+        if self.disk is not None:
+            value, expires = self.disk.get(key)
+            if value is not _MISSING:
+                with self._lock:
+                    self._store(key, value, expires, namespace)
+                    stats["hits"] += 1
+                    stats["disk_hits"] += 1
+                return value
+        with self._lock:
+            stats["misses"] += 1
+        return _MISSING
+
+    def _store(self, key: str, value: Any, expires: float, namespace: str) -> bool:
+        """Insert into memory, evicting the LRU entry if TinyLFU admits the newcomer"""
+        if key in self._entries:
+            self._entries[key] = (value, expires, namespace)
+            self._entries.move_to_end(key)
+            return True
+        if len(self._entries) >= self.max_entries:
+            self._purge_expired(limit=8)
+        if len(self._entries) >= self.max_entries:
+            victim = next(iter(self._entries))
+            if self._sketch.estimate(key) < self._sketch.estimate(victim):
+                self._stats[namespace]["rejected"] += 1
+                return False
+            victim_namespace = self._entries.pop(victim)[2]
+            self._stats[victim_namespace]["evictions"] += 1
+        self._entries[key] = (value, expires, namespace)
+        return True
+
+    def _purge_expired(self, limit: Optional[int] = None) -> int:
+        now = time.time()
+        expired = [k for k, (_, expires, _) in self._entries.items() if expires <= now]
+        for key in expired[:limit]:
+            self._stats[self._entries.pop(key)[2]]["expired"] += 1
+        return len(expired[:limit])
+
+    def get(self, key: str, default: Any = None, namespace: str = "default") -> Any:
+        """Get cached value"""
+        value = self._lookup(key, namespace)
+        return default if value is _MISSING else value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None, namespace: str = "default") -> None:
+        """Set cached value (and write it through to the disk tier); ttl <= 0 stores nothing"""
+        ttl = self.default_ttl if ttl is None else ttl
+        if ttl <= 0:
+            return
+        expires = time.time() + ttl
+        with self._lock:
+            self._stats[namespace]["sets"] += 1
+            self._store(key, value, expires, namespace)
+        if self.disk is not None:
+            self.disk.set(key, namespace, value, expires)
+        self._ensure_sweeper()
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+        if self.disk is not None:
+            self.disk.delete(key)
+
+    def clear(self, namespace: Optional[str] = None) -> None:
+        """Clear all cache (or one namespace)"""
+        with self._lock:
+            if namespace is None:
+                self._entries.clear()
+            else:
+                for key in [k for k, entry in self._entries.items() if entry[2] == namespace]:
+                    del self._entries[key]
+        if self.disk is not None:
+            self.disk.clear(namespace)
+
+    # ----------------------------------------------------------- single-flight
+
+    def get_or_compute(self, key: str, compute: Callable[[], Any], ttl: Optional[float] = None,
+                       namespace: str = "default", should_cache: Callable[[Any], bool] = None) -> Any:
+        """Cached value, or compute() once even if many threads miss together"""
+        value = self._lookup(key, namespace)
+        if value is not _MISSING:
+            return value
+
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+            else:
+                self._stats[namespace]["coalesced"] += 1
+        if not leader:
+            return future.result()
+
+        try:
+            value = compute()
+            if should_cache is None or should_cache(value):
+                self.set(key, value, ttl, namespace)
+            future.set_result(value)
+            return value
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    async def get_or_compute_async(self, key: str, compute: Callable[[], Any], ttl: Optional[float] = None,
+                                   namespace: str = "default", should_cache: Callable[[Any], bool] = None) -> Any:
+        """Async single-flight: concurrent coroutines missing the same key await one compute()"""
+        value = self._lookup(key, namespace)
+        if value is not _MISSING:
+            return value
+
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._lock:
+                inflight = self._inflight_async.get(key)
+                leader = inflight is None or inflight[0] is not loop
+                if leader:
+                    future = loop.create_future()
+                    self._inflight_async[key] = (loop, future)
+                else:
+                    future = inflight[1]
+                    self._stats[namespace]["coalesced"] += 1
+            if leader:
+                break
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                # The leader was cancelled (e.g. its client went away), not us:
+                # retry, becoming the leader if nobody else has
+                if future.cancelled() and not _cancelling(asyncio.current_task()):
+                    continue
+                raise
+
+        try:
+            value = await compute()
+            if should_cache is None or should_cache(value):
+                self.set(key, value, ttl, namespace)
+            future.set_result(value)
+            return value
+        except asyncio.CancelledError:
+            future.cancel()  # followers retry instead of inheriting the cancellation
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # followers re-raise it; don't warn when there are none
+            raise
+        finally:
+            with self._lock:
+                if self._inflight_async.get(key, (None, None))[1] is future:
+                    del self._inflight_async[key]
+
+    # ----------------------------------------------------------------- sweeper
+
+    def _ensure_sweeper(self) -> None:
+        if self._sweeper is not None or self.sweep_interval <= 0:
+            return
+        with self._lock:
+            if self._sweeper is None:
+                self._sweeper = threading.Thread(target=self._sweep_loop, name="cache-sweeper", daemon=True)
+                self._sweeper.start()
+
+    def _sweep_loop(self) -> None:
+        while not self._stop.wait(self.sweep_interval):
+            self.sweep()
+
+    def sweep(self) -> int:
+        """Drop expired entries from memory and disk; returns how many were removed."""
+        with self._lock:
+            removed = self._purge_expired()
+        if self.disk is not None:
+            try:
+                removed += self.disk.sweep()
+            except sqlite3.Error as e:
+                print(f"⚠️  Cache disk sweep failed: {e}")
+        return removed
+
+    def close(self) -> None:
+        self._stop.set()
+
+    # ------------------------------------------------------------------- stats
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            namespaces = {}
+            for namespace, counts in self._stats.items():
+                lookups = counts["hits"] + counts["misses"]
+                # Coalesced misses waited on another caller instead of computing
+                namespaces[namespace] = {
+                    **counts,
+                    "hit_rate": round((counts["hits"] + counts["coalesced"]) / lookups, 3) if lookups else 0.0
+                }
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "disk_tier": self.disk.path if self.disk else None,
+                "namespaces": namespaces
+            }
+
+# ============================================================================
+# DECORATOR
+# ============================================================================
+
+def _cacheable(result: Any) -> bool:
+    """Don't cache empty results or tool error dicts"""
+    if result is None:
+        return False
+    return not (isinstance(result, dict) and result.get("status") == "error")
+
+def cached(ttl: float = 300, key_func: Optional[Callable] = None, namespace: Optional[str] = None,
+           cache: Optional[Cache] = None, should_cache: Callable[[Any], bool] = _cacheable):
+    """
+    Cache a function's results (sync or async) in `cache` (default: the
+    shared tool_cache), with single-flight misses and stable argument keys.
+    """
+    def decorator(func: Callable) -> Callable:
+        store = cache or tool_cache
+        name = namespace or f"{func.__module__}.{func.__qualname__}"
+
+        def make_key(args, kwargs):
+            if key_func:
+                return f"{name}:{key_func(*args, **kwargs)}"
+            return stable_key(name, args, kwargs)
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                return await store.get_or_compute_async(
+                    make_key(args, kwargs), lambda: func(*args, **kwargs), ttl, name, should_cache
+                )
+            async_wrapper.cache = store
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return store.get_or_compute(
+                make_key(args, kwargs), lambda: func(*args, **kwargs), ttl, name, should_cache
+            )
+        wrapper.cache = store
+        return wrapper
+    return decorator
+
+# Shared by api_utils.cache_result / api_call(cache_ttl=...)
+tool_cache = Cache()
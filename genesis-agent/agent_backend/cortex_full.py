@@ -7,7 +7,13 @@ Enhanced with rate limiting, retry logic, and proper error handling
 import os
 import json
 import base64
-from typing import Dict, Any, List, Optional
+import time
+import asyncio
+import inspect
+import itertools
+import threading
+from concurrent.futures import Future, TimeoutError as FuturesTimeout
+from typing import Dict, Any, List, Optional, AsyncIterator
 from datetime import datetime
 from vertexai.generative_models import (
     GenerativeModel,
@@ -827,16 +833,179 @@ model = GenerativeModel(
     )
 )
 
+# ============================================================================
+# TOOL EXECUTION
+# All function calls of a model turn run concurrently: sync *_impl tools on
+# their own threads (at most TOOL_WORKERS at once), async tools on the event
+# loop, each with a timeout.
+# ============================================================================
+
+TOOL_WORKERS = int(os.getenv("CORTEX_TOOL_WORKERS", "8"))
+TOOL_TIMEOUT = float(os.getenv("CORTEX_TOOL_TIMEOUT", "120"))
+# Tools that legitimately run longer than the default
+TOOL_TIMEOUTS = {
+    "execute_command": 300,
+    "execute_python": 300,
+    "install_package": 600,
+    "run_tests": 600,
+    "analyze_video": 600,
+    "deploy_service": 600,
+}
+# Timed-out tools that are still running; past this, new sync tool calls are refused
+TOOL_MAX_HUNG = int(os.getenv("CORTEX_TOOL_MAX_HUNG", "32"))
+
+class ToolRunner:
+    """
+    Runs sync tools on short-lived daemon threads, at most `workers` at once.
+
+    A thread can't be stopped, so a call whose timeout fires gives its worker
+    slot back immediately and is tracked as hung until it returns: a stuck
+    Firestore or HTTP call no longer takes capacity from later tool calls.
+    """
+
+    def __init__(self, workers: int = TOOL_WORKERS, max_hung: int = TOOL_MAX_HUNG):
+        self.workers = workers
+        self.max_hung = max_hung
+        self.timed_out = 0
+        self._cond = threading.Condition()
+        self._active: Dict[int, str] = {}  # call id -> tool name, holding a slot
+        self._hung: Dict[int, str] = {}    # call id -> tool name, timed out but still running
+        self._ids = itertools.count()
+
+    def submit(self, function_call) -> tuple:
+        """Start a tool call; returns (call id, Future of its result)"""
+        call_id, future = next(self._ids), Future()
+        with self._cond:
+            hung = len(self._hung)
+        if hung >= self.max_hung:
+            future.set_result({"status": "error", "message":
+                               f"{hung} timed-out tools are still running; not starting {function_call.name}"})
+            return call_id, future
+        threading.Thread(target=self._run, args=(call_id, function_call, future),
+                         name=f"cortex-tool-{call_id}", daemon=True).start()
+        return call_id, future
+
+    def _run(self, call_id: int, function_call, future: Future) -> None:
+        with self._cond:
+            while len(self._active) >= self.workers and not future.cancelled():
+                self._cond.wait()
+            if future.cancelled():  # timed out while waiting for a slot
+                return
+            self._active[call_id] = function_call.name
+        result = _safe_execute(function_call)
+        with self._cond:
+            self._active.pop(call_id, None)
+            if self._hung.pop(call_id, None) is not None:
+                print(f"⏱️  Timed-out tool {function_call.name} finished; {len(self._hung)} still running")
+            self._cond.notify_all()
+            if not future.cancelled():
+                future.set_result(result)
+
+    def abandon(self, call_id: int, function_call, future: Future) -> None:
+        """The caller's timeout fired: free the call's slot and track it as hung"""
+        with self._cond:
+            if not future.cancel():
+                return  # finished after all
+            self.timed_out += 1
+            name = self._active.pop(call_id, None)
+            if name is not None:
+                self._hung[call_id] = name
+            self._cond.notify_all()
+            hung = len(self._hung)
+        print(f"⏱️  Tool {function_call.name} timed out; {hung} timed-out tools still running")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "workers": self.workers,
+                "running": len(self._active),
+                "hung": len(self._hung),
+                "hung_tools": sorted(self._hung.values()),
+                "timed_out_total": self.timed_out
+            }
+
+tool_runner = ToolRunner()
+
+def tool_timeout(function_name: str) -> float:
+    return TOOL_TIMEOUTS.get(function_name, TOOL_TIMEOUT)
+
+def _timeout_result(function_name: str) -> Dict[str, Any]:
+    return {"status": "error", "message": f"{function_name} timed out after {tool_timeout(function_name):.0f}s"}
+
 def execute_function_call(function_call) -> Dict[str, Any]:
     """Execute a function call"""
     function_name = function_call.name
     function_args = dict(function_call.args)
     
     if function_name in TOOL_FUNCTIONS:
-        return TOOL_FUNCTIONS[function_name](**function_args)
+        result = TOOL_FUNCTIONS[function_name](**function_args)
+        if inspect.isawaitable(result):
+            # Async tool called from a worker thread (sync chat path)
+            result = asyncio.run(result)
+        return result
     else:
         return {"status": "error", "message": f"Unknown function: {function_name}"}
 
+def _safe_execute(function_call) -> Dict[str, Any]:
+    try:
+        return execute_function_call(function_call)
+    except Exception as e:
+        print(f"❌ Tool {function_call.name} failed: {e}")
+        return {"status": "error", "message": str(e)}
+
+def execute_function_calls(function_calls: List) -> List[Dict[str, Any]]:
+    """Run a turn's function calls concurrently; results are in call order."""
+    started = time.monotonic()
+    calls = [tool_runner.submit(fc) for fc in function_calls]
+    results = []
+    for function_call, (call_id, future) in zip(function_calls, calls):
+        remaining = started + tool_timeout(function_call.name) - time.monotonic()
+        try:
+            results.append(future.result(timeout=max(0.0, remaining)))
+        except FuturesTimeout:
+            tool_runner.abandon(call_id, function_call, future)
+            results.append(_timeout_result(function_call.name))
+    return results
+
+async def execute_function_call_async(function_call) -> Dict[str, Any]:
+    """Run one tool without blocking the event loop (async tools run on it directly)"""
+    function = TOOL_FUNCTIONS.get(function_call.name)
+    submitted = None
+    try:
+        if function is not None and inspect.iscoroutinefunction(function):
+            call = function(**dict(function_call.args))
+        else:
+            submitted = tool_runner.submit(function_call)
+            # Shielded: on timeout the runner, not wait_for, cancels the call
+            call = asyncio.shield(asyncio.wrap_future(submitted[1]))
+        return await asyncio.wait_for(call, timeout=tool_timeout(function_call.name))
+    except asyncio.TimeoutError:
+        if submitted is not None:
+            tool_runner.abandon(submitted[0], function_call, submitted[1])
+        return _timeout_result(function_call.name)
+    except Exception as e:
+        print(f"❌ Tool {function_call.name} failed: {e}")
+        return {"status": "error", "message": str(e)}
+
+def _split_response(response):
+    """(text, function calls) of a response or streamed chunk"""
+    text, function_calls = "", []
+    if not response.candidates:
+        return text, function_calls
+    for part in response.candidates[0].content.parts:
+        if hasattr(part, 'function_call') and part.function_call:
+            function_calls.append(part.function_call)
+        elif hasattr(part, 'text') and part.text:
+            text += part.text
+    return text, function_calls
+
+def _function_responses(function_calls: List, results: List[Dict[str, Any]]) -> List[Part]:
+    """One function_response part per call, sent back together in one message"""
+    return [
+        Part.from_function_response(name=fc.name, response={"result": result})
+        for fc, result in zip(function_calls, results)
+    ]
+
 def chat(message: str, image_base64: Optional[str] = None, chat_history: List[Content] = None) -> Dict[str, Any]:
     """Main chat function"""
     chat_session = model.start_chat(history=chat_history or [])
@@ -848,37 +1017,93 @@ def chat(message: str, image_base64: Optional[str] = None, chat_history: List[Co
     response = chat_session.send_message(parts)
     
     tool_calls = []
-    function_call = None
+    response_text, function_calls = _split_response(response)
     
-    for part in response.candidates[0].content.parts:
-        if hasattr(part, 'function_call') and part.function_call:
-            function_call = part.function_call
-            break
+    while function_calls:
+        tool_calls.extend({"name": fc.name, "args": dict(fc.args)} for fc in function_calls)
+        results = execute_function_calls(function_calls)
+        response = chat_session.send_message(_function_responses(function_calls, results))
+        response_text, function_calls = _split_response(response)
     
-    while function_call:
-        tool_calls.append({"name": function_call.name, "args": dict(function_call.args)})
-        result = execute_function_call(function_call)
-        response = chat_session.send_message(
-            Part.from_function_response(name=function_call.name, response={"result": result})
-        )
-        
-        function_call = None
-        for part in response.candidates[0].content.parts:
-            if hasattr(part, 'function_call') and part.function_call:
-                function_call = part.function_call
-                break
+    return {
+        "response": response_text,
+        "tool_calls": tool_calls,
+        "history": chat_session.history
+    }
+
+# ============================================================================
+# ASYNC CHAT (used by server.py)
+# Model round-trips use the SDK's async API and tools run as above, so one
+# slow tool or model call never stalls the event loop.
+# ============================================================================
+
+async def chat_events(message: str, image_base64: Optional[str] = None,
+                      chat_history: List[Content] = None, stream: bool = True) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Async chat pipeline, yielding events as they happen:
+      {"type": "token", "text": ...}                 model text (chunked when stream=True)
+      {"type": "tool_call", "name": ..., "args": ...}
+      {"type": "tool_result", "name": ..., "status": ...}   in completion order
+      {"type": "done", "response": ..., "tool_calls": ..., "history": ...}
+    """
+    chat_session = model.start_chat(history=chat_history or [])
     
-    response_text = ""
-    for part in response.candidates[0].content.parts:
-        if hasattr(part, 'text') and part.text:
-            response_text += part.text
+    content = [Part.from_text(message)]
+    if image_base64:
+        content.append(Part.from_data(data=base64.b64decode(image_base64), mime_type="image/jpeg"))
     
-    return {
+    tool_calls = []
+    while True:
+        response_text, function_calls = "", []
+        if stream:
+            chunks = await chat_session.send_message_async(content, stream=True)
+            async for chunk in chunks:
+                text, calls = _split_response(chunk)
+                if text:
+                    response_text += text
+                    yield {"type": "token", "text": text}
+                function_calls.extend(calls)
+        else:
+            response = await chat_session.send_message_async(content)
+            response_text, function_calls = _split_response(response)
+            if response_text:
+                yield {"type": "token", "text": response_text}
+        
+        if not function_calls:
+            break
+        
+        for fc in function_calls:
+            call = {"name": fc.name, "args": dict(fc.args)}
+            tool_calls.append(call)
+            yield {"type": "tool_call", **call}
+        
+        async def run(index: int, function_call):
+            return index, await execute_function_call_async(function_call)
+        
+        results = [None] * len(function_calls)
+        for finished in asyncio.as_completed([run(i, fc) for i, fc in enumerate(function_calls)]):
+            index, result = await finished
+            results[index] = result
+            yield {
+                "type": "tool_result",
+                "name": function_calls[index].name,
+                "status": result.get("status") if isinstance(result, dict) else None
+            }
+        content = _function_responses(function_calls, results)
+    
+    yield {
+        "type": "done",
         "response": response_text,
         "tool_calls": tool_calls,
         "history": chat_session.history
     }
 
+async def chat_async(message: str, image_base64: Optional[str] = None, chat_history: List[Content] = None) -> Dict[str, Any]:
+    """Async version of chat(): same result, without blocking the event loop"""
+    async for event in chat_events(message, image_base64, chat_history, stream=False):
+        if event["type"] == "done":
+            return {key: event[key] for key in ("response", "tool_calls", "history")}
+
 if __name__ == "__main__":
     print("✅ Cortex OS FULL - 30+ Tools Ready!")
     print(f"📍 Project: {PROJECT_ID}")
@@ -103,6 +103,9 @@ from .meta_agent_tools import (
     agent_dependency_graph
 )
 
+# Import semantic tool retriever - rank tools by embedding similarity
+from .tool_retriever import tool_retriever, shrink_tools_callback, TOOL_RETRIEVAL_ENABLED
+
 # Import sub-agents for multi-agent system
 from .sub_agents.code_master import code_master
 from .sub_agents.cloud_expert import cloud_expert
@@ -1834,6 +1837,12 @@ Current date: 2025-10-02
         temperature=0.7,
         max_output_tokens=4096,
     ),
+    # 🎯 Only send the tool schemas relevant to each request (see tool_retriever.py)
+    before_model_callback=shrink_tools_callback,
 )
 
+# Embed every tool docstring once (cached on disk) so tools can be ranked per turn
+if TOOL_RETRIEVAL_ENABLED:
+    tool_retriever.build_in_background(root_agent.tools)
+
 __all__ = ['root_agent']
@@ -0,0 +1,194 @@
+"""
+Write-Behind Capture Pipeline
+Persists auto-captured conversations off the response path
+
+CognitiveMiddleware enqueues turns here and returns immediately. A single
+background worker drains the bounded queue in batches: context detection,
+one batched embedding request and Firestore WriteBatch commits via
+MemoryService.save_conversation_turns. When the queue is full new turns are
+dropped (and counted) rather than slowing down the agent.
+"""
+
+import os
+import time
+import queue
+import atexit
+import threading
+from typing import Dict, Any, List, Optional
+
+from .memory_service import memory_service
+
+
+_STOP = object()
+
+
+class CapturePipeline:
+    """Bounded background queue that batches conversation captures"""
+
+    def __init__(
+        self,
+        max_queue_size: int = 1000,
+        batch_size: int = 50,
+        flush_interval: float = 0.5,
+        enqueue_timeout: float = 0.0
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.enqueue_timeout = enqueue_timeout
+
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue_size)
+        self._worker: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._closed = False
+
+        self.metrics = {
+            'enqueued': 0,
+            'dropped': 0,
+            'captured': 0,
+            'failed': 0,
+            'batches': 0,
+            'last_batch_size': 0,
+            'last_batch_seconds': 0.0,
+            'max_queue_delay_seconds': 0.0
+        }
+
+    def _ensure_worker(self) -> None:
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._start_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="cognitive-capture", daemon=True)
+                self._worker.start()
+
+    def enqueue(
+        self,
+        user_id: str,
+        session_id: str,
+        user_message: str,
+        agent_response: str
+    ) -> bool:
+        """Queue a turn for capture. Returns False if it was dropped (queue full or closed)."""
+        if self._closed:
+            self.metrics['dropped'] += 1
+            return False
+
+        item = {
+            'user_id': user_id,
+            'session_id': session_id,
+            'user_message': user_message,
+            'agent_response': agent_response,
+            'enqueued_at': time.monotonic()
+        }
+
+        try:
+            if self.enqueue_timeout > 0:
+                self._queue.put(item, timeout=self.enqueue_timeout)
+            else:
+                self._queue.put_nowait(item)
+        except queue.Full:
+            self.metrics['dropped'] += 1
+            if self.metrics['dropped'] == 1 or self.metrics['dropped'] % 100 == 0:
+                print(f"⚠️  Capture queue full ({self._queue.maxsize}), {self.metrics['dropped']} turn(s) dropped so far")
+            return False
+
+        self.metrics['enqueued'] += 1
+        self._ensure_worker()
+        return True
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                self._queue.task_done()
+                return
+
+            batch = [item]
+            stop = False
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    nxt = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if nxt is _STOP:
+                    self._queue.task_done()
+                    stop = True
+                    break
+                batch.append(nxt)
+
+            self._process(batch)
+            for _ in batch:
+                self._queue.task_done()
+            if stop:
+                return
+
+    def _process(self, batch: List[Dict[str, Any]]) -> None:
+        started = time.monotonic()
+        oldest = min(item['enqueued_at'] for item in batch)
+        self.metrics['max_queue_delay_seconds'] = max(self.metrics['max_queue_delay_seconds'], started - oldest)
+
+        try:
+            turns = []
+            for item in batch:
+                turns.append({
+                    'user_id': item['user_id'],
+                    'session_id': item['session_id'],
+                    'user_message': item['user_message'],
+                    'agent_response': item['agent_response'],
+                    'metadata': memory_service.build_capture_metadata(item['user_message'], item['agent_response'])
+                })
+
+            memory_service.save_conversation_turns(turns)
+            self.metrics['captured'] += len(batch)
+            print(f"🧠 Auto-captured {len(batch)} conversation(s) in background")
+
+        except Exception as e:
+            self.metrics['failed'] += len(batch)
+            print(f"Error in background capture ({len(batch)} turns): {e}")
+
+        self.metrics['batches'] += 1
+        self.metrics['last_batch_size'] = len(batch)
+        self.metrics['last_batch_seconds'] = round(time.monotonic() - started, 3)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Block until every queued turn has been processed. Returns False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+
+    def shutdown(self, timeout: float = 10.0) -> bool:
+        """Stop accepting turns, drain the queue and stop the worker"""
+        if self._closed:
+            return True
+        self._closed = True
+        if self._worker is None or not self._worker.is_alive():
+            return self._queue.unfinished_tasks == 0
+
+        # Blocking put: the sentinel must get in even if the queue is full
+        self._queue.put(_STOP)
+        self._worker.join(timeout)
+        return not self._worker.is_alive()
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {
+            **self.metrics,
+            'queue_depth': self._queue.qsize(),
+            'queue_capacity': self._queue.maxsize,
+            'closed': self._closed
+        }
+
+
+# Global pipeline instance (flushed on interpreter exit)
+capture_pipeline = CapturePipeline(
+    max_queue_size=int(os.environ.get('COGNITIVE_CAPTURE_QUEUE_SIZE', '1000')),
+    batch_size=int(os.environ.get('COGNITIVE_CAPTURE_BATCH_SIZE', '50'))
+)
+atexit.register(capture_pipeline.shutdown)
@@ -6,6 +6,7 @@ Automatically captures every conversation for cognitive profiling
 import os
 from typing import Dict, Any
 from .memory_service import memory_service
+from .capture_pipeline import capture_pipeline
 
 
 class CognitiveMiddleware:
@@ -13,10 +14,13 @@ class CognitiveMiddleware:
     Middleware that automatically captures conversations with context detection
     
     This is the bridge between the ADK agent and the cognitive modeling system.
+    With write_behind enabled, turns are handed to the background capture
+    pipeline so memory persistence never adds to response latency.
     """
     
-    def __init__(self, enabled: bool = True):
+    def __init__(self, enabled: bool = True, write_behind: bool = True):
         self.enabled = enabled
+        self.write_behind = write_behind
         self.capture_count = 0
         
     def capture_conversation(
@@ -34,6 +38,22 @@ class CognitiveMiddleware:
         if not self.enabled:
             return {'status': 'disabled'}
         
+        if self.write_behind:
+            accepted = capture_pipeline.enqueue(
+                user_id=user_id,
+                session_id=session_id,
+                user_message=user_message,
+                agent_response=agent_response
+            )
+            if not accepted:
+                return {'status': 'dropped', 'capture_count': self.capture_count}
+            
+            self.capture_count += 1
+            return {
+                'status': 'queued',
+                'capture_count': self.capture_count
+            }
+        
         try:
             # Call the memory service auto-capture
             doc_id = memory_service.auto_capture_conversation(
@@ -59,14 +79,31 @@ class CognitiveMiddleware:
     
     def get_stats(self) -> Dict[str, Any]:
         """Get middleware statistics"""
-        return {
+        stats = {
             'enabled': self.enabled,
+            'write_behind': self.write_behind,
             'total_captured': self.capture_count
         }
+        if self.write_behind:
+            stats['pipeline'] = capture_pipeline.get_metrics()
+        return stats
+    
+    def flush(self, timeout: float = None) -> bool:
+        """Wait for queued captures to reach Firestore"""
+        if not self.write_behind:
+            return True
+        return capture_pipeline.flush(timeout)
+    
+    def shutdown(self, timeout: float = 10.0) -> bool:
+        """Flush and stop the background pipeline (also runs at interpreter exit)"""
+        if not self.write_behind:
+            return True
+        return capture_pipeline.shutdown(timeout)
 
 
 # Global middleware instance
 cognitive_middleware = CognitiveMiddleware(
-    enabled=os.environ.get('COGNITIVE_CAPTURE', 'true').lower() == 'true'
+    enabled=os.environ.get('COGNITIVE_CAPTURE', 'true').lower() == 'true',
+    write_behind=os.environ.get('COGNITIVE_CAPTURE_ASYNC', 'true').lower() == 'true'
 )
 
@@ -0,0 +1,244 @@
+"""
+Cognitive Profile Aggregates
+Materialized per-user, per-day counters behind get_cognitive_profile
+
+Every captured turn increments one daily bucket:
+
+    cognitive_profiles/{user_id}                      {'user_id', 'backfilled_at', ...}
+    cognitive_profiles/{user_id}/daily/{YYYY-MM-DD}   {'day', 'total', 'contexts', 'styles',
+                                                       'entities', 'topics', 'preferences',
+                                                       'short_requests', 'concise_requests'}
+
+A profile over any window then reads O(days) bucket docs instead of every
+conversation. Users captured before this existed are backfilled once from
+conversation_memory on first read.
+
+Counter keys come from user text, so they are percent-escaped before being
+used as Firestore map keys ('.', '/', '`' and friends would otherwise be
+read as field-path syntax) and unescaped when buckets are read back.
+"""
+
+import re
+from urllib.parse import quote, unquote
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, List, Optional
+
+from google.cloud import firestore
+
+from .keyword_matcher import KeywordMatcher
+
+
+PROFILE_COLLECTION = 'cognitive_profiles'
+BUCKET_COLLECTION = 'daily'
+
+COUNTER_FIELDS = ('contexts', 'styles', 'entities', 'topics', 'preferences')
+SCALAR_FIELDS = ('total', 'short_requests', 'concise_requests')
+
+_STOP_WORDS = {'this', 'that', 'with', 'from', 'have', 'want', 'need', 'just', 'like'}
+_WORD_RE = re.compile(r'\b[a-z]{4,}\b')
+
+# Keyword fallback for turns captured without cognitive_analysis
+FALLBACK_CONTEXT_RULES = KeywordMatcher([
+    ('development', ['agent', 'cortex', 'code', 'deploy', 'vertex', 'firestore', 'database']),
+    ('travel', ['travel', 'agency', 'booking', 'hotel', 'flight']),
+    ('agency', ['agency', 'client', 'business', 'marketing']),
+    ('learning', ['learn', 'autonomous', 'cognitive', 'memory', 'remember']),
+])
+FALLBACK_STYLE_RULES = KeywordMatcher([
+    ('direct/passionate', ['fuck', 'shit', 'damn', 'ass']),
+])
+FALLBACK_POLITE_RULES = KeywordMatcher([
+    ('polite', ['please', 'thanks', 'could you']),
+])
+
+
+def _day_key(when: Optional[datetime] = None) -> str:
+    when = when or datetime.now(timezone.utc)
+    if when.tzinfo is not None:
+        when = when.astimezone(timezone.utc)
+    return when.strftime('%Y-%m-%d')
+
+
+def _field_key(key: str) -> str:
+    """Counter key safe to use as a Firestore map key"""
+    return quote(key, safe=' ').replace('.', '%2E').replace('~', '%7E')
+
+
+def _escape_keys(counter: Dict[str, int]) -> Dict[str, int]:
+    return {_field_key(key): count for key, count in counter.items() if key}
+
+
+def _unescape_keys(counter: Dict[str, int]) -> Dict[str, int]:
+    return {unquote(key): count for key, count in (counter or {}).items()}
+
+
+def turn_features(user_message: str, metadata: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Counters contributed by one conversation turn.
+
+    Uses the capture-time cognitive_analysis when present, otherwise falls
+    back to keyword analysis of the raw user message (notes, legacy docs).
+    """
+    user_message = (user_message or '').lower()
+    cognitive = (metadata or {}).get('cognitive_analysis', {})
+
+    contexts, styles, entities = Counter(), Counter(), Counter()
+
+    if cognitive:
+        for context, is_present in cognitive.get('contexts', {}).items():
+            if is_present:
+                contexts[context] += 1
+        style = cognitive.get('communication_style')
+        if style:
+            styles[style] += 1
+        for entity in cognitive.get('entities', []):
+            if entity:
+                entities[str(entity)] += 1
+    else:
+        # Detect business contexts from keywords
+        contexts.update(FALLBACK_CONTEXT_RULES.labels(user_message))
+
+        # Detect communication style from message patterns
+        style = FALLBACK_STYLE_RULES.first(user_message)
+        if style is None:
+            style = 'inquisitive' if '?' in user_message else (FALLBACK_POLITE_RULES.first(user_message) or 'directive')
+        styles[style] += 1
+
+        # Extract key topics (simple word frequency)
+        for word in _WORD_RE.findall(user_message):
+            if word not in _STOP_WORDS:
+                entities[word] += 1
+
+    # Interest/preference signals used by analyze_conversation_patterns
+    topics, preferences = Counter(), Counter()
+    if 'glass' in user_message and 'effect' in user_message:
+        topics['glass_ui'] += 1
+    if 'deploy' in user_message:
+        topics['deployment'] += 1
+    if 'dark' in user_message:
+        preferences['dark_mode'] += 1
+
+    word_count = len(user_message.split())
+    return {
+        'total': 1,
+        'contexts': contexts,
+        'styles': styles,
+        'entities': entities,
+        'topics': topics,
+        'preferences': preferences,
+        'short_requests': 1 if word_count < 15 else 0,
+        'concise_requests': 1 if word_count < 10 else 0
+    }
+
+
+def _merge(into: Dict[str, Any], features: Dict[str, Any]) -> None:
+    for field in SCALAR_FIELDS:
+        into[field] = into.get(field, 0) + features.get(field, 0)
+    for field in COUNTER_FIELDS:
+        into.setdefault(field, Counter()).update(features.get(field, {}))
+
+
+def _empty() -> Dict[str, Any]:
+    aggregate = {field: 0 for field in SCALAR_FIELDS}
+    aggregate.update({field: Counter() for field in COUNTER_FIELDS})
+    return aggregate
+
+
+class CognitiveProfileStore:
+    """Reads and incrementally updates the per-user daily buckets"""
+
+    def __init__(self, db: firestore.Client):
+        self.db = db
+
+    def _profile_ref(self, user_id: str):
+        return self.db.collection(PROFILE_COLLECTION).document(user_id)
+
+    def _bucket_ref(self, user_id: str, day: str):
+        return self._profile_ref(user_id).collection(BUCKET_COLLECTION).document(day)
+
+    def record_turns(self, turns: List[Dict[str, Any]]) -> None:
+        """
+        Add captured turns to today's buckets.
+
+        Turns for the same user are merged in memory first, so a capture batch
+        costs one Increment write per user rather than one per turn.
+        """
+        day = _day_key()
+        per_user: Dict[str, Dict[str, Any]] = defaultdict(_empty)
+        for turn in turns:
+            _merge(per_user[turn['user_id']], turn_features(turn['user_message'], turn.get('metadata')))
+
+        batch = self.db.batch()
+        for user_id, aggregate in per_user.items():
+            update = {'day': day}
+            for field in SCALAR_FIELDS:
+                if aggregate[field]:
+                    update[field] = firestore.Increment(aggregate[field])
+            for field in COUNTER_FIELDS:
+                if aggregate[field]:
+                    update[field] = {key: firestore.Increment(count)
+                                     for key, count in _escape_keys(aggregate[field]).items()}
+            batch.set(self._bucket_ref(user_id, day), update, merge=True)
+        batch.commit()
+
+    def backfill(self, user_id: str) -> int:
+        """One-time rebuild of a user's buckets from conversation_memory. Returns turns counted."""
+        buckets: Dict[str, Dict[str, Any]] = defaultdict(_empty)
+        counted = 0
+        today = _day_key()
+
+        conversations = self.db.collection('conversation_memory')\
+            .where('user_id', '==', user_id)\
+            .stream()
+        for conv in conversations:
+            data = conv.to_dict()
+            timestamp = data.get('timestamp')
+            day = _day_key(timestamp) if isinstance(timestamp, datetime) else today
+            _merge(buckets[day], turn_features(data.get('user_message', ''), data.get('metadata', {})))
+            counted += 1
+
+        batch = self.db.batch()
+        writes = 0
+        for day, aggregate in buckets.items():
+            doc = {'day': day}
+            doc.update({field: aggregate[field] for field in SCALAR_FIELDS})
+            doc.update({field: _escape_keys(aggregate[field]) for field in COUNTER_FIELDS})
+            batch.set(self._bucket_ref(user_id, day), doc)
+            writes += 1
+            if writes >= 499:
+                batch.commit()
+                batch = self.db.batch()
+                writes = 0
+
+        batch.set(self._profile_ref(user_id), {
+            'user_id': user_id,
+            'backfilled_at': firestore.SERVER_TIMESTAMP,
+            'backfilled_turns': counted
+        }, merge=True)
+        batch.commit()
+        return counted
+
+    def aggregate(self, user_id: str, days: int) -> Dict[str, Any]:
+        """
+        Sum the daily buckets covering the last `days` days, today included
+        (UTC, whole days).
+
+        Backfills the user first if their buckets were never built.
+        """
+        profile_doc = self._profile_ref(user_id).get()
+        if not profile_doc.exists or not (profile_doc.to_dict() or {}).get('backfilled_at'):
+            self.backfill(user_id)
+
+        cutoff_day = _day_key(datetime.now(timezone.utc) - timedelta(days=max(days, 1) - 1))
+        buckets = self._profile_ref(user_id).collection(BUCKET_COLLECTION)\
+            .where('day', '>=', cutoff_day)\
+            .stream()
+
+        totals = _empty()
+        for bucket in buckets:
+            data = bucket.to_dict()
+            for field in COUNTER_FIELDS:
+                data[field] = _unescape_keys(data.get(field))
+            _merge(totals, data)
+        return totals
@@ -12,6 +12,7 @@ Tracks:
 from typing import Dict, List, Any
 from datetime import datetime
 from .memory_service import memory_service
+from .keyword_matcher import KeywordMatcher
 
 
 class CommunicationAnalytics:
@@ -50,6 +51,16 @@ class CommunicationAnalytics:
             'no i mean',
             'let me rephrase'
         ]
+        
+        # Compiled once: user messages are checked for transcription slips and
+        # corrections, agent responses for clarity requests
+        self.user_rules = KeywordMatcher([
+            ('transcription', list(self.common_errors.keys())),
+            ('correction', self.correction_phrases)
+        ])
+        self.agent_rules = KeywordMatcher([
+            ('clarity_request', self.ambiguity_phrases)
+        ])
     
     def analyze_conversation(
         self,
@@ -77,39 +88,36 @@ class CommunicationAnalytics:
         
         # Analyze each turn
         for i, turn in enumerate(conversations):
-            user_msg = turn['user_message'].lower()
-            agent_resp = turn['agent_response'].lower()
+            user_hits = self.user_rules.matches(turn['user_message'])
+            agent_hits = self.agent_rules.matches(turn['agent_response'])
             
             # Check for potential transcription errors
-            for error_word in self.common_errors.keys():
-                if error_word in user_msg:
-                    metrics['transcription_issues'] += 1
-                    metrics['details'].append({
-                        'turn': i + 1,
-                        'type': 'transcription',
-                        'word': error_word,
-                        'likely_meant': self.common_errors[error_word]
-                    })
+            for error_word in user_hits.get('transcription', []):
+                metrics['transcription_issues'] += 1
+                metrics['details'].append({
+                    'turn': i + 1,
+                    'type': 'transcription',
+                    'word': error_word,
+                    'likely_meant': self.common_errors[error_word]
+                })
             
             # Check for clarity requests
-            for phrase in self.ambiguity_phrases:
-                if phrase in agent_resp:
-                    metrics['clarity_requests'] += 1
-                    metrics['details'].append({
-                        'turn': i + 1,
-                        'type': 'clarity_request',
-                        'phrase': phrase
-                    })
+            for phrase in agent_hits.get('clarity_request', []):
+                metrics['clarity_requests'] += 1
+                metrics['details'].append({
+                    'turn': i + 1,
+                    'type': 'clarity_request',
+                    'phrase': phrase
+                })
             
             # Check for corrections
-            for phrase in self.correction_phrases:
-                if phrase in user_msg:
-                    metrics['corrections'] += 1
-                    metrics['details'].append({
-                        'turn': i + 1,
-                        'type': 'correction',
-                        'phrase': phrase
-                    })
+            for phrase in user_hits.get('correction', []):
+                metrics['corrections'] += 1
+                metrics['details'].append({
+                    'turn': i + 1,
+                    'type': 'correction',
+                    'phrase': phrase
+                })
         
         # Calculate communication score (0-100)
         score = 100
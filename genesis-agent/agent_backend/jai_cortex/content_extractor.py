@@ -3,9 +3,66 @@ Content Extractor Module
 Extracts clean text content from web pages
 """
 
+import time
+import threading
 import requests
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeout
+from urllib.parse import urlparse
 from bs4 import BeautifulSoup
-from typing import Dict, Any
+from requests.adapters import HTTPAdapter
+from typing import Dict, Any, Iterator, Optional, Tuple
+
+from .http_cache import http_cache
+
+# Set a user agent to avoid being blocked
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """Shared, connection-pooling session (keep-alive across research calls)"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=32, pool_maxsize=8)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                session.headers.update(DEFAULT_HEADERS)
+                _session = session
+    return _session
+
+
+def _parse_page(content: bytes) -> tuple:
+    """(title, cleaned text) of an HTML page"""
+    # Parse with BeautifulSoup
+    soup = BeautifulSoup(content, 'html.parser')
+    
+    # Extract title
+    title = soup.find('title')
+    title_text = str(title.string) if title and title.string else 'Untitled'
+    
+    # Remove unwanted elements
+    for element in soup(['script', 'style', 'nav', 'header', 'footer', 'aside', 'iframe', 'noscript']):
+        element.decompose()
+    
+    # Get text content
+    text = soup.get_text(separator='\n', strip=True)
+    
+    # Clean up the text - remove excessive whitespace
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    cleaned_text = '\n'.join(lines)
+    
+    # Limit to 8000 characters to avoid token limits
+    if len(cleaned_text) > 8000:
+        cleaned_text = cleaned_text[:8000] + "..."
+    
+    return title_text, cleaned_text
 
 
 def extract_text_from_url(url: str, timeout: int = 10) -> Dict[str, Any]:
@@ -25,36 +82,17 @@ def extract_text_from_url(url: str, timeout: int = 10) -> Dict[str, Any]:
         - 'error': Error message if failed
     """
     try:
-        # Set a user agent to avoid being blocked
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        
-        # Fetch the page
-        response = requests.get(url, timeout=timeout, headers=headers)
-        response.raise_for_status()
+        # Fetch the page (pooled connection, revalidated against the disk cache)
+        response = http_cache.fetch(get_session(), url, timeout=timeout, source='page')
         
-        # Parse with BeautifulSoup
-        soup = BeautifulSoup(response.content, 'html.parser')
+        # Same body as last time: reuse the cleaned text, skip parsing
+        cached = http_cache.get_extracted('page_text', url, response.content_hash)
+        if cached is not None:
+            print(f"♻️  Cached extraction ({len(cached['text'])} characters) from: {cached['title']}")
+            return {'url': url, **cached, 'success': True, 'error': None}
         
-        # Extract title
-        title = soup.find('title')
-        title_text = title.string if title else 'Untitled'
-        
-        # Remove unwanted elements
-        for element in soup(['script', 'style', 'nav', 'header', 'footer', 'aside', 'iframe', 'noscript']):
-            element.decompose()
-        
-        # Get text content
-        text = soup.get_text(separator='\n', strip=True)
-        
-        # Clean up the text - remove excessive whitespace
-        lines = [line.strip() for line in text.splitlines() if line.strip()]
-        cleaned_text = '\n'.join(lines)
-        
-        # Limit to 8000 characters to avoid token limits
-        if len(cleaned_text) > 8000:
-            cleaned_text = cleaned_text[:8000] + "..."
+        title_text, cleaned_text = _parse_page(response.content)
+        http_cache.put_extracted('page_text', url, response.content_hash, {'title': title_text, 'text': cleaned_text})
         
         print(f"✅ Extracted {len(cleaned_text)} characters from: {title_text}")
         
@@ -100,24 +138,111 @@ def extract_text_from_url(url: str, timeout: int = 10) -> Dict[str, Any]:
         }
 
 
-def extract_from_multiple_urls(urls: list, timeout: int = 10) -> list:
+def _failed(url: str, error_msg: str) -> Dict[str, Any]:
+    return {
+        'url': url,
+        'title': None,
+        'text': '',
+        'success': False,
+        'error': error_msg
+    }
+
+
+def iter_extractions(
+    urls: list,
+    timeout: int = 10,
+    max_workers: int = 8,
+    per_host_limit: int = 2,
+    deadline: Optional[float] = None
+) -> Iterator[Tuple[int, Dict[str, Any]]]:
     """
-    Extract content from multiple URLs.
+    Extract content from multiple URLs concurrently, yielding as pages finish.
+    
+    Pages are fetched on a bounded thread pool over the shared session, with
+    at most per_host_limit requests in flight to any one host. Yields
+    (input index, extraction result) in completion order, failures included,
+    until every URL is done or the global deadline passes. Closing the
+    generator early cancels the fetches that have not started.
     
     Args:
         urls: List of URLs to extract from
         timeout: Timeout per URL
+        max_workers: Maximum concurrent fetches
+        per_host_limit: Maximum concurrent fetches per host
+        deadline: Seconds for the whole call (default: timeout + 5)
+    """
+    if not urls:
+        return
+    
+    deadline_at = time.monotonic() + (deadline if deadline is not None else timeout + 5)
+    host_slots = {}
+    for url in urls:
+        host_slots.setdefault(urlparse(url).netloc.lower(), threading.BoundedSemaphore(per_host_limit))
+    
+    def fetch(url: str) -> Dict[str, Any]:
+        remaining = deadline_at - time.monotonic()
+        slot = host_slots[urlparse(url).netloc.lower()]
+        if remaining <= 0 or not slot.acquire(timeout=remaining):
+            return _failed(url, f"Deadline reached before fetching {url}")
+        try:
+            remaining = deadline_at - time.monotonic()
+            return extract_text_from_url(url, timeout=max(1, min(timeout, remaining)))
+        finally:
+            slot.release()
+    
+    executor = ThreadPoolExecutor(max_workers=min(max_workers, len(urls)), thread_name_prefix="extract")
+    futures = {executor.submit(fetch, url): i for i, url in enumerate(urls)}
+    try:
+        for future in as_completed(futures, timeout=max(0, deadline_at - time.monotonic())):
+            yield futures[future], future.result()
+    except FuturesTimeout:
+        print(f"⏱️  Extraction deadline reached")
+    finally:
+        # Don't wait for stragglers; queued fetches are cancelled
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def extract_from_multiple_urls(
+    urls: list,
+    timeout: int = 10,
+    max_workers: int = 8,
+    per_host_limit: int = 2,
+    deadline: Optional[float] = None,
+    min_sources: Optional[int] = None
+) -> list:
+    """
+    Extract content from multiple URLs concurrently.
+    
+    See iter_extractions for how fetches are scheduled. The call returns as
+    soon as min_sources pages have been extracted, or when the global
+    deadline passes, whichever comes first.
+    
+    Args:
+        urls: List of URLs to extract from
+        timeout: Timeout per URL
+        max_workers: Maximum concurrent fetches
+        per_host_limit: Maximum concurrent fetches per host
+        deadline: Seconds for the whole call (default: timeout + 5)
+        min_sources: Return early once this many pages succeeded (default: all)
         
     Returns:
-        List of extraction results (only successful ones)
+        List of extraction results (only successful ones), in input order
     """
-    results = []
+    if not urls:
+        return []
     
-    for url in urls:
-        result = extract_text_from_url(url, timeout=timeout)
-        if result['success'] and result['text']:
-            results.append(result)
+    started = time.monotonic()
+    successes = {}
+    extractions = iter_extractions(urls, timeout, max_workers, per_host_limit, deadline)
+    try:
+        for i, result in extractions:
+            if result['success'] and result['text']:
+                successes[i] = result
+                if min_sources and len(successes) >= min_sources:
+                    break
+    finally:
+        extractions.close()
     
-    print(f"📄 Successfully extracted content from {len(results)}/{len(urls)} URLs")
+    results = [successes[i] for i in sorted(successes)]
+    print(f"📄 Successfully extracted content from {len(results)}/{len(urls)} URLs in {time.monotonic() - started:.1f}s")
     return results
-
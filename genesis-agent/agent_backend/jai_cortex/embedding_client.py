@@ -0,0 +1,354 @@
+"""
+JAi Cortex OS - Embedding Client
+Long-lived, cached, batching client for Vertex AI text embeddings
+
+- The TextEmbeddingModel is loaded once and reused
+- Vectors are cached by content hash in an in-process LRU and in SQLite on disk
+- Concurrent requests (threads or coroutines) are coalesced into one
+  get_embeddings call of up to max_batch_size texts
+- Requests are also split by an estimated token budget, and a request the
+  model rejects is bisected down to single texts, so one bad text only
+  fails itself
+- Identical texts that are already in flight share a single request
+"""
+
+import os
+import time
+import queue
+import sqlite3
+import hashlib
+import asyncio
+import threading
+from array import array
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import List, Dict, Any, Optional, Union
+
+
+EMBEDDING_CACHE_PATH = os.environ.get(
+    'EMBEDDING_CACHE_PATH',
+    os.path.join(os.path.expanduser('~'), '.jai_cortex', 'embedding_cache.sqlite3')
+)
+
+# Vertex AI accepts up to 250 texts per text-embedding request
+MAX_EMBEDDING_BATCH = 250
+# ...and up to 20k input tokens per request; estimated as len/3 to stay clear of it
+MAX_EMBEDDING_BATCH_TOKENS = int(os.environ.get('MAX_EMBEDDING_BATCH_TOKENS', '20000'))
+CHARS_PER_TOKEN = 3
+
+# Failures that say nothing about the texts themselves: splitting the request won't help
+_SERVICE_ERRORS = {'ResourceExhausted', 'ServiceUnavailable', 'Unauthenticated', 'PermissionDenied',
+                   'DeadlineExceeded', 'TooManyRequests'}
+
+# Upper bound for a blocking embed() call (queueing + model request)
+EMBEDDING_TIMEOUT = float(os.environ.get('EMBEDDING_TIMEOUT', '60'))
+
+
+class EmbeddingClient:
+    """Cached, coalescing embedding client (sync and async APIs)"""
+
+    def __init__(
+        self,
+        model_name: str = "text-embedding-004",
+        cache_path: Optional[str] = EMBEDDING_CACHE_PATH,
+        memory_cache_size: int = 4096,
+        max_batch_size: int = MAX_EMBEDDING_BATCH,
+        max_batch_tokens: int = MAX_EMBEDDING_BATCH_TOKENS,
+        coalesce_window: float = 0.01
+    ):
+        self.model_name = model_name
+        self.cache_path = cache_path
+        self.memory_cache_size = memory_cache_size
+        self.max_batch_size = max_batch_size
+        self.max_batch_tokens = max_batch_tokens
+        self.coalesce_window = coalesce_window
+
+        self._model = None
+        self._model_lock = threading.Lock()
+
+        self._lru: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lru_lock = threading.Lock()
+
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+
+        self._queue: "queue.Queue" = queue.Queue()
+        self._inflight: Dict[str, Future] = {}
+        self._inflight_lock = threading.Lock()
+        self._worker: Optional[threading.Thread] = None
+
+        self.stats_counters = {
+            'memory_hits': 0,
+            'disk_hits': 0,
+            'misses': 0,
+            'coalesced': 0,
+            'api_calls': 0,
+            'api_texts': 0,
+            'api_splits': 0,
+            'failed_texts': 0
+        }
+
+    # ------------------------------------------------------------------
+    # Model + cache plumbing
+    # ------------------------------------------------------------------
+
+    def _get_model(self):
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    from vertexai.language_models import TextEmbeddingModel
+                    self._model = TextEmbeddingModel.from_pretrained(self.model_name)
+        return self._model
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model_name}\x00{text}".encode('utf-8')).hexdigest()
+
+    def _get_db(self) -> Optional[sqlite3.Connection]:
+        if self.cache_path is None:
+            return None
+        if self._db is None:
+            directory = os.path.dirname(self.cache_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.cache_path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "key TEXT PRIMARY KEY, model TEXT, vector BLOB, created_at REAL)"
+            )
+            self._db = conn
+        return self._db
+
+    def _remember(self, key: str, vector: List[float]) -> None:
+        with self._lru_lock:
+            self._lru[key] = vector
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.memory_cache_size:
+                self._lru.popitem(last=False)
+
+    def _lookup(self, key: str) -> Optional[List[float]]:
+        with self._lru_lock:
+            vector = self._lru.get(key)
+            if vector is not None:
+                self._lru.move_to_end(key)
+                self.stats_counters['memory_hits'] += 1
+                return vector
+
+        try:
+            with self._db_lock:
+                db = self._get_db()
+                row = db.execute("SELECT vector FROM embeddings WHERE key = ?", (key,)).fetchone() if db else None
+        except sqlite3.Error as e:
+            print(f"Embedding cache read error: {e}")
+            row = None
+
+        if row is None:
+            return None
+        vector = array('f', row[0]).tolist()
+        self.stats_counters['disk_hits'] += 1
+        self._remember(key, vector)
+        return vector
+
+    def _persist(self, items: Dict[str, List[float]]) -> None:
+        for key, vector in items.items():
+            self._remember(key, vector)
+        try:
+            with self._db_lock:
+                db = self._get_db()
+                if db is None:
+                    return
+                now = time.time()
+                db.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, model, vector, created_at) VALUES (?, ?, ?, ?)",
+                    [(key, self.model_name, array('f', vector).tobytes(), now) for key, vector in items.items()]
+                )
+                db.commit()
+        except sqlite3.Error as e:
+            print(f"Embedding cache write error: {e}")
+
+    def _chunks(self, texts: List[str]) -> List[List[str]]:
+        """Consecutive runs of at most max_batch_size texts and max_batch_tokens estimated tokens"""
+        chunks, chunk, tokens = [], [], 0
+        for text in texts:
+            estimate = len(text) // CHARS_PER_TOKEN + 1
+            if chunk and (len(chunk) >= self.max_batch_size or tokens + estimate > self.max_batch_tokens):
+                chunks.append(chunk)
+                chunk, tokens = [], 0
+            chunk.append(text)
+            tokens += estimate
+        if chunk:
+            chunks.append(chunk)
+        return chunks
+
+    def _call_chunk(self, model, chunk: List[str]) -> List[Union[List[float], Exception]]:
+        """One get_embeddings request; on failure, bisect so only the bad texts fail"""
+        self.stats_counters['api_calls'] += 1
+        self.stats_counters['api_texts'] += len(chunk)
+        try:
+            vectors = [e.values for e in model.get_embeddings(chunk)]
+            if len(vectors) != len(chunk):
+                raise RuntimeError(f"{self.model_name} returned {len(vectors)} vectors for {len(chunk)} texts")
+            return vectors
+        except Exception as e:
+            if len(chunk) == 1 or type(e).__name__ in _SERVICE_ERRORS:
+                self.stats_counters['failed_texts'] += len(chunk)
+                return [e] * len(chunk)
+            self.stats_counters['api_splits'] += 1
+            middle = len(chunk) // 2
+            return self._call_chunk(model, chunk[:middle]) + self._call_chunk(model, chunk[middle:])
+
+    def _call_model(self, texts: List[str]) -> List[Union[List[float], Exception]]:
+        """
+        Vectors for texts, in order, using as few requests as the batch and
+        token limits allow. A text the model couldn't embed gets the
+        exception in place of its vector.
+        """
+        model = self._get_model()
+        results = []
+        for chunk in self._chunks(texts):
+            results.extend(self._call_chunk(model, chunk))
+        return results
+
+    # ------------------------------------------------------------------
+    # Coalescing worker
+    # ------------------------------------------------------------------
+
+    def _ensure_worker(self) -> None:
+        if self._worker is None or not self._worker.is_alive():
+            with self._inflight_lock:
+                if self._worker is None or not self._worker.is_alive():
+                    self._worker = threading.Thread(target=self._run_worker, name="embedding-coalescer", daemon=True)
+                    self._worker.start()
+
+    def _run_worker(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.coalesce_window
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                self._flush(batch)
+            except Exception as e:
+                # Never let the worker die: fail this batch and keep serving
+                print(f"Embedding worker error: {e}")
+                self._resolve([key for key, _ in batch], {}, e)
+
+    def _flush(self, batch: List[tuple]) -> None:
+        keys = [key for key, _ in batch]
+        try:
+            outcome = dict(zip(keys, self._call_model([text for _, text in batch])))
+            self._persist({key: value for key, value in outcome.items() if not isinstance(value, Exception)})
+            error = None
+        except Exception as e:
+            outcome, error = {}, e
+        self._resolve(keys, outcome, error)
+
+    def _resolve(self, keys: List[str], outcome: Dict[str, Union[List[float], Exception]],
+                 error: Optional[Exception]) -> None:
+        """Settle the in-flight futures of keys (per-text exceptions and missing vectors become errors)"""
+        with self._inflight_lock:
+            futures = [(key, self._inflight.pop(key, None)) for key in keys]
+        for key, future in futures:
+            if future is None or future.done():
+                continue
+            vector = outcome.get(key)
+            if error is not None:
+                future.set_exception(error)
+            elif isinstance(vector, Exception):
+                future.set_exception(vector)
+            elif vector is None:
+                future.set_exception(RuntimeError(
+                    f"{self.model_name} returned {len(outcome)} vectors for {len(keys)} texts"
+                ))
+            else:
+                future.set_result(vector)
+
+    def submit(self, text: str) -> Future:
+        """Queue a text for embedding; returns a Future resolving to the vector"""
+        key = self._key(text)
+        cached = self._lookup(key)
+        if cached is not None:
+            future = Future()
+            future.set_result(cached)
+            return future
+
+        with self._inflight_lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                self.stats_counters['coalesced'] += 1
+                return future
+            future = Future()
+            self._inflight[key] = future
+            self.stats_counters['misses'] += 1
+
+        self._ensure_worker()
+        self._queue.put((key, text))
+        return future
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def embed(self, text: str, timeout: Optional[float] = EMBEDDING_TIMEOUT) -> List[float]:
+        """Embed one text (cached; batched with concurrent callers)"""
+        return self.submit(text).result(timeout=timeout)
+
+    def embed_many(self, texts: List[str], skip_failed: bool = False) -> List[List[float]]:
+        """
+        Embed many texts with cache lookups and as few model calls as possible.
+        
+        If the model can't embed some texts, the others are still cached; then
+        the first error is raised, or with skip_failed those texts get [].
+        """
+        results: List[Optional[List[float]]] = [None] * len(texts)
+        missing: Dict[str, List[int]] = {}
+        missing_text: Dict[str, str] = {}
+
+        for i, text in enumerate(texts):
+            key = self._key(text)
+            cached = self._lookup(key)
+            if cached is not None:
+                results[i] = cached
+            else:
+                missing.setdefault(key, []).append(i)
+                missing_text[key] = text
+
+        if missing:
+            keys = list(missing.keys())
+            self.stats_counters['misses'] += len(keys)
+            outcome = dict(zip(keys, self._call_model([missing_text[key] for key in keys])))
+            failed = {key: value for key, value in outcome.items() if isinstance(value, Exception)}
+            self._persist({key: value for key, value in outcome.items() if key not in failed})
+            if failed:
+                first = next(iter(failed.values()))
+                if not skip_failed:
+                    raise first
+                print(f"Embedding failed for {len(failed)} of {len(keys)} texts: {first}")
+            for key, vector in outcome.items():
+                for i in missing[key]:
+                    results[i] = [] if key in failed else vector
+
+        return results
+
+    async def aembed(self, text: str) -> List[float]:
+        """Async embed; concurrent coroutines are coalesced into shared batches"""
+        return await asyncio.wrap_future(self.submit(text))
+
+    async def aembed_many(self, texts: List[str]) -> List[List[float]]:
+        return list(await asyncio.gather(*(self.aembed(text) for text in texts)))
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.stats_counters['memory_hits'] + self.stats_counters['disk_hits'] + self.stats_counters['misses']
+        hits = self.stats_counters['memory_hits'] + self.stats_counters['disk_hits']
+        return {
+            'model': self.model_name,
+            **self.stats_counters,
+            'hit_rate': round(hits / lookups, 3) if lookups else 0.0,
+            'memory_cache_entries': len(self._lru)
+        }
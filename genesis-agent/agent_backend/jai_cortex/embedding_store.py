@@ -0,0 +1,369 @@
+"""
+JAi Cortex OS - Memory-Mapped Embedding Store
+Exact vectorized similarity search over pre-normalized embeddings
+
+Layout (one shard per user_id):
+    <root>/<shard>/vectors-<gen>-<tag>.npy   float32 (N x D), rows L2-normalized
+    <root>/<shard>/ids-<gen>-<tag>.npy       conversation ids, parallel to vectors
+    <root>/<shard>/meta.json                 {"user_id", "count", "dim", "generation", "files"}
+    <root>/<shard>/.lock                     held by writers (fcntl.flock)
+
+Shards are opened with np.load(mmap_mode='r'), so every worker process maps
+the same page cache read-only with zero copies. Every save writes a new
+generation of both arrays and then atomically replaces meta.json, which
+names the current generation; readers re-map when meta.json changes, so
+ids and vectors always come from the same write. The previous generation
+is kept for readers that are mid-refresh.
+
+Every worker process may write: a save takes the shard's exclusive file
+lock, re-reads the current generation, merges its pending rows into it and
+publishes the result, so concurrent saves serialize instead of overwriting
+each other. File names carry a pid/uuid tag, so no two writers ever share
+a temporary or generation file.
+"""
+
+import os
+import re
+import glob
+import json
+import uuid
+import hashlib
+import threading
+from contextlib import contextmanager
+from collections import defaultdict
+from typing import List, Tuple, Dict, Optional, Iterable
+
+import numpy as np
+
+from .vector_index import VectorIndex, _normalize, _top_k
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locking, single writer only
+    fcntl = None
+
+
+DEFAULT_SHARD = '_shared'
+
+
+def _shard_name(user_id: Optional[str]) -> str:
+    """Filesystem-safe, collision-free directory name for a user_id"""
+    user_id = user_id or DEFAULT_SHARD
+    safe = re.sub(r'[^A-Za-z0-9_.-]', '_', user_id)[:48]
+    digest = hashlib.sha1(user_id.encode('utf-8')).hexdigest()[:8]
+    return f"{safe}-{digest}"
+
+
+class _Shard:
+    """One user's mapped matrix plus rows added since the last save"""
+
+    def __init__(self, path: str, user_id: str):
+        self.path = path
+        self.user_id = user_id
+        self.vectors: Optional[np.ndarray] = None   # read-only memmap
+        self.ids: Optional[np.ndarray] = None
+        self.positions: Optional[Dict[str, int]] = None
+        self.file_stamp = None
+        self.generation = 0
+        self.pending_ids: List[str] = []
+        self.pending_rows: List[np.ndarray] = []
+        self.pending_positions: Dict[str, int] = {}
+        self.shadowed: set = set()  # mapped ids overwritten by a pending row
+
+    @property
+    def meta_file(self) -> str:
+        return os.path.join(self.path, 'meta.json')
+
+    @property
+    def lock_file(self) -> str:
+        return os.path.join(self.path, '.lock')
+
+    # Generation 0 is the unversioned layout written before generations existed;
+    # meta.json written before tagged names carries no "files" entry
+    def data_files(self, meta: Dict) -> Tuple[str, str]:
+        files = meta.get('files')
+        if files:
+            return os.path.join(self.path, files['vectors']), os.path.join(self.path, files['ids'])
+        generation = int(meta.get('generation', 0))
+        if not generation:
+            return os.path.join(self.path, 'vectors.npy'), os.path.join(self.path, 'ids.npy')
+        return (os.path.join(self.path, f'vectors-{generation}.npy'),
+                os.path.join(self.path, f'ids-{generation}.npy'))
+
+    @contextmanager
+    def write_lock(self):
+        """Exclusive cross-process lock for read-merge-write of this shard"""
+        os.makedirs(self.path, exist_ok=True)
+        with open(self.lock_file, 'a') as f:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    def _stamp(self):
+        try:
+            st = os.stat(self.meta_file)
+            return (st.st_ino, st.st_mtime_ns, st.st_size)
+        except FileNotFoundError:
+            return None
+
+    def refresh(self) -> None:
+        """(Re)map the generation named by meta.json if it changed since we last opened it"""
+        stamp = self._stamp()
+        if stamp == self.file_stamp:
+            return
+        if stamp is None:
+            self.vectors, self.ids, self.generation = None, None, 0
+        else:
+            try:
+                with open(self.meta_file, 'r') as f:
+                    meta = json.load(f)
+                generation = int(meta.get('generation', 0))
+                vectors_file, ids_file = self.data_files(meta)
+                vectors = np.load(vectors_file, mmap_mode='r')
+                ids = np.load(ids_file, mmap_mode='r')
+            except (FileNotFoundError, ValueError):
+                return  # a writer moved on mid-refresh; keep the current mapping and retry next time
+            self.vectors, self.ids, self.generation = vectors, ids, generation
+        self.positions = None
+        self.file_stamp = stamp
+
+    @property
+    def mapped_count(self) -> int:
+        return 0 if self.ids is None else int(self.ids.shape[0])
+
+    def mapped_position(self, doc_id: str) -> Optional[int]:
+        if self.ids is None:
+            return None
+        if self.positions is None:
+            self.positions = {str(doc_id): i for i, doc_id in enumerate(self.ids)}
+        return self.positions.get(doc_id)
+
+
+class EmbeddingStore(VectorIndex):
+    """
+    Sharded, memory-mapped embedding matrix with exact top-k search.
+
+    A query is one matrix-vector product per shard followed by argpartition,
+    so there is no per-vector Python work and no training step.
+    """
+
+    backend = 'mmap'
+
+    def __init__(self, root: str):
+        self.root = root
+        self.dim = 0
+        self._shards: Dict[str, _Shard] = {}
+        self._lock = threading.RLock()
+        self._discover()
+
+    def _discover(self) -> None:
+        if not os.path.isdir(self.root):
+            return
+        for name in sorted(os.listdir(self.root)):
+            meta_path = os.path.join(self.root, name, 'meta.json')
+            if not os.path.exists(meta_path):
+                continue
+            with open(meta_path, 'r') as f:
+                meta = json.load(f)
+            self._shards[meta['user_id']] = _Shard(os.path.join(self.root, name), meta['user_id'])
+            self.dim = self.dim or int(meta.get('dim', 0))
+
+    def _shard(self, user_id: Optional[str], create: bool = False) -> Optional[_Shard]:
+        user_id = user_id or DEFAULT_SHARD
+        shard = self._shards.get(user_id)
+        if shard is None and create:
+            shard = _Shard(os.path.join(self.root, _shard_name(user_id)), user_id)
+            self._shards[user_id] = shard
+        return shard
+
+    def __len__(self) -> int:
+        with self._lock:
+            total = 0
+            for shard in self._shards.values():
+                shard.refresh()
+                total += shard.mapped_count + len(shard.pending_ids) - len(shard.shadowed)
+            return total
+
+    def __contains__(self, doc_id: str) -> bool:
+        with self._lock:
+            for shard in self._shards.values():
+                shard.refresh()
+                if doc_id in shard.pending_positions or shard.mapped_position(doc_id) is not None:
+                    return True
+            return False
+
+    def user_ids(self) -> List[str]:
+        """Users that have a shard"""
+        return list(self._shards.keys())
+
+    def add(self, doc_id: str, vector: List[float], user_id: Optional[str] = None) -> bool:
+        """Buffer a row in the user's shard; it is searchable immediately and persisted by save()"""
+        row = _normalize(vector)
+        if row is None:
+            return False
+
+        with self._lock:
+            if not self.dim:
+                self.dim = row.shape[0]
+            if row.shape[0] != self.dim:
+                print(f"Embedding store dimension mismatch for {doc_id}: {row.shape[0]} != {self.dim}")
+                return False
+
+            shard = self._shard(user_id, create=True)
+            shard.refresh()
+            position = shard.pending_positions.get(doc_id)
+            if position is not None:
+                shard.pending_rows[position] = row
+                return True
+
+            if shard.mapped_position(doc_id) is not None:
+                shard.shadowed.add(doc_id)
+            shard.pending_positions[doc_id] = len(shard.pending_ids)
+            shard.pending_ids.append(doc_id)
+            shard.pending_rows.append(row)
+            return True
+
+    def _search_shard(self, shard: _Shard, q: np.ndarray, top_k: int) -> List[Tuple[str, float]]:
+        shard.refresh()
+        hits = []
+
+        if shard.mapped_count:
+            scores = shard.vectors @ q
+            # Over-fetch so rows shadowed by a pending update can be dropped
+            best = _top_k(scores, top_k + len(shard.shadowed))
+            for i in best:
+                doc_id = str(shard.ids[i])
+                if doc_id not in shard.shadowed:
+                    hits.append((doc_id, float(scores[i])))
+
+        if shard.pending_rows:
+            scores = np.stack(shard.pending_rows) @ q
+            for i in _top_k(scores, top_k):
+                hits.append((shard.pending_ids[i], float(scores[i])))
+
+        return hits
+
+    def search(self, query: List[float], top_k: int = 5, user_id: Optional[str] = None) -> List[Tuple[str, float]]:
+        """Top-k over one user's shard, or over every shard when user_id is None"""
+        q = _normalize(query)
+        if q is None or top_k <= 0:
+            return []
+
+        with self._lock:
+            if q.shape[0] != self.dim:
+                return []
+            if user_id is not None:
+                shard = self._shard(user_id)
+                shards = [shard] if shard else []
+            else:
+                shards = list(self._shards.values())
+
+            hits = []
+            for shard in shards:
+                hits.extend(self._search_shard(shard, q, top_k))
+
+        hits.sort(key=lambda hit: hit[1], reverse=True)
+        return hits[:top_k]
+
+    def _write_shard(self, shard: _Shard, ids: np.ndarray, vectors: np.ndarray) -> None:
+        """
+        Write a new generation, then atomically point meta.json at it (existing
+        mappings stay valid). Call with shard.write_lock() held.
+        """
+        os.makedirs(shard.path, exist_ok=True)
+        generation = shard.generation + 1
+        tag = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        files = {'vectors': f'vectors-{generation}-{tag}.npy', 'ids': f'ids-{generation}-{tag}.npy'}
+        for name, array in ((files['vectors'], vectors), (files['ids'], ids)):
+            with open(os.path.join(shard.path, name), 'wb') as f:
+                np.save(f, array)
+
+        meta_tmp = f"{shard.meta_file}.{tag}.tmp"
+        with open(meta_tmp, 'w') as f:
+            json.dump({'user_id': shard.user_id, 'count': int(ids.shape[0]), 'dim': self.dim,
+                       'generation': generation, 'files': files}, f)
+        os.replace(meta_tmp, shard.meta_file)
+
+        # Keep the previous generation for readers that read the old meta.json;
+        # anything else (older generations, leftovers of a crashed writer) goes
+        for path in glob.glob(os.path.join(shard.path, '*.npy')) + glob.glob(f"{shard.meta_file}.*.tmp"):
+            match = re.match(r'(?:vectors|ids)-(\d+)(?:-[\w-]+)?\.npy$', os.path.basename(path))
+            if match is None or int(match.group(1)) < generation - 1:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+    def _clear_pending(self, shard: _Shard) -> None:
+        shard.pending_ids, shard.pending_rows = [], []
+        shard.pending_positions, shard.shadowed = {}, set()
+
+    def save(self, path: Optional[str] = None) -> None:
+        """Merge pending rows into each shard's latest generation (under the shard's file lock)"""
+        with self._lock:
+            for shard in self._shards.values():
+                if not shard.pending_ids:
+                    continue
+                with shard.write_lock():
+                    # Another process may have published since our last refresh
+                    shard.refresh()
+
+                    if shard.mapped_count:
+                        pending = set(shard.pending_ids)
+                        keep = np.array([str(doc_id) not in pending for doc_id in shard.ids], dtype=bool)
+                        ids = np.concatenate([np.asarray(shard.ids[keep]).astype(str), np.array(shard.pending_ids, dtype=str)])
+                        vectors = np.concatenate([np.asarray(shard.vectors[keep]), np.stack(shard.pending_rows)])
+                    else:
+                        ids = np.array(shard.pending_ids, dtype=str)
+                        vectors = np.stack(shard.pending_rows)
+
+                    self._write_shard(shard, ids, np.ascontiguousarray(vectors, dtype=np.float32))
+                    self._clear_pending(shard)
+                    shard.refresh()
+
+    def rebuild(self, records: Iterable[Tuple[Optional[str], str, List[float]]]) -> int:
+        """
+        Replace every shard from (user_id, doc_id, embedding) records,
+        e.g. a full pass over the memory_embeddings collection.
+
+        Returns the number of rows written.
+        """
+        grouped: Dict[str, Dict[str, np.ndarray]] = defaultdict(dict)
+        for user_id, doc_id, embedding in records:
+            row = _normalize(embedding)
+            if row is None:
+                continue
+            if not self.dim:
+                self.dim = row.shape[0]
+            if row.shape[0] == self.dim:
+                grouped[user_id or DEFAULT_SHARD][doc_id] = row
+
+        with self._lock:
+            stale = set(self._shards) - set(grouped)
+            for user_id in stale:
+                shard = self._shards.pop(user_id)
+                with shard.write_lock():
+                    for path in [shard.meta_file] + glob.glob(os.path.join(shard.path, '*.npy')):
+                        try:
+                            os.remove(path)
+                        except FileNotFoundError:
+                            pass
+
+            total = 0
+            for user_id, rows in grouped.items():
+                shard = self._shard(user_id, create=True)
+                with shard.write_lock():
+                    shard.refresh()
+                    self._write_shard(
+                        shard,
+                        np.array(list(rows.keys()), dtype=str),
+                        np.ascontiguousarray(np.stack(list(rows.values())), dtype=np.float32)
+                    )
+                    self._clear_pending(shard)
+                    shard.refresh()
+                total += len(rows)
+            return total
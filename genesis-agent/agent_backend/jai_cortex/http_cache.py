@@ -0,0 +1,389 @@
+"""
+JAi Cortex OS - HTTP Cache
+Shared on-disk cache for web research, scraping and search API calls
+
+Two tables in one SQLite file:
+
+    responses   raw 2xx response bodies keyed by method + URL + params, with
+                the ETag / Last-Modified validators and a per-source expiry
+    extracted   derived results (cleaned page text, design analysis) keyed by
+                namespace + URL + sha256 of the body they were derived from
+
+A fresh response is served without touching the network. A stale one is
+revalidated with If-None-Match / If-Modified-Since; a 304 renews it and, since
+the body hash is unchanged, the extracted-result lookup still hits, so repeat
+research skips both the download and BeautifulSoup. If revalidation fails the
+stale copy is served rather than nothing.
+
+The file is kept under max_bytes by evicting least recently used rows.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from urllib.parse import urlencode
+from typing import Dict, Any, Optional
+
+import requests
+
+
+HTTP_CACHE_PATH = os.environ.get(
+    'HTTP_CACHE_PATH',
+    os.path.join(os.path.expanduser('~'), '.jai_cortex', 'http_cache.sqlite3')
+)
+HTTP_CACHE_MAX_BYTES = int(os.environ.get('HTTP_CACHE_MAX_MB', '256')) * 1024 * 1024
+
+# Seconds a response is served without revalidation, per source.
+# Override with HTTP_CACHE_TTL_<SOURCE>, e.g. HTTP_CACHE_TTL_SEARCH=3600
+SOURCE_TTLS = {
+    'page': 6 * 3600,      # articles extracted for research
+    'design': 3600,        # live sites scraped for design data
+    'css': 24 * 3600,      # stylesheets (usually fingerprinted)
+    'search': 12 * 3600,   # Custom Search API result lists
+    'default': 3600,
+}
+
+# Response headers worth keeping with the body
+_KEPT_HEADERS = ('content-type', 'etag', 'last-modified', 'cache-control', 'content-encoding')
+
+
+def _ttl_for(source: str) -> int:
+    override = os.environ.get(f'HTTP_CACHE_TTL_{source.upper()}')
+    if override:
+        return int(override)
+    return SOURCE_TTLS.get(source, SOURCE_TTLS['default'])
+
+
+class CachedResponse:
+    """The parts of requests.Response the callers use, served from cache or network"""
+
+    def __init__(
+        self,
+        url: str,
+        status_code: int,
+        content: bytes,
+        headers: Dict[str, str],
+        from_cache: bool = False,
+        revalidated: bool = False
+    ):
+        self.url = url
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers
+        self.from_cache = from_cache
+        self.revalidated = revalidated
+        self.content_hash = hashlib.sha256(content).hexdigest()
+
+    @property
+    def text(self) -> str:
+        content_type = self.headers.get('content-type', '')
+        encoding = 'utf-8'
+        if 'charset=' in content_type:
+            encoding = content_type.split('charset=')[-1].split(';')[0].strip().strip('"\'') or encoding
+        try:
+            return self.content.decode(encoding, errors='replace')
+        except LookupError:
+            # Unknown charset label
+            return self.content.decode('utf-8', errors='replace')
+
+    def json(self) -> Any:
+        return json.loads(self.content)
+
+    def raise_for_status(self) -> None:
+        """Only 2xx responses are ever returned, so this never raises"""
+        return None
+
+
+class HttpCache:
+    """SQLite-backed response + extracted-result cache with LRU size bound"""
+
+    def __init__(self, path: Optional[str] = HTTP_CACHE_PATH, max_bytes: int = HTTP_CACHE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._db: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._writes_since_evict = 0
+
+        self.stats_counters = {
+            'fresh_hits': 0,
+            'revalidated': 0,
+            'stale_served': 0,
+            'misses': 0,
+            'extracted_hits': 0,
+            'extracted_misses': 0,
+            'evicted': 0
+        }
+
+    # ------------------------------------------------------------------
+    # Storage
+    # ------------------------------------------------------------------
+
+    def _get_db(self) -> Optional[sqlite3.Connection]:
+        if self.path is None:
+            return None
+        if self._db is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, url TEXT, source TEXT, status INTEGER, headers TEXT, body BLOB, "
+                "etag TEXT, last_modified TEXT, fetched_at REAL, expires_at REAL, last_access REAL, size INTEGER)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS extracted ("
+                "key TEXT PRIMARY KEY, namespace TEXT, url TEXT, value TEXT, last_access REAL, size INTEGER)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS responses_lru ON responses (last_access)")
+            conn.execute("CREATE INDEX IF NOT EXISTS extracted_lru ON extracted (last_access)")
+            self._db = conn
+        return self._db
+
+    @staticmethod
+    def _key(method: str, url: str, params: Optional[Dict[str, Any]] = None) -> str:
+        query = urlencode(sorted((params or {}).items()), doseq=True)
+        return hashlib.sha256(f"{method.upper()} {url}?{query}".encode('utf-8')).hexdigest()
+
+    def _load(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            with self._lock:
+                db = self._get_db()
+                if db is None:
+                    return None
+                row = db.execute(
+                    "SELECT url, status, headers, body, etag, last_modified, expires_at FROM responses WHERE key = ?",
+                    (key,)
+                ).fetchone()
+                if row is not None:
+                    db.execute("UPDATE responses SET last_access = ? WHERE key = ?", (time.time(), key))
+                    db.commit()
+        except sqlite3.Error as e:
+            print(f"HTTP cache read error: {e}")
+            return None
+
+        if row is None:
+            return None
+        url, status, headers, body, etag, last_modified, expires_at = row
+        return {
+            'url': url,
+            'status': status,
+            'headers': json.loads(headers),
+            'body': body,
+            'etag': etag,
+            'last_modified': last_modified,
+            'expires_at': expires_at
+        }
+
+    def _store(self, key: str, url: str, source: str, response: requests.Response) -> None:
+        headers = {name: response.headers[name] for name in _KEPT_HEADERS if name in response.headers}
+        now = time.time()
+        try:
+            with self._lock:
+                db = self._get_db()
+                if db is None:
+                    return
+                db.execute(
+                    "INSERT OR REPLACE INTO responses "
+                    "(key, url, source, status, headers, body, etag, last_modified, fetched_at, expires_at, last_access, size) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        key, url, source, response.status_code, json.dumps(headers), response.content,
+                        headers.get('etag'), headers.get('last-modified'),
+                        now, now + _ttl_for(source), now, len(response.content)
+                    )
+                )
+                db.commit()
+                self._maybe_evict(db)
+        except sqlite3.Error as e:
+            print(f"HTTP cache write error: {e}")
+
+    def _renew(self, key: str, source: str) -> None:
+        now = time.time()
+        try:
+            with self._lock:
+                db = self._get_db()
+                if db is not None:
+                    db.execute(
+                        "UPDATE responses SET fetched_at = ?, expires_at = ?, last_access = ? WHERE key = ?",
+                        (now, now + _ttl_for(source), now, key)
+                    )
+                    db.commit()
+        except sqlite3.Error as e:
+            print(f"HTTP cache write error: {e}")
+
+    def _forget(self, key: str) -> None:
+        try:
+            with self._lock:
+                db = self._get_db()
+                if db is not None:
+                    db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    db.commit()
+        except sqlite3.Error as e:
+            print(f"HTTP cache write error: {e}")
+
+    def _maybe_evict(self, db: sqlite3.Connection) -> None:
+        """Drop least recently used rows until both tables fit in max_bytes (caller holds the lock)"""
+        self._writes_since_evict += 1
+        if self._writes_since_evict < 20:
+            return
+        self._writes_since_evict = 0
+
+        total = sum(
+            db.execute(f"SELECT COALESCE(SUM(size), 0) FROM {table}").fetchone()[0]
+            for table in ('responses', 'extracted')
+        )
+        if total <= self.max_bytes:
+            return
+
+        # Evict down to 90% so we don't run this on every write at the limit
+        excess = total - int(self.max_bytes * 0.9)
+        rows = db.execute(
+            "SELECT 'responses', key, size, last_access FROM responses "
+            "UNION ALL SELECT 'extracted', key, size, last_access FROM extracted "
+            "ORDER BY last_access"
+        )
+        victims = {'responses': [], 'extracted': []}
+        for table, key, size, _ in rows:
+            if excess <= 0:
+                break
+            victims[table].append((key,))
+            excess -= size or 0
+
+        for table, keys in victims.items():
+            if keys:
+                db.executemany(f"DELETE FROM {table} WHERE key = ?", keys)
+                self.stats_counters['evicted'] += len(keys)
+        db.commit()
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def fetch(
+        self,
+        session: requests.Session,
+        url: str,
+        params: Optional[Dict[str, Any]] = None,
+        headers: Optional[Dict[str, str]] = None,
+        timeout: float = 10,
+        source: str = 'default'
+    ) -> CachedResponse:
+        """
+        GET through the cache.
+
+        Raises requests exceptions exactly like session.get + raise_for_status,
+        except that a stale cached copy is returned if revalidation fails with
+        a connection error, a timeout or a 5xx. A 404/410 drops the cached copy.
+        """
+        key = self._key('GET', url, params)
+        cached = self._load(key)
+
+        if cached is not None and cached['expires_at'] > time.time():
+            self.stats_counters['fresh_hits'] += 1
+            return CachedResponse(url, cached['status'], cached['body'], cached['headers'], from_cache=True)
+
+        request_headers = dict(headers or {})
+        if cached is not None:
+            if cached['etag']:
+                request_headers['If-None-Match'] = cached['etag']
+            if cached['last_modified']:
+                request_headers['If-Modified-Since'] = cached['last_modified']
+
+        try:
+            response = session.get(url, params=params, headers=request_headers, timeout=timeout)
+        except (requests.ConnectionError, requests.Timeout):
+            if cached is None:
+                raise
+            return self._serve_stale(url, cached)
+
+        if cached is not None:
+            if response.status_code == 304:
+                self.stats_counters['revalidated'] += 1
+                self._renew(key, source)
+                return CachedResponse(
+                    url, cached['status'], cached['body'], cached['headers'],
+                    from_cache=True, revalidated=True
+                )
+            if response.status_code >= 500:
+                return self._serve_stale(url, cached)
+            if response.status_code in (404, 410):
+                self._forget(key)  # the page is gone, not just unreachable
+        response.raise_for_status()
+
+        self.stats_counters['misses'] += 1
+        if 'no-store' not in response.headers.get('cache-control', '').lower():
+            self._store(key, url, source, response)
+        kept = {name: response.headers[name] for name in _KEPT_HEADERS if name in response.headers}
+        return CachedResponse(url, response.status_code, response.content, kept)
+
+    def _serve_stale(self, url: str, cached: Dict[str, Any]) -> CachedResponse:
+        self.stats_counters['stale_served'] += 1
+        print(f"⚠️  Serving stale cached copy of {url}")
+        return CachedResponse(url, cached['status'], cached['body'], cached['headers'], from_cache=True)
+
+    def get_extracted(self, namespace: str, url: str, content_hash: str) -> Optional[Any]:
+        """Previously derived result for this exact body, or None"""
+        key = hashlib.sha256(f"{namespace}\x00{url}\x00{content_hash}".encode('utf-8')).hexdigest()
+        try:
+            with self._lock:
+                db = self._get_db()
+                if db is None:
+                    return None
+                row = db.execute("SELECT value FROM extracted WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    db.execute("UPDATE extracted SET last_access = ? WHERE key = ?", (time.time(), key))
+                    db.commit()
+        except sqlite3.Error as e:
+            print(f"HTTP cache read error: {e}")
+            return None
+
+        if row is None:
+            self.stats_counters['extracted_misses'] += 1
+            return None
+        self.stats_counters['extracted_hits'] += 1
+        return json.loads(row[0])
+
+    def put_extracted(self, namespace: str, url: str, content_hash: str, value: Any) -> None:
+        """Remember a JSON-serializable result derived from a response body"""
+        key = hashlib.sha256(f"{namespace}\x00{url}\x00{content_hash}".encode('utf-8')).hexdigest()
+        payload = json.dumps(value)
+        try:
+            with self._lock:
+                db = self._get_db()
+                if db is None:
+                    return
+                db.execute(
+                    "INSERT OR REPLACE INTO extracted (key, namespace, url, value, last_access, size) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, namespace, url, payload, time.time(), len(payload))
+                )
+                db.commit()
+                self._maybe_evict(db)
+        except sqlite3.Error as e:
+            print(f"HTTP cache write error: {e}")
+
+    def clear(self) -> None:
+        with self._lock:
+            db = self._get_db()
+            if db is not None:
+                db.execute("DELETE FROM responses")
+                db.execute("DELETE FROM extracted")
+                db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.stats_counters['fresh_hits'] + self.stats_counters['revalidated'] + self.stats_counters['misses']
+        network_saved = self.stats_counters['fresh_hits'] + self.stats_counters['revalidated']
+        return {
+            **self.stats_counters,
+            'hit_rate': round(network_saved / lookups, 3) if lookups else 0.0,
+            'max_bytes': self.max_bytes
+        }
+
+
+# Global cache shared by the research, scraping and search modules
+http_cache = HttpCache()
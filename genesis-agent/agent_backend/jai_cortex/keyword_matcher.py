@@ -0,0 +1,124 @@
+"""
+Keyword Matcher - Compiled multi-pattern classification engine
+
+Replaces chains of `any(word in text for word in [...])` with one compiled
+regex per rule table and a single pass over the message.
+
+Rules are declarative: an ordered list of (label, keywords). Matching is
+word-boundary aware:
+- keywords of up to 3 characters must be whole words (an optional plural
+  "s" is allowed), so 'ui' no longer fires on "build" and 'ad' not on "read"
+- longer keywords match at the start of a word, so 'deploy' still covers
+  "deployed" and "deployment"
+- multi-word phrases ("cloud run", "could you") follow the same rules
+- boundaries are "no word character on that side" rather than a regex
+  word boundary, so keywords that start or end with punctuation ('c++',
+  '.net') still match
+"""
+
+
+import re
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+Rule = Tuple[str, Sequence[str]]
+
+
+def _is_word_char(char: str) -> bool:
+    return bool(char) and (char.isalnum() or char == '_')
+
+
+class KeywordMatcher:
+    """Ordered rule table compiled into a single alternation regex"""
+
+    def __init__(self, rules: Iterable[Rule], short_word_length: int = 3):
+        self.rules: List[Rule] = [(label, tuple(k.lower() for k in keywords)) for label, keywords in rules]
+        self.labels_in_order = [label for label, _ in self.rules]
+        self.short_word_length = short_word_length
+
+        # keyword -> labels it belongs to (a keyword may feed several rules)
+        self._keyword_labels: Dict[str, List[str]] = {}
+        for label, keywords in self.rules:
+            for keyword in keywords:
+                labels = self._keyword_labels.setdefault(keyword, [])
+                if label not in labels:
+                    labels.append(label)
+
+        keywords = sorted(self._keyword_labels, key=len, reverse=True)
+        self._whole_word = {k: len(k) <= short_word_length for k in keywords}
+
+        # Shorter keywords that are necessarily matched wherever a longer one
+        # matches at the same position ('price' inside 'price compare')
+        self._implied: Dict[str, List[str]] = {}
+        for keyword in keywords:
+            implied = [keyword]
+            for other in keywords:
+                if other != keyword and keyword.startswith(other) and self._covers(other, keyword):
+                    implied.append(other)
+            self._implied[keyword] = implied
+
+        # Zero-width lookahead at each token start so overlapping phrases that
+        # begin at later words are still found; longest alternative wins per start
+        alternation = '|'.join(self._pattern(k) for k in keywords)
+        self._regex = re.compile(rf'(?<!\w)(?=({alternation}))') if keywords else None
+
+    def _pattern(self, keyword: str) -> str:
+        escaped = re.escape(keyword)
+        if self._whole_word[keyword]:
+            return rf'{escaped}s?(?!\w)'
+        return escaped
+
+    def _covers(self, shorter: str, longer: str) -> bool:
+        """True if `shorter` (a prefix of `longer`) matches wherever `longer` does"""
+        if not self._whole_word[shorter]:
+            return True
+        rest = longer[len(shorter):]
+        if not _is_word_char(rest[:1]):
+            return True
+        return rest[:1] == 's' and not _is_word_char(rest[1:2])
+
+    def _hits(self, text: str) -> List[str]:
+        """Keywords found in text, one entry per matching position"""
+        if self._regex is None or not text:
+            return []
+        hits = []
+        for match in self._regex.finditer(text.lower()):
+            found = match.group(1)
+            keyword = found if found in self._implied else found[:-1]  # strip plural 's'
+            hits.extend(self._implied[keyword])
+        return hits
+
+    def scores(self, text: str) -> Counter:
+        """label -> number of keyword hits"""
+        counts = Counter()
+        for keyword in self._hits(text):
+            for label in self._keyword_labels[keyword]:
+                counts[label] += 1
+        return counts
+
+    def matches(self, text: str) -> Dict[str, List[str]]:
+        """label -> distinct keywords found, in the rule's declaration order"""
+        found = set(self._hits(text))
+        result = {}
+        for label, keywords in self.rules:
+            hit = [k for k in dict.fromkeys(keywords) if k in found]
+            if hit:
+                result[label] = hit
+        return result
+
+    def labels(self, text: str) -> List[str]:
+        """Every matching label, in rule order"""
+        found = self.scores(text)
+        return [label for label in self.labels_in_order if found[label]]
+
+    def first(self, text: str, default: Optional[str] = None) -> Optional[str]:
+        """First matching label in rule (priority) order"""
+        found = self.scores(text)
+        for label in self.labels_in_order:
+            if found[label]:
+                return label
+        return default
+
+    def any(self, text: str) -> bool:
+        return bool(self._hits(text))
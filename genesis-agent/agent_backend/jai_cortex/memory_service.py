@@ -4,11 +4,18 @@ Uses Vertex AI Vector Search for infinite memory
 """
 
 import os
-from typing import List, Dict, Any
+import time
+import atexit
+import threading
+from typing import List, Dict, Any, Tuple
 from datetime import datetime
 from google.cloud import aiplatform
 from google.cloud import firestore
 
+from .embedding_client import EmbeddingClient
+from .cognitive_profile import CognitiveProfileStore
+from .keyword_matcher import KeywordMatcher
+
 PROJECT_ID = "studio-2416451423-f2d96"
 LOCATION = "us-central1"
 
@@ -16,29 +23,95 @@ LOCATION = "us-central1"
 aiplatform.init(project=PROJECT_ID, location=LOCATION)
 db = firestore.Client(project=PROJECT_ID, database='agent-master-database')
 
+# Local ANN index over memory_embeddings (see vector_index.py)
+# 'ivf' / 'flat' snapshot to a single .npz file; 'mmap' (embedding_store.py)
+# keeps per-user memory-mapped .npy shards in a directory
+MEMORY_INDEX_BACKEND = os.environ.get('MEMORY_INDEX_BACKEND', 'ivf')
+MEMORY_INDEX_PATH = os.environ.get(
+    'MEMORY_INDEX_PATH',
+    os.path.join(
+        os.path.expanduser('~'), '.jai_cortex',
+        'memory_store' if MEMORY_INDEX_BACKEND == 'mmap' else 'memory_index.npz'
+    )
+)
+MEMORY_INDEX_SNAPSHOT_EVERY = int(os.environ.get('MEMORY_INDEX_SNAPSHOT_EVERY', '50'))
+# How often a loaded index is checked against Firestore for turns it never saw
+# (saved by other workers, or lost with a crash before the last snapshot)
+MEMORY_INDEX_SYNC_SECONDS = float(os.environ.get('MEMORY_INDEX_SYNC_SECONDS', '300'))
+# After a failed index load/build, wait this long before retrying (doubles per failure, max 1h)
+MEMORY_INDEX_RETRY_SECONDS = float(os.environ.get('MEMORY_INDEX_RETRY_SECONDS', '300'))
+
+# Firestore rejects WriteBatches with more than 500 writes
+FIRESTORE_BATCH_LIMIT = 500
+
+# Cognitive modeling rule tables (see keyword_matcher.py)
+BUSINESS_CONTEXT_RULES = KeywordMatcher([
+    ('agency', ['client', 'campaign', 'marketing', 'brand', 'agency', 'ad', 'creative']),
+    ('travel', ['travel', 'trip', 'destination', 'hotel', 'flight', 'booking', 'tour']),
+    ('personal', ['i feel', 'my life', 'personally', 'my family', 'myself']),
+    ('development', ['code', 'function', 'api', 'database', 'deploy', 'agent', 'tool', 'github', 'python']),
+    ('technical', ['error', 'bug', 'fix', 'implement', 'architecture', 'system']),
+])
+
+# Checked in order: the first matching style wins
+COMMUNICATION_STYLE_RULES = KeywordMatcher([
+    ('analytical', ['analyze', 'explain', 'why', 'how']),
+    ('creative', ['create', 'design', 'imagine', 'build']),
+])
+
+ENTITY_RULES = KeywordMatcher([
+    ('agent_development', ['agent']),
+    ('database', ['firestore', 'database']),
+    ('multi_agent_system', ['specialist', 'codemaster']),
+])
+
 
 class MemoryService:
     """Manages long-term memory using Vertex AI Vector Search"""
     
     def __init__(self):
         self.embedding_model = "text-embedding-004"
+        # Long-lived client: model loaded once, vectors cached by content hash
+        self.embedding_client = EmbeddingClient(self.embedding_model)
         # Vector search endpoint (will be created in Phase 2 setup)
         self.index_endpoint_name = None
         
+        # In-process vector index, loaded/built lazily on first use
+        self.index_backend = MEMORY_INDEX_BACKEND
+        self.index_path = MEMORY_INDEX_PATH
+        self._vector_index = None
+        self._index_lock = threading.Lock()
+        self._index_unsaved = 0
+        self._index_failures = 0
+        self._index_retry_at = 0.0
+        self._index_synced_at = 0.0
+        self._sync_lock = threading.Lock()
+        atexit.register(self.save_memory_index)
+        
+        # Materialized per-user daily counters behind get_cognitive_profile
+        self.profile_store = CognitiveProfileStore(db)
+        
     def generate_embedding(self, text: str) -> List[float]:
-        """Generate embedding vector for text using Vertex AI"""
+        """Generate embedding vector for text using Vertex AI (cached, see embedding_client.py)"""
         try:
-            from vertexai.language_models import TextEmbeddingModel
-            
-            model = TextEmbeddingModel.from_pretrained(self.embedding_model)
-            embeddings = model.get_embeddings([text])
-            
-            return embeddings[0].values  # Returns list of floats
+            return self.embedding_client.embed(text)  # Returns list of floats
             
         except Exception as e:
             print(f"Embedding generation error: {e}")
             return []
     
+    def generate_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed several texts in batched Vertex AI requests (cache misses only).
+        Texts the model rejects get [] without failing the rest of the batch.
+        """
+        try:
+            return self.embedding_client.embed_many(texts, skip_failed=True)
+            
+        except Exception as e:
+            print(f"Embedding generation error: {e}")
+            return [[] for _ in texts]
+    
     def save_conversation_turn(
         self,
         user_id: str,
@@ -49,41 +122,88 @@ class MemoryService:
     ) -> str:
         """Save a conversation turn to Firestore for later vector indexing"""
         try:
-            # Create memory document
-            memory_doc = {
+            doc_ids = self.save_conversation_turns([{
                 'user_id': user_id,
                 'session_id': session_id,
                 'user_message': user_message,
                 'agent_response': agent_response,
-                'timestamp': firestore.SERVER_TIMESTAMP,
-                'metadata': metadata or {}
-            }
+                'metadata': metadata
+            }])
+            return doc_ids[0]
             
-            # Save to Firestore
+        except Exception as e:
+            print(f"Error saving conversation: {e}")
+            return None
+    
+    def save_conversation_turns(self, turns: List[Dict[str, Any]]) -> List[str]:
+        """
+        Save several conversation turns at once (used by the capture pipeline)
+        
+        Every turn is embedded in one batched request, and the conversation_memory
+        and memory_embeddings docs are committed with Firestore WriteBatches.
+        Each turn is a dict with user_id, session_id, user_message, agent_response
+        and optional metadata. Returns the new conversation ids in input order.
+        """
+        if not turns:
+            return []
+        
+        # Generate combined text for embedding
+        combined_texts = [f"User: {t['user_message']}\nAgent: {t['agent_response']}" for t in turns]
+        embeddings = self.generate_embeddings(combined_texts)
+        
+        doc_ids = []
+        indexed = []
+        batch = db.batch()
+        pending_writes = 0
+        
+        for turn, combined_text, embedding in zip(turns, combined_texts, embeddings):
+            # Create memory document
             doc_ref = db.collection('conversation_memory').document()
-            doc_ref.set(memory_doc)
-            
-            # Generate combined text for embedding
-            combined_text = f"User: {user_message}\nAgent: {agent_response}"
-            
-            # Generate embedding (to be indexed later)
-            embedding = self.generate_embedding(combined_text)
+            batch.set(doc_ref, {
+                'user_id': turn['user_id'],
+                'session_id': turn['session_id'],
+                'user_message': turn['user_message'],
+                'agent_response': turn['agent_response'],
+                'timestamp': firestore.SERVER_TIMESTAMP,
+                'metadata': turn.get('metadata') or {}
+            })
+            pending_writes += 1
             
             if embedding:
                 # Save the ACTUAL embedding vector for semantic search
-                db.collection('memory_embeddings').document(doc_ref.id).set({
+                batch.set(db.collection('memory_embeddings').document(doc_ref.id), {
                     'conversation_id': doc_ref.id,
+                    'user_id': turn['user_id'],
                     'embedding': embedding,  # Store the actual vector
                     'embedding_model': self.embedding_model,
                     'text_preview': combined_text[:200],
                     'full_text': combined_text  # Store for retrieval
                 })
+                pending_writes += 1
+                indexed.append((doc_ref.id, embedding, turn['user_id']))
             
-            return doc_ref.id
+            doc_ids.append(doc_ref.id)
             
+            # Each turn is at most 2 writes; keep under Firestore's 500-write batch limit
+            if pending_writes >= FIRESTORE_BATCH_LIMIT - 1:
+                batch.commit()
+                batch = db.batch()
+                pending_writes = 0
+        
+        if pending_writes:
+            batch.commit()
+        
+        # Roll the turns into the cognitive profile buckets (never fails the save)
+        try:
+            self.profile_store.record_turns(turns)
         except Exception as e:
-            print(f"Error saving conversation: {e}")
-            return None
+            print(f"Error updating cognitive profile aggregates: {e}")
+        
+        # Keep the local index in step so the turns are searchable immediately
+        for doc_id, embedding, user_id in indexed:
+            self._index_add(doc_id, embedding, user_id)
+        
+        return doc_ids
     
     def detect_business_context(self, user_message: str, agent_response: str) -> Dict[str, Any]:
         """
@@ -96,50 +216,17 @@ class MemoryService:
         """
         combined_text = f"{user_message} {agent_response}".lower()
         
-        contexts = {
-            'agency': False,
-            'travel': False,
-            'personal': False,
-            'development': False,
-            'technical': False
-        }
-        
-        # Context detection patterns
-        agency_keywords = ['client', 'campaign', 'marketing', 'brand', 'agency', 'ad', 'creative']
-        travel_keywords = ['travel', 'trip', 'destination', 'hotel', 'flight', 'booking', 'tour']
-        personal_keywords = ['i feel', 'my life', 'personally', 'my family', 'myself']
-        dev_keywords = ['code', 'function', 'api', 'database', 'deploy', 'agent', 'tool', 'github', 'python']
-        technical_keywords = ['error', 'bug', 'fix', 'implement', 'architecture', 'system']
-        
-        # Detect contexts
-        if any(keyword in combined_text for keyword in agency_keywords):
-            contexts['agency'] = True
-        if any(keyword in combined_text for keyword in travel_keywords):
-            contexts['travel'] = True
-        if any(keyword in combined_text for keyword in personal_keywords):
-            contexts['personal'] = True
-        if any(keyword in combined_text for keyword in dev_keywords):
-            contexts['development'] = True
-        if any(keyword in combined_text for keyword in technical_keywords):
-            contexts['technical'] = True
+        # Detect contexts (rule tables at module level, one pass each)
+        detected = BUSINESS_CONTEXT_RULES.scores(combined_text)
+        contexts = {context: bool(detected[context]) for context in BUSINESS_CONTEXT_RULES.labels_in_order}
         
         # Detect communication style
-        style = 'neutral'
-        if any(word in user_message.lower() for word in ['analyze', 'explain', 'why', 'how']):
-            style = 'analytical'
-        elif any(word in user_message.lower() for word in ['create', 'design', 'imagine', 'build']):
-            style = 'creative'
-        elif len(user_message.split()) < 10:
-            style = 'direct'
+        style = COMMUNICATION_STYLE_RULES.first(user_message)
+        if style is None:
+            style = 'direct' if len(user_message.split()) < 10 else 'neutral'
         
         # Extract key entities (simple version - can be enhanced)
-        entities = []
-        if 'agent' in combined_text:
-            entities.append('agent_development')
-        if 'firestore' in combined_text or 'database' in combined_text:
-            entities.append('database')
-        if 'specialist' in combined_text or 'codemaster' in combined_text:
-            entities.append('multi_agent_system')
+        entities = ENTITY_RULES.labels(combined_text)
         
         return {
             'contexts': contexts,
@@ -150,6 +237,19 @@ class MemoryService:
             'timestamp': datetime.now().isoformat()
         }
     
+    def build_capture_metadata(self, user_message: str, agent_response: str) -> Dict[str, Any]:
+        """Cognitive analysis + metadata attached to auto-captured turns"""
+        # Detect business context and communication patterns
+        cognitive_analysis = self.detect_business_context(user_message, agent_response)
+        
+        # Enhanced metadata for cognitive modeling
+        return {
+            'type': 'auto_captured_conversation',
+            'cognitive_analysis': cognitive_analysis,
+            'auto_captured': True,
+            'capture_timestamp': datetime.now().isoformat()
+        }
+    
     def auto_capture_conversation(
         self,
         user_id: str,
@@ -161,18 +261,10 @@ class MemoryService:
         AUTOMATIC COGNITIVE CAPTURE: Saves every conversation with intelligent context detection
         
         This is called automatically after each agent response to build the cognitive model.
+        (CognitiveMiddleware normally routes this through the background capture_pipeline.)
         """
         try:
-            # Detect business context and communication patterns
-            cognitive_analysis = self.detect_business_context(user_message, agent_response)
-            
-            # Enhanced metadata for cognitive modeling
-            metadata = {
-                'type': 'auto_captured_conversation',
-                'cognitive_analysis': cognitive_analysis,
-                'auto_captured': True,
-                'capture_timestamp': datetime.now().isoformat()
-            }
+            metadata = self.build_capture_metadata(user_message, agent_response)
             
             # Use the existing save method with enhanced metadata
             doc_id = self.save_conversation_turn(
@@ -183,7 +275,7 @@ class MemoryService:
                 metadata=metadata
             )
             
-            print(f"🧠 Auto-captured conversation with context: {cognitive_analysis['primary_context']}")
+            print(f"🧠 Auto-captured conversation with context: {metadata['cognitive_analysis']['primary_context']}")
             return doc_id
             
         except Exception as e:
@@ -195,6 +287,8 @@ class MemoryService:
         Search conversation memory using TRUE SEMANTIC SEARCH with vector embeddings
         
         This finds conceptually similar conversations, not just keyword matches.
+        Scoring runs against the local vector index; only the top_k winning
+        conversations are fetched from Firestore (in one batched read).
         """
         try:
             # Generate query embedding
@@ -204,38 +298,13 @@ class MemoryService:
                 print("Failed to generate query embedding")
                 return []
             
-            # Fetch all memory embeddings and compute similarity
-            results = []
-            embeddings = db.collection('memory_embeddings').stream()
-            
-            for emb_doc in embeddings:
-                emb_data = emb_doc.to_dict()
-                stored_embedding = emb_data.get('embedding', [])
-                
-                if not stored_embedding:
-                    continue
-                
-                # Calculate cosine similarity
-                similarity = self._cosine_similarity(query_embedding, stored_embedding)
-                
-                # Fetch the actual conversation data
-                conv_id = emb_data.get('conversation_id')
-                conv_doc = db.collection('conversation_memory').document(conv_id).get()
-                
-                if conv_doc.exists:
-                    conv_data = conv_doc.to_dict()
-                    results.append({
-                        'id': conv_id,
-                        'user_message': conv_data.get('user_message', ''),
-                        'agent_response': conv_data.get('agent_response', ''),
-                        'timestamp': conv_data.get('timestamp'),
-                        'relevance': similarity,  # Actual similarity score (0-1)
-                        'similarity_score': f"{similarity:.2%}"  # Human readable
-                    })
+            index = self._get_vector_index()
+            if index is None:
+                # Index unavailable (e.g. numpy missing) - fall back to a full scan
+                return self._scan_memory(query_embedding, top_k)
             
-            # Sort by similarity (highest first) and return top_k
-            results.sort(key=lambda x: x['relevance'], reverse=True)
-            return results[:top_k]
+            hits = index.search(query_embedding, top_k)
+            return self._fetch_conversations(hits)
             
         except Exception as e:
             print(f"Error searching memory: {e}")
@@ -243,6 +312,233 @@ class MemoryService:
             traceback.print_exc()
             return []
     
+    def _fetch_conversations(self, hits: List[Tuple[str, float]]) -> List[Dict[str, Any]]:
+        """Batch-read the conversation docs for (conversation_id, similarity) hits"""
+        if not hits:
+            return []
+        
+        refs = [db.collection('conversation_memory').document(conv_id) for conv_id, _ in hits]
+        docs = {doc.id: doc for doc in db.get_all(refs)}
+        
+        results = []
+        for conv_id, similarity in hits:
+            conv_doc = docs.get(conv_id)
+            if conv_doc is None or not conv_doc.exists:
+                continue
+            conv_data = conv_doc.to_dict()
+            results.append({
+                'id': conv_id,
+                'user_message': conv_data.get('user_message', ''),
+                'agent_response': conv_data.get('agent_response', ''),
+                'timestamp': conv_data.get('timestamp'),
+                'relevance': similarity,  # Actual similarity score (0-1)
+                'similarity_score': f"{similarity:.2%}"  # Human readable
+            })
+        return results
+    
+    def _scan_memory(self, query_embedding: List[float], top_k: int) -> List[Dict[str, Any]]:
+        """Brute-force search over every stored embedding (no local index)"""
+        hits = []
+        for emb_doc in db.collection('memory_embeddings').stream():
+            emb_data = emb_doc.to_dict()
+            stored_embedding = emb_data.get('embedding', [])
+            
+            if not stored_embedding:
+                continue
+            
+            similarity = self._cosine_similarity(query_embedding, stored_embedding)
+            hits.append((emb_data.get('conversation_id', emb_doc.id), similarity))
+        
+        # Sort by similarity (highest first) and only fetch the top_k conversations
+        hits.sort(key=lambda hit: hit[1], reverse=True)
+        return self._fetch_conversations(hits[:top_k])
+    
+    def _get_vector_index(self):
+        """
+        Return the local vector index, loading the snapshot or building it on first use.
+        
+        A failed load/build is retried only after a backoff, so searches fall
+        back to a full scan instead of rebuilding the index every time. A
+        loaded snapshot (and, every MEMORY_INDEX_SYNC_SECONDS, the live index)
+        is reconciled with Firestore by _sync_vector_index.
+        """
+        index = self._vector_index
+        if index is not None:
+            if time.monotonic() - self._index_synced_at >= MEMORY_INDEX_SYNC_SECONDS:
+                self._sync_vector_index(index)
+            return index
+        if time.monotonic() < self._index_retry_at:
+            return None
+        
+        with self._index_lock:
+            if self._vector_index is not None:
+                return self._vector_index
+            if time.monotonic() < self._index_retry_at:
+                return None
+            try:
+                if self.index_backend == 'mmap':
+                    from .embedding_store import EmbeddingStore
+                    
+                    index = EmbeddingStore(self.index_path)
+                    if len(index) == 0:
+                        index.rebuild(self._iter_embedding_records())
+                        self._index_synced_at = time.monotonic()
+                    print(f"🧠 Opened memory-mapped embedding store ({len(index)} vectors)")
+                    self._vector_index = index
+                    self._sync_vector_index(index)
+                else:
+                    from .vector_index import load_vector_index
+                    
+                    index = load_vector_index(self.index_path)
+                    if index is not None:
+                        print(f"🧠 Loaded memory index snapshot ({len(index)} vectors)")
+                        self._vector_index = index
+                        self._sync_vector_index(index)
+                    else:
+                        self._vector_index = self._build_vector_index()
+            except Exception as e:
+                self._index_failures += 1
+                delay = min(MEMORY_INDEX_RETRY_SECONDS * 2 ** (self._index_failures - 1), 3600)
+                self._index_retry_at = time.monotonic() + delay
+                print(f"Memory index unavailable, using full scan (retry in {delay:.0f}s): {e}")
+                return None
+            self._index_failures = 0
+        
+        return self._vector_index
+    
+    def _iter_embedding_records(self, batch_size: int = 300):
+        """
+        Yield (user_id, conversation_id, embedding) for every memory_embeddings doc.
+        
+        Older embedding docs don't carry user_id; those are resolved from
+        conversation_memory with one batched read per batch_size docs.
+        """
+        missing = []
+        
+        def resolve(batch):
+            refs = [db.collection('conversation_memory').document(conv_id) for conv_id, _ in batch]
+            owners = {doc.id: (doc.to_dict() or {}).get('user_id') for doc in db.get_all(refs) if doc.exists}
+            for conv_id, embedding in batch:
+                yield owners.get(conv_id), conv_id, embedding
+        
+        for emb_doc in db.collection('memory_embeddings').stream():
+            emb_data = emb_doc.to_dict()
+            stored_embedding = emb_data.get('embedding', [])
+            if not stored_embedding:
+                continue
+            conv_id = emb_data.get('conversation_id', emb_doc.id)
+            if emb_data.get('user_id'):
+                yield emb_data['user_id'], conv_id, stored_embedding
+                continue
+            missing.append((conv_id, stored_embedding))
+            if len(missing) >= batch_size:
+                yield from resolve(missing)
+                missing = []
+        
+        if missing:
+            yield from resolve(missing)
+    
+    def _build_vector_index(self):
+        """Build the index from every document in memory_embeddings and snapshot it"""
+        from .vector_index import create_vector_index
+        
+        index = create_vector_index(self.index_backend)
+        for emb_doc in db.collection('memory_embeddings').stream():
+            emb_data = emb_doc.to_dict()
+            stored_embedding = emb_data.get('embedding', [])
+            if stored_embedding:
+                index.add(emb_data.get('conversation_id', emb_doc.id), stored_embedding)
+        
+        print(f"🧠 Built memory index from Firestore ({len(index)} vectors)")
+        index.save(self.index_path)
+        self._index_synced_at = time.monotonic()
+        return index
+    
+    def _sync_vector_index(self, index, batch_size: int = 300) -> int:
+        """
+        Add memory_embeddings docs that the local index doesn't have yet.
+        
+        A snapshot only knows the turns this process indexed before its last
+        save: turns saved by other workers, or after the last snapshot of a
+        process that was killed, would otherwise never become searchable.
+        A count aggregation decides whether anything is missing; only then
+        are the doc ids listed (no vectors) and the missing docs read.
+        Returns how many vectors were added.
+        """
+        if not self._sync_lock.acquire(blocking=False):
+            return 0  # another thread is already syncing
+        try:
+            self._index_synced_at = time.monotonic()
+            collection = db.collection('memory_embeddings')
+            try:
+                total = collection.count().get()[0][0].value
+            except Exception as e:
+                print(f"Memory index count failed, comparing ids: {e}")
+                total = None
+            if total is not None and total <= len(index):
+                return 0
+            
+            missing = []
+            for emb_doc in collection.select(['conversation_id']).stream():
+                conv_id = (emb_doc.to_dict() or {}).get('conversation_id', emb_doc.id)
+                if conv_id not in index:
+                    missing.append(emb_doc.reference)
+            
+            added = 0
+            for start in range(0, len(missing), batch_size):
+                for emb_doc in db.get_all(missing[start:start + batch_size]):
+                    emb_data = emb_doc.to_dict() or {}
+                    stored_embedding = emb_data.get('embedding', [])
+                    if stored_embedding and index.add(emb_data.get('conversation_id', emb_doc.id),
+                                                      stored_embedding, user_id=emb_data.get('user_id')):
+                        added += 1
+            if added:
+                print(f"🧠 Synced {added} memory embeddings from Firestore into the local index")
+                self._index_unsaved += added
+                self.save_memory_index()
+            return added
+        except Exception as e:
+            print(f"Error syncing memory index: {e}")
+            return 0
+        finally:
+            self._sync_lock.release()
+    
+    def rebuild_memory_index(self) -> int:
+        """Discard the local index and rebuild it from Firestore. Returns the vector count."""
+        with self._index_lock:
+            if self.index_backend == 'mmap':
+                from .embedding_store import EmbeddingStore
+                
+                store = self._vector_index or EmbeddingStore(self.index_path)
+                store.rebuild(self._iter_embedding_records())
+                self._vector_index = store
+                self._index_synced_at = time.monotonic()
+            else:
+                self._vector_index = self._build_vector_index()
+            self._index_unsaved = 0
+            self._index_failures, self._index_retry_at = 0, 0.0
+            return len(self._vector_index)
+    
+    def save_memory_index(self) -> None:
+        """Write the local index snapshot if it has unsaved updates"""
+        if self._vector_index is None or self._index_unsaved == 0:
+            return
+        try:
+            self._vector_index.save(self.index_path)
+            self._index_unsaved = 0
+        except Exception as e:
+            print(f"Error saving memory index: {e}")
+    
+    def _index_add(self, conversation_id: str, embedding: List[float], user_id: str = None) -> None:
+        """Incrementally add a new embedding and snapshot every few writes"""
+        index = self._get_vector_index()
+        if index is None:
+            return
+        if index.add(conversation_id, embedding, user_id=user_id):
+            self._index_unsaved += 1
+            if self._index_unsaved >= MEMORY_INDEX_SNAPSHOT_EVERY:
+                self.save_memory_index()
+    
     def _cosine_similarity(self, vec1: List[float], vec2: List[float]) -> float:
         """Calculate cosine similarity between two vectors (0-1 scale)"""
         try:
@@ -297,94 +593,21 @@ class MemoryService:
         - Communication style patterns
         - Preferred topics
         - Interaction frequency
+        
+        Reads the per-day aggregates kept by cognitive_profile.py, so the cost
+        is O(days) rather than O(conversations). The window is whole UTC days.
         """
         try:
-            from datetime import timedelta, timezone
-            from collections import Counter
-            
-            # Get recent conversations (use UTC timezone to match Firestore)
-            cutoff_date = datetime.now(timezone.utc) - timedelta(days=days)
-            
-            # Query ONLY by user_id (no composite index needed)
-            # Then filter by timestamp in Python
-            conversations = db.collection('conversation_memory')\
-                .where('user_id', '==', user_id)\
-                .stream()
-            
-            # Aggregate cognitive data
-            contexts_count = Counter()
-            styles_count = Counter()
-            entities_count = Counter()
-            total_messages = 0
-            
-            for conv in conversations:
-                data = conv.to_dict()
-                
-                # Filter by timestamp in Python (avoid Firestore composite index requirement)
-                timestamp = data.get('timestamp')
-                if timestamp and timestamp < cutoff_date:
-                    continue  # Skip old conversations
-                
-                total_messages += 1
-                user_message = data.get('user_message', '').lower()
-                
-                metadata = data.get('metadata', {})
-                cognitive = metadata.get('cognitive_analysis', {})
-                
-                # If we have cognitive analysis metadata, use it
-                if cognitive:
-                    # Count contexts
-                    contexts = cognitive.get('contexts', {})
-                    for context, is_present in contexts.items():
-                        if is_present:
-                            contexts_count[context] += 1
-                    
-                    # Count styles
-                    style = cognitive.get('communication_style')
-                    if style:
-                        styles_count[style] += 1
-                    
-                    # Count entities
-                    entities = cognitive.get('entities', [])
-                    for entity in entities:
-                        entities_count[entity] += 1
-                else:
-                    # FALLBACK: Analyze the raw message content
-                    # Detect business contexts from keywords
-                    if any(word in user_message for word in ['agent', 'cortex', 'code', 'deploy', 'vertex', 'firestore', 'database']):
-                        contexts_count['development'] += 1
-                    if any(word in user_message for word in ['travel', 'agency', 'booking', 'hotel', 'flight']):
-                        contexts_count['travel'] += 1
-                    if any(word in user_message for word in ['agency', 'client', 'business', 'marketing']):
-                        contexts_count['agency'] += 1
-                    if any(word in user_message for word in ['learn', 'autonomous', 'cognitive', 'memory', 'remember']):
-                        contexts_count['learning'] += 1
-                    
-                    # Detect communication style from message patterns
-                    if any(word in user_message for word in ['fuck', 'shit', 'damn', 'ass']):
-                        styles_count['direct/passionate'] += 1
-                    elif '?' in user_message:
-                        styles_count['inquisitive'] += 1
-                    elif any(word in user_message for word in ['please', 'thanks', 'could you']):
-                        styles_count['polite'] += 1
-                    else:
-                        styles_count['directive'] += 1
-                    
-                    # Extract key topics (simple word frequency)
-                    import re
-                    words = re.findall(r'\b[a-z]{4,}\b', user_message)  # Words 4+ chars
-                    for word in words:
-                        if word not in ['this', 'that', 'with', 'from', 'have', 'want', 'need', 'just', 'like']:
-                            entities_count[word] += 1
+            totals = self.profile_store.aggregate(user_id, days)
             
             # Build profile
             profile = {
                 'user_id': user_id,
                 'analysis_period_days': days,
-                'total_conversations': total_messages,
-                'primary_contexts': dict(contexts_count.most_common(3)),
-                'communication_styles': dict(styles_count.most_common()),
-                'key_topics': dict(entities_count.most_common(5)),
+                'total_conversations': totals['total'],
+                'primary_contexts': dict(totals['contexts'].most_common(3)),
+                'communication_styles': dict(totals['styles'].most_common()),
+                'key_topics': dict(totals['entities'].most_common(5)),
                 'generated_at': datetime.now().isoformat()
             }
             
@@ -13,9 +13,21 @@ from datetime import datetime
 from google.cloud import firestore
 from google.adk.tools import ToolContext
 
+from .keyword_matcher import KeywordMatcher
+
 PROJECT_ID = "studio-2416451423-f2d96"
 db = firestore.Client(project=PROJECT_ID, database='agent-master-database')
 
+# Task classification table for analyze_task_for_agent_needs
+TASK_TYPE_RULES = KeywordMatcher([
+    ("file_management", ["file", "folder", "directory", "organize"]),
+    ("media_processing", ["video", "audio", "media", "transcribe"]),
+    ("deployment", ["deploy", "cloud", "server", "api"]),
+    ("code_analysis", ["code", "debug", "review", "analyze"]),
+    ("data_management", ["database", "query", "store", "retrieve"]),
+    ("business_automation", ["invoice", "payment", "business", "client"]),
+])
+
 
 # ============================================================================
 # AGENT CREATION TOOLS (4 tools)
@@ -33,22 +45,8 @@ def analyze_task_for_agent_needs(task_description: str, tool_context: ToolContex
         dict: Agent blueprint with recommended tools and structure
     """
     try:
-        task_lower = task_description.lower()
-        
-        # Analyze task type
-        task_types = []
-        if any(word in task_lower for word in ["file", "folder", "directory", "organize"]):
-            task_types.append("file_management")
-        if any(word in task_lower for word in ["video", "audio", "media", "transcribe"]):
-            task_types.append("media_processing")
-        if any(word in task_lower for word in ["deploy", "cloud", "server", "api"]):
-            task_types.append("deployment")
-        if any(word in task_lower for word in ["code", "debug", "review", "analyze"]):
-            task_types.append("code_analysis")
-        if any(word in task_lower for word in ["database", "query", "store", "retrieve"]):
-            task_types.append("data_management")
-        if any(word in task_lower for word in ["invoice", "payment", "business", "client"]):
-            task_types.append("business_automation")
+        # Analyze task type (single pass over TASK_TYPE_RULES)
+        task_types = TASK_TYPE_RULES.labels(task_description)
         
         # Recommend tools based on task type
         recommended_tools = []
@@ -1303,42 +1301,19 @@ def analyze_conversation_patterns(user_id: str, days: int, tool_context: ToolCon
         dict: Identified patterns and preferences
     """
     try:
-        from datetime import timedelta, timezone
-        from collections import Counter
-        
-        cutoff_date = datetime.now(timezone.utc) - timedelta(days=days)
-        
-        conversations = db.collection('conversation_memory')\
-            .where('user_id', '==', user_id)\
-            .stream()
+        from .memory_service import memory_service
         
-        # Analyze patterns
-        topics = Counter()
-        preferences = Counter()
-        frequent_requests = []
-        
-        for conv in conversations:
-            data = conv.to_dict()
-            user_message = data.get('user_message', '').lower()
-            
-            # Topic detection
-            if "glass" in user_message and "effect" in user_message:
-                topics["glass_ui"] += 1
-            if "deploy" in user_message:
-                topics["deployment"] += 1
-            if "dark" in user_message:
-                preferences["dark_mode"] += 1
-            
-            # Track requests
-            if len(user_message.split()) < 15:
-                frequent_requests.append(user_message)
+        # Per-day aggregates maintained at capture time (see cognitive_profile.py)
+        totals = memory_service.profile_store.aggregate(user_id, days)
+        topics = totals['topics']
+        preferences = totals['preferences']
         
         patterns = {
             "user_id": user_id,
             "analysis_period_days": days,
             "top_topics": dict(topics.most_common(5)),
             "preferences": dict(preferences.most_common(5)),
-            "conversation_style": "concise" if len([r for r in frequent_requests if len(r.split()) < 10]) > len(frequent_requests) * 0.6 else "detailed"
+            "conversation_style": "concise" if totals['concise_requests'] > totals['short_requests'] * 0.6 else "detailed"
         }
         
         return {
@@ -1348,7 +1323,7 @@ def analyze_conversation_patterns(user_id: str, days: int, tool_context: ToolCon
             "message": f"Analyzed {days} days of conversations",
             "insights": [
                 f"User prefers {patterns['conversation_style']} responses",
-                f"Top interest: {list(topics.keys())[0] if topics else 'unknown'}"
+                f"Top interest: {topics.most_common(1)[0][0] if topics else 'unknown'}"
             ]
         }
         
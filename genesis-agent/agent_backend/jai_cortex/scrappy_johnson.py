@@ -10,6 +10,9 @@ from collections import Counter
 from typing import Dict, List, Any
 from urllib.parse import urljoin, urlparse
 
+from .content_extractor import get_session
+from .http_cache import http_cache
+
 
 class ScrappyJohnson:
     """The badass website scraper"""
@@ -34,9 +37,16 @@ class ScrappyJohnson:
             print(f"🎯 Target: {url}")
             print("="*60)
             
-            # Fetch the page
-            response = requests.get(url, headers=self.headers, timeout=15)
-            response.raise_for_status()
+            # Fetch the page (revalidated against the shared HTTP cache)
+            response = http_cache.fetch(get_session(), url, headers=self.headers, timeout=15, source='design')
+            
+            # Unchanged page: reuse the previous analysis
+            cached = http_cache.get_extracted('design', url, response.content_hash)
+            if cached is not None:
+                print("♻️  Page unchanged since last scrape, using cached analysis")
+                print("="*60)
+                return cached
+            
             soup = BeautifulSoup(response.content, 'html.parser')
             
             # Extract all the goodies
@@ -51,6 +61,8 @@ class ScrappyJohnson:
                 'components': self._extract_components(soup),
             }
             
+            http_cache.put_extracted('design', url, response.content_hash, result)
+            
             print("✅ SCRAPE COMPLETE")
             print("="*60)
             
@@ -214,8 +226,7 @@ class ScrappyJohnson:
             Dictionary with colors, fonts, spacing from CSS
         """
         try:
-            response = requests.get(css_url, headers=self.headers, timeout=10)
-            response.raise_for_status()
+            response = http_cache.fetch(get_session(), css_url, headers=self.headers, timeout=10, source='css')
             css_content = response.text
             
             # Extract colors
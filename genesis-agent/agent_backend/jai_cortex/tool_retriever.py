@@ -0,0 +1,222 @@
+"""
+Semantic Tool Retriever
+Ranks registered tools for a request by embedding similarity
+
+Every FunctionTool docstring is embedded once at startup (one batched
+request; vectors are cached on disk by content hash through the shared
+EmbeddingClient, so restarts and unchanged docstrings cost nothing) and kept
+in a FlatVectorIndex. A request is then one embedding + one matrix-vector
+product.
+
+`shrink_tools_callback` is an async ADK before_model_callback that uses the
+ranking to send only the most relevant tool schemas to Gemini on each call
+instead of all ~120, which cuts prompt tokens and time-to-first-token. It
+changes what the model sees, so it is opt-in (DYNAMIC_TOOL_SELECTION=true);
+agents with no more than DYNAMIC_TOOL_TOP_K tools are never shrunk, and the
+model calls of one turn share the query embedding. The request is embedded
+with the client's async API, so the event loop never blocks on it; if that
+takes longer than DYNAMIC_TOOL_TIMEOUT seconds (or the tool index is still
+building), the full tool list is sent.
+"""
+
+import os
+import asyncio
+import threading
+from typing import List, Tuple, Optional, Iterable, Any
+
+
+TOOL_RETRIEVAL_ENABLED = os.environ.get('DYNAMIC_TOOL_SELECTION', 'false').lower() == 'true'
+TOOL_RETRIEVAL_TOP_K = int(os.environ.get('DYNAMIC_TOOL_TOP_K', '25'))
+# Longest a model call waits for the request embedding before sending every tool
+TOOL_RETRIEVAL_TIMEOUT = float(os.environ.get('DYNAMIC_TOOL_TIMEOUT', '1.0'))
+
+# Always sent to the model, whatever the ranking says
+CORE_TOOLS = {
+    'simple_search',
+    'search_memory',
+    'save_note',
+    'select_relevant_tools',
+    'read_file_content',
+    'recall_project_context',
+    'transfer_to_agent',
+}
+
+
+def _tool_text(name: str, description: str) -> str:
+    """Text embedded for a tool: name plus the docstring up to the Args section"""
+    summary = (description or '').split('Args:')[0].strip()
+    return f"{name.replace('_', ' ')}: {summary}"
+
+
+class ToolRetriever:
+    """Embedding index over tool docstrings"""
+
+    def __init__(self, top_k: int = TOOL_RETRIEVAL_TOP_K, always_include: Iterable[str] = CORE_TOOLS):
+        self.top_k = top_k
+        self.always_include = set(always_include)
+        self._index = None
+        self._lock = threading.Lock()
+        self._building: Optional[threading.Thread] = None
+        # (request text, embedding) of the last ranked request: every model
+        # call in a turn ranks the same user message
+        self._last_query: Optional[Tuple[str, List[float]]] = None
+
+    @property
+    def ready(self) -> bool:
+        return self._index is not None
+
+    def build(self, tools: Iterable[Any]) -> int:
+        """Embed every tool's docstring (cache hits for unchanged ones). Returns tools indexed."""
+        from .memory_service import memory_service
+        from .vector_index import FlatVectorIndex
+
+        entries = []
+        for tool in tools:
+            name = getattr(tool, 'name', None)
+            if not name:
+                continue
+            text = _tool_text(name, getattr(tool, 'description', ''))
+            entries.append((name, text))
+
+        vectors = memory_service.embedding_client.embed_many([text for _, text in entries])
+
+        index = FlatVectorIndex()
+        for (name, _), vector in zip(entries, vectors):
+            index.add(name, vector)
+
+        with self._lock:
+            self._index = index
+        print(f"🎯 Tool retriever indexed {len(index)} tools")
+        return len(index)
+
+    def build_in_background(self, tools: Iterable[Any]) -> None:
+        """Build without blocking startup; rank() returns [] until it finishes"""
+        tools = list(tools)
+
+        def run():
+            try:
+                self.build(tools)
+            except Exception as e:
+                print(f"Tool retriever build failed (all tools will be sent): {e}")
+
+        self._building = threading.Thread(target=run, name="tool-retriever-build", daemon=True)
+        self._building.start()
+
+    def _cached_query(self, request: str) -> Optional[List[float]]:
+        last = self._last_query
+        return last[1] if last is not None and last[0] == request else None
+
+    def rank(self, request: str, top_k: Optional[int] = None) -> List[Tuple[str, float]]:
+        """(tool_name, similarity) for the best-matching tools, best first (blocking)"""
+        if self._index is None or not request:
+            return []
+        query = self._cached_query(request)
+        if query is None:
+            from .memory_service import memory_service
+
+            query = memory_service.generate_embedding(request)
+            if not query:
+                return []
+            self._last_query = (request, query)
+        return self._index.search(query, top_k or self.top_k)
+
+    async def arank(self, request: str, top_k: Optional[int] = None,
+                    timeout: float = TOOL_RETRIEVAL_TIMEOUT) -> List[Tuple[str, float]]:
+        """rank() for the event loop: [] if the request can't be embedded within timeout"""
+        if self._index is None or not request:
+            return []
+        query = self._cached_query(request)
+        if query is None:
+            from .memory_service import memory_service
+
+            # Shielded: a timeout here must not cancel the shared, coalesced embedding
+            embedding = asyncio.ensure_future(memory_service.embedding_client.aembed(request))
+            embedding.add_done_callback(lambda task: task.cancelled() or task.exception())
+            try:
+                query = await asyncio.wait_for(asyncio.shield(embedding), timeout)
+            except asyncio.TimeoutError:
+                print(f"Tool ranking skipped: request embedding took over {timeout:.1f}s")
+                return []
+            except Exception as e:
+                print(f"Tool ranking skipped: {e}")
+                return []
+            if not query:
+                return []
+            self._last_query = (request, query)
+        return self._index.search(query, top_k or self.top_k)
+
+    def _selection(self, ranked: List[Tuple[str, float]], available: set, keep: Iterable[str]) -> Optional[set]:
+        if not ranked:
+            return None
+        selected = {name for name, _ in ranked}
+        selected |= self.always_include
+        selected |= set(keep)
+        return selected & available
+
+    def select(self, request: str, available: Iterable[str], keep: Iterable[str] = ()) -> Optional[set]:
+        """
+        Names of the tools to expose for this request, or None to expose all
+        (index not ready, or the ranking failed).
+        """
+        available = set(available)
+        if len(available) <= self.top_k:
+            return None
+        return self._selection(self.rank(request, top_k=self.top_k), available, keep)
+
+    async def aselect(self, request: str, available: Iterable[str], keep: Iterable[str] = ()) -> Optional[set]:
+        """select() without blocking the event loop (None on embedding timeout)"""
+        available = set(available)
+        if len(available) <= self.top_k:
+            return None
+        return self._selection(await self.arank(request, top_k=self.top_k), available, keep)
+
+
+def _latest_user_text(contents: List[Any]) -> str:
+    for content in reversed(contents or []):
+        if getattr(content, 'role', None) != 'user':
+            continue
+        texts = [part.text for part in (content.parts or []) if getattr(part, 'text', None)]
+        if texts:
+            return '\n'.join(texts)
+    return ''
+
+
+def _called_tools(contents: List[Any]) -> set:
+    """Tools already used in this conversation must stay declared"""
+    names = set()
+    for content in contents or []:
+        for part in getattr(content, 'parts', None) or []:
+            call = getattr(part, 'function_call', None)
+            if call is not None and call.name:
+                names.add(call.name)
+    return names
+
+
+async def shrink_tools_callback(callback_context, llm_request):
+    """ADK before_model_callback: trim function declarations to the relevant tools"""
+    if not TOOL_RETRIEVAL_ENABLED or not tool_retriever.ready:
+        return None
+    try:
+        declarations = [
+            decl.name
+            for tool in (llm_request.config.tools or [])
+            for decl in (getattr(tool, 'function_declarations', None) or [])
+        ]
+        selected = await tool_retriever.aselect(
+            _latest_user_text(llm_request.contents),
+            declarations,
+            keep=_called_tools(llm_request.contents)
+        )
+        if selected is None:
+            return None
+
+        for tool in llm_request.config.tools:
+            if getattr(tool, 'function_declarations', None):
+                tool.function_declarations = [d for d in tool.function_declarations if d.name in selected]
+    except Exception as e:
+        print(f"Tool shrinking skipped: {e}")
+    return None
+
+
+# Global retriever instance (built from root_agent's tools in agent.py)
+tool_retriever = ToolRetriever()
@@ -0,0 +1,334 @@
+"""
+JAi Cortex OS - Local Vector Index
+In-process ANN index used by MemoryService.search_memory
+
+Vectors live in one contiguous float32 matrix with L2-normalized rows, so a
+cosine similarity is a plain dot product. IVFFlatIndex adds a k-means coarse
+quantizer on top and only scans the closest clusters for each query.
+"""
+
+import os
+import threading
+from typing import List, Tuple, Dict, Optional, Any
+
+import numpy as np
+
+
+class VectorIndex:
+    """Base interface for pluggable in-process vector indexes"""
+
+    backend = 'base'
+
+    def add(self, doc_id: str, vector: List[float], user_id: Optional[str] = None) -> bool:
+        """
+        Insert or replace a vector. Returns False if the vector is unusable.
+        user_id is only used by sharded backends (see embedding_store.py).
+        """
+        raise NotImplementedError
+
+    def search(self, query: List[float], top_k: int = 5) -> List[Tuple[str, float]]:
+        """Return up to top_k (doc_id, cosine similarity) pairs, best first"""
+        raise NotImplementedError
+
+    def save(self, path: str) -> None:
+        """Persist a snapshot of the index to disk"""
+        raise NotImplementedError
+
+    @classmethod
+    def from_snapshot(cls, data: Dict[str, Any]) -> 'VectorIndex':
+        """Rebuild an index from the arrays written by save()"""
+        raise NotImplementedError
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+    def __contains__(self, doc_id: str) -> bool:
+        raise NotImplementedError
+
+
+def _normalize(vector: List[float]) -> Optional[np.ndarray]:
+    """Convert to a unit-length float32 row (None for empty/zero vectors)"""
+    arr = np.asarray(vector, dtype=np.float32).ravel()
+    if arr.size == 0:
+        return None
+    norm = float(np.linalg.norm(arr))
+    if norm == 0.0:
+        return None
+    return arr / norm
+
+
+def _top_k(scores: np.ndarray, top_k: int) -> np.ndarray:
+    """Indices of the top_k highest scores, sorted best first"""
+    if top_k >= scores.shape[0]:
+        return np.argsort(-scores)
+    part = np.argpartition(-scores, top_k)[:top_k]
+    return part[np.argsort(-scores[part])]
+
+
+class FlatVectorIndex(VectorIndex):
+    """Exact search: one matrix-vector product over every stored row"""
+
+    backend = 'flat'
+
+    def __init__(self, dim: int = 0, initial_capacity: int = 1024):
+        self.dim = dim
+        self._capacity = initial_capacity
+        self._vectors = np.zeros((initial_capacity, dim), dtype=np.float32) if dim else None
+        self._ids: List[str] = []
+        self._positions: Dict[str, int] = {}
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._positions
+
+    def _ensure_capacity(self, needed: int) -> None:
+        if self._vectors is None:
+            self._vectors = np.zeros((max(self._capacity, needed), self.dim), dtype=np.float32)
+            return
+        if needed <= self._vectors.shape[0]:
+            return
+        new_capacity = max(needed, self._vectors.shape[0] * 2)
+        grown = np.zeros((new_capacity, self.dim), dtype=np.float32)
+        grown[:len(self._ids)] = self._vectors[:len(self._ids)]
+        self._vectors = grown
+
+    def add(self, doc_id: str, vector: List[float], user_id: Optional[str] = None) -> bool:
+        row = _normalize(vector)
+        if row is None:
+            return False
+
+        with self._lock:
+            if not self.dim:
+                self.dim = row.shape[0]
+            if row.shape[0] != self.dim:
+                print(f"Vector index dimension mismatch for {doc_id}: {row.shape[0]} != {self.dim}")
+                return False
+
+            position = self._positions.get(doc_id)
+            if position is None:
+                position = len(self._ids)
+                self._ensure_capacity(position + 1)
+                self._ids.append(doc_id)
+                self._positions[doc_id] = position
+
+            self._vectors[position] = row
+            self._on_row_written(position)
+            return True
+
+    def _on_row_written(self, position: int) -> None:
+        """Hook for subclasses that keep extra per-row structures"""
+
+    def _candidate_rows(self, query: np.ndarray) -> Optional[np.ndarray]:
+        """Rows to score for a query (None means every row)"""
+        return None
+
+    def search(self, query: List[float], top_k: int = 5) -> List[Tuple[str, float]]:
+        q = _normalize(query)
+        if q is None or top_k <= 0:
+            return []
+
+        with self._lock:
+            count = len(self._ids)
+            if count == 0 or q.shape[0] != self.dim:
+                return []
+
+            rows = self._candidate_rows(q)
+            if rows is None:
+                scores = self._vectors[:count] @ q
+                best = _top_k(scores, top_k)
+                return [(self._ids[i], float(scores[i])) for i in best]
+
+            if rows.size == 0:
+                return []
+            scores = self._vectors[rows] @ q
+            best = _top_k(scores, top_k)
+            return [(self._ids[rows[i]], float(scores[i])) for i in best]
+
+    def _snapshot_arrays(self) -> Dict[str, np.ndarray]:
+        count = len(self._ids)
+        vectors = self._vectors[:count] if self._vectors is not None else np.zeros((0, self.dim), dtype=np.float32)
+        return {
+            'backend': np.array(self.backend),
+            'ids': np.array(self._ids, dtype=str),
+            'vectors': vectors
+        }
+
+    def save(self, path: str) -> None:
+        with self._lock:
+            arrays = self._snapshot_arrays()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # np.savez appends ".npz" to names without it, so keep that suffix on the temp file
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(tmp_path, **arrays)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def from_snapshot(cls, data: Dict[str, Any]) -> 'FlatVectorIndex':
+        vectors = np.ascontiguousarray(data['vectors'], dtype=np.float32)
+        ids = [str(i) for i in data['ids']]
+        index = cls(dim=vectors.shape[1] if vectors.ndim == 2 else 0,
+                    initial_capacity=max(1024, len(ids)))
+        if ids:
+            index._ensure_capacity(len(ids))
+            index._vectors[:len(ids)] = vectors
+            index._ids = ids
+            index._positions = {doc_id: i for i, doc_id in enumerate(ids)}
+        return index
+
+
+class IVFFlatIndex(FlatVectorIndex):
+    """
+    Inverted-file index: rows are bucketed by their nearest k-means centroid
+    and a query only scores the rows in its nprobe closest buckets.
+
+    Below min_train_size the index behaves exactly like FlatVectorIndex.
+    The quantizer is retrained whenever the index doubles in size.
+    """
+
+    backend = 'ivf'
+
+    def __init__(
+        self,
+        dim: int = 0,
+        initial_capacity: int = 1024,
+        nprobe: int = 8,
+        min_train_size: int = 2048,
+        kmeans_iterations: int = 10
+    ):
+        super().__init__(dim=dim, initial_capacity=initial_capacity)
+        self.nprobe = nprobe
+        self.min_train_size = min_train_size
+        self.kmeans_iterations = kmeans_iterations
+        self._centroids: Optional[np.ndarray] = None
+        self._assignments = np.zeros(initial_capacity, dtype=np.int32)
+        self._lists: List[List[int]] = []
+        self._listed_rows = 0
+        self._trained_size = 0
+
+    def _ensure_capacity(self, needed: int) -> None:
+        super()._ensure_capacity(needed)
+        if needed > self._assignments.shape[0]:
+            grown = np.zeros(self._vectors.shape[0], dtype=np.int32)
+            grown[:self._assignments.shape[0]] = self._assignments
+            self._assignments = grown
+
+    def _on_row_written(self, position: int) -> None:
+        count = len(self._ids)
+        if self._centroids is None:
+            if count >= self.min_train_size:
+                self.train()
+            return
+        if count >= 2 * self._trained_size:
+            self.train()
+            return
+
+        # Incremental update: move the row into its nearest bucket
+        cluster = int(np.argmax(self._centroids @ self._vectors[position]))
+        previous = int(self._assignments[position])
+        if position < self._listed_rows:
+            if previous == cluster:
+                return
+            self._lists[previous].remove(position)
+        else:
+            self._listed_rows = position + 1
+        self._assignments[position] = cluster
+        self._lists[cluster].append(position)
+
+    def _assign(self, vectors: np.ndarray, chunk_size: int = 8192) -> np.ndarray:
+        """Nearest centroid for each row, computed in chunks to bound memory"""
+        out = np.empty(vectors.shape[0], dtype=np.int32)
+        for start in range(0, vectors.shape[0], chunk_size):
+            block = vectors[start:start + chunk_size] @ self._centroids.T
+            out[start:start + chunk_size] = np.argmax(block, axis=1)
+        return out
+
+    def train(self) -> None:
+        """(Re)build the coarse quantizer with spherical k-means"""
+        with self._lock:
+            count = len(self._ids)
+            if count == 0:
+                return
+            vectors = self._vectors[:count]
+            nlist = int(min(4096, max(1, np.sqrt(count))))
+
+            rng = np.random.default_rng(0)
+            sample_size = min(count, nlist * 40)
+            sample = vectors[rng.choice(count, size=sample_size, replace=False)]
+            self._centroids = sample[rng.choice(sample_size, size=nlist, replace=False)].copy()
+
+            for _ in range(self.kmeans_iterations):
+                labels = self._assign(sample)
+                sums = np.zeros_like(self._centroids)
+                np.add.at(sums, labels, sample)
+                norms = np.linalg.norm(sums, axis=1, keepdims=True)
+                # Empty clusters keep their previous centroid
+                filled = norms[:, 0] > 0
+                self._centroids[filled] = sums[filled] / norms[filled]
+
+            self._rebuild_lists(self._assign(vectors))
+            self._trained_size = count
+
+    def _rebuild_lists(self, assignments: np.ndarray) -> None:
+        count = assignments.shape[0]
+        self._assignments[:count] = assignments
+        order = np.argsort(assignments, kind='stable')
+        bounds = np.searchsorted(assignments[order], np.arange(self._centroids.shape[0] + 1))
+        self._lists = [order[bounds[c]:bounds[c + 1]].tolist() for c in range(self._centroids.shape[0])]
+        self._listed_rows = count
+
+    def _candidate_rows(self, query: np.ndarray) -> Optional[np.ndarray]:
+        if self._centroids is None:
+            return None
+        nprobe = min(self.nprobe, self._centroids.shape[0])
+        closest = _top_k(self._centroids @ query, nprobe)
+        rows = [self._lists[c] for c in closest if self._lists[c]]
+        if not rows:
+            return np.zeros(0, dtype=np.int64)
+        return np.concatenate([np.asarray(r, dtype=np.int64) for r in rows])
+
+    def _snapshot_arrays(self) -> Dict[str, np.ndarray]:
+        arrays = super()._snapshot_arrays()
+        if self._centroids is not None:
+            arrays['centroids'] = self._centroids
+            arrays['assignments'] = self._assignments[:len(self._ids)]
+            arrays['trained_size'] = np.array(self._trained_size)
+        return arrays
+
+    @classmethod
+    def from_snapshot(cls, data: Dict[str, Any]) -> 'IVFFlatIndex':
+        index = super().from_snapshot(data)
+        if 'centroids' in data:
+            index._centroids = np.ascontiguousarray(data['centroids'], dtype=np.float32)
+            index._trained_size = int(data['trained_size'])
+            index._rebuild_lists(np.asarray(data['assignments'], dtype=np.int32))
+        return index
+
+
+INDEX_BACKENDS = {
+    FlatVectorIndex.backend: FlatVectorIndex,
+    IVFFlatIndex.backend: IVFFlatIndex,
+}
+
+
+def create_vector_index(backend: str = 'ivf', **kwargs) -> VectorIndex:
+    """Create an empty index for the named backend"""
+    if backend not in INDEX_BACKENDS:
+        raise ValueError(f"Unknown vector index backend '{backend}'. Available: {', '.join(INDEX_BACKENDS)}")
+    return INDEX_BACKENDS[backend](**kwargs)
+
+
+def load_vector_index(path: str) -> Optional[VectorIndex]:
+    """Load a snapshot written by VectorIndex.save (None if it doesn't exist)"""
+    if not os.path.exists(path):
+        return None
+    with np.load(path, allow_pickle=False) as data:
+        arrays = {key: data[key] for key in data.files}
+    backend = str(arrays.get('backend', 'flat'))
+    return INDEX_BACKENDS[backend].from_snapshot(arrays)
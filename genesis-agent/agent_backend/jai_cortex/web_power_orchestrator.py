@@ -1,160 +1,335 @@
 """
 Web Power Orchestrator
 Coordinates comprehensive web research with synthesis
+
+research_topic_stream() yields progress events as the research runs:
+
+    {'type': 'search', 'urls': [...]}
+    {'type': 'source', 'index', 'url', 'title', 'success', 'chars', 'error', 'late'}
+    {'type': 'synthesis_started', 'num_sources'}
+    {'type': 'token', 'text'}
+    {'type': 'done', 'result': {...}}     # same dict research_topic returns
+
+By default synthesis starts as soon as a quorum of sources is extracted, and
+the answer is streamed from Gemini chunk by chunk. The remaining pages keep
+loading meanwhile; they are reported afterwards as 'source' events with
+late=True and listed under the result's 'additional_sources' (they are not
+cited in the answer). research_topic() runs with quorum=False, so the
+blocking answer is synthesized from every source that could be extracted;
+research_topic_astream() is the async-iterator form for async servers.
 """
 
+import asyncio
+import threading
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, Iterator, AsyncIterator, List
 from .web_searcher import perform_web_search
-from .content_extractor import extract_from_multiple_urls
+from .content_extractor import iter_extractions
 from vertexai.generative_models import GenerativeModel
 
 
-def research_topic(query: str, num_sources: int = 5) -> Dict[str, Any]:
+_DONE = object()
+
+
+def source_quorum(num_urls: int) -> int:
+    """Sources worth waiting for before synthesizing: ceil(3/4) of the URLs found"""
+    return max(1, -(-3 * num_urls // 4))
+
+
+def _build_synthesis_prompt(query: str, extracted_sources: List[Dict[str, Any]]) -> str:
+    context_parts = []
+    for i, source in enumerate(extracted_sources, 1):
+        context_parts.append(
+            f"===== SOURCE {i} =====\n"
+            f"URL: {source['url']}\n"
+            f"Title: {source['title']}\n\n"
+            f"{source['text']}\n"
+        )
+
+    context_document = "\n\n".join(context_parts)
+
+    return f"""You are a research assistant performing comprehensive web research.
+
+**User's Question:** {query}
+
+**Your Task:**
+I have gathered information from {len(extracted_sources)} web sources. Please:
+1. Synthesize the key findings into a comprehensive, well-structured answer
+2. Include specific claims, data points, and facts from the sources
+3. After each important claim, cite the source using this format: [Source: <number>]
+4. If sources contradict each other, note the discrepancy
+5. Be thorough but concise - aim for a comprehensive brief, not an essay
+6. Structure your answer with clear sections if the topic is complex
+
+**Sources:**
+{context_document}
+
+**Provide your synthesized answer with citations:**"""
+
+
+def _fallback_answer(extracted_sources: List[Dict[str, Any]]) -> str:
+    answer = f"I gathered information but couldn't synthesize it. Here are the key sources:\n\n"
+    for i, source in enumerate(extracted_sources, 1):
+        answer += f"\n{i}. **{source['title']}**\n{source['text'][:500]}...\n"
+    return answer
+
+
+def _failure(query: str, answer: str, error: str, sources: list = None) -> Dict[str, Any]:
+    return {
+        'query': query,
+        'answer': answer,
+        'sources': sources or [],
+        'timestamp': datetime.now().isoformat(),
+        'success': False,
+        'error': error
+    }
+
+
+def research_topic_stream(query: str, num_sources: int = 5, quorum: bool = True) -> Iterator[Dict[str, Any]]:
     """
-    Performs comprehensive web research on a topic.
-    
+    Performs comprehensive web research, yielding progress as it happens.
+
     Workflow:
-    1. Search web for relevant URLs
-    2. Extract content from each URL
-    3. Aggregate all content
-    4. Synthesize with Gemini 2.5 Pro
-    5. Return formatted answer with citations
-    
+    1. Search web for relevant URLs                  -> 'search'
+    2. Extract content from each URL concurrently    -> one 'source' per URL
+    3. Once a quorum is in, synthesize with Gemini   -> 'synthesis_started', 'token'...
+    4. Sources that finished during synthesis        -> 'source' (late=True)
+    5. Final formatted answer with citations         -> 'done'
+
     Args:
         query: The research question or topic
         num_sources: Number of sources to analyze (default: 5)
-        
-    Returns:
-        Dictionary with:
-        - 'query': Original query
-        - 'answer': Synthesized answer with citations
-        - 'sources': List of sources used
-        - 'timestamp': When research was performed
-        - 'success': Whether research succeeded
+        quorum: Start synthesis once source_quorum() pages are in (False:
+            wait for every page, up to the extraction deadline)
+
+    Yields:
+        Event dictionaries (see module docstring); the last one is always 'done'
     """
     try:
         print(f"\n🌐 Starting Web Power-Up Research")
         print(f"📋 Query: {query}")
         print(f"🎯 Target sources: {num_sources}")
         print("-" * 60)
-        
+
         # Step 1: Search the web
         print("\n🔍 Step 1: Searching the web...")
         urls = perform_web_search(query, num_results=num_sources)
-        
+        yield {'type': 'search', 'urls': urls}
+
         if not urls:
-            return {
-                'query': query,
-                'answer': "I couldn't find any web results for this query. This might be due to API configuration issues or the query being too specific.",
-                'sources': [],
-                'timestamp': datetime.now().isoformat(),
-                'success': False,
-                'error': 'No search results found'
-            }
-        
-        # Step 2: Extract content from URLs
-        print(f"\n📄 Step 2: Extracting content from {len(urls)} URLs...")
-        extracted_sources = extract_from_multiple_urls(urls, timeout=10)
-        
-        if not extracted_sources:
-            return {
-                'query': query,
-                'answer': "I found URLs but couldn't extract content from any of them. The sites might be blocking automated access.",
-                'sources': [{'url': url, 'title': 'Failed to extract'} for url in urls],
-                'timestamp': datetime.now().isoformat(),
-                'success': False,
-                'error': 'No content extracted'
-            }
-        
-        # Step 3: Build context document
-        print(f"\n🔄 Step 3: Aggregating content from {len(extracted_sources)} sources...")
-        context_parts = []
-        for i, source in enumerate(extracted_sources, 1):
-            context_parts.append(
-                f"===== SOURCE {i} =====\n"
-                f"URL: {source['url']}\n"
-                f"Title: {source['title']}\n\n"
-                f"{source['text']}\n"
-            )
-        
-        context_document = "\n\n".join(context_parts)
-        
-        # Step 4: Build synthesis prompt
-        print(f"\n🧠 Step 4: Synthesizing findings with Gemini 2.5 Pro...")
-        
-        synthesis_prompt = f"""You are a research assistant performing comprehensive web research.
+            yield {'type': 'done', 'result': _failure(
+                query,
+                "I couldn't find any web results for this query. This might be due to API configuration issues or the query being too specific.",
+                'No search results found'
+            )}
+            return
 
-**User's Question:** {query}
+        # Step 2: Extract content, reporting each page as it lands; with a
+        # quorum, the rest keep loading on a collector thread during synthesis
+        print(f"\n📄 Step 2: Extracting content from {len(urls)} URLs...")
+        needed = source_quorum(len(urls)) if quorum else len(urls)
+        successes = {}
+        late = []
+        extractions = iter_extractions(urls, timeout=10, deadline=15)
+        collector = None
+        try:
+            for i, source in extractions:
+                event = _source_event(i, source)
+                if event['success']:
+                    successes[i] = source
+                yield event
+                if len(successes) >= needed:
+                    break
 
-**Your Task:**
-I have gathered information from {len(extracted_sources)} web sources. Please:
-1. Synthesize the key findings into a comprehensive, well-structured answer
-2. Include specific claims, data points, and facts from the sources
-3. After each important claim, cite the source using this format: [Source: <number>]
-4. If sources contradict each other, note the discrepancy
-5. Be thorough but concise - aim for a comprehensive brief, not an essay
-6. Structure your answer with clear sections if the topic is complex
+            def collect():
+                for item in extractions:
+                    late.append(item)
 
-**Sources:**
-{context_document}
+            collector = threading.Thread(target=collect, name="research-late-sources", daemon=True)
+            collector.start()
+            yield from _synthesize(query, urls, successes, late, collector)
+        finally:
+            # A running collector finishes by itself at the extraction deadline
+            if collector is None:
+                extractions.close()
 
-**Provide your synthesized answer with citations:**"""
-        
-        # Step 5: Call Gemini for synthesis
-        try:
-            model = GenerativeModel("gemini-2.0-flash-exp")
-            response = model.generate_content(
-                synthesis_prompt,
-                generation_config={
-                    'temperature': 0.3,  # Lower temperature for more factual responses
-                    'max_output_tokens': 2048
-                }
-            )
-            
-            synthesized_answer = response.text
-            
-        except Exception as e:
-            print(f"❌ LLM synthesis error: {e}")
-            # Fallback: return the raw content
-            synthesized_answer = f"I gathered information but couldn't synthesize it. Here are the key sources:\n\n"
-            for i, source in enumerate(extracted_sources, 1):
-                synthesized_answer += f"\n{i}. **{source['title']}**\n{source['text'][:500]}...\n"
-        
-        # Step 6: Format final response
-        print(f"\n✅ Research complete!")
-        print(f"📊 Sources analyzed: {len(extracted_sources)}")
-        print("-" * 60)
-        
-        # Build sources list
-        sources_list = []
-        for i, source in enumerate(extracted_sources, 1):
-            sources_list.append({
-                'number': i,
-                'title': source['title'],
-                'url': source['url']
-            })
-        
-        return {
-            'query': query,
-            'answer': synthesized_answer,
-            'sources': sources_list,
-            'timestamp': datetime.now().isoformat(),
-            'success': True,
-            'num_sources_analyzed': len(extracted_sources)
-        }
-        
     except Exception as e:
         print(f"\n❌ Research failed: {e}")
         import traceback
         traceback.print_exc()
-        
-        return {
-            'query': query,
-            'answer': f"Research failed due to an unexpected error: {str(e)}",
-            'sources': [],
-            'timestamp': datetime.now().isoformat(),
-            'success': False,
-            'error': str(e)
-        }
 
+        yield {'type': 'done', 'result': _failure(
+            query,
+            f"Research failed due to an unexpected error: {str(e)}",
+            str(e)
+        )}
+
+
+def _source_event(index: int, source: Dict[str, Any], late: bool = False) -> Dict[str, Any]:
+    return {
+        'type': 'source',
+        'index': index,
+        'url': source['url'],
+        'title': source['title'],
+        'success': bool(source['success'] and source['text']),
+        'chars': len(source['text']),
+        'error': source['error'],
+        'late': late
+    }
+
+
+def _synthesize(query: str, urls: List[str], successes: Dict[int, Dict[str, Any]], late: list,
+                collector: threading.Thread) -> Iterator[Dict[str, Any]]:
+    """Steps 3-5 of research_topic_stream over the sources extracted so far"""
+    extracted_sources = [successes[i] for i in sorted(successes)]
+    print(f"📄 Successfully extracted content from {len(extracted_sources)}/{len(urls)} URLs")
+
+    if not extracted_sources:
+        yield {'type': 'done', 'result': _failure(
+            query,
+            "I found URLs but couldn't extract content from any of them. The sites might be blocking automated access.",
+            'No content extracted',
+            sources=[{'url': url, 'title': 'Failed to extract'} for url in urls]
+        )}
+        return
+
+    # Step 3: Build the synthesis prompt
+    print(f"\n🔄 Step 3: Aggregating content from {len(extracted_sources)} sources...")
+    synthesis_prompt = _build_synthesis_prompt(query, extracted_sources)
+
+    # Step 4: Stream the synthesis from Gemini
+    print(f"\n🧠 Step 4: Synthesizing findings with Gemini 2.5 Pro...")
+    yield {'type': 'synthesis_started', 'num_sources': len(extracted_sources)}
+
+    answer_parts = []
+    try:
+        model = GenerativeModel("gemini-2.0-flash-exp")
+        responses = model.generate_content(
+            synthesis_prompt,
+            generation_config={
+                'temperature': 0.3,  # Lower temperature for more factual responses
+                'max_output_tokens': 2048
+            },
+            stream=True
+        )
+        for chunk in responses:
+            try:
+                text = chunk.text
+            except (ValueError, AttributeError):
+                # Chunks without text parts (e.g. the final usage chunk)
+                continue
+            if text:
+                answer_parts.append(text)
+                yield {'type': 'token', 'text': text}
+
+        synthesized_answer = ''.join(answer_parts)
+        if not synthesized_answer:
+            raise ValueError("Empty synthesis response")
+
+    except Exception as e:
+        print(f"❌ LLM synthesis error: {e}")
+        # Fallback: return the raw content (after whatever was streamed)
+        fallback = _fallback_answer(extracted_sources)
+        yield {'type': 'token', 'text': ('\n\n' if answer_parts else '') + fallback}
+        synthesized_answer = ''.join(answer_parts) + ('\n\n' if answer_parts else '') + fallback
+
+    # Pages that finished while Gemini was writing (already done when quorum=False)
+    collector.join()
+    additional_sources = []
+    for i, source in sorted(late, key=lambda item: item[0]):
+        event = _source_event(i, source, late=True)
+        yield event
+        if event['success']:
+            additional_sources.append({'title': source['title'], 'url': source['url']})
+
+    # Step 5: Format final response
+    print(f"\n✅ Research complete!")
+    print(f"📊 Sources analyzed: {len(extracted_sources)}")
+    print("-" * 60)
+
+    # Build sources list
+    sources_list = []
+    for i, source in enumerate(extracted_sources, 1):
+        sources_list.append({
+            'number': i,
+            'title': source['title'],
+            'url': source['url']
+        })
+
+    yield {'type': 'done', 'result': {
+        'query': query,
+        'answer': synthesized_answer,
+        'sources': sources_list,
+        'timestamp': datetime.now().isoformat(),
+        'success': True,
+        'num_sources_analyzed': len(extracted_sources),
+        'additional_sources': additional_sources
+    }}
+
+
+async def research_topic_astream(query: str, num_sources: int = 5) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Async iterator over research_topic_stream events.
+
+    The blocking search/extraction/synthesis runs on a worker thread; events
+    are handed to the event loop as they are produced.
+    """
+    loop = asyncio.get_running_loop()
+    events: asyncio.Queue = asyncio.Queue()
+    stop = threading.Event()
+
+    def emit(item):
+        try:
+            loop.call_soon_threadsafe(events.put_nowait, item)
+        except RuntimeError:
+            # Event loop already closed
+            stop.set()
+
+    def produce():
+        stream = research_topic_stream(query, num_sources)
+        try:
+            for event in stream:
+                emit(event)
+                if stop.is_set():
+                    break
+        finally:
+            stream.close()
+            emit(_DONE)
+
+    worker = threading.Thread(target=produce, name="research-stream", daemon=True)
+    worker.start()
+    try:
+        while True:
+            event = await events.get()
+            if event is _DONE:
+                return
+            yield event
+    finally:
+        # Consumer went away (client disconnected): let the worker wind down
+        stop.set()
+
+
+def research_topic(query: str, num_sources: int = 5) -> Dict[str, Any]:
+    """
+    Performs comprehensive web research on a topic.
+
+    Blocking form of research_topic_stream: runs the same workflow and
+    returns only the final result.
+
+    Args:
+        query: The research question or topic
+        num_sources: Number of sources to analyze (default: 5)
+
+    Returns:
+        Dictionary with:
+        - 'query': Original query
+        - 'answer': Synthesized answer with citations
+        - 'sources': List of sources used
+        - 'timestamp': When research was performed
+        - 'success': Whether research succeeded
+    """
+    result = None
+    for event in research_topic_stream(query, num_sources=num_sources, quorum=False):
+        if event['type'] == 'done':
+            result = event['result']
+    return result
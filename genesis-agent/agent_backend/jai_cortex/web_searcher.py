@@ -1,12 +1,18 @@
 """
 Web Searcher Module
 Performs web searches using Google Custom Search API
+
+Result lists go through the shared HTTP cache, so repeating a query within
+the 'search' TTL costs neither a network round trip nor API quota.
 """
 
 import os
 import requests
 from typing import List, Dict, Any
 
+from .content_extractor import get_session
+from .http_cache import http_cache
+
 
 def perform_web_search(query: str, num_results: int = 5) -> List[str]:
     """
@@ -39,9 +45,8 @@ def perform_web_search(query: str, num_results: int = 5) -> List[str]:
             'num': num_results
         }
         
-        # Make request
-        response = requests.get(url, params=params, timeout=10)
-        response.raise_for_status()
+        # Make request (served from cache for repeated queries)
+        response = http_cache.fetch(get_session(), url, params=params, timeout=10, source='search')
         
         # Parse results
         search_results = response.json().get("items", [])
@@ -84,8 +89,7 @@ def get_search_snippets(query: str, num_results: int = 5) -> List[Dict[str, str]
             'num': num_results
         }
         
-        response = requests.get(url, params=params, timeout=10)
-        response.raise_for_status()
+        response = http_cache.fetch(get_session(), url, params=params, timeout=10, source='search')
         
         search_results = response.json().get("items", [])
         
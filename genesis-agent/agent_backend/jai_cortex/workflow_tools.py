@@ -11,9 +11,86 @@ This solves decision paralysis and ensures critical steps (like validation) neve
 from google.adk.tools import ToolContext
 import logging
 
+from .keyword_matcher import KeywordMatcher
+from .tool_retriever import tool_retriever
+
 logger = logging.getLogger(__name__)
 
 
+# ============================================================================
+# TOOL SELECTION RULES (used by select_relevant_tools)
+# ============================================================================
+
+TOOL_CATEGORIES = {
+    'deployment': {
+        'keywords': ['deploy', 'cloud run', 'publish', 'launch'],
+        'tools': [
+            'smart_deploy_workflow',  # Use workflow instead of individual tools
+            'list_directory',
+            'find_directory',
+            'read_file_content'
+        ],
+        'reason': "Deployment task detected - using smart_deploy_workflow"
+    },
+    'debugging': {
+        'keywords': ['debug', 'error', 'broken', 'not working', 'failed'],
+        'tools': [
+            'smart_debug_workflow',  # Use workflow instead of individual tools
+            'get_cloud_run_logs',
+            'get_cloud_build_logs',
+            'describe_cloud_run_service'
+        ],
+        'reason': "Debugging task detected - using smart_debug_workflow"
+    },
+    'analysis': {
+        'keywords': ['analyze', 'image', 'video', 'github', 'code'],
+        'tools': [
+            'smart_analyze_workflow',  # Use workflow instead of individual tools
+            'analyze_image',
+            'analyze_video',
+            'analyze_github_repo'
+        ],
+        'reason': "Analysis task detected - using smart_analyze_workflow"
+    },
+    'design': {
+        'keywords': ['design', 'ui', 'component', 'css', 'tailwind'],
+        'tools': [
+            'extract_design_system',
+            'generate_apple_ui_component',
+            'generate_css_styles',
+            'setup_tailwind_css'
+        ],
+        'reason': "Design task detected"
+    },
+    'memory': {
+        'keywords': ['remember', 'recall', 'context', 'project', 'notes'],
+        'tools': [
+            'remember_project_context',
+            'recall_project_context',
+            'update_project_notes',
+            'search_memory'
+        ],
+        'reason': "Memory task detected"
+    },
+    'cloud_infrastructure': {
+        'keywords': ['iam', 'permission', 'secret', 'firestore', 'storage'],
+        'tools': [
+            'grant_iam_permission',
+            'check_iam_permissions',
+            'create_secret',
+            'get_secret',
+            'check_firestore_database',
+            'check_cloud_storage_buckets'
+        ],
+        'reason': "Cloud infrastructure task detected"
+    },
+}
+
+TOOL_CATEGORY_RULES = KeywordMatcher(
+    [(category, spec['keywords']) for category, spec in TOOL_CATEGORIES.items()]
+)
+
+
 def smart_deploy_workflow(
     service_name: str,
     source_directory: str,
@@ -191,74 +268,22 @@ def select_relevant_tools(
         dict with 'relevant_tools' (list of 5-10 tool names) and 'reasoning'
     """
     
-    task_lower = task_description.lower()
     relevant_tools = []
     reasoning = []
     
-    # Deployment tasks
-    if any(word in task_lower for word in ['deploy', 'cloud run', 'publish', 'launch']):
-        relevant_tools.extend([
-            'smart_deploy_workflow',  # Use workflow instead of individual tools
-            'list_directory',
-            'find_directory',
-            'read_file_content'
-        ])
-        reasoning.append("Deployment task detected - using smart_deploy_workflow")
-    
-    # Debugging tasks
-    if any(word in task_lower for word in ['debug', 'error', 'broken', 'not working', 'failed']):
-        relevant_tools.extend([
-            'smart_debug_workflow',  # Use workflow instead of individual tools
-            'get_cloud_run_logs',
-            'get_cloud_build_logs',
-            'describe_cloud_run_service'
-        ])
-        reasoning.append("Debugging task detected - using smart_debug_workflow")
-    
-    # Analysis tasks
-    if any(word in task_lower for word in ['analyze', 'image', 'video', 'github', 'code']):
-        relevant_tools.extend([
-            'smart_analyze_workflow',  # Use workflow instead of individual tools
-            'analyze_image',
-            'analyze_video',
-            'analyze_github_repo'
-        ])
-        reasoning.append("Analysis task detected - using smart_analyze_workflow")
+    # One pass over the request; categories come back in table order
+    for category in TOOL_CATEGORY_RULES.labels(task_description):
+        relevant_tools.extend(TOOL_CATEGORIES[category]['tools'])
+        reasoning.append(TOOL_CATEGORIES[category]['reason'])
     
-    # Design/UI tasks
-    if any(word in task_lower for word in ['design', 'ui', 'component', 'css', 'tailwind']):
-        relevant_tools.extend([
-            'extract_design_system',
-            'generate_apple_ui_component',
-            'generate_css_styles',
-            'setup_tailwind_css'
-        ])
-        reasoning.append("Design task detected")
-    
-    # Memory/context tasks
-    if any(word in task_lower for word in ['remember', 'recall', 'context', 'project', 'notes']):
-        relevant_tools.extend([
-            'remember_project_context',
-            'recall_project_context',
-            'update_project_notes',
-            'search_memory'
-        ])
-        reasoning.append("Memory task detected")
-    
-    # Cloud infrastructure tasks
-    if any(word in task_lower for word in ['iam', 'permission', 'secret', 'firestore', 'storage']):
-        relevant_tools.extend([
-            'grant_iam_permission',
-            'check_iam_permissions',
-            'create_secret',
-            'get_secret',
-            'check_firestore_database',
-            'check_cloud_storage_buckets'
-        ])
-        reasoning.append("Cloud infrastructure task detected")
+    # Semantic ranking over every registered tool's docstring (once the index is built)
+    semantic_matches = [name for name, _ in tool_retriever.rank(task_description, top_k=10)]
+    if semantic_matches:
+        relevant_tools.extend(semantic_matches)
+        reasoning.append(f"Semantic match: {', '.join(semantic_matches[:5])}")
     
-    # Remove duplicates
-    relevant_tools = list(set(relevant_tools))
+    # Remove duplicates (keeping category order so the cap below drops the least specific)
+    relevant_tools = list(dict.fromkeys(relevant_tools))
     
     # If no specific category matched, return general-purpose tools
     if not relevant_tools:
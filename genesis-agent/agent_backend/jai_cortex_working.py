@@ -332,7 +332,7 @@ def search_my_knowledge(query: str) -> dict:
         }
     
     try:
-        results = knowledge_base.search_knowledge(query)
+        results = knowledge_base.retrieve(query)
         
         if not results:
             return {
@@ -485,7 +485,7 @@ def save_conversation(message: str, response: str, metadata: dict) -> dict:
                     user_message=message,
                     agent_response=response
                 )
-                if capture_result.get("status") == "success":
+                if capture_result.get("status") in ("success", "queued"):
                     print(f"✅ Auto-captured conversation #{capture_result.get('capture_count')}")
             except Exception as capture_error:
                 print(f"⚠️  Auto-capture failed: {capture_error}")
@@ -5,6 +5,7 @@ Serves the ADK agent with proper endpoints for the frontend.
 
 import os
 import asyncio
+from collections import OrderedDict
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
@@ -29,8 +30,75 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+APP_NAME = "jai_cortex"
+SESSION_DB_URL = os.getenv("SESSION_DB_URL", "sqlite:///./jai_cortex_sessions.db")
+SESSION_CACHE_SIZE = int(os.getenv("SESSION_CACHE_SIZE", "10000"))
+
+
+def _create_session_service() -> DatabaseSessionService:
+    """
+    SQLite session DB in WAL mode (readers don't block the writer) with a
+    small connection pool instead of a connection per request.
+    """
+    try:
+        service = DatabaseSessionService(SESSION_DB_URL, pool_size=5, max_overflow=10, pool_pre_ping=True)
+    except Exception as e:
+        # Older ADK/SQLAlchemy versions don't accept pool options here
+        print(f"⚠️  Session DB pool options not supported ({e}), using defaults")
+        service = DatabaseSessionService(SESSION_DB_URL)
+    
+    engine = getattr(service, "db_engine", None)
+    if engine is not None and SESSION_DB_URL.startswith("sqlite"):
+        from sqlalchemy import event
+        
+        @event.listens_for(getattr(engine, "sync_engine", engine), "connect")
+        def _sqlite_pragmas(dbapi_connection, _record):
+            cursor = dbapi_connection.cursor()
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA synchronous=NORMAL")
+            cursor.execute("PRAGMA busy_timeout=5000")
+            cursor.close()
+        
+        if not hasattr(engine, "sync_engine"):
+            # Drop connections opened before the listener (table creation)
+            engine.dispose()
+    return service
+
+
 # Persistent session service using SQLite database (saves conversation history locally)
-session_service = DatabaseSessionService("sqlite:///./jai_cortex_sessions.db")
+session_service = _create_session_service()
+
+# One long-lived Runner for every request (it holds no per-request state)
+runner = Runner(
+    agent=root_agent,  # This is now an AdkApp with enable_tracing=True
+    app_name=APP_NAME,
+    session_service=session_service
+)
+
+# Sessions known to exist in the DB, so the hot path skips the lookup/insert
+_known_sessions: "OrderedDict[tuple, None]" = OrderedDict()
+_session_lock = asyncio.Lock()
+
+
+async def ensure_session(user_id: str, session_id: str) -> None:
+    """Create the session once; afterwards an in-process cache answers."""
+    key = (user_id, session_id)
+    if key in _known_sessions:
+        _known_sessions.move_to_end(key)
+        return
+    
+    async with _session_lock:
+        if key not in _known_sessions:
+            session = await session_service.get_session(
+                app_name=APP_NAME, user_id=user_id, session_id=session_id
+            )
+            if session is None:
+                await session_service.create_session(
+                    app_name=APP_NAME, user_id=user_id, session_id=session_id
+                )
+            _known_sessions[key] = None
+            while len(_known_sessions) > SESSION_CACHE_SIZE:
+                _known_sessions.popitem(last=False)
 
 # Request/Response models
 class ChatRequest(BaseModel):
@@ -51,11 +119,7 @@ class ChatResponse(BaseModel):
 async def startup_event():
     """Initialize default session on startup."""
     try:
-        await session_service.create_session(
-            app_name="agent_master",
-            user_id="default",
-            session_id="default"
-        )
+        await ensure_session(user_id="default", session_id="default")
         print("✅ JAi CORTEX OS - COMPLETE ADK is ready!")
         print("📡 Listening for requests on http://localhost:8000")
         print("🤖 24 Specialist Agents: CodeMaster, CloudExpert, DatabaseExpert, WebSearcher, and 20 more")
@@ -74,25 +138,8 @@ async def chat_endpoint(request: ChatRequest):
     Main chat endpoint - runs the TRUE AGENT with real tools.
     """
     try:
-        # Always ensure session exists
-        session_key = f"{request.user_id}:{request.session_id}"
-        try:
-            await session_service.create_session(
-                app_name="jai_cortex",
-                user_id=request.user_id,
-                session_id=request.session_id
-            )
-        except Exception as e:
-            # Session might already exist, that's fine
-            print(f"Session creation note: {e}")
-            pass
-        
-        # Create runner with the agent (AdkApp with tracing enabled)
-        runner = Runner(
-            agent=root_agent,  # This is now an AdkApp with enable_tracing=True
-            app_name="jai_cortex",
-            session_service=session_service
-        )
+        # Ensure session exists (cached after the first request)
+        await ensure_session(request.user_id, request.session_id)
         
         # Prepare the message content
         parts = [genai_types.Part.from_text(text=request.message)]
@@ -150,6 +197,8 @@ async def chat_endpoint(request: ChatRequest):
         )
         
     except Exception as e:
+        # The session may have been deleted underneath us; re-check next time
+        _known_sessions.pop((request.user_id, request.session_id), None)
         print(f"❌ Error in chat endpoint: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
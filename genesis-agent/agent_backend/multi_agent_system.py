@@ -4,10 +4,67 @@ Manages multiple specialist agents, routes messages, handles multi-platform
 """
 
 import os
+import importlib.util
+from pathlib import Path
 from typing import Dict, List, Any, Optional
 from datetime import datetime
 from agent_templates import AGENT_TEMPLATES, calculate_agent_strength
 
+# Loaded by file path: importing jai_cortex.keyword_matcher would run
+# jai_cortex/__init__.py and pull the whole ADK agent (and its clients) into
+# the router. keyword_matcher.py itself only needs the standard library.
+_spec = importlib.util.spec_from_file_location(
+    "jai_cortex_keyword_matcher", Path(__file__).parent / "jai_cortex" / "keyword_matcher.py"
+)
+_keyword_matcher = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(_keyword_matcher)
+KeywordMatcher = _keyword_matcher.KeywordMatcher
+
+# Checked in order: the first agent whose keywords appear wins, so the most
+# specific domains come first (see jai_cortex/keyword_matcher.py)
+AGENT_ROUTING_RULES = KeywordMatcher([
+    # Crypto keywords (check first - most specific)
+    ('CryptoKing', ['crypto', 'bitcoin', 'ethereum', 'btc', 'eth', 'defi', 'nft', 'blockchain', 'altcoin', 'wallet']),
+    # Stock keywords
+    ('StockMaster', ['stock', 'stocks', 'shares', 'dividend', 'portfolio', 'market', 'nasdaq', 'dow', 'earnings']),
+    # Financial keywords (general)
+    ('FinanceWizard', ['money', 'budget', 'expense', 'finance', 'transaction', 'cost', 'price', 'invest', 'saving']),
+    # Code keywords
+    ('CodeMaster', [
+        'code', 'coding', 'bug', 'debug', 'deploy', 'test', 'testing', 'function',
+        'react', 'python', 'javascript', 'typescript', 'api', 'backend', 'frontend',
+        'database', 'firestore', 'sql', 'query', 'schema', 'collection', 'document',
+        'app', 'application', 'build', 'compile', 'error', 'exception', 'fix',
+        'refactor', 'optimize', 'performance', 'script', 'library', 'framework',
+        'node', 'npm', 'package', 'dependency', 'git', 'repository', 'commit'
+    ]),
+    # Research keywords
+    ('ResearchScout', ['search', 'find', 'research', 'competitor', 'trend', 'news', 'article']),
+    # Design keywords
+    ('DesignGenius', ['design', 'ui', 'ux', 'color', 'layout', 'component', 'style', 'glassmorphic']),
+    # Travel keywords
+    ('TravelGenius', ['travel', 'flight', 'hotel', 'trip', 'vacation', 'destination', 'booking']),
+    # Shopping keywords
+    ('ShopSavvy', ['shop', 'shopping', 'buy', 'purchase', 'deal', 'price compare', 'product']),
+    # Budget keywords
+    ('BudgetBoss', ['spending', 'bill', 'subscription', 'save money', 'track expense']),
+    # Sports keywords
+    ('SportsMath', ['sports', 'game', 'team', 'prediction', 'bet', 'odds', 'nfl', 'nba', 'soccer']),
+    # Automation keywords
+    ('AutomationWizard', ['automate', 'automation', 'workflow', 'schedule', 'trigger', 'cron']),
+    # Notebook/Data science keywords
+    ('NotebookGenius', ['notebook', 'jupyter', 'data analysis', 'dataset', 'pandas', 'visualization']),
+    # Maps keywords
+    ('MapsNavigator', ['map', 'maps', 'location', 'directions', 'navigate', 'route', 'gps']),
+    # Workspace keywords
+    ('WorkspaceManager', ['email', 'gmail', 'drive', 'calendar', 'meeting', 'doc', 'sheet']),
+    # Media keywords
+    ('MediaProcessor', ['zoom', 'video', 'audio', 'transcribe', 'recording']),
+    # Agent creation keywords
+    ('AgentCreator', ['create agent', 'new agent', 'build agent', 'make agent']),
+])
+
+
 # ============================================================================
 # AGENT MANAGER
 # ============================================================================
@@ -118,81 +175,8 @@ class AgentManager:
     
     def route_message(self, message: str, context: Optional[Dict[str, Any]] = None) -> str:
         """Route message to best agent based on content"""
-        message_lower = message.lower()
-        
-        # Crypto keywords (check first - most specific)
-        if any(word in message_lower for word in ['crypto', 'bitcoin', 'ethereum', 'btc', 'eth', 'defi', 'nft', 'blockchain', 'altcoin', 'wallet']):
-            return 'CryptoKing'
-        
-        # Stock keywords
-        if any(word in message_lower for word in ['stock', 'stocks', 'shares', 'dividend', 'portfolio', 'market', 'nasdaq', 'dow', 'earnings']):
-            return 'StockMaster'
-        
-        # Financial keywords (general)
-        if any(word in message_lower for word in ['money', 'budget', 'expense', 'finance', 'transaction', 'cost', 'price', 'invest', 'saving']):
-            return 'FinanceWizard'
-        
-        # Code keywords
-        if any(word in message_lower for word in [
-            'code', 'coding', 'bug', 'debug', 'deploy', 'test', 'testing', 'function', 
-            'react', 'python', 'javascript', 'typescript', 'api', 'backend', 'frontend',
-            'database', 'firestore', 'sql', 'query', 'schema', 'collection', 'document',
-            'app', 'application', 'build', 'compile', 'error', 'exception', 'fix',
-            'refactor', 'optimize', 'performance', 'script', 'library', 'framework',
-            'node', 'npm', 'package', 'dependency', 'git', 'repository', 'commit'
-        ]):
-            return 'CodeMaster'
-        
-        # Research keywords
-        if any(word in message_lower for word in ['search', 'find', 'research', 'competitor', 'trend', 'news', 'article']):
-            return 'ResearchScout'
-        
-        # Design keywords
-        if any(word in message_lower for word in ['design', 'ui', 'ux', 'color', 'layout', 'component', 'style', 'glassmorphic']):
-            return 'DesignGenius'
-        
-        # Travel keywords
-        if any(word in message_lower for word in ['travel', 'flight', 'hotel', 'trip', 'vacation', 'destination', 'booking']):
-            return 'TravelGenius'
-        
-        # Shopping keywords
-        if any(word in message_lower for word in ['shop', 'shopping', 'buy', 'purchase', 'deal', 'price compare', 'product']):
-            return 'ShopSavvy'
-        
-        # Budget keywords
-        if any(word in message_lower for word in ['spending', 'bill', 'subscription', 'save money', 'track expense']):
-            return 'BudgetBoss'
-        
-        # Sports keywords
-        if any(word in message_lower for word in ['sports', 'game', 'team', 'prediction', 'bet', 'odds', 'nfl', 'nba', 'soccer']):
-            return 'SportsMath'
-        
-        # Automation keywords
-        if any(word in message_lower for word in ['automate', 'automation', 'workflow', 'schedule', 'trigger', 'cron']):
-            return 'AutomationWizard'
-        
-        # Notebook/Data science keywords
-        if any(word in message_lower for word in ['notebook', 'jupyter', 'data analysis', 'dataset', 'pandas', 'visualization']):
-            return 'NotebookGenius'
-        
-        # Maps keywords
-        if any(word in message_lower for word in ['map', 'maps', 'location', 'directions', 'navigate', 'route', 'gps']):
-            return 'MapsNavigator'
-        
-        # Workspace keywords
-        if any(word in message_lower for word in ['email', 'gmail', 'drive', 'calendar', 'meeting', 'doc', 'sheet']):
-            return 'WorkspaceManager'
-        
-        # Media keywords
-        if any(word in message_lower for word in ['zoom', 'video', 'audio', 'transcribe', 'recording']):
-            return 'MediaProcessor'
-        
-        # Agent creation keywords
-        if any(word in message_lower for word in ['create agent', 'new agent', 'build agent', 'make agent']):
-            return 'AgentCreator'
-        
-        # Default to master agent
-        return 'CORTEX_MASTER'
+        # Single pass over the message against the routing table
+        return AGENT_ROUTING_RULES.first(message, default='CORTEX_MASTER')
 
 
 # ============================================================================
@@ -3,14 +3,17 @@ FastAPI Server for Cortex OS - Pure Vertex AI
 """
 
 import os
+import json
 import asyncio
 import base64
 from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import Optional, List, Dict, Any
 from datetime import datetime
-from cortex_full import chat, model, PROJECT_ID, LOCATION, TOOL_FUNCTIONS
+from cortex_full import chat_async, chat_events, model, PROJECT_ID, LOCATION, TOOL_FUNCTIONS, tool_runner
+from session_store import create_session_store
 
 # Import multi-agent system
 try:
@@ -35,8 +38,8 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# In-memory session storage (simple for now)
-sessions: Dict[str, List] = {}
+# Bounded session storage (LRU/TTL + byte cap, history compaction); see session_store.py
+sessions = create_session_store()
 
 # Request/Response models
 class ChatRequest(BaseModel):
@@ -45,6 +48,10 @@ class ChatRequest(BaseModel):
     session_id: str = "default"
     user_id: str = "default"
 
+class ResearchRequest(BaseModel):
+    query: str
+    num_sources: int = 5
+
 class ChatResponse(BaseModel):
     response: str
     tool_calls: List[Dict[str, Any]] = []
@@ -76,30 +83,34 @@ async def startup_event():
     
     print("\n🎉 READY FOR MULTI-PLATFORM, MULTI-AGENT ACTION!\n")
 
+def route_message(request: ChatRequest) -> str:
+    """INTELLIGENT ROUTING: pick the best specialist agent for a message"""
+    if not HAS_MULTI_AGENT:
+        return "Cortex"
+    
+    router = get_router()
+    routing = router.handle_message(
+        message=request.message,
+        platform='web',
+        user_id=request.user_id,
+        session_id=request.session_id
+    )
+    selected_agent = routing.get('agent_id', 'Cortex')
+    print(f"🎯 Routing to: {selected_agent}")
+    return selected_agent
+
 @app.post("/api/chat", response_model=ChatResponse)
 async def chat_endpoint(request: ChatRequest):
     """Main chat endpoint with intelligent agent routing"""
     try:
         # Get or create session history
         session_key = f"{request.user_id}:{request.session_id}"
-        history = sessions.get(session_key, [])
+        history = sessions.get(session_key)
         
-        # INTELLIGENT ROUTING: Route to best specialist agent
-        if HAS_MULTI_AGENT:
-            router = get_router()
-            routing = router.handle_message(
-                message=request.message,
-                platform='web',
-                user_id=request.user_id,
-                session_id=request.session_id
-            )
-            selected_agent = routing.get('agent_id', 'Cortex')
-            print(f"🎯 Routing to: {selected_agent}")
-        else:
-            selected_agent = "Cortex"
+        selected_agent = route_message(request)
         
-        # Call Vertex AI agent (main Cortex with all tools)
-        result = chat(
+        # Call Vertex AI agent (main Cortex with all tools) without blocking the event loop
+        result = await chat_async(
             message=request.message,
             image_base64=request.image,
             chat_history=history
@@ -109,7 +120,7 @@ async def chat_endpoint(request: ChatRequest):
         result["selected_agent"] = selected_agent
         
         # Update session history
-        sessions[session_key] = result["history"]
+        sessions.put(session_key, result["history"])
         
         return ChatResponse(
             response=result["response"],
@@ -123,6 +134,72 @@ async def chat_endpoint(request: ChatRequest):
         print(f"❌ Error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+def sse_event(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+@app.post("/api/chat/stream")
+async def chat_stream_endpoint(request: ChatRequest):
+    """
+    Streaming chat over Server-Sent Events (POST, so read it with fetch()
+    rather than EventSource). Events: start, token, tool_call, tool_result,
+    done (same fields as /api/chat) and error.
+    """
+    session_key = f"{request.user_id}:{request.session_id}"
+    history = sessions.get(session_key)
+    selected_agent = route_message(request)
+    
+    async def event_stream():
+        yield sse_event("start", {"selected_agent": selected_agent})
+        try:
+            async for event in chat_events(
+                message=request.message,
+                image_base64=request.image,
+                chat_history=history
+            ):
+                kind = event["type"]
+                if kind == "done":
+                    sessions.put(session_key, event["history"])
+                    yield sse_event("done", {
+                        "response": event["response"],
+                        "tool_calls": event["tool_calls"],
+                        "timestamp": int(datetime.now().timestamp() * 1000),
+                        "selected_agent": selected_agent
+                    })
+                else:
+                    yield sse_event(kind, {k: v for k, v in event.items() if k != "type"})
+        except Exception as e:
+            print(f"❌ Stream error: {e}")
+            yield sse_event("error", {"detail": str(e)})
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.post("/api/research/stream")
+async def research_stream_endpoint(request: ResearchRequest):
+    """
+    Web research over Server-Sent Events, so results show up while sources
+    are still being read. Events: search, source, synthesis_started, token,
+    done (the research_topic result) and error.
+    """
+    from jai_cortex.web_power_orchestrator import research_topic_astream
+    
+    async def event_stream():
+        try:
+            async for event in research_topic_astream(request.query, request.num_sources):
+                yield sse_event(event["type"], {k: v for k, v in event.items() if k != "type"})
+        except Exception as e:
+            print(f"❌ Research stream error: {e}")
+            yield sse_event("error", {"detail": str(e)})
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.get("/api/health")
 async def health_check():
     return {
@@ -130,7 +207,9 @@ async def health_check():
         "agent": "Cortex OS",
         "framework": "Vertex AI",
         "version": "3.0.0",
-        "project": PROJECT_ID
+        "project": PROJECT_ID,
+        "sessions": sessions.stats(),
+        "tools": tool_runner.stats()
     }
 
 @app.get("/")
@@ -143,6 +222,8 @@ async def root():
         "project": PROJECT_ID,
         "endpoints": {
             "chat": "/api/chat",
+            "chat_stream": "/api/chat/stream",
+            "research_stream": "/api/research/stream",
             "voice": "ws://localhost:8000/ws/voice",
             "agents": "/api/agents",
             "agent_strength": "/api/agents/{agent_id}/strength",
@@ -255,14 +336,14 @@ async def voice_websocket(websocket: WebSocket):
             if data.get("type") == "audio":
                 # Transcribe incoming audio
                 audio_base64 = data.get("audio")
-                transcription = transcribe_audio_stream_impl(audio_base64)
+                transcription = await asyncio.to_thread(transcribe_audio_stream_impl, audio_base64)
                 
                 if transcription['status'] == 'success':
                     text = transcription['transcript']
                     print(f"🎤 User said: {text}")
                     
                     # Get agent response
-                    result = chat(
+                    result = await chat_async(
                         message=text,
                         image_base64=None,
                         chat_history=[]
@@ -272,7 +353,7 @@ async def voice_websocket(websocket: WebSocket):
                     print(f"🤖 Agent responds: {response_text}")
                     
                     # Convert response to speech
-                    tts_result = text_to_speech_impl(response_text)
+                    tts_result = await asyncio.to_thread(text_to_speech_impl, response_text)
                     
                     if tts_result['status'] == 'success':
                         # Send audio response back
@@ -0,0 +1,314 @@
+"""
+Session Store for Cortex OS chat history
+Bounded, evicting storage for server.py instead of an unbounded dict
+
+- MemorySessionStore: LRU + TTL eviction with caps on session count and
+  total bytes (single worker)
+- SQLiteSessionStore: same limits in a WAL SQLite file, so several uvicorn
+  workers on one host share sessions
+
+Histories are stored as plain dicts (Content.to_dict()) and compacted on
+every write: inline image bytes are dropped from all but the latest turn,
+and turns beyond SESSION_MAX_TURNS (or SESSION_MAX_HISTORY_BYTES) are
+folded into a short summary at the start of the history, so the prompt
+resent on each start_chat stays bounded too.
+
+Configure with SESSION_STORE=memory (default) or SESSION_STORE=sqlite:///path/sessions.sqlite3
+"""
+
+import os
+import json
+import time
+import sqlite3
+import threading
+from pathlib import Path
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+SESSION_TTL = float(os.getenv("SESSION_TTL", str(24 * 3600)))
+SESSION_MAX_SESSIONS = int(os.getenv("SESSION_MAX_SESSIONS", "1000"))
+SESSION_MAX_BYTES = int(os.getenv("SESSION_MAX_BYTES", str(64 * 1024 * 1024)))
+SESSION_MAX_TURNS = int(os.getenv("SESSION_MAX_TURNS", "20"))
+SESSION_MAX_HISTORY_BYTES = int(os.getenv("SESSION_MAX_HISTORY_BYTES", str(256 * 1024)))
+SUMMARY_CHARS = 2000
+
+SUMMARY_PREFIX = "[Summary of earlier conversation]"
+SUMMARY_ACK = "Understood, I'll keep that context in mind."
+
+# ============================================================================
+# HISTORY CONVERSION & COMPACTION
+# ============================================================================
+
+def history_to_dicts(history: List[Any]) -> List[Dict[str, Any]]:
+    """Vertex AI Content objects (or dicts) -> JSON-serializable dicts"""
+    return [item if isinstance(item, dict) else item.to_dict() for item in history or []]
+
+def history_from_dicts(history: List[Dict[str, Any]]) -> List[Any]:
+    """Dicts -> Vertex AI Content objects for model.start_chat"""
+    from vertexai.generative_models import Content
+    return [Content.from_dict(item) for item in history]
+
+def history_bytes(history: List[Dict[str, Any]]) -> int:
+    return len(json.dumps(history, default=str))
+
+def _text_of(content: Dict[str, Any]) -> str:
+    return " ".join(part["text"] for part in content.get("parts", []) if part.get("text")).strip()
+
+def _is_user_message(content: Dict[str, Any]) -> bool:
+    """A user turn typed by a person (not a function_response)"""
+    return content.get("role") == "user" and any("text" in part for part in content.get("parts", []))
+
+def _strip_inline_data(content: Dict[str, Any]) -> Dict[str, Any]:
+    parts = []
+    for part in content.get("parts", []):
+        if "inline_data" in part:
+            mime_type = part["inline_data"].get("mime_type", "data")
+            parts.append({"text": f"[{mime_type} omitted]"})
+        else:
+            parts.append(part)
+    return {**content, "parts": parts}
+
+def extractive_summary(history: List[Dict[str, Any]]) -> str:
+    """Cheap summary of dropped turns: who said what, truncated (no model call)"""
+    lines = []
+    for content in history:
+        text = _text_of(content)
+        if not text:
+            continue
+        if text.startswith(SUMMARY_PREFIX):
+            lines.append(text[len(SUMMARY_PREFIX):].strip())
+            continue
+        speaker = "User" if content.get("role") == "user" else "Cortex"
+        lines.append(f"{speaker}: {text[:200]}")
+    summary = "\n".join(lines)
+    # Keep the most recent part of the summary when it overflows
+    return summary[-SUMMARY_CHARS:]
+
+def compact_history(history: List[Dict[str, Any]], max_turns: int = SESSION_MAX_TURNS,
+                    max_bytes: int = SESSION_MAX_HISTORY_BYTES,
+                    summarizer: Callable[[List[Dict[str, Any]]], str] = extractive_summary) -> List[Dict[str, Any]]:
+    """
+    Bound a chat history: drop inline bytes from older turns, then fold the
+    oldest turns into a summary until at most max_turns user turns and
+    max_bytes remain. Cuts only happen at user turns, so function calls
+    stay paired with their responses.
+    """
+    starts = [i for i, content in enumerate(history) if _is_user_message(content)]
+    latest = starts[-1] if starts else 0
+    history = [_strip_inline_data(c) if i < latest else c for i, c in enumerate(history)]
+
+    has_summary = bool(history) and _text_of(history[0]).startswith(SUMMARY_PREFIX)
+    # The previous summary's canned acknowledgement carries no content
+    has_ack = has_summary and len(history) > 1 and history[1].get("role") == "model" \
+        and _text_of(history[1]) == SUMMARY_ACK
+    turn_starts = [i for i in starts if not (has_summary and i == 0)]
+
+    cut = 0
+    if len(turn_starts) > max_turns:
+        cut = turn_starts[-max_turns]
+    while history_bytes(history[cut:]) > max_bytes:
+        later = [i for i in turn_starts if i > cut]
+        if len(later) <= 1:
+            break
+        cut = later[0]
+    if cut == 0:
+        return history
+
+    folded = history[:cut]
+    if has_ack:
+        folded = folded[:1] + folded[2:]
+    summary = summarizer(folded)
+    return [
+        {"role": "user", "parts": [{"text": f"{SUMMARY_PREFIX}\n{summary}"}]},
+        {"role": "model", "parts": [{"text": SUMMARY_ACK}]},
+    ] + history[cut:]
+
+# ============================================================================
+# STORES
+# ============================================================================
+
+class SessionStore:
+    """get()/put() chat histories by session key; subclasses decide where they live"""
+
+    def __init__(self, ttl: float = SESSION_TTL, max_bytes: int = SESSION_MAX_BYTES,
+                 max_turns: int = SESSION_MAX_TURNS):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.max_turns = max_turns
+        self.evictions = 0
+        self.compactions = 0
+
+    def get(self, key: str) -> List[Any]:
+        """History as Content objects ([] for unknown or expired sessions)"""
+        history = self.get_dicts(key)
+        return history_from_dicts(history) if history else []
+
+    def put(self, key: str, history: List[Any]) -> None:
+        """Compact and store a history (Content objects or dicts)"""
+        dicts = history_to_dicts(history)
+        compacted = compact_history(dicts, max_turns=self.max_turns)
+        if len(compacted) != len(dicts):
+            self.compactions += 1
+        self.put_dicts(key, compacted)
+
+    def get_dicts(self, key: str) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def put_dicts(self, key: str, history: List[Dict[str, Any]]) -> None:
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, Any]:
+        raise NotImplementedError
+
+
+class MemorySessionStore(SessionStore):
+    """In-process LRU with TTL, session-count and byte caps"""
+
+    def __init__(self, max_sessions: int = SESSION_MAX_SESSIONS, **kwargs):
+        super().__init__(**kwargs)
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (history, bytes, updated)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def _remove(self, key: str) -> None:
+        _, size, _ = self._sessions.pop(key)
+        self._bytes -= size
+
+    def _evict(self) -> None:
+        cutoff = time.time() - self.ttl
+        # LRU order == last-update order, so expired sessions are at the front
+        while self._sessions:
+            key, (_, _, updated) = next(iter(self._sessions.items()))
+            if updated >= cutoff and len(self._sessions) <= self.max_sessions and self._bytes <= self.max_bytes:
+                break
+            self._remove(key)
+            self.evictions += 1
+
+    def get_dicts(self, key: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            entry = self._sessions.get(key)
+            if entry is None:
+                return []
+            if entry[2] < time.time() - self.ttl:
+                self._remove(key)
+                self.evictions += 1
+                return []
+            return entry[0]
+
+    def put_dicts(self, key: str, history: List[Dict[str, Any]]) -> None:
+        size = history_bytes(history)
+        with self._lock:
+            if key in self._sessions:
+                self._remove(key)
+            self._sessions[key] = (history, size, time.time())
+            self._bytes += size
+            self._evict()
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            if key in self._sessions:
+                self._remove(key)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "backend": "memory",
+                "sessions": len(self._sessions),
+                "bytes": self._bytes,
+                "max_sessions": self.max_sessions,
+                "max_bytes": self.max_bytes,
+                "evictions": self.evictions,
+                "compactions": self.compactions
+            }
+
+
+class SQLiteSessionStore(SessionStore):
+    """Sessions in a WAL SQLite file shared by every worker on the host"""
+
+    EVICT_EVERY = 50  # puts between size/TTL sweeps
+
+    def __init__(self, path: str, max_sessions: int = SESSION_MAX_SESSIONS, **kwargs):
+        super().__init__(**kwargs)
+        self.path = Path(path)
+        self.max_sessions = max_sessions
+        self._lock = threading.Lock()
+        self._puts = 0
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False, timeout=10)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "key TEXT PRIMARY KEY, history TEXT NOT NULL, bytes INTEGER NOT NULL, updated REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS sessions_updated ON sessions(updated)")
+        self._db.commit()
+
+    def get_dicts(self, key: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT history FROM sessions WHERE key = ? AND updated >= ?",
+                (key, time.time() - self.ttl)
+            ).fetchone()
+        return json.loads(row[0]) if row else []
+
+    def put_dicts(self, key: str, history: List[Dict[str, Any]]) -> None:
+        data = json.dumps(history, default=str)
+        with self._lock:
+            with self._db:
+                self._db.execute(
+                    "INSERT INTO sessions (key, history, bytes, updated) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(key) DO UPDATE SET history = excluded.history, "
+                    "bytes = excluded.bytes, updated = excluded.updated",
+                    (key, data, len(data), time.time())
+                )
+            self._puts += 1
+            if self._puts % self.EVICT_EVERY == 0:
+                self._evict()
+
+    def _evict(self) -> None:
+        with self._db:
+            cursor = self._db.execute("DELETE FROM sessions WHERE updated < ?", (time.time() - self.ttl,))
+            evicted = cursor.rowcount
+            count, total = self._db.execute("SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM sessions").fetchone()
+            for key, size in self._db.execute("SELECT key, bytes FROM sessions ORDER BY updated").fetchall():
+                if count <= self.max_sessions and total <= self.max_bytes:
+                    break
+                self._db.execute("DELETE FROM sessions WHERE key = ?", (key,))
+                count -= 1
+                total -= size
+                evicted += 1
+        self.evictions += evicted
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            with self._db:
+                self._db.execute("DELETE FROM sessions WHERE key = ?", (key,))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            count, total = self._db.execute("SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM sessions").fetchone()
+        return {
+            "backend": "sqlite",
+            "path": str(self.path),
+            "sessions": count,
+            "bytes": total,
+            "max_sessions": self.max_sessions,
+            "max_bytes": self.max_bytes,
+            "evictions": self.evictions,
+            "compactions": self.compactions
+        }
+
+
+def create_session_store(url: Optional[str] = None) -> SessionStore:
+    """Store selected by SESSION_STORE: 'memory' (default) or 'sqlite:///path'"""
+    url = url or os.getenv("SESSION_STORE", "memory")
+    if url.startswith("sqlite:///"):
+        return SQLiteSessionStore(url[len("sqlite:///"):])
+    if url != "memory":
+        print(f"⚠️  Unknown SESSION_STORE '{url}', using in-memory sessions")
+    return MemorySessionStore()
@@ -70,7 +70,7 @@ def monitor_sessions():
                                     agent_response=agent_response
                                 )
                                 
-                                if result['status'] == 'success':
+                                if result['status'] in ('success', 'queued'):
                                     print(f"✅ Captured: {session_id[:8]}... (#{result['capture_count']})")
                                 
                         processed_messages.add(message_id)
@@ -100,6 +100,7 @@ if __name__ == "__main__":
         monitor_sessions()
     except KeyboardInterrupt:
         print("\n\n🛑 Cognitive Capture Service Stopped")
+        cognitive_middleware.shutdown()
         stats = cognitive_middleware.get_stats()
         print(f"📊 Total Captured: {stats['total_captured']}")
 
@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+Test script for caching
+Checks TTL expiry, LRU/TinyLFU eviction, single-flight misses (threads and
+asyncio, including a cancelled leader), stable keys and the disk tier
+
+Run from agent_backend/: python test_caching.py
+"""
+
+import os
+import time
+import asyncio
+import tempfile
+import threading
+
+from caching import Cache, cached, stable_key
+
+
+def make_cache(**kwargs) -> Cache:
+    kwargs.setdefault("disk_path", None)
+    kwargs.setdefault("sweep_interval", 0)
+    return Cache(**kwargs)
+
+
+def test_stable_keys():
+    """Equal arguments share a key regardless of dict/set ordering"""
+    assert stable_key("ns", ({"b": 1, "a": 2},)) == stable_key("ns", ({"a": 2, "b": 1},))
+    assert stable_key("ns", ({3, 1, 2},)) == stable_key("ns", ({1, 2, 3},))
+    assert stable_key("ns", (), {"x": 1, "y": 2}) == stable_key("ns", (), {"y": 2, "x": 1})
+    assert stable_key("ns", (1,)) != stable_key("ns", ("1",))
+    assert stable_key("a", (1,)) != stable_key("b", (1,))
+
+    print("✅ Stable key test passed!\n")
+
+
+def test_ttl():
+    """Entries expire on read and on sweep; ttl <= 0 stores nothing"""
+    print("\n" + "="*60)
+    print("TESTING: TTL")
+    print("="*60 + "\n")
+
+    cache = make_cache(default_ttl=60)
+    cache.set("short", "value", ttl=0.05)
+    cache.set("default", "value")
+    assert cache.get("short") == "value"
+    time.sleep(0.1)
+    assert cache.get("short", "gone") == "gone", "Expired entry must not be served"
+    assert cache.get("default") == "value", "ttl=None falls back to default_ttl"
+
+    cache.set("zero", "value", ttl=0)
+    assert cache.get("zero") is None, "ttl=0 means don't cache"
+    cache.set("negative", "value", ttl=-1)
+    assert cache.get("negative") is None
+
+    cache.set("a", 1, ttl=0.05)
+    cache.set("b", 2, ttl=0.05)
+    time.sleep(0.1)
+    assert cache.sweep() == 2
+    assert cache.stats()["entries"] == 1
+    assert cache.stats()["namespaces"]["default"]["expired"] >= 3
+
+    print("✅ TTL test passed!\n")
+
+
+def test_lru_eviction():
+    """At capacity the least recently used entry goes first"""
+    print("\n" + "="*60)
+    print("TESTING: eviction")
+    print("="*60 + "\n")
+
+    cache = make_cache(max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")  # 'b' is now least recently used
+    cache.set("c", 3)
+    assert cache.get("b") is None and cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats()["entries"] == 2
+    assert cache.stats()["namespaces"]["default"]["evictions"] == 1
+
+    # Overwriting an existing key never evicts
+    cache.set("a", 10)
+    assert cache.get("a") == 10 and cache.get("c") == 3
+
+    print("✅ LRU eviction test passed!\n")
+
+
+def test_tinylfu_admission():
+    """A one-off key can't displace a hot entry; a frequently requested one can"""
+    cache = make_cache(max_entries=2)
+    cache.set("hot1", 1)
+    cache.set("hot2", 2)
+    for _ in range(5):
+        cache.get("hot1")
+        cache.get("hot2")
+
+    cache.set("once", 3)
+    assert cache.get("once") is None, "Cold newcomer should be rejected"
+    assert cache.get("hot1") == 1 and cache.get("hot2") == 2
+    assert cache.stats()["namespaces"]["default"]["rejected"] == 1
+
+    for _ in range(10):
+        cache.get("popular")  # misses still count towards frequency
+    cache.set("popular", 4)
+    assert cache.get("popular") == 4, "Frequently requested newcomer should be admitted"
+    assert cache.get("hot1") is None, "LRU victim makes room for it"
+
+    # Expired entries are purged before anything live is evicted
+    cache = make_cache(max_entries=2)
+    cache.set("stale", 1, ttl=0.05)
+    cache.set("live", 2)
+    for _ in range(5):
+        cache.get("live")
+    time.sleep(0.1)
+    cache.set("new", 3)
+    assert cache.get("new") == 3 and cache.get("live") == 2
+
+    print("✅ TinyLFU admission test passed!\n")
+
+
+def test_single_flight_threads():
+    """Concurrent thread misses on one key run compute() once"""
+    print("\n" + "="*60)
+    print("TESTING: single-flight")
+    print("="*60 + "\n")
+
+    cache = make_cache()
+    calls = []
+    barrier = threading.Barrier(8)
+    results = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.2)
+        return {"answer": 42}
+
+    def worker():
+        barrier.wait()
+        results.append(cache.get_or_compute("k", compute, namespace="threads"))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1, f"compute() ran {len(calls)} times"
+    assert results == [{"answer": 42}] * 8
+    assert cache.stats()["namespaces"]["threads"]["coalesced"] == 7
+    assert cache.get_or_compute("k", compute, namespace="threads") == {"answer": 42}
+    assert len(calls) == 1, "Result is cached afterwards"
+
+    print("✅ Threaded single-flight test passed!\n")
+
+
+def test_single_flight_errors():
+    """Followers see the leader's exception; failures and rejected results aren't cached"""
+    cache = make_cache()
+    barrier = threading.Barrier(3)
+    errors = []
+
+    def failing():
+        time.sleep(0.2)
+        raise ValueError("upstream down")
+
+    def worker():
+        barrier.wait()
+        try:
+            cache.get_or_compute("k", failing)
+        except ValueError as e:
+            errors.append(str(e))
+
+    threads = [threading.Thread(target=worker) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == ["upstream down"] * 3
+
+    assert cache.get_or_compute("k", lambda: "recovered") == "recovered", "Errors must not be cached"
+    assert cache.get_or_compute("skip", lambda: None, should_cache=lambda v: v is not None) is None
+    assert cache.get("skip", "absent") == "absent"
+
+    print("✅ Single-flight error test passed!\n")
+
+
+def test_single_flight_async():
+    """Concurrent coroutines await one compute(); a cancelled leader doesn't fail followers"""
+    cache = make_cache()
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.1)
+        return len(calls)
+
+    async def coalesce():
+        results = await asyncio.gather(*(cache.get_or_compute_async("k", compute) for _ in range(10)))
+        assert results == [1] * 10, f"Expected one shared result, got {results}"
+        assert len(calls) == 1
+
+    async def leader_cancelled():
+        calls.clear()
+        leader = asyncio.ensure_future(cache.get_or_compute_async("c", compute))
+        await asyncio.sleep(0.01)
+        follower = asyncio.ensure_future(cache.get_or_compute_async("c", compute))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        assert await follower == 2, "Follower should take over and compute the value itself"
+        assert leader.cancelled()
+        assert cache.get("c") == 2
+
+    async def follower_cancelled():
+        calls.clear()
+        leader = asyncio.ensure_future(cache.get_or_compute_async("f", compute))
+        await asyncio.sleep(0.01)
+        follower = asyncio.ensure_future(cache.get_or_compute_async("f", compute))
+        await asyncio.sleep(0.01)
+        follower.cancel()
+        assert await leader == 1, "Cancelling a follower must not cancel the shared computation"
+        assert follower.cancelled()
+
+    async def leader_error():
+        async def failing():
+            await asyncio.sleep(0.05)
+            raise RuntimeError("boom")
+
+        results = await asyncio.gather(*(cache.get_or_compute_async("e", failing) for _ in range(3)),
+                                       return_exceptions=True)
+        assert all(isinstance(r, RuntimeError) for r in results)
+        assert cache.get("e") is None
+
+    asyncio.run(coalesce())
+    asyncio.run(leader_cancelled())
+    asyncio.run(follower_cancelled())
+    asyncio.run(leader_error())
+
+    print("✅ Async single-flight test passed!\n")
+
+
+def test_decorator():
+    """@cached keys on arguments, skips error dicts and wraps async functions"""
+    cache = make_cache()
+    calls = []
+
+    @cached(ttl=60, cache=cache)
+    def lookup(query, limit=10):
+        calls.append((query, limit))
+        if query == "bad":
+            return {"status": "error", "message": "nope"}
+        return {"status": "success", "query": query}
+
+    lookup("x", limit=5)
+    lookup("x", limit=5)
+    lookup("y", limit=5)
+    assert calls == [("x", 5), ("y", 5)]
+
+    lookup("bad")
+    lookup("bad")
+    assert calls.count(("bad", 10)) == 2, "Error results are not cached"
+
+    @cached(ttl=60, cache=cache, namespace="async_lookup")
+    async def async_lookup(query):
+        calls.append(query)
+        return query.upper()
+
+    async def run():
+        return await asyncio.gather(async_lookup("z"), async_lookup("z"))
+
+    assert asyncio.run(run()) == ["Z", "Z"]
+    assert calls.count("z") == 1
+    assert lookup.cache is cache and "async_lookup" in cache.stats()["namespaces"]
+
+    print("✅ Decorator test passed!\n")
+
+
+def test_disk_tier():
+    """Values written by one cache are served to another process's cache"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "cache.sqlite3")
+        first = make_cache(disk_path=path)
+        second = make_cache(disk_path=path)
+
+        first.set("shared", {"value": 1}, namespace="disk")
+        assert second.get("shared", namespace="disk") == {"value": 1}
+        assert second.stats()["namespaces"]["disk"]["disk_hits"] == 1
+
+        first.set("object", object(), namespace="disk")  # not JSON: memory only
+        assert second.get("object", namespace="disk") is None
+
+        first.set("short", 1, ttl=0.05)
+        time.sleep(0.1)
+        assert second.get("short") is None
+        assert first.sweep() >= 1
+
+        first.clear("disk")
+        second.clear()
+        assert make_cache(disk_path=path).get("shared", namespace="disk") is None
+
+    print("✅ Disk tier test passed!\n")
+
+
+def main():
+    """Run all caching tests."""
+    print("\n🧪 CACHING TESTS\n")
+
+    try:
+        test_stable_keys()
+        test_ttl()
+        test_lru_eviction()
+        test_tinylfu_admission()
+        test_single_flight_threads()
+        test_single_flight_errors()
+        test_single_flight_async()
+        test_decorator()
+        test_disk_tier()
+
+        print("\n" + "="*60)
+        print("🎉 ALL CACHING TESTS PASSED!")
+        print("="*60 + "\n")
+
+    except AssertionError as e:
+        print(f"\n❌ TEST FAILED: {e}\n")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
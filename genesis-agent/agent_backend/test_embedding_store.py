@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Test script for jai_cortex.embedding_store
+Checks per-user shards, pending/shadowed rows, generation files, reopening
+a saved store, legacy layouts, rebuild() and concurrent writer processes
+
+Run from agent_backend/: python test_embedding_store.py
+"""
+
+import os
+import json
+import tempfile
+import multiprocessing
+
+import numpy as np
+
+from jai_cortex.embedding_store import EmbeddingStore, _shard_name
+
+
+def unit(*values):
+    return list(values)
+
+
+def shard_files(store, user_id=None):
+    shard = store._shard(user_id)
+    return sorted(f for f in os.listdir(shard.path) if f.endswith(".npy"))
+
+
+def read_meta(store, user_id=None):
+    with open(store._shard(user_id).meta_file) as f:
+        return json.load(f)
+
+
+def test_pending_and_shards():
+    """Rows are searchable before save(); search can be scoped to one user's shard"""
+    print("\n" + "="*60)
+    print("TESTING: shards and pending rows")
+    print("="*60 + "\n")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = EmbeddingStore(tmp)
+        assert store.add("a1", unit(1, 0, 0), user_id="alice")
+        assert store.add("b1", unit(0.9, 0.1, 0), user_id="bob")
+        assert store.add("shared", unit(0, 1, 0))
+        assert not store.add("bad", unit(1, 0)), "Dimension mismatch is rejected"
+
+        assert len(store) == 3 and "a1" in store and "zzz" not in store
+        assert [d for d, _ in store.search(unit(1, 0, 0), top_k=2)] == ["a1", "b1"]
+        assert [d for d, _ in store.search(unit(1, 0, 0), top_k=5, user_id="bob")] == ["b1"]
+        assert store.search(unit(1, 0, 0), user_id="nobody") == []
+        assert sorted(store.user_ids()) == ["_shared", "alice", "bob"]
+
+        # Odd user ids still map to distinct, filesystem-safe directories
+        assert _shard_name("a/b") != _shard_name("a_b") and "/" not in _shard_name("a/b")
+
+    print("✅ Shard test passed!\n")
+
+
+def test_generations_and_reopen():
+    """Each save writes a new generation; the previous one is kept, older ones removed"""
+    print("\n" + "="*60)
+    print("TESTING: generations")
+    print("="*60 + "\n")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = EmbeddingStore(tmp)
+        store.add("x", unit(1, 0, 0))
+        store.add("y", unit(0, 1, 0))
+        store.save()
+        assert read_meta(store)["generation"] == 1 and read_meta(store)["count"] == 2
+        assert len(shard_files(store)) == 2
+
+        # Updating a saved row shadows the mapped copy until the next save
+        store.add("x", unit(0, 0, 1))
+        assert len(store) == 2, "A shadowed row is not counted twice"
+        hits = store.search(unit(1, 0, 0), top_k=5)
+        assert "x" not in [d for d, s in hits if s > 0.5], "Stale mapped row must not be returned"
+        assert store.search(unit(0, 0, 1), top_k=1)[0][0] == "x"
+
+        store.save()
+        store.add("z", unit(1, 1, 0))
+        store.save()
+        meta = read_meta(store)
+        assert meta["generation"] == 3 and meta["count"] == 3
+        generations = {int(f.split("-")[1]) for f in shard_files(store)}
+        assert generations == {2, 3}, f"Only current and previous generations kept, got {generations}"
+        assert not [f for f in os.listdir(store._shard(None).path) if f.endswith(".tmp")]
+
+        reopened = EmbeddingStore(tmp)
+        assert len(reopened) == 3 and reopened.dim == 3
+        assert reopened.search(unit(0, 0, 1), top_k=1)[0][0] == "x", "Update survived the reopen"
+        assert reopened.search(unit(1, 1, 0), top_k=1)[0][0] == "z"
+        assert isinstance(reopened._shard(None).vectors, np.memmap), "Saved shards are memory-mapped"
+
+        # A reader picks up another instance's save without reopening
+        store.add("w", unit(-1, 0, 0))
+        store.save()
+        assert "w" in reopened and reopened.search(unit(-1, 0, 0), top_k=1)[0][0] == "w"
+
+    print("✅ Generation/reopen test passed!\n")
+
+
+def test_legacy_layout():
+    """Shards written before generations (vectors.npy / ids.npy) still load"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, _shard_name(None))
+        os.makedirs(path)
+        np.save(os.path.join(path, "vectors.npy"), np.eye(3, dtype=np.float32))
+        np.save(os.path.join(path, "ids.npy"), np.array(["a", "b", "c"]))
+        with open(os.path.join(path, "meta.json"), "w") as f:
+            json.dump({"user_id": "_shared", "count": 3, "dim": 3}, f)
+
+        store = EmbeddingStore(tmp)
+        assert len(store) == 3 and store.search(unit(0, 1, 0), top_k=1)[0][0] == "b"
+        store.add("d", unit(1, 1, 1))
+        store.save()
+        assert read_meta(store)["generation"] == 1 and len(EmbeddingStore(tmp)) == 4
+
+    print("✅ Legacy layout test passed!\n")
+
+
+def test_rebuild():
+    """rebuild() replaces every shard and drops users that no longer have records"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = EmbeddingStore(tmp)
+        store.add("old", unit(1, 0, 0), user_id="gone")
+        store.add("pending", unit(0, 1, 0), user_id="alice")
+        store.save()
+
+        written = store.rebuild([
+            ("alice", "a1", unit(1, 0, 0)),
+            ("alice", "a1", unit(0, 1, 0)),   # later record for the same id wins
+            (None, "s1", unit(0, 0, 1)),
+            ("alice", "zero", unit(0, 0, 0)),
+        ])
+        assert written == 2
+        assert "old" not in store and "pending" not in store
+        assert sorted(store.user_ids()) == ["_shared", "alice"]
+        assert store.search(unit(0, 1, 0), top_k=1, user_id="alice")[0][0] == "a1"
+        assert sorted(EmbeddingStore(tmp).user_ids()) == ["_shared", "alice"]
+
+    print("✅ Rebuild test passed!\n")
+
+
+def _writer(root, worker, rows):
+    store = EmbeddingStore(root)
+    rng = np.random.default_rng(worker)
+    for i in range(rows):
+        store.add(f"w{worker}-{i}", rng.normal(size=8).tolist())
+        if i % 10 == 9:
+            store.save()
+    store.save()
+
+
+def test_concurrent_writers():
+    """Saves from several processes merge instead of overwriting each other"""
+    print("\n" + "="*60)
+    print("TESTING: concurrent writers")
+    print("="*60 + "\n")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        processes = [multiprocessing.Process(target=_writer, args=(tmp, worker, 50)) for worker in range(4)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+            assert process.exitcode == 0
+
+        store = EmbeddingStore(tmp)
+        assert len(store) == 200, f"Rows lost between writers: {len(store)}/200"
+        assert read_meta(store)["count"] == 200
+        assert all(f"w{worker}-49" in store for worker in range(4))
+
+    print("✅ Concurrent writer test passed!\n")
+
+
+def main():
+    """Run all embedding store tests."""
+    print("\n🧪 EMBEDDING STORE TESTS\n")
+
+    try:
+        test_pending_and_shards()
+        test_generations_and_reopen()
+        test_legacy_layout()
+        test_rebuild()
+        test_concurrent_writers()
+
+        print("\n" + "="*60)
+        print("🎉 ALL EMBEDDING STORE TESTS PASSED!")
+        print("="*60 + "\n")
+
+    except AssertionError as e:
+        print(f"\n❌ TEST FAILED: {e}\n")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Test script for session_store
+Checks history compaction (summary folding, inline-data stripping, byte cap)
+and the memory/SQLite stores' TTL and LRU eviction
+
+Run from agent_backend/: python test_session_store.py
+"""
+
+import os
+import tempfile
+
+from session_store import (
+    SUMMARY_ACK, SUMMARY_PREFIX, MemorySessionStore, SQLiteSessionStore,
+    compact_history, history_bytes
+)
+
+
+def user(text):
+    return {"role": "user", "parts": [{"text": text}]}
+
+
+def model(text):
+    return {"role": "model", "parts": [{"text": text}]}
+
+
+def conversation(first, last):
+    """user/model pairs numbered first..last"""
+    history = []
+    for n in range(first, last + 1):
+        history += [user(f"question {n}"), model(f"answer {n}")]
+    return history
+
+
+def summary_text(history):
+    return history[0]["parts"][0]["text"]
+
+
+def test_fold_old_turns():
+    """Turns beyond max_turns are folded into a leading summary + ack"""
+    print("\n" + "="*60)
+    print("TESTING: compact_history folding")
+    print("="*60 + "\n")
+
+    history = conversation(1, 5)
+    assert compact_history(history, max_turns=5) == history, "Within the limit nothing changes"
+
+    compacted = compact_history(history, max_turns=2)
+    assert summary_text(compacted).startswith(SUMMARY_PREFIX)
+    assert compacted[1] == model(SUMMARY_ACK)
+    assert compacted[2:] == conversation(4, 5), "The latest max_turns turns are kept verbatim"
+    assert "User: question 1" in summary_text(compacted)
+    assert "Cortex: answer 3" in summary_text(compacted)
+
+    print("✅ Folding test passed!\n")
+
+
+def test_ack_not_refolded():
+    """Repeated compaction never copies the canned acknowledgement into the summary"""
+    print("\n" + "="*60)
+    print("TESTING: repeated compaction")
+    print("="*60 + "\n")
+
+    history = compact_history(conversation(1, 3), max_turns=2)
+    for n in range(4, 10):
+        history = compact_history(history + [user(f"question {n}"), model(f"answer {n}")], max_turns=2)
+
+        text = summary_text(history)
+        assert text.count(SUMMARY_PREFIX) == 1, "Old summaries are merged, not nested"
+        assert "Understood" not in text, f"Ack leaked into summary after turn {n}:\n{text}"
+        assert [c for c in history if c == model(SUMMARY_ACK)] == [history[1]], "Exactly one ack"
+        assert history[2:] == conversation(n - 1, n)
+
+    text = summary_text(history)
+    for n in range(1, 8):
+        assert f"User: question {n}" in text, f"Turn {n} lost from the rolling summary"
+
+    print("✅ Repeated compaction test passed!\n")
+
+
+def test_custom_summarizer_input():
+    """Summarizers see the old summary and the dropped turns, never the ack"""
+    seen = []
+
+    def summarizer(dropped):
+        seen.append(dropped)
+        return "short"
+
+    history = compact_history(conversation(1, 3), max_turns=1, summarizer=summarizer)
+    history = compact_history(history + conversation(4, 4), max_turns=1, summarizer=summarizer)
+
+    dropped = seen[-1]
+    assert summary_text(dropped[:1]) == f"{SUMMARY_PREFIX}\nshort"
+    assert model(SUMMARY_ACK) not in dropped
+    assert dropped[1:] == conversation(3, 3)
+
+    print("✅ Summarizer input test passed!\n")
+
+
+def test_inline_data_and_byte_cap():
+    """Image bytes survive only in the latest turn; byte cap cuts at user turns"""
+    image = {"inline_data": {"mime_type": "image/png", "data": "x" * 1000}}
+    history = [
+        {"role": "user", "parts": [{"text": "look"}, image]}, model("nice"),
+        {"role": "user", "parts": [{"text": "and this"}, image]}, model("also nice"),
+    ]
+    compacted = compact_history(history, max_turns=10)
+    assert compacted[0]["parts"][1] == {"text": "[image/png omitted]"}
+    assert compacted[2]["parts"][1] == image, "Latest turn keeps its attachment"
+
+    history = conversation(1, 20)
+    limit = history_bytes(conversation(1, 3)) + 200
+    compacted = compact_history(history, max_turns=50, max_bytes=limit)
+    assert compacted[-1] == model("answer 20")
+    assert history_bytes(compacted[2:]) <= limit
+    assert compacted[2]["role"] == "user", "Cuts only happen at user turns"
+
+    # A single oversized turn is kept rather than dropped
+    huge = [user("x" * 5000), model("ok")]
+    assert compact_history(huge, max_bytes=100) == huge
+
+    print("✅ Inline data / byte cap test passed!\n")
+
+
+def test_function_calls_stay_paired():
+    """function_call / function_response turns are never split from their user turn"""
+    history = [
+        user("question 1"),
+        {"role": "model", "parts": [{"function_call": {"name": "search", "args": {}}}]},
+        {"role": "user", "parts": [{"function_response": {"name": "search", "response": {}}}]},
+        model("answer 1"),
+    ] + conversation(2, 3)
+    compacted = compact_history(history, max_turns=2)
+    assert compacted[2:] == conversation(2, 3)
+
+    compacted = compact_history(history, max_turns=3)
+    assert compacted == history, "function_response turns do not count as user turns"
+
+    print("✅ Function call pairing test passed!\n")
+
+
+def test_memory_store_eviction():
+    """MemorySessionStore: LRU by session count, TTL expiry, compaction on put"""
+    print("\n" + "="*60)
+    print("TESTING: session stores")
+    print("="*60 + "\n")
+
+    store = MemorySessionStore(max_sessions=2, max_turns=2)
+    store.put("a", conversation(1, 1))
+    store.put("b", conversation(1, 1))
+    store.put("a", conversation(1, 2))   # refresh 'a'
+    store.put("c", conversation(1, 1))
+    assert store.get_dicts("b") == [], "Least recently updated session is evicted"
+    assert store.get_dicts("a") == conversation(1, 2)
+    assert store.stats()["evictions"] == 1
+
+    store.put("a", conversation(1, 5))
+    assert summary_text(store.get_dicts("a")).startswith(SUMMARY_PREFIX)
+    assert store.stats()["compactions"] == 1
+
+    expiring = MemorySessionStore(ttl=-1)
+    expiring.put("x", conversation(1, 1))
+    assert expiring.get_dicts("x") == []
+
+    print("✅ Memory store test passed!\n")
+
+
+def test_sqlite_store():
+    """SQLiteSessionStore round-trips, expires and evicts"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SQLiteSessionStore(os.path.join(tmp, "sessions.sqlite3"), max_sessions=1)
+        store.put("a", conversation(1, 2))
+        assert store.get_dicts("a") == conversation(1, 2)
+
+        store.put("b", conversation(1, 1))
+        store._evict()
+        assert store.get_dicts("a") == [] and store.get_dicts("b") == conversation(1, 1)
+
+        store.ttl = -1
+        assert store.get_dicts("b") == []
+        store._db.close()
+
+    print("✅ SQLite store test passed!\n")
+
+
+def main():
+    """Run all session store tests."""
+    print("\n🧪 SESSION STORE TESTS\n")
+
+    try:
+        test_fold_old_turns()
+        test_ack_not_refolded()
+        test_custom_summarizer_input()
+        test_inline_data_and_byte_cap()
+        test_function_calls_stay_paired()
+        test_memory_store_eviction()
+        test_sqlite_store()
+
+        print("\n" + "="*60)
+        print("🎉 ALL SESSION STORE TESTS PASSED!")
+        print("="*60 + "\n")
+
+    except AssertionError as e:
+        print(f"\n❌ TEST FAILED: {e}\n")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Test script for jai_cortex.vector_index
+Checks exact search, IVF training/retraining, incremental bucket updates
+and snapshot round-trips
+
+Run from agent_backend/: python test_vector_index.py
+"""
+
+import os
+import tempfile
+
+import numpy as np
+
+from jai_cortex.vector_index import (
+    FlatVectorIndex, IVFFlatIndex, create_vector_index, load_vector_index
+)
+
+
+def random_vectors(count, dim=16, seed=0):
+    return np.random.default_rng(seed).normal(size=(count, dim)).astype(np.float32)
+
+
+def fill(index, vectors, prefix="doc"):
+    for i, vector in enumerate(vectors):
+        assert index.add(f"{prefix}{i}", vector.tolist())
+    return index
+
+
+def test_flat_search():
+    """Exact cosine top-k, replacement in place, unusable vectors rejected"""
+    print("\n" + "="*60)
+    print("TESTING: flat index")
+    print("="*60 + "\n")
+
+    index = FlatVectorIndex(initial_capacity=2)
+    assert index.add("x", [1, 0, 0])
+    assert index.add("y", [0, 1, 0])
+    assert index.add("xy", [1, 1, 0])  # grows past initial_capacity
+
+    hits = index.search([1, 0.1, 0], top_k=2)
+    assert [doc_id for doc_id, _ in hits] == ["x", "xy"], f"Unexpected order: {hits}"
+    assert abs(hits[0][1] - 0.995) < 0.01, "Scores are cosine similarities"
+
+    assert index.add("x", [0, 0, 1]), "Re-adding an id replaces its vector"
+    assert len(index) == 3 and "x" in index and "z" not in index
+    assert index.search([0, 0, 1], top_k=1)[0][0] == "x"
+
+    assert not index.add("zero", [0, 0, 0]), "Zero vectors can't be normalized"
+    assert not index.add("short", [1, 0]), "Dimension mismatch is rejected"
+    assert index.search([1, 0], top_k=3) == [], "Wrong-dimension queries find nothing"
+    assert index.search([1, 0, 0], top_k=0) == []
+
+    print("✅ Flat index test passed!\n")
+
+
+def test_ivf_training():
+    """Untrained IVF is exact; training happens at min_train_size and again on doubling"""
+    print("\n" + "="*60)
+    print("TESTING: IVF training")
+    print("="*60 + "\n")
+
+    vectors = random_vectors(300)
+    flat = fill(FlatVectorIndex(), vectors)
+    ivf = IVFFlatIndex(min_train_size=64, nprobe=1000)
+
+    fill(ivf, vectors[:63])
+    assert ivf._centroids is None, "No quantizer below min_train_size"
+    assert ivf.search(vectors[5].tolist(), top_k=5) == fill(FlatVectorIndex(), vectors[:63]).search(
+        vectors[5].tolist(), top_k=5)
+
+    ivf.add("doc63", vectors[63].tolist())
+    assert ivf._centroids is not None and ivf._trained_size == 64
+    first_nlist = ivf._centroids.shape[0]
+
+    for i in range(64, 127):
+        ivf.add(f"doc{i}", vectors[i].tolist())
+    assert ivf._trained_size == 64, "Rows are bucketed incrementally until the index doubles"
+    assert sum(len(bucket) for bucket in ivf._lists) == 127, "Every row sits in exactly one bucket"
+
+    ivf.add("doc127", vectors[127].tolist())
+    assert ivf._trained_size == 128, "Retrained on doubling"
+
+    fill(ivf, vectors[128:], prefix="tmp")  # ids don't matter for the size check
+    assert ivf._trained_size == 256 and ivf._centroids.shape[0] >= first_nlist
+
+    # Probing every bucket must give exactly the flat results
+    ivf = fill(IVFFlatIndex(min_train_size=64, nprobe=1000), vectors)
+    for q in random_vectors(10, seed=1):
+        assert ivf.search(q.tolist(), top_k=10) == flat.search(q.tolist(), top_k=10)
+
+    print("✅ IVF training test passed!\n")
+
+
+def test_ivf_recall_and_updates():
+    """A small nprobe still finds near-duplicates; updated rows move buckets"""
+    vectors = random_vectors(1000, dim=32)
+    ivf = fill(IVFFlatIndex(min_train_size=256, nprobe=4), vectors)
+
+    found = 0
+    noise = random_vectors(50, dim=32, seed=2) * 0.05
+    for i in range(50):
+        top = ivf.search((vectors[i] + noise[i]).tolist(), top_k=1)
+        found += bool(top) and top[0][0] == f"doc{i}"
+    assert found >= 45, f"Near-duplicate recall too low: {found}/50"
+
+    # Replace a row with a vector from elsewhere: it must be found at its new position only
+    ivf.add("doc0", vectors[999].tolist())
+    assert sum(bucket.count(0) for bucket in ivf._lists) == 1, "Updated row is listed once"
+    hits = dict(ivf.search(vectors[999].tolist(), top_k=2))
+    assert "doc0" in hits and "doc999" in hits
+
+    print("✅ IVF recall/update test passed!\n")
+
+
+def test_snapshot_round_trip():
+    """save() + load_vector_index() restore backend, ids, vectors and quantizer"""
+    print("\n" + "="*60)
+    print("TESTING: snapshots")
+    print("="*60 + "\n")
+
+    vectors = random_vectors(200)
+    queries = random_vectors(5, seed=3)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        assert load_vector_index(os.path.join(tmp, "missing.npz")) is None
+
+        for backend in ("flat", "ivf"):
+            kwargs = {"min_train_size": 64} if backend == "ivf" else {}
+            index = fill(create_vector_index(backend, **kwargs), vectors)
+            path = os.path.join(tmp, "nested", f"{backend}.npz")
+            index.save(path)
+            assert not [f for f in os.listdir(os.path.dirname(path)) if ".tmp" in f], "No temp files left"
+
+            loaded = load_vector_index(path)
+            assert type(loaded) is type(index), f"{backend}: got {type(loaded).__name__}"
+            assert len(loaded) == 200 and "doc17" in loaded
+            for q in queries:
+                assert loaded.search(q.tolist(), top_k=5) == index.search(q.tolist(), top_k=5), \
+                    f"{backend}: results changed after reload"
+
+            if backend == "ivf":
+                assert np.array_equal(loaded._centroids, index._centroids)
+                assert loaded._trained_size == index._trained_size
+                assert sorted(map(sorted, loaded._lists)) == sorted(map(sorted, index._lists))
+
+            # The reloaded index keeps accepting rows
+            assert loaded.add("new", queries[0].tolist())
+            assert loaded.search(queries[0].tolist(), top_k=1)[0][0] == "new"
+
+        empty = FlatVectorIndex(dim=4)
+        empty.save(os.path.join(tmp, "empty.npz"))
+        assert len(load_vector_index(os.path.join(tmp, "empty.npz"))) == 0
+
+    try:
+        create_vector_index("annoy")
+        assert False, "Unknown backends must be rejected"
+    except ValueError:
+        pass
+
+    print("✅ Snapshot round-trip test passed!\n")
+
+
+def main():
+    """Run all vector index tests."""
+    print("\n🧪 VECTOR INDEX TESTS\n")
+
+    try:
+        test_flat_search()
+        test_ivf_training()
+        test_ivf_recall_and_updates()
+        test_snapshot_round_trip()
+
+        print("\n" + "="*60)
+        print("🎉 ALL VECTOR INDEX TESTS PASSED!")
+        print("="*60 + "\n")
+
+    except AssertionError as e:
+        print(f"\n❌ TEST FAILED: {e}\n")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()